@@ -0,0 +1,4 @@
+"""
+Benchmarks Package
+Contains micro-benchmarks and load tests for performance-sensitive code paths.
+"""
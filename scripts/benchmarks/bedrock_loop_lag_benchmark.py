@@ -0,0 +1,100 @@
+#!/usr/bin/env python3.13
+"""
+Bedrock Event Loop Lag Benchmark
+Runs concurrent LLM calls from the event loop, once through the blocking
+`invoke` and once through `ainvoke`, and reports how late a 10 ms ticker
+coroutine gets scheduled meanwhile. Bedrock is simulated by a client that sleeps
+for a fixed latency, unless --live is given.
+"""
+import argparse
+import asyncio
+import io
+import json
+import logging
+import os
+import statistics
+import sys
+from time import perf_counter, sleep
+
+# Configure logging
+logger = logging.getLogger(__name__)
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+
+# Add the root directory to sys.path to import project modules
+root_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(root_dir)
+
+from src.wrappers.aws.bedrock_model import BedrockWrapper
+from src.wrappers.langchain.llms.bedrock import BedrockLLM
+
+MODEL_ID = "us.meta.llama3-2-1b-instruct-v1:0"
+REGION = "us-east-1"
+PROMPT = "Reply with a single word: hello."
+TICK_S = 0.01
+
+
+class SimulatedBedrockClient:
+    def __init__(self, latency_s: float):
+        self.latency_s = latency_s
+
+    def invoke_model(self, **kwargs):
+        sleep(self.latency_s)
+        return {
+            "ResponseMetadata": {"HTTPStatusCode": 200},
+            "body": io.BytesIO(json.dumps({"generation": "hello"}).encode("utf-8")),
+        }
+
+
+async def measure_loop_lags_s(stop: asyncio.Event) -> list[float]:
+    lags_s = []
+    while not stop.is_set():
+        t0 = perf_counter()
+        await asyncio.sleep(TICK_S)
+        lags_s.append(perf_counter() - t0 - TICK_S)
+    return lags_s
+
+
+async def run(llm: BedrockLLM, n_calls: int, use_async: bool) -> tuple[float, list]:
+    async def call():
+        if use_async:
+            return await llm.ainvoke(PROMPT)
+        return llm.invoke(PROMPT)
+
+    stop = asyncio.Event()
+    ticker = asyncio.create_task(measure_loop_lags_s(stop))
+    await asyncio.sleep(0)
+    t0 = perf_counter()
+    await asyncio.gather(*[call() for _ in range(n_calls)])
+    duration_s = perf_counter() - t0
+    stop.set()
+    return duration_s, await ticker
+
+
+def main():
+    """Main function to run the Bedrock event loop lag benchmark"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--n-calls", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.5, help="Simulated (s)")
+    parser.add_argument("--live", action="store_true", help="Call Bedrock")
+    args = parser.parse_args()
+
+    if not args.live:
+        wrapper = BedrockWrapper(region=REGION, read_timeout=None)
+        wrapper._BedrockWrapper__client = SimulatedBedrockClient(args.latency)
+    llm = BedrockLLM(model_id=MODEL_ID, region=REGION)
+    logging.getLogger("src.wrappers.langchain.llms.bedrock").setLevel(logging.WARNING)
+
+    for name, use_async in [("invoke", False), ("ainvoke", True)]:
+        duration_s, lags_s = asyncio.run(run(llm, args.n_calls, use_async))
+        lags_s = lags_s or [duration_s]
+        logger.info(
+            f"{name}: {args.n_calls} calls in {duration_s:.2f} s. Loop lag "
+            f"median {statistics.median(lags_s) * 1000:.1f} ms, "
+            f"max {max(lags_s) * 1000:.1f} ms over {len(lags_s)} ticks."
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3.13
+"""
+Columnar Encoding Benchmark
+Encodes the results of representative chart queries (a daily time series, bars
+per category and a large breakdown) in the rows result format, as JSON and as
+the string sent to ElevenLabs, and in the columnar one, as JSON and binary,
+and reports their payload sizes (raw and gzipped) and encoding times. Encoding
+starts from the cursor rows, so it includes building the result DTO.
+"""
+import argparse
+import gzip
+import json
+import logging
+import os
+import random
+import sys
+from datetime import date, timedelta
+from decimal import Decimal
+from time import perf_counter
+from typing import Callable
+
+# Configure logging
+logger = logging.getLogger(__name__)
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+
+# Add the root directory to sys.path to import project modules
+root_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(root_dir)
+
+from src.app.demos.ai_bi.nlq.columnar_rows import (
+    ColumnarRowsBuilder,
+    encode_columnar_binary,
+)
+from src.app.demos.ai_bi.nlq.dtos import SqlResultDTO
+from src.utils.json_toolbox import make_serializable
+
+REGIONS = ["North", "South", "East", "West", "Central"]
+CATEGORIES = ["Electronics", "Clothing", "Groceries", "Furniture", "Toys", "Books"]
+
+
+def create_time_series(n_rows: int) -> tuple[list[str], list[tuple]]:
+    """Daily revenue and orders."""
+    start = date(2024, 1, 1)
+    return ["day", "revenue", "n_orders"], [
+        (
+            start + timedelta(days=i),
+            Decimal(random.randint(10_000, 99_999_999)) / 100,
+            random.randint(0, 5_000),
+        )
+        for i in range(n_rows)
+    ]
+
+
+def create_bars(n_rows: int) -> tuple[list[str], list[tuple]]:
+    """Revenue per region."""
+    return ["region", "revenue"], [
+        (
+            f"{REGIONS[i % len(REGIONS)]} {i // len(REGIONS)}",
+            Decimal(random.randint(10_000, 99_999_999)) / 100,
+        )
+        for i in range(n_rows)
+    ]
+
+
+def create_breakdown(n_rows: int) -> tuple[list[str], list[tuple]]:
+    """Revenue per day, region and category."""
+    start = date(2024, 1, 1)
+    return ["day", "region", "category", "revenue", "n_orders"], [
+        (
+            start + timedelta(days=i // 30),
+            random.choice(REGIONS),
+            random.choice(CATEGORIES),
+            Decimal(random.randint(100, 9_999_999)) / 100,
+            random.randint(0, 500) if i % 17 else None,
+        )
+        for i in range(n_rows)
+    ]
+
+
+def create_rows_result(columns: list[str], rows: list[tuple]) -> SqlResultDTO:
+    return SqlResultDTO(
+        columns=columns,
+        rows=[list(row) for row in rows],
+        query="SELECT ...",
+        execution_time_ms=1.0,
+    )
+
+
+def create_columnar_result(columns: list[str], rows: list[tuple]) -> SqlResultDTO:
+    columnar_rows = ColumnarRowsBuilder(columns)
+    columnar_rows.extend(rows)
+    return SqlResultDTO(
+        columns=columns,
+        rows=[],
+        query="SELECT ...",
+        execution_time_ms=1.0,
+        columnar_rows=columnar_rows.build(),
+    )
+
+
+ENCODINGS: dict[str, Callable[[list[str], list[tuple]], bytes]] = {
+    "rows json": lambda columns, rows: json.dumps(
+        make_serializable(create_rows_result(columns, rows))
+    ).encode(),
+    "rows str": lambda columns, rows: str(
+        create_rows_result(columns, rows).model_dump()
+    ).encode(),
+    "columnar json": lambda columns, rows: create_columnar_result(columns, rows)
+    .model_dump_json()
+    .encode(),
+    "columnar binary": lambda columns, rows: encode_columnar_binary(
+        create_columnar_result(columns, rows).model_dump(mode="json")
+    ),
+}
+
+
+def main():
+    """Main function to run the columnar encoding benchmark"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--n-repeats", type=int, default=20)
+    args = parser.parse_args()
+
+    random.seed(0)
+    queries = {
+        "time series (365 rows)": create_time_series(365),
+        "bars (12 rows)": create_bars(12),
+        "breakdown (10000 rows)": create_breakdown(10_000),
+    }
+    for query_name, (columns, rows) in queries.items():
+        logger.info(f"{query_name}:")
+        for encoding_name, encode in ENCODINGS.items():
+            t0 = perf_counter()
+            for _ in range(args.n_repeats):
+                payload = encode(columns, rows)
+            duration_ms = (perf_counter() - t0) * 1000 / args.n_repeats
+            logger.info(
+                f"  {encoding_name:<16} {len(payload):>9} B, "
+                f"{len(gzip.compress(payload)):>8} B gzipped, {duration_ms:8.2f} ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
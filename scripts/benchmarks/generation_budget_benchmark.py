@@ -0,0 +1,104 @@
+#!/usr/bin/env python3.13
+"""
+Generation Budget Benchmark
+Calls Bedrock with the NLQ prompt on a fixed query set, without any generation
+limit and with the NLQ generation budget and stop sequences, and reports the
+output tokens and latencies of each variant. The variant with JSON completion,
+invoked like the NLQ does, also ends as soon as the JSON answer is complete.
+"""
+import argparse
+import logging
+import os
+import statistics
+import sys
+from datetime import datetime
+from time import perf_counter
+
+# Configure logging
+logger = logging.getLogger(__name__)
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+
+# Add the root directory to sys.path to import project modules
+root_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(root_dir)
+
+from scripts.benchmarks.nlq_example_selection_benchmark import QUERIES
+from src.app.demos.ai_bi.nlq.llm_nlq.llm_nlq import (
+    DEFAULT_MAX_OUTPUT_TOKENS,
+    DEFAULT_MODEL_ID,
+    DEFAULT_REGION,
+    DEFAULT_STOP_SEQUENCES,
+    AibiLlmTextToSQL,
+)
+from src.wrappers.langchain.llms.bedrock import BedrockLLM
+
+
+def measure(llm: BedrockLLM, prompts: list[str], shall_stream: bool) -> dict:
+    n_output_tokens = llm.usage_stats["output_tokens"]
+    latencies_s = []
+    n_characters = []
+    for prompt in prompts:
+        start = perf_counter()
+        try:
+            answer = "".join(llm.stream(prompt)) if shall_stream else llm.invoke(prompt)
+        except Exception as e:
+            logger.warning(f"Failed to compute prompt: {type(e)}-{e}")
+            continue
+        latencies_s.append(perf_counter() - start)
+        n_characters.append(len(answer))
+    return {
+        "latencies_s": latencies_s,
+        "n_characters": n_characters,
+        # Streamed answers, including those ended on JSON completion, report no
+        # usage: their output is only measured in characters
+        "n_output_tokens": llm.usage_stats["output_tokens"] - n_output_tokens,
+    }
+
+
+def main():
+    """Main function to run the generation budget benchmark"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--model-id", default=DEFAULT_MODEL_ID)
+    parser.add_argument("--region", default=DEFAULT_REGION)
+    args = parser.parse_args()
+
+    prompt = AibiLlmTextToSQL(response_cache_ttl_s=None)._AibiLlmTextToSQL__prompt
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:00:00")
+    prompts = [
+        prompt.format(natural_language_query=query, timestamp=timestamp)
+        for query in QUERIES
+    ]
+    budget = {
+        "max_output_tokens": DEFAULT_MAX_OUTPUT_TOKENS,
+        "stop": DEFAULT_STOP_SEQUENCES,
+    }
+    variants = {
+        "unbounded": (BedrockLLM(args.model_id, args.region), False),
+        "budget and stop sequences": (
+            BedrockLLM(args.model_id, args.region, **budget),
+            False,
+        ),
+        "unbounded, streamed": (BedrockLLM(args.model_id, args.region), True),
+        "budget, stop sequences and JSON completion": (
+            BedrockLLM(
+                args.model_id, args.region, stop_when_json_complete=True, **budget
+            ),
+            False,
+        ),
+    }
+    for name, (llm, shall_stream) in variants.items():
+        results = measure(llm, prompts, shall_stream)
+        if not results["latencies_s"]:
+            continue
+        logger.info(
+            f"{name}: {statistics.median(results['latencies_s']):.2f} s median latency, "
+            f"{max(results['latencies_s']):.2f} s max, "
+            f"{statistics.mean(results['n_characters']):.0f} output characters and "
+            f"{results['n_output_tokens'] / len(results['latencies_s']):.0f} output tokens on average."
+        )
+
+
+if __name__ == "__main__":
+    main()
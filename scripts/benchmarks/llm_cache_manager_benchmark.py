@@ -0,0 +1,148 @@
+#!/usr/bin/env python3.13
+"""
+LLM Cache Manager Benchmark
+Compares the legacy file-per-prompt cache layout against the SQLite store of
+CacheManager: key computation, writes, hits, misses and disk usage at 100k
+entries, and the one-off migration of the legacy layout.
+"""
+import argparse
+import logging
+import os
+import random
+import sys
+import tempfile
+from pathlib import Path
+from time import perf_counter
+from uuid import NAMESPACE_URL, uuid5
+
+# Configure logging
+logger = logging.getLogger(__name__)
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+
+# Add the root directory to sys.path to import project modules
+root_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(root_dir)
+
+from src.wrappers.llm.llm_engines.caching.cache_manager import CacheManager
+
+PROMPT_TEMPLATE = "You are a helpful assistant. Answer the question below.\n" * 100
+N_LOOKUPS = 10_000
+
+
+def compute_legacy_key(prompt: str) -> str:
+    prompt = "".join([c for c in prompt if c.isalnum() or c == " "])
+    prompt = " ".join(prompt.split())
+    return str(uuid5(NAMESPACE_URL, prompt))
+
+
+def measure_s(function, n: int) -> float:
+    start = perf_counter()
+    for i in range(n):
+        function(i)
+    return perf_counter() - start
+
+
+def compute_disk_usage_bytes(path: Path) -> int:
+    if path.is_file():
+        return path.stat().st_blocks * 512
+    return sum(
+        (Path(directory) / filename).stat().st_blocks * 512
+        for directory, _, filenames in os.walk(path)
+        for filename in filenames
+    )
+
+
+def log_result(name: str, elapsed_s: float, n: int):
+    logger.info(f"{name}: {elapsed_s:.2f} s ({elapsed_s / n * 1e6:.1f} µs/op).")
+
+
+def main():
+    """Main function to run the LLM cache manager benchmark"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--n-entries", type=int, default=100_000)
+    args = parser.parse_args()
+    n_entries = args.n_entries
+    # Logs one line per write otherwise
+    logging.getLogger("src.wrappers.llm.llm_engines.caching.cache_manager").setLevel(
+        logging.WARNING
+    )
+
+    prompts = [f"{PROMPT_TEMPLATE}Question {i}?" for i in range(N_LOOKUPS)]
+    log_result(
+        "legacy key",
+        measure_s(lambda i: compute_legacy_key(prompts[i]), N_LOOKUPS),
+        N_LOOKUPS,
+    )
+    cache_manager = CacheManager(Path(tempfile.mkdtemp()))
+    prompt2key = cache_manager._CacheManager__prompt2key
+    log_result("key", measure_s(lambda i: prompt2key(prompts[i]), N_LOOKUPS), N_LOOKUPS)
+
+    value = "x" * 500
+    keys = [str(uuid5(NAMESPACE_URL, str(i))) for i in range(n_entries)]
+    hit_keys = random.sample(keys, N_LOOKUPS)
+    miss_keys = [str(uuid5(NAMESPACE_URL, f"miss {i}")) for i in range(N_LOOKUPS)]
+    with tempfile.TemporaryDirectory() as directory:
+        legacy_directory = Path(directory) / "v1"
+        legacy_directory.mkdir()
+
+        def legacy_get(key: str):
+            cache_file = legacy_directory / key
+            return cache_file.read_text() if cache_file.exists() else None
+
+        log_result(
+            "legacy writes",
+            measure_s(
+                lambda i: (legacy_directory / keys[i]).write_text(value), n_entries
+            ),
+            n_entries,
+        )
+        log_result(
+            "legacy hits",
+            measure_s(lambda i: legacy_get(hit_keys[i]), N_LOOKUPS),
+            N_LOOKUPS,
+        )
+        log_result(
+            "legacy misses",
+            measure_s(lambda i: legacy_get(miss_keys[i]), N_LOOKUPS),
+            N_LOOKUPS,
+        )
+        logger.info(
+            f"legacy disk usage: {compute_disk_usage_bytes(legacy_directory) / 1e6:.1f} MB."
+        )
+        start = perf_counter()
+        CacheManager(Path(directory), version_name="v1", max_entries=n_entries)
+        logger.info(f"migration: {perf_counter() - start:.2f} s.")
+
+    with tempfile.TemporaryDirectory() as directory:
+        cache_manager = CacheManager(Path(directory), max_entries=n_entries)
+        log_result(
+            "writes",
+            measure_s(lambda i: cache_manager.set_by_key(keys[i], value), n_entries),
+            n_entries,
+        )
+        log_result(
+            "hits",
+            measure_s(lambda i: cache_manager.get_by_key(hit_keys[i]), N_LOOKUPS),
+            N_LOOKUPS,
+        )
+        log_result(
+            "misses",
+            measure_s(lambda i: cache_manager.get_by_key(miss_keys[i]), N_LOOKUPS),
+            N_LOOKUPS,
+        )
+        filepath = cache_manager.filepath
+        logger.info(
+            f"disk usage: {sum(compute_disk_usage_bytes(Path(f'{filepath}{suffix}')) for suffix in ['', '-wal'] if Path(f'{filepath}{suffix}').exists()) / 1e6:.1f} MB."
+        )
+        log_result(
+            "writes with eviction",
+            measure_s(lambda i: cache_manager.set_by_key(f"new {i}", value), N_LOOKUPS),
+            N_LOOKUPS,
+        )
+        logger.info(f"stats: {cache_manager.stats}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3.13
+"""
+LLM Pipeline Benchmark
+Compares the per-call overhead of the LangChain chain the LLM components used
+(RunnableLambda | BedrockLLM | transform | TolerantJsonOutputParser) against
+the native LlmPipeline, with a zero-latency stub Bedrock client, and the
+import time of both in fresh interpreters.
+"""
+import argparse
+import asyncio
+import io
+import json
+import logging
+import os
+import statistics
+import subprocess
+import sys
+from time import perf_counter
+
+# Configure logging
+logger = logging.getLogger(__name__)
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+
+# Add the root directory to sys.path to import project modules
+root_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(root_dir)
+
+from langchain_core.runnables import RunnableLambda, chain
+
+from src.wrappers.aws.bedrock_model import BedrockWrapper
+from src.wrappers.aws.bedrock_rate_limiter import BedrockRateLimiter
+from src.wrappers.langchain.llms.bedrock import BedrockLLM
+from src.wrappers.langchain.output_parsers.tolerant_json_output_parser import (
+    TolerantJsonOutputParser,
+)
+from src.wrappers.llm.pipelines.bedrock_text_generator import BedrockTextGenerator
+from src.wrappers.llm.pipelines.llm_pipeline import LlmPipeline
+from src.wrappers.llm.postprocessing.tolerant_json_parser import TolerantJsonParser
+
+REGION = "us-east-1"
+MODEL_ID = "us.meta.llama3-3-70b-instruct-v1:0"
+GENERATION = '{"texts": ["first highlight", "second highlight"]}'
+LANGCHAIN_IMPORTS = [
+    "src.wrappers.langchain.llms.bedrock",
+    "src.wrappers.langchain.output_parsers.tolerant_json_output_parser",
+    "langchain_core.runnables",
+]
+PIPELINE_IMPORTS = [
+    "src.wrappers.llm.pipelines.llm_pipeline",
+    "src.wrappers.llm.postprocessing.tolerant_json_parser",
+]
+
+
+class StubBedrockClient:
+    """Answers instantly, so that only the client-side overhead is measured."""
+
+    def invoke_model(self, **kwargs):
+        return {
+            "ResponseMetadata": {"HTTPStatusCode": 200},
+            "body": io.BytesIO(json.dumps({"generation": GENERATION}).encode()),
+        }
+
+
+def render(inputs: dict[str, str]) -> str:
+    return f"Highlight the answer to: {inputs['question']}"
+
+
+def transform(answer: str) -> str:
+    return answer
+
+
+def create_langchain_chain():
+    model = BedrockLLM(model_id=MODEL_ID, region=REGION, use_converse=False)
+    return (
+        RunnableLambda(render) | model | chain(transform) | TolerantJsonOutputParser()
+    )
+
+
+def create_pipeline() -> LlmPipeline:
+    generator = BedrockTextGenerator(
+        model_id=MODEL_ID, region=REGION, use_converse=False
+    )
+    return LlmPipeline(
+        render=render,
+        generator=generator,
+        parse=TolerantJsonParser().parse,
+        transform=transform,
+    )
+
+
+def measure_us(function, n_iterations: int) -> tuple[float, float]:
+    """Median and p95 latency of sync calls, in microseconds."""
+    durations = []
+    for i in range(n_iterations):
+        t0 = perf_counter()
+        function({"question": f"question {i}"})
+        durations.append((perf_counter() - t0) * 1e6)
+    durations.sort()
+    return statistics.median(durations), durations[int(len(durations) * 0.95)]
+
+
+def ameasure_us(function, n_iterations: int) -> tuple[float, float]:
+    """Median and p95 latency of async calls, in microseconds."""
+
+    async def run() -> list[float]:
+        durations = []
+        for i in range(n_iterations):
+            t0 = perf_counter()
+            await function({"question": f"question {i}"})
+            durations.append((perf_counter() - t0) * 1e6)
+        return durations
+
+    durations = sorted(asyncio.run(run()))
+    return statistics.median(durations), durations[int(len(durations) * 0.95)]
+
+
+def measure_import_ms(modules: list[str], n_runs: int) -> float:
+    """Median import time of `modules` in fresh interpreters, in milliseconds."""
+    code = (
+        "import time; t0 = time.perf_counter(); "
+        + "; ".join(f"import {m}" for m in modules)
+        + "; print((time.perf_counter() - t0) * 1000)"
+    )
+    durations = [
+        float(
+            subprocess.run(
+                [sys.executable, "-c", code],
+                cwd=root_dir,
+                capture_output=True,
+                text=True,
+                check=True,
+            ).stdout
+        )
+        for _ in range(n_runs)
+    ]
+    return statistics.median(durations)
+
+
+def main():
+    """Main function to run the LLM pipeline benchmark"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--n-iterations", type=int, default=2000)
+    parser.add_argument("--n-import-runs", type=int, default=5)
+    args = parser.parse_args()
+
+    logging.getLogger("src").setLevel(logging.WARNING)
+    wrapper = BedrockWrapper(region=REGION, read_timeout=None)
+    setattr(wrapper, "_BedrockWrapper__client", StubBedrockClient())
+    # The stub cannot be throttled: lift the token bucket so that it does not
+    # pace the calls
+    rate_limiter = BedrockRateLimiter(MODEL_ID)
+    for name in ["rate", "max_rate", "burst", "tokens"]:
+        setattr(rate_limiter, f"_BedrockRateLimiter__{name}", float("inf"))
+
+    langchain_chain = create_langchain_chain()
+    pipeline = create_pipeline()
+    assert langchain_chain.invoke({"question": "q"}) == pipeline.invoke(
+        {"question": "q"}
+    )
+    for name, langchain_function, pipeline_function, measure in [
+        ("sync", langchain_chain.invoke, pipeline.invoke, measure_us),
+        ("async", langchain_chain.ainvoke, pipeline.ainvoke, ameasure_us),
+    ]:
+        langchain_p50, langchain_p95 = measure(langchain_function, args.n_iterations)
+        pipeline_p50, pipeline_p95 = measure(pipeline_function, args.n_iterations)
+        logger.info(
+            f"{name} call: LangChain chain p50 {langchain_p50:.0f} us / p95 {langchain_p95:.0f} us, "
+            f"LlmPipeline p50 {pipeline_p50:.0f} us / p95 {pipeline_p95:.0f} us "
+            f"({langchain_p50 / pipeline_p50:.1f}x)."
+        )
+
+    langchain_ms = measure_import_ms(LANGCHAIN_IMPORTS, args.n_import_runs)
+    pipeline_ms = measure_import_ms(PIPELINE_IMPORTS, args.n_import_runs)
+    logger.info(
+        f"Import: LangChain chain {langchain_ms:.0f} ms, LlmPipeline {pipeline_ms:.0f} ms."
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3.13
+"""
+NLQ Example Selection Benchmark
+Reports the estimated prompt tokens of the NLQ prompt with all few-shot examples
+against per-query example selection, on a fixed EN/ES query set. With --invoke,
+it also measures end-to-end generation latency against Bedrock.
+"""
+import argparse
+import logging
+import os
+import statistics
+import sys
+from datetime import datetime
+from time import perf_counter
+
+# Configure logging
+logger = logging.getLogger(__name__)
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+
+# Add the root directory to sys.path to import project modules
+root_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(root_dir)
+
+from src.app.demos.ai_bi.nlq.llm_nlq.dtos import NlqRequestDTO
+from src.app.demos.ai_bi.nlq.llm_nlq.llm_nlq import AibiLlmTextToSQL
+from src.wrappers.llm.llm_engines.abstract_llm_engine import CHAR_2_TOKENS_FACTOR
+
+QUERIES = [
+    "Top 5 products by revenue",
+    "Monthly sales trend in 2024",
+    "What percentage of revenue comes from each region?",
+    "Which customers bought the most this year?",
+    "Compare sales of the last two quarters by category",
+    "How many orders did we get last week?",
+    "What is the average order value by payment method?",
+    "¿Cuáles son los 5 productos más vendidos?",
+    "Ventas por categoría del último trimestre",
+    "¿Qué porcentaje de los ingresos viene de cada región?",
+]
+
+
+def measure_prompt_tokens(text_to_sql: AibiLlmTextToSQL) -> list[int]:
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    prompt = text_to_sql._AibiLlmTextToSQL__prompt
+    return [
+        int(
+            len(prompt.format(natural_language_query=query, timestamp=timestamp))
+            * CHAR_2_TOKENS_FACTOR
+        )
+        for query in QUERIES
+    ]
+
+
+def measure_latencies_s(text_to_sql: AibiLlmTextToSQL) -> list[float]:
+    latencies_s = []
+    for query in QUERIES:
+        start = perf_counter()
+        try:
+            text_to_sql.compute(NlqRequestDTO(natural_language_query=query))
+        except Exception as e:
+            logger.warning(f"Failed to compute '{query}': {type(e)}-{e}")
+            continue
+        latencies_s.append(perf_counter() - start)
+    return latencies_s
+
+
+def main():
+    """Main function to run the NLQ example selection benchmark"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--invoke",
+        action="store_true",
+        help="Also measure generation latency by calling Bedrock",
+    )
+    args = parser.parse_args()
+
+    variants = {
+        "all examples": AibiLlmTextToSQL(max_prompt_examples=None),
+        "selected examples": AibiLlmTextToSQL(),
+    }
+    for name, text_to_sql in variants.items():
+        tokens = measure_prompt_tokens(text_to_sql)
+        logger.info(
+            f"{name}: {statistics.mean(tokens):.0f} prompt tokens on average "
+            f"(min {min(tokens)}, max {max(tokens)})."
+        )
+        if args.invoke:
+            latencies_s = measure_latencies_s(text_to_sql)
+            if latencies_s:
+                logger.info(
+                    f"{name}: {statistics.median(latencies_s):.2f} s median latency, "
+                    f"{max(latencies_s):.2f} s max ({len(latencies_s)}/{len(QUERIES)} queries)."
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3.13
+"""
+NLQ Event Loop Lag Benchmark
+Runs concurrent NLQ requests from the event loop, once through the blocking
+`AibiNlqAgent.compute` and once through `acompute`, and reports how late a
+10 ms ticker coroutine gets scheduled meanwhile. Bedrock is simulated by a
+client that sleeps for a fixed latency, and the database by a connection pool
+whose queries sleep, unless --live is given.
+"""
+import argparse
+import asyncio
+import io
+import json
+import logging
+import os
+import statistics
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter, sleep
+from typing import Optional
+
+# Configure logging
+logger = logging.getLogger(__name__)
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+
+# Add the root directory to sys.path to import project modules
+root_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(root_dir)
+
+from src.app.demos.ai_bi.nlq.llm_nlq.llm_nlq import DEFAULT_MODEL_ID, AibiLlmTextToSQL
+from src.app.demos.ai_bi.nlq.nlq_agent import AibiNlqAgent
+from src.app.demos.ai_bi.nlq.query_executor import (
+    DEFAULT_FETCH_BATCH_SIZE,
+    DEFAULT_MAX_ROWS,
+    MAX_CONNECTIONS,
+    AibiQueryExecutor,
+)
+from src.wrappers.aws.bedrock_model import BedrockWrapper
+from src.wrappers.aws.bedrock_rate_limiter import BedrockRateLimiter
+
+REGION = "us-east-1"
+TICK_S = 0.01
+SQL_QUERY = "SELECT region, SUM(amount) AS total_amount FROM sales GROUP BY region"
+
+
+class SimulatedBedrockClient:
+    def __init__(self, latency_s: float):
+        self.latency_s = latency_s
+
+    def invoke_model(self, **kwargs):
+        sleep(self.latency_s)
+        generation = json.dumps({"sql_queries": [SQL_QUERY], "title": "Sales"})
+        return {
+            "ResponseMetadata": {"HTTPStatusCode": 200},
+            "body": io.BytesIO(json.dumps({"generation": generation}).encode()),
+        }
+
+
+class SimulatedCursor:
+    description = [("region",), ("total_amount",)]
+
+    def __init__(self, latency_s: float):
+        self.latency_s = latency_s
+
+    def execute(self, query: str):
+        sleep(self.latency_s)
+
+    def fetchmany(self, size: int) -> list[tuple]:
+        return [("north", 10.0), ("south", 20.0)]
+
+    def close(self):
+        pass
+
+
+class SimulatedConnection:
+    def __init__(self, latency_s: float):
+        self.latency_s = latency_s
+
+    def cursor(self, name: Optional[str] = None) -> SimulatedCursor:
+        return SimulatedCursor(self.latency_s)
+
+    def reset(self):
+        pass
+
+
+class SimulatedConnectionPool:
+    def __init__(self, latency_s: float):
+        self.latency_s = latency_s
+
+    def getconn(self) -> SimulatedConnection:
+        return SimulatedConnection(self.latency_s)
+
+    def putconn(self, connection: SimulatedConnection):
+        pass
+
+
+def create_simulated_query_executor(latency_s: float) -> AibiQueryExecutor:
+    """Real query executor whose connection pool is simulated."""
+    query_executor = object.__new__(AibiQueryExecutor)
+    query_executor._AibiQueryExecutor__connection_pool = SimulatedConnectionPool(
+        latency_s
+    )
+    query_executor._AibiQueryExecutor__executor = ThreadPoolExecutor(
+        max_workers=MAX_CONNECTIONS, thread_name_prefix="aibi-sql"
+    )
+    query_executor._AibiQueryExecutor__connection_slots = threading.BoundedSemaphore(
+        MAX_CONNECTIONS
+    )
+    query_executor._AibiQueryExecutor__connection_timeout = 10
+    query_executor._AibiQueryExecutor__max_rows = DEFAULT_MAX_ROWS
+    query_executor._AibiQueryExecutor__fetch_batch_size = DEFAULT_FETCH_BATCH_SIZE
+    query_executor._AibiQueryExecutor__use_server_side_cursor = True
+    # Every request runs its query
+    query_executor._AibiQueryExecutor__result_cache = None
+    return query_executor
+
+
+async def measure_loop_lags_s(stop: asyncio.Event) -> list[float]:
+    lags_s = []
+    while not stop.is_set():
+        t0 = perf_counter()
+        await asyncio.sleep(TICK_S)
+        lags_s.append(perf_counter() - t0 - TICK_S)
+    return lags_s
+
+
+async def run(
+    agent: AibiNlqAgent, n_requests: int, use_async: bool, offset: int
+) -> tuple[float, list[float], list[float]]:
+    """Duration, loop lags and request latencies, in seconds."""
+    latencies_s = []
+
+    async def request(i: int):
+        t0 = perf_counter()
+        # Distinct queries, so that no request is served by another one
+        query = f"Total sales by region, request {offset + i}"
+        result = await agent.acompute(query) if use_async else agent.compute(query)
+        latencies_s.append(perf_counter() - t0)
+        return result
+
+    stop = asyncio.Event()
+    ticker = asyncio.create_task(measure_loop_lags_s(stop))
+    await asyncio.sleep(0)
+    t0 = perf_counter()
+    await asyncio.gather(*[request(i) for i in range(n_requests)])
+    duration_s = perf_counter() - t0
+    stop.set()
+    return duration_s, await ticker, latencies_s
+
+
+def main():
+    """Main function to run the NLQ event loop lag benchmark"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--n-requests", type=int, default=20)
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="Simulated (s)")
+    parser.add_argument("--sql-latency", type=float, default=0.05, help="Simulated (s)")
+    parser.add_argument("--max-concurrent-requests", type=int, default=8)
+    parser.add_argument("--live", action="store_true", help="Call Bedrock and the DB")
+    args = parser.parse_args()
+
+    if args.live:
+        query_executor = AibiQueryExecutor()
+    else:
+        wrapper = BedrockWrapper(region=REGION, read_timeout=None)
+        wrapper._BedrockWrapper__client = SimulatedBedrockClient(args.llm_latency)
+        # The simulated client cannot be throttled: lift the token bucket so
+        # that it does not pace the requests
+        rate_limiter = BedrockRateLimiter(DEFAULT_MODEL_ID)
+        for name in ["rate", "max_rate", "burst", "tokens"]:
+            setattr(rate_limiter, f"_BedrockRateLimiter__{name}", float("inf"))
+        query_executor = create_simulated_query_executor(args.sql_latency)
+    agent = AibiNlqAgent(
+        llm_text_to_sql=AibiLlmTextToSQL(region=REGION, response_cache_ttl_s=None),
+        query_executor=query_executor,
+        max_concurrent_requests=args.max_concurrent_requests,
+    )
+    logging.getLogger("src").setLevel(logging.WARNING)
+
+    for i, (name, use_async) in enumerate([("compute", False), ("acompute", True)]):
+        duration_s, lags_s, latencies_s = asyncio.run(
+            run(agent, args.n_requests, use_async, offset=i * args.n_requests)
+        )
+        lags_s = lags_s or [duration_s]
+        logger.info(
+            f"{name}: {args.n_requests} requests in {duration_s:.2f} s "
+            f"(latency p50 {statistics.median(latencies_s):.2f} s). Loop lag "
+            f"median {statistics.median(lags_s) * 1000:.1f} ms, "
+            f"max {max(lags_s) * 1000:.1f} ms over {len(lags_s)} ticks."
+        )
+
+
+if __name__ == "__main__":
+    main()
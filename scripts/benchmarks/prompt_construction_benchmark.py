@@ -0,0 +1,121 @@
+#!/usr/bin/env python3.13
+"""
+Prompt Construction Benchmark
+Compares the per-call prompt construction time of LangChain's FewShotPromptTemplate
+against StaticPrefixPrompt, using the highlighting and NLQ prompting assets.
+"""
+import json
+import logging
+import os
+import sys
+from pathlib import Path
+from timeit import timeit
+
+# Configure logging
+logger = logging.getLogger(__name__)
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+
+# Add the root directory to sys.path to import project modules
+root_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(root_dir)
+
+from langchain_core.prompts.few_shot import FewShotPromptTemplate
+from langchain_core.prompts.prompt import PromptTemplate
+
+from src.utils.json_toolbox import load_jsons_in_directory
+from src.wrappers.llm.prompting.static_prefix_prompt import StaticPrefixPrompt
+
+N_CALLS = 2000
+
+PROMPTINGS = {
+    "highlighting": {
+        "directory": Path(
+            "src/app/landing_voicechat/highlighting/llm_text_highlighting/prompting"
+        ),
+        "serialized_keys": None,
+        "inputs": {
+            "question": "What services do you offer?",
+            "answer": "Chatbots, voice assistants and process automation.",
+            "section_content": "Chatbots and Voice Assistants\n\nAI-Driven Process Automation",
+        },
+    },
+    "nlq": {
+        "directory": Path("src/app/demos/ai_bi/nlq/llm_nlq/prompting"),
+        "serialized_keys": ["results"],
+        "inputs": {
+            "natural_language_query": "Top 5 products by revenue",
+            "timestamp": "2025-07-29 18:30:00",
+        },
+    },
+}
+
+
+def load_examples(directory: Path, serialized_keys: list[str] | None) -> list[dict]:
+    examples = load_jsons_in_directory(directory / "examples", encoding="utf-8")
+    examples = [
+        e | {"example_id": i + 1, "type": e.get("type", "CORRECT")}
+        for i, e in enumerate(examples)
+    ]
+    return [
+        {
+            k: (
+                json.dumps(v, ensure_ascii=False)
+                if serialized_keys is None or k in serialized_keys
+                else v
+            )
+            for k, v in e.items()
+        }
+        for e in examples
+    ]
+
+
+def escape(example: dict) -> dict:
+    return {
+        k: v.replace("{", "{{").replace("}", "}}") if isinstance(v, str) else v
+        for k, v in example.items()
+    }
+
+
+def benchmark(name: str, directory: Path, serialized_keys, inputs: dict):
+    prefix = (directory / "prefix.txt").read_text()
+    suffix = (directory / "suffix.txt").read_text()
+    formatter = (directory / "examples-formatter.txt").read_text()
+    examples = load_examples(directory, serialized_keys)
+
+    few_shot_prompt_template = FewShotPromptTemplate(
+        prefix=prefix,
+        examples=[escape(e) for e in examples],
+        example_prompt=PromptTemplate.from_template(formatter),
+        input_variables=list(inputs),
+        suffix=suffix,
+    )
+    static_prefix_prompt = StaticPrefixPrompt(
+        prefix=prefix,
+        suffix=suffix,
+        examples=examples,
+        example_formatter=formatter,
+    )
+    assert few_shot_prompt_template.format(**inputs) == static_prefix_prompt.format(
+        **inputs
+    )
+
+    before_s = timeit(lambda: few_shot_prompt_template.format(**inputs), number=N_CALLS)
+    after_s = timeit(lambda: static_prefix_prompt.format(**inputs), number=N_CALLS)
+    logger.info(
+        f"{name}: {len(examples)} examples, {len(static_prefix_prompt.prefix)} prefix characters. "
+        f"FewShotPromptTemplate: {before_s / N_CALLS * 1e6:.1f} us/call. "
+        f"StaticPrefixPrompt: {after_s / N_CALLS * 1e6:.1f} us/call "
+        f"(x{before_s / after_s:.0f})."
+    )
+
+
+def main():
+    """Main function to run the prompt construction benchmark"""
+    for name, prompting in PROMPTINGS.items():
+        benchmark(name, **prompting)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3.13
+"""
+Results Validator Benchmark
+Compares the legacy validation of ResultsValidator (jsonschema.validate, which
+checks the schema and builds a validator on every call, then a recursive key
+case conversion) against the precompiled single traversal, on NLQ-sized
+results.
+"""
+import argparse
+import logging
+import os
+import random
+import sys
+from copy import deepcopy
+from time import perf_counter
+
+# Configure logging
+logger = logging.getLogger(__name__)
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+
+# Add the root directory to sys.path to import project modules
+root_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(root_dir)
+
+from jsonschema import ValidationError, validate
+
+from src.utils.dict_toolbox import convert_keys_case
+from src.utils.string_toolbox import CaseType
+from src.wrappers.llm.postprocessing.results_validator import ResultsValidator
+
+N_COLUMNS = 8
+# Schema of a serialized NlqResultDTO
+NLQ_RESULT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "natural_language_query": {"type": "string"},
+        "title": {"type": ["string", "null"]},
+        "chart_type": {"type": ["string", "null"]},
+        "total_time_ms": {"type": "number"},
+        "generation_time_ms": {"type": "number"},
+        "results": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "columns": {"type": "array", "items": {"type": "string"}},
+                    "rows": {
+                        "type": "array",
+                        "items": {
+                            "type": "array",
+                            "items": {"type": ["string", "number", "null"]},
+                        },
+                    },
+                    "query": {"type": "string"},
+                    "execution_time_ms": {"type": "number"},
+                    "columns_units": {
+                        "type": ["array", "null"],
+                        "items": {"type": ["string", "null"]},
+                    },
+                },
+                "required": ["columns", "rows", "query", "execution_time_ms"],
+            },
+        },
+    },
+    "required": [
+        "natural_language_query",
+        "results",
+        "total_time_ms",
+        "generation_time_ms",
+    ],
+}
+
+
+def create_nlq_result(n_rows: int, n_queries: int) -> dict:
+    rng = random.Random(n_rows)
+    return {
+        "natural_language_query": "Monthly revenue by product line in 2024",
+        "title": "Monthly revenue by product line",
+        "chart_type": "bar",
+        "total_time_ms": 1834.2,
+        "generation_time_ms": 1502.7,
+        "results": [
+            {
+                "columns": [f"column_{j}" for j in range(N_COLUMNS)],
+                "rows": [
+                    [
+                        f"product {rng.randrange(50)}",
+                        "2024-05-01",
+                        rng.randrange(1000),
+                        round(rng.uniform(0, 1e5), 2),
+                        None,
+                        rng.random(),
+                        f"region {rng.randrange(5)}",
+                        rng.randrange(10),
+                    ]
+                    for _ in range(n_rows)
+                ],
+                "query": "SELECT product_line, month, SUM(revenue) FROM sales GROUP BY 1, 2",
+                "execution_time_ms": 12.4,
+                "columns_units": ["EUR", None, None, "EUR", None, "%", None, None],
+            }
+            for _ in range(n_queries)
+        ],
+    }
+
+
+def validate_legacy(results: dict) -> dict | Exception:
+    try:
+        validate(instance=results, schema=NLQ_RESULT_SCHEMA)
+    except ValidationError as e:
+        return e
+    return convert_keys_case(results, CaseType.KEBAB, recursive=True)
+
+
+def measure_ms(function, results: list[dict]) -> float:
+    start = perf_counter()
+    for r in results:
+        function(r)
+    return (perf_counter() - start) * 1000 / len(results)
+
+
+def main():
+    """Main function to run the results validator benchmark"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--n-iterations", type=int, default=50)
+    parser.add_argument("--n-queries", type=int, default=2)
+    args = parser.parse_args()
+
+    validator = ResultsValidator(NLQ_RESULT_SCHEMA)
+    for n_rows in [10, 100, 1000, 5000]:
+        result = create_nlq_result(n_rows, args.n_queries)
+        assert validator.validate(deepcopy(result)) == validate_legacy(result)
+        results = [deepcopy(result) for _ in range(args.n_iterations)]
+        legacy_ms = measure_ms(validate_legacy, results)
+        compiled_ms = measure_ms(validator.validate, results)
+        logger.info(
+            f"{args.n_queries} x {n_rows} rows: legacy {legacy_ms:.3f} ms, "
+            f"precompiled {compiled_ms:.3f} ms ({legacy_ms / compiled_ms:.1f}x)."
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3.13
+"""
+Span Aligner Benchmark
+Reports the mean time `SpanAligner.compute` takes to align highlights (exact,
+paraphrased, misspelled and missing ones) within the English bio section.
+"""
+import argparse
+import logging
+import os
+import sys
+from pathlib import Path
+from time import perf_counter
+
+# Configure logging
+logger = logging.getLogger(__name__)
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+
+# Add the root directory to sys.path to import project modules
+root_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(root_dir)
+
+from src.app.landing_voicechat.highlighting.section_indexing.section_index import (
+    SectionIndex,
+)
+from src.app.landing_voicechat.highlighting.span_alignment.span_aligner import (
+    SpanAligner,
+)
+
+SECTION_FILEPATH = (
+    Path(root_dir) / "src/app/landing/highlightable-content/en/en-bio.txt"
+)
+HIGHLIGHTS = [
+    "7+ years in the AI industry",
+    "building end to end tailor made software solutions powered by AI",
+    "high technical qualty",
+    "i’m  a COMITTED tech lead",
+    "Kubernetes cluster autoscaling",
+]
+
+
+def main():
+    """Main function to run the span aligner benchmark"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--n-runs", type=int, default=200)
+    args = parser.parse_args()
+
+    section_index = SectionIndex(SECTION_FILEPATH.read_text())
+    aligner = SpanAligner()
+    for highlight in HIGHLIGHTS:
+        t0 = perf_counter()
+        for _ in range(args.n_runs):
+            span = aligner.compute(highlight, section_index)
+        mean_ms = (perf_counter() - t0) * 1000 / args.n_runs
+        logger.info(
+            f"{mean_ms:.3f} ms: '{highlight}' -> {repr(span.text) if span else None}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3.13
+"""
+SQL Result Memory Benchmark
+Runs a query over a large synthetic table (generate_series) three ways, each
+in a fresh process: the former fetchall of every row, `AibiQueryExecutor.execute`
+(server-side cursor, row cap) and `AibiQueryExecutor.stream` (batches encoded
+as NDJSON and dropped), and reports their peak memory and duration. The
+database is simulated, with a server-side cursor that produces rows as they
+are fetched and a client-side one that holds them all once executed, unless
+--live is given.
+"""
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import resource
+import sys
+import threading
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from decimal import Decimal
+from hashlib import md5
+from itertools import islice
+from time import perf_counter
+from typing import Optional
+
+# Configure logging
+logger = logging.getLogger(__name__)
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+
+# Add the root directory to sys.path to import project modules
+root_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(root_dir)
+
+from src.app.demos.ai_bi.nlq.dtos import SqlResultDTO
+from src.app.demos.ai_bi.nlq.query_executor import (
+    DEFAULT_FETCH_BATCH_SIZE,
+    DEFAULT_MAX_ROWS,
+    MAX_CONNECTIONS,
+    AibiQueryExecutor,
+)
+from src.utils.json_toolbox import make_serializable
+
+MODES = ["fetchall", "execute", "stream"]
+SYNTHETIC_QUERY = (
+    "SELECT g AS id, md5(g::text) AS label, g * 1.5 AS amount, "
+    "TIMESTAMP '2025-01-01' + g * INTERVAL '1 minute' AS created_at "
+    "FROM generate_series(1, {n_rows}) AS g"
+)
+
+
+class SimulatedCursor:
+    description = [("id",), ("label",), ("amount",), ("created_at",)]
+
+    def __init__(self, n_rows: int, is_server_side: bool):
+        self.n_rows = n_rows
+        self.is_server_side = is_server_side
+        self.rows = None
+
+    def execute(self, query: str):
+        rows = (self.create_row(i) for i in range(1, self.n_rows + 1))
+        # A client-side cursor receives the whole result set on execute
+        self.rows = rows if self.is_server_side else iter(list(rows))
+
+    def fetchmany(self, size: int) -> list[tuple]:
+        return list(islice(self.rows, size))
+
+    def fetchall(self) -> list[tuple]:
+        return list(self.rows)
+
+    def close(self):
+        self.rows = None
+
+    @staticmethod
+    def create_row(i: int) -> tuple:
+        return (
+            i,
+            md5(str(i).encode()).hexdigest(),
+            Decimal(i) * Decimal("1.5"),
+            datetime(2025, 1, 1) + timedelta(minutes=i),
+        )
+
+
+class SimulatedConnection:
+    def __init__(self, n_rows: int):
+        self.n_rows = n_rows
+
+    def cursor(self, name: Optional[str] = None) -> SimulatedCursor:
+        return SimulatedCursor(self.n_rows, is_server_side=name is not None)
+
+    def reset(self):
+        pass
+
+
+class SimulatedConnectionPool:
+    def __init__(self, n_rows: int):
+        self.n_rows = n_rows
+
+    def getconn(self) -> SimulatedConnection:
+        return SimulatedConnection(self.n_rows)
+
+    def putconn(self, connection: SimulatedConnection):
+        pass
+
+
+def create_query_executor(
+    n_rows: int, max_rows: Optional[int], fetch_batch_size: int, is_live: bool
+) -> AibiQueryExecutor:
+    if is_live:
+        return AibiQueryExecutor(
+            result_cache_max_size_bytes=None,
+            max_rows=max_rows,
+            fetch_batch_size=fetch_batch_size,
+        )
+    # Real query executor whose connection pool is simulated
+    query_executor = object.__new__(AibiQueryExecutor)
+    query_executor._AibiQueryExecutor__connection_pool = SimulatedConnectionPool(n_rows)
+    query_executor._AibiQueryExecutor__executor = ThreadPoolExecutor(
+        max_workers=MAX_CONNECTIONS, thread_name_prefix="aibi-sql"
+    )
+    query_executor._AibiQueryExecutor__connection_slots = threading.BoundedSemaphore(
+        MAX_CONNECTIONS
+    )
+    query_executor._AibiQueryExecutor__connection_timeout = 10
+    query_executor._AibiQueryExecutor__result_cache = None
+    query_executor._AibiQueryExecutor__max_rows = max_rows
+    query_executor._AibiQueryExecutor__fetch_batch_size = fetch_batch_size
+    query_executor._AibiQueryExecutor__use_server_side_cursor = True
+    return query_executor
+
+
+def fetch_all(query_executor: AibiQueryExecutor, query: str) -> SqlResultDTO:
+    """Former `execute`: every row fetched at once from a client-side cursor."""
+    connection = query_executor._AibiQueryExecutor__get_pooled_connection()
+    try:
+        start_time = perf_counter()
+        cursor = connection.cursor()
+        cursor.execute(query)
+        columns = [desc[0] for desc in cursor.description]
+        rows = [list(row) for row in cursor.fetchall()]
+        cursor.close()
+        return SqlResultDTO(
+            columns=columns,
+            rows=rows,
+            query=query,
+            execution_time_ms=(perf_counter() - start_time) * 1000,
+        )
+    finally:
+        query_executor._AibiQueryExecutor__put_pooled_connection(connection)
+
+
+def run(mode: str, args: argparse.Namespace, results: multiprocessing.Queue):
+    """Peak traced Python memory, RSS growth and duration of one mode."""
+    logging.getLogger("src").setLevel(logging.ERROR)
+    query_executor = create_query_executor(
+        args.n_rows, args.max_rows or None, args.fetch_batch_size, args.live
+    )
+    query = SYNTHETIC_QUERY.format(n_rows=args.n_rows)
+    rss_before_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    tracemalloc.start()
+    t0 = perf_counter()
+    n_rows = 0
+    n_bytes = 0
+    if mode == "fetchall":
+        result = fetch_all(query_executor, query)
+        n_rows = len(result.rows)
+        n_bytes = len(json.dumps(make_serializable(result)))
+    elif mode == "execute":
+        result = query_executor.execute(query)
+        n_rows = len(result.rows)
+        n_bytes = len(json.dumps(make_serializable(result)))
+    else:
+        for batch in query_executor.stream(query):
+            n_rows += len(batch.rows)
+            n_bytes += len(json.dumps(make_serializable(batch))) + 1
+    duration_s = perf_counter() - t0
+    _, peak_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    rss_after_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    results.put(
+        (n_rows, n_bytes, peak_bytes, (rss_after_kb - rss_before_kb) * 1024, duration_s)
+    )
+
+
+def main():
+    """Main function to run the SQL result memory benchmark"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--n-rows", type=int, default=1_000_000)
+    parser.add_argument(
+        "--max-rows", type=int, default=DEFAULT_MAX_ROWS, help="0: none"
+    )
+    parser.add_argument(
+        "--fetch-batch-size", type=int, default=DEFAULT_FETCH_BATCH_SIZE
+    )
+    parser.add_argument("--live", action="store_true", help="Query the demo DB")
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context("spawn")
+    for mode in MODES:
+        results = context.Queue()
+        process = context.Process(target=run, args=(mode, args, results))
+        process.start()
+        n_rows, n_bytes, peak_bytes, rss_growth_bytes, duration_s = results.get()
+        process.join()
+        logger.info(
+            f"{mode}: {n_rows} of {args.n_rows} rows ({n_bytes / 2**20:.1f} MiB "
+            f"of JSON) in {duration_s:.2f} s. Peak traced memory "
+            f"{peak_bytes / 2**20:.1f} MiB, RSS growth {rss_growth_bytes / 2**20:.1f} MiB."
+        )
+
+
+if __name__ == "__main__":
+    main()
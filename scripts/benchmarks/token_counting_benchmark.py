@@ -0,0 +1,102 @@
+#!/usr/bin/env python3.13
+"""
+Token Counting Benchmark
+Compares exact tokenization of every prompt against the lazy strategy of
+AbstractLlmEngine (estimate when far from the limits, cached prefix count plus
+tail otherwise) on few-shot prompts sharing a static prefix. Also reports the
+largest difference between the prefix-plus-tail and full exact counts.
+"""
+import argparse
+import logging
+import os
+import statistics
+import sys
+from time import perf_counter
+
+# Configure logging
+logger = logging.getLogger(__name__)
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+
+# Add the root directory to sys.path to import project modules
+root_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(root_dir)
+
+from src.wrappers.llm.llm_engines.llm_engines_factory import LlmEnginesFactory
+from src.wrappers.llm.llm_engines.model_types import ModelType
+from src.wrappers.llm.prompting.static_prefix_prompt import StaticPrefixPrompt
+
+INSTRUCTIONS = (
+    "Convert the question into a PostgreSQL query over the sales database. "
+    "Answer with a JSON object with the keys 'query' and 'explanation'."
+)
+EXAMPLES = [
+    {
+        "question": f"What's the total revenue of product category {i} by month?",
+        "answer": (
+            '{"query": "SELECT DATE_TRUNC(\'month\', s.date) AS month, '
+            f"SUM(s.amount) AS revenue FROM sales s WHERE s.category_id = {i} "
+            'GROUP BY month ORDER BY month", "explanation": "Monthly revenue."}'
+        ),
+    }
+    for i in range(40)
+]
+QUESTIONS = [
+    f"Which are the top {i} customers by revenue this year?" for i in range(200)
+]
+
+
+def measure_s(count, prompts: list[str]) -> tuple[float, list[int]]:
+    start = perf_counter()
+    counts = [count(prompt) for prompt in prompts]
+    return perf_counter() - start, counts
+
+
+def main():
+    """Main function to run the token counting benchmark"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--model", default="gpt-3.5-turbo-16k-0613")
+    args = parser.parse_args()
+
+    prompt = StaticPrefixPrompt(
+        INSTRUCTIONS,
+        "Question: {question}\nAnswer:",
+        EXAMPLES,
+        "Question: {question}\nAnswer: {answer}",
+    )
+    prompts = [prompt.format(question=question) for question in QUESTIONS]
+    engine = LlmEnginesFactory.create(ModelType.GPT, model=args.model)
+    n_exact_tokens = engine._count_tokens(prompts[0])
+    logger.info(f"{len(prompts)} prompts of ~{n_exact_tokens} tokens.")
+
+    compute_input_tokens = engine._AbstractLlmEngine__compute_input_tokens
+    # A limit close to the prompt size forces exact counts, a far one allows
+    # estimates
+    close_limit = int(n_exact_tokens * 1.2)
+    far_limit = n_exact_tokens * 4
+    variants = {
+        "exact": engine._count_tokens,
+        "lazy (close limit)": lambda p: compute_input_tokens(p, close_limit, None),
+        "lazy with prefix (close limit)": lambda p: compute_input_tokens(
+            p, close_limit, prompt.prefix
+        ),
+        "lazy (far limit)": lambda p: compute_input_tokens(p, far_limit, None),
+    }
+    exact_counts = None
+    for name, count in variants.items():
+        elapsed_s, counts = measure_s(count, prompts)
+        logger.info(
+            f"{name}: {elapsed_s / len(prompts) * 1e6:.0f} µs/prompt, "
+            f"{statistics.mean(counts):.0f} tokens on average."
+        )
+        if exact_counts is None:
+            exact_counts = counts
+        elif "prefix" in name:
+            max_difference = max(abs(a - b) for a, b in zip(counts, exact_counts))
+            logger.info(f"{name}: max difference to exact counts {max_difference}.")
+    logger.info(f"stats: {engine.token_count_stats}.")
+
+
+if __name__ == "__main__":
+    main()
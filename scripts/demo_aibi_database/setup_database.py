@@ -337,6 +337,38 @@ def populate_tables(conn):
         raise e
 
 
+def bump_data_version(conn):
+    """Replace the data version token, so that running servers drop the query
+    results they cached from the previous data"""
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS aibi_data_version (
+                id INTEGER PRIMARY KEY CHECK (id = 0),
+                token TEXT NOT NULL,
+                updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+            )
+            """
+        )
+        cursor.execute(
+            """
+            INSERT INTO aibi_data_version (id, token) VALUES (0, md5(random()::text || clock_timestamp()::text))
+            ON CONFLICT (id) DO UPDATE SET token = excluded.token, updated_at = now()
+            RETURNING token
+            """
+        )
+        token = cursor.fetchone()[0]
+        conn.commit()
+        logger.info(f"Data version token bumped to {token}")
+    except Exception as e:
+        conn.rollback()
+        logger.error(f"Error bumping data version token: {e}")
+        raise e
+    finally:
+        cursor.close()
+
+
 def main():
     """Main function to setup the database"""
     start_time = time.time()
@@ -355,6 +387,9 @@ def main():
         # Populate tables
         populate_tables(conn)
 
+        # Invalidate the query results cached by running servers
+        bump_data_version(conn)
+
         # Close database connection
         conn.close()
 
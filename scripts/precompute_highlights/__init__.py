@@ -0,0 +1,4 @@
+"""
+Precompute Highlights Package
+Contains the batch job that builds the precomputed highlights artifact.
+"""
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3.13
+"""
+Precompute Highlights Script
+Runs LlmTextHighlighter over a corpus of anonymized past questions and responses
+and writes the read-only artifact that TextHighlighter checks before calling Bedrock.
+
+The corpus is a JSON Lines file with one object per line:
+    {"section": "BIO", "language": "en", "question": "...", "response": "..."}
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+# Configure logging
+logger = logging.getLogger(__name__)
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+
+# Add the root directory to sys.path to import project modules
+root_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(root_dir)
+
+from src.app.landing.toolbox import typify_language, typify_section_name
+from src.app.landing_voicechat.highlighting.llm_text_highlighting.llm_text_highlighter import (
+    LlmTextHighlighter,
+)
+from src.app.landing_voicechat.highlighting.precomputed_highlights.precomputed_highlights_store import (
+    DEFAULT_PRECOMPUTED_HIGHLIGHTS_FILEPATH,
+    PrecomputedHighlightsStore,
+    compute_highlight_key,
+)
+from src.app.landing_voicechat.highlighting.text_highlighter import (
+    DEFAULT_BEDROCK_MODEL_ID,
+    TextHighlighter,
+)
+
+DEFAULT_MAX_CONCURRENCY = 4
+DEFAULT_MIN_COUNT = 1
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("corpus", type=Path, help="JSON Lines corpus file")
+    parser.add_argument(
+        "--output", type=Path, default=DEFAULT_PRECOMPUTED_HIGHLIGHTS_FILEPATH
+    )
+    parser.add_argument("--model-id", default=DEFAULT_BEDROCK_MODEL_ID)
+    parser.add_argument(
+        "--max-concurrency",
+        type=int,
+        default=DEFAULT_MAX_CONCURRENCY,
+        help="Maximum number of simultaneous Bedrock calls",
+    )
+    parser.add_argument(
+        "--min-count",
+        type=int,
+        default=DEFAULT_MIN_COUNT,
+        help="Only precompute questions seen at least this many times",
+    )
+    return parser.parse_args()
+
+
+def load_corpus(corpus_path: Path, min_count: int) -> list[dict]:
+    """Deduplicate the corpus by section, language and highlight key and keep
+    the most frequent entries first."""
+    entries = {}
+    counts = Counter()
+    with open(corpus_path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            section = typify_section_name(record["section"])
+            language = typify_language(record["language"])
+            key = compute_highlight_key(record["question"], record["response"])
+            entry_id = (section, language, key)
+            counts[entry_id] += 1
+            entries.setdefault(
+                entry_id,
+                {
+                    "section": section,
+                    "language": language,
+                    "key": key,
+                    "question": record["question"],
+                    "response": record["response"],
+                },
+            )
+    return [
+        entries[entry_id]
+        for entry_id, count in counts.most_common()
+        if count >= min_count
+    ]
+
+
+def compute_highlights(entries: list[dict], model_id: str, max_concurrency: int):
+    text_highlighter = TextHighlighter(
+        model_id=model_id, precomputed_highlights_filepath=None
+    )
+    llm_text_highlighter = LlmTextHighlighter(model_id=model_id)
+    sections = {}
+
+    def compute(entry: dict):
+        content = text_highlighter.get_section_content(
+            entry["section"], entry["language"]
+        )
+        results = llm_text_highlighter.compute(
+            entry["question"], entry["response"], content
+        )
+        return entry, content, results
+
+    n_failed = 0
+    with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+        futures = [executor.submit(compute, entry) for entry in entries]
+        for future in as_completed(futures):
+            try:
+                entry, content, results = future.result()
+            except Exception as e:
+                n_failed += 1
+                logger.warning(f"Failed to compute highlights: {type(e)}-{e}")
+                continue
+            section = sections.setdefault(
+                (entry["section"], entry["language"]),
+                {
+                    "section": entry["section"],
+                    "language": entry["language"],
+                    "content": content,
+                    "highlights": {},
+                },
+            )
+            section["highlights"][entry["key"]] = results.spans or []
+    logger.info(
+        f"Computed highlights for {len(entries) - n_failed}/{len(entries)} entries"
+    )
+    return list(sections.values())
+
+
+def main():
+    """Main function to precompute the highlights artifact"""
+    args = parse_args()
+    start_time = time.time()
+
+    entries = load_corpus(args.corpus, args.min_count)
+    logger.info(f"Loaded {len(entries)} distinct entries from {args.corpus}")
+
+    sections = compute_highlights(entries, args.model_id, args.max_concurrency)
+    PrecomputedHighlightsStore.export(args.output, sections, model_id=args.model_id)
+
+    end_time = time.time()
+    logger.info(
+        f"Highlights artifact written to {args.output} in {end_time - start_time:.2f} seconds"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -15,7 +15,7 @@ async def post_message_endpoint(
 ) -> SingleMessageResponse:
     logger.info(f"Received message: {message}. Session ID: {session_id}")
     session_id = session_id or generate_session_id()
-    reply_message = post_message_and_await_reply(
+    reply_message = await post_message_and_await_reply(
         message.content, conversation_id=session_id
     )
     return SingleMessageResponse(
@@ -10,12 +10,12 @@ AGENT_ID = VariablesGrabber().get("CHATBOT_BEDROCK_AGENT_ID")
 AGENT_ALIAS_ID = VariablesGrabber().get("CHATBOT_BEDROCK_AGENT_ALIAS_ID")
 
 
-def post_message_and_await_reply(
+async def post_message_and_await_reply(
     content: str, conversation_id: Optional[str] = None
 ) -> ChatbotBotMessageDTO:
     conversation_id = conversation_id or generate_session_id()
     try:
-        reply = BedrockAgentWrapper().invoke(
+        reply = await BedrockAgentWrapper().ainvoke(
             agent_id=AGENT_ID,
             agent_alias_id=AGENT_ALIAS_ID,
             input_text=content,
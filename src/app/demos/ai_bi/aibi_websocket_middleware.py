@@ -1,7 +1,10 @@
 import logging
 from typing import Any, Optional, Dict
 
+from src.app.demos.ai_bi.nlq.columnar_rows import convert_to_rows
 from src.app.demos.ai_bi.nlq.dtos import NlqResultDTO
+from src.app.demos.ai_bi.nlq.enums import ResultFormat
+from src.app.demos.ai_bi.toolbox import create_nlq_stream_message
 from src.wrappers.elevenlabs.elevenlabs_websocket_middleware import (
     ElevenLabsWebsocketMiddleware,
     client_tool_call,
@@ -12,8 +15,25 @@ logger = logging.getLogger(__name__)
 
 
 class AibiWebsocketMiddleware(ElevenLabsWebsocketMiddleware):
+    """With `stream_results`, the rows of the NLQ tool are sent to the client
+    in `nlq_rows` messages as they are fetched, and left out of its result.
+    With `columnar_results`, the client receives them in the columnar result
+    format, and ElevenLabs in the rows one."""
 
     # Public:
+    def __init__(
+        self,
+        agent_id: str,
+        api_key: str,
+        voice_id: Optional[str] = None,
+        stream_results: bool = False,
+        columnar_results: bool = False,
+    ):
+        super().__init__(agent_id=agent_id, api_key=api_key, voice_id=voice_id)
+        self.__stream_results = stream_results
+        self.__result_format = (
+            ResultFormat.COLUMNAR if columnar_results else ResultFormat.ROWS
+        )
 
     # Protected:
     _additional_client_to_elevenlabs_filters = [
@@ -39,13 +59,43 @@ class AibiWebsocketMiddleware(ElevenLabsWebsocketMiddleware):
         if not user_query:
             raise ValueError("user_query parameter is required")
 
-        nlq_result = self.__compute_nlq_result(user_query)
+        if self.__stream_results:
+            nlq_result = await self.__stream_nlq_result(
+                user_query, tool_call.get("tool_call_id")
+            )
+        else:
+            nlq_result = await self.__compute_nlq_result(user_query)
         nlq_result.title = title
 
-        return nlq_result.model_dump()
+        tool_result = nlq_result.model_dump()
+        if self.__result_format is ResultFormat.COLUMNAR and not self.__stream_results:
+            # The agent reads the message, not the packed columns
+            tool_result["message"] = str(
+                nlq_result.model_copy(
+                    update={"results": [convert_to_rows(r) for r in nlq_result.results]}
+                ).model_dump()
+            )
+        return tool_result
 
     # Private:
-    def __compute_nlq_result(self, user_query: str) -> NlqResultDTO:
+    async def __compute_nlq_result(self, user_query: str) -> NlqResultDTO:
         nlq_agent = AibiNlqAgent()
-        result = nlq_agent.compute(user_query)
+        result = await nlq_agent.acompute(
+            user_query, result_format=self.__result_format
+        )
         return result
+
+    async def __stream_nlq_result(
+        self, user_query: str, tool_call_id: Optional[str]
+    ) -> NlqResultDTO:
+        """Sends the start and rows events to the client, and returns the
+        result."""
+        nlq_agent = AibiNlqAgent()
+        async for event in nlq_agent.astream(
+            user_query, result_format=self.__result_format
+        ):
+            if isinstance(event, NlqResultDTO):
+                return event
+            await self.send_message_to_client(
+                create_nlq_stream_message(event) | {"tool_call_id": tool_call_id}
+            )
@@ -1,17 +1,29 @@
+import json
 import logging
+from typing import AsyncIterator, Optional
+
 from fastapi import (
     APIRouter,
     WebSocket,
     Depends,
     Query,
     Body,
+    Header,
 )
+from fastapi.responses import Response, StreamingResponse
 
 from src.app.demos.ai_bi.aibi_websocket_middleware import (
     AibiWebsocketMiddleware,
 )
+from src.app.demos.ai_bi.nlq.columnar_rows import (
+    COLUMNAR_BINARY_MEDIA_TYPE,
+    encode_columnar_binary,
+    negotiate_columnar_media_type,
+)
+from src.app.demos.ai_bi.nlq.enums import ResultFormat
 from src.app.demos.ai_bi.nlq.nlq_agent import AibiNlqAgent
 from src.app.demos.ai_bi.responses import NlqResponse
+from src.app.demos.ai_bi.toolbox import create_nlq_stream_message
 from src.config.vars_grabber import VariablesGrabber
 from src.wrappers.elevenlabs.enums import WebSocketEventType
 from src.app.errors import EnvironmentVariablesValueError
@@ -28,7 +40,13 @@ DEMO_AIBI_ELEVENLABS_AGENT_ID = VariablesGrabber().get("DEMO_AIBI_ELEVENLABS_AGE
 
 
 def get_aibi_elevenlabs_middleware(
-    voice_id: str = Query(None, description="ElevenLabs voice ID")
+    voice_id: str = Query(None, description="ElevenLabs voice ID"),
+    stream_results: bool = Query(
+        False, description="Send NLQ tool rows to the client in batches"
+    ),
+    columnar_results: bool = Query(
+        False, description="Send NLQ tool rows to the client as columns"
+    ),
 ) -> AibiWebsocketMiddleware:
     if not ELEVENLABS_API_KEY:
         logger.error("ELEVENLABS_API_KEY not configured")
@@ -43,6 +61,8 @@ def get_aibi_elevenlabs_middleware(
         agent_id=DEMO_AIBI_ELEVENLABS_AGENT_ID,
         api_key=ELEVENLABS_API_KEY,
         voice_id=voice_id,
+        stream_results=stream_results,
+        columnar_results=columnar_results,
     )
 
 
@@ -98,13 +118,58 @@ async def natural_language_query(
         ..., embed=True, description="Natural language query to convert to SQL"
     ),
     title: str = Body(None, embed=True, description="Title of the query"),
+    accept: Optional[str] = Header(None),
 ):
+    """Rows are returned as columns when the Accept header asks for
+    application/vnd.aibi.columnar+json, or its binary encoding
+    application/vnd.aibi.columnar."""
+    media_type = negotiate_columnar_media_type(accept)
     nlq_agent = AibiNlqAgent()
-    result = nlq_agent.compute(user_query)
+    result = await nlq_agent.acompute(
+        user_query,
+        result_format=ResultFormat.COLUMNAR if media_type else ResultFormat.ROWS,
+    )
     if title:
         result.title = title
 
-    return NlqResponse(
+    response = NlqResponse(
         message="Successfully generated and executed SQL query",
         data=result,
     )
+    if media_type == COLUMNAR_BINARY_MEDIA_TYPE:
+        return Response(
+            content=encode_columnar_binary(response.model_dump(mode="json")),
+            media_type=media_type,
+        )
+    if media_type:
+        return Response(content=response.model_dump_json(), media_type=media_type)
+    return response
+
+
+@router.post("/nlq/stream")
+async def stream_natural_language_query(
+    user_query: str = Body(
+        ..., embed=True, description="Natural language query to convert to SQL"
+    ),
+    title: str = Body(None, embed=True, description="Title of the query"),
+):
+    """Same as /nlq, as NDJSON: a `nlq_start` line with the generated queries,
+    `nlq_rows` lines with batches of rows as they are fetched, and a
+    `nlq_result` line without rows, or a `nlq_error` line."""
+    return StreamingResponse(
+        iter_nlq_stream_lines(user_query, title),
+        media_type="application/x-ndjson",
+    )
+
+
+async def iter_nlq_stream_lines(
+    user_query: str, title: Optional[str]
+) -> AsyncIterator[str]:
+    nlq_agent = AibiNlqAgent()
+    try:
+        async for event in nlq_agent.astream(user_query):
+            yield json.dumps(create_nlq_stream_message(event, title)) + "\n"
+    except Exception as e:
+        # The status code is already sent
+        logger.error(f"Error streaming NLQ results: {type(e)}-{e}.")
+        yield json.dumps(create_nlq_stream_message(e)) + "\n"
@@ -0,0 +1,314 @@
+import base64
+import json
+import struct
+import sys
+from array import array
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+from typing import Any, Optional, Sequence
+
+from src.app.demos.ai_bi.nlq.dtos import (
+    ColumnarColumnDTO,
+    ColumnarRowsDTO,
+    SqlResultDTO,
+)
+from src.app.demos.ai_bi.nlq.enums import ColumnType
+from src.utils.json_toolbox import make_serializable
+
+COLUMNAR_JSON_MEDIA_TYPE = "application/vnd.aibi.columnar+json"
+COLUMNAR_BINARY_MEDIA_TYPE = "application/vnd.aibi.columnar"
+# Binary payloads: magic, little-endian uint32 length of the JSON header, JSON
+# header, then the buffers its columns point to
+BINARY_MAGIC = b"AIBC"
+BINARY_HEADER_LENGTH_FORMAT = "<I"
+
+ARRAY_TYPECODES = {
+    ColumnType.BOOLEAN: "b",
+    ColumnType.INTEGER: "q",
+    ColumnType.FLOAT: "d",
+    ColumnType.STRING: "i",
+    ColumnType.DATE: "i",
+    ColumnType.TIMESTAMP: "q",
+}
+EPOCH = datetime(1970, 1, 1)
+EPOCH_ORDINAL = EPOCH.toordinal()
+MILLISECOND = timedelta(milliseconds=1)
+
+
+def get_column_type(value: Any) -> ColumnType:
+    """Decimals are STRING values, as the ROWS result format sends them (see
+    `make_serializable`): exact, unlike floats."""
+    # bool is an int, and datetime a date
+    if isinstance(value, bool):
+        return ColumnType.BOOLEAN
+    if isinstance(value, int):
+        return ColumnType.INTEGER
+    if isinstance(value, float):
+        return ColumnType.FLOAT
+    if isinstance(value, (str, Decimal)):
+        return ColumnType.STRING
+    if isinstance(value, datetime):
+        return ColumnType.TIMESTAMP
+    if isinstance(value, date):
+        return ColumnType.DATE
+    return ColumnType.JSON
+
+
+def convert_timestamp(value: datetime) -> int:
+    """Milliseconds since epoch. Naive timestamps are taken as UTC."""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return (value - EPOCH) // MILLISECOND
+
+
+class ColumnarColumnBuilder:
+    """Values of one column, appended batch by batch into a typed array.
+
+    The type is the one of the first non-null value. INTEGER columns become
+    FLOAT ones on the first float, and columns of any other mix of types are
+    kept as JSON values."""
+
+    # Public:
+    def __init__(self, name: str):
+        self.__name = name
+        self.__type = ColumnType.NULL
+        self.__n_rows = 0
+        self.__nulls = bytearray()
+        self.__has_nulls = False
+        self.__data: Optional[array] = None
+        self.__dictionary: dict[str, int] = {}
+        self.__values: list[Any] = []
+
+    def extend(self, values: Sequence[Any]):
+        first_row = self.__n_rows
+        self.__n_rows += len(values)
+        self.__nulls.extend(bytes((self.__n_rows + 7) // 8 - len(self.__nulls)))
+        for i, value in enumerate(values, first_row):
+            if value is None:
+                self.__nulls[i >> 3] |= 1 << (i & 7)
+                self.__has_nulls = True
+                if self.__type is not ColumnType.NULL:
+                    self.__append_null()
+                continue
+            value_type = get_column_type(value)
+            if value_type is not self.__type:
+                self.__convert(value_type, i)
+            self.__append(value)
+
+    def build(self) -> ColumnarColumnDTO:
+        data = None
+        if self.__data is not None:
+            if sys.byteorder == "big":
+                self.__data.byteswap()
+            data = base64.b64encode(self.__data.tobytes()).decode()
+            if sys.byteorder == "big":
+                self.__data.byteswap()
+        return ColumnarColumnDTO(
+            name=self.__name,
+            type=self.__type,
+            data=data,
+            dictionary=(
+                list(self.__dictionary) if self.__type is ColumnType.STRING else None
+            ),
+            values=self.__values if self.__type is ColumnType.JSON else None,
+            nulls=base64.b64encode(self.__nulls).decode() if self.__has_nulls else None,
+        )
+
+    # Private:
+    def __append(self, value: Any):
+        if self.__type is ColumnType.STRING:
+            if isinstance(value, Decimal):
+                value = str(value)
+            index = self.__dictionary.get(value)
+            if index is None:
+                index = self.__dictionary[value] = len(self.__dictionary)
+            self.__data.append(index)
+        elif self.__type is ColumnType.FLOAT:
+            self.__data.append(float(value))
+        elif self.__type is ColumnType.TIMESTAMP:
+            self.__data.append(convert_timestamp(value))
+        elif self.__type is ColumnType.DATE:
+            self.__data.append(value.toordinal() - EPOCH_ORDINAL)
+        elif self.__type is ColumnType.JSON:
+            self.__values.append(make_serializable(value))
+        else:
+            try:
+                self.__data.append(value)
+            except OverflowError:
+                # Beyond int64
+                self.__convert(ColumnType.JSON, len(self.__data))
+                self.__append(value)
+
+    def __append_null(self):
+        if self.__type is ColumnType.JSON:
+            self.__values.append(None)
+        else:
+            self.__data.append(0)
+
+    def __convert(self, value_type: ColumnType, n_rows: int):
+        """Switches to the type that holds both the `n_rows` previous values
+        and values of `value_type`."""
+        if self.__type is ColumnType.NULL:
+            self.__type = value_type
+            if value_type is ColumnType.JSON:
+                self.__values = [None] * n_rows
+            else:
+                self.__data = array(ARRAY_TYPECODES[value_type], [0]) * n_rows
+        elif (self.__type, value_type) == (ColumnType.FLOAT, ColumnType.INTEGER):
+            pass
+        elif (self.__type, value_type) == (ColumnType.INTEGER, ColumnType.FLOAT):
+            self.__type = ColumnType.FLOAT
+            self.__data = array("d", self.__data)
+        elif self.__type is not ColumnType.JSON:
+            values = decode_column(self.build(), n_rows)[:n_rows]
+            self.__type = ColumnType.JSON
+            self.__data = None
+            self.__values = make_serializable(values)
+
+
+class ColumnarRowsBuilder:
+    """Columnar rows of a query result, built from its cursor batches without
+    going through per-row lists."""
+
+    # Public:
+    def __init__(self, columns: list[str]):
+        self.__n_rows = 0
+        self.__columns = [ColumnarColumnBuilder(column) for column in columns]
+
+    def extend(self, rows: Sequence[Sequence[Any]]):
+        if not rows:
+            return
+        self.__n_rows += len(rows)
+        for column, values in zip(self.__columns, zip(*rows)):
+            column.extend(values)
+
+    def build(self) -> ColumnarRowsDTO:
+        return ColumnarRowsDTO(
+            n_rows=self.__n_rows, columns=[column.build() for column in self.__columns]
+        )
+
+
+def decode_column(column: ColumnarColumnDTO, n_rows: int) -> list[Any]:
+    """Values of a column, with dates and timestamps (naive, UTC) as Python
+    objects."""
+    if column.type is ColumnType.NULL:
+        return [None] * n_rows
+    if column.type is ColumnType.JSON:
+        return list(column.values)
+    values = array(ARRAY_TYPECODES[column.type], base64.b64decode(column.data))
+    if sys.byteorder == "big":
+        values.byteswap()
+    if column.type is ColumnType.BOOLEAN:
+        values = [bool(v) for v in values]
+    elif column.type is ColumnType.STRING:
+        values = [column.dictionary[v] for v in values]
+    elif column.type is ColumnType.DATE:
+        values = [date.fromordinal(v + EPOCH_ORDINAL) for v in values]
+    elif column.type is ColumnType.TIMESTAMP:
+        values = [EPOCH + v * MILLISECOND for v in values]
+    else:
+        values = values.tolist()
+    if column.nulls is not None:
+        nulls = base64.b64decode(column.nulls)
+        for i in range(len(values)):
+            if nulls[i >> 3] & (1 << (i & 7)):
+                values[i] = None
+    return values
+
+
+def decode_columnar_rows(columnar_rows: ColumnarRowsDTO) -> list[list[Any]]:
+    """Rows of the ROWS result format."""
+    columns = [
+        decode_column(column, columnar_rows.n_rows) for column in columnar_rows.columns
+    ]
+    return [list(row) for row in zip(*columns)] if columns else []
+
+
+def encode_columnar_binary(payload: dict[str, Any]) -> bytes:
+    """Binary encoding of a JSON payload: the buffers of its columnar rows
+    are moved out of the JSON header, and referenced by [offset, length]."""
+    buffers = bytearray()
+
+    def move_buffers(value: Any) -> Any:
+        if isinstance(value, list):
+            return [move_buffers(v) for v in value]
+        if not isinstance(value, dict):
+            return value
+        if value.get("columnar_rows"):
+            value = value | {
+                "columnar_rows": value["columnar_rows"]
+                | {
+                    "columns": [
+                        column
+                        | {
+                            key: move_buffer(column[key])
+                            for key in ["data", "nulls"]
+                            if column.get(key) is not None
+                        }
+                        for column in value["columnar_rows"]["columns"]
+                    ]
+                }
+            }
+        return {k: move_buffers(v) for k, v in value.items()}
+
+    def move_buffer(buffer: str) -> list[int]:
+        offset = len(buffers)
+        buffers.extend(base64.b64decode(buffer))
+        return [offset, len(buffers) - offset]
+
+    header = json.dumps(move_buffers(payload), separators=(",", ":")).encode()
+    return (
+        BINARY_MAGIC
+        + struct.pack(BINARY_HEADER_LENGTH_FORMAT, len(header))
+        + header
+        + buffers
+    )
+
+
+def decode_columnar_binary(payload: bytes) -> dict[str, Any]:
+    """JSON payload of `encode_columnar_binary`."""
+    if payload[: len(BINARY_MAGIC)] != BINARY_MAGIC:
+        raise ValueError("Not a columnar binary payload")
+    start = len(BINARY_MAGIC) + struct.calcsize(BINARY_HEADER_LENGTH_FORMAT)
+    (header_length,) = struct.unpack(
+        BINARY_HEADER_LENGTH_FORMAT, payload[len(BINARY_MAGIC) : start]
+    )
+    buffers = memoryview(payload)[start + header_length :]
+
+    def restore_buffers(value: Any) -> Any:
+        if isinstance(value, list):
+            return [restore_buffers(v) for v in value]
+        if not isinstance(value, dict):
+            return value
+        if value.get("columnar_rows"):
+            for column in value["columnar_rows"]["columns"]:
+                for key in ["data", "nulls"]:
+                    if column.get(key) is not None:
+                        offset, length = column[key]
+                        column[key] = base64.b64encode(
+                            buffers[offset : offset + length]
+                        ).decode()
+        return {k: restore_buffers(v) for k, v in value.items()}
+
+    return restore_buffers(json.loads(payload[start : start + header_length]))
+
+
+def negotiate_columnar_media_type(accept: Optional[str]) -> Optional[str]:
+    """First columnar media type of an Accept header, if any."""
+    for media_range in (accept or "").split(","):
+        media_type = media_range.split(";")[0].strip().lower()
+        if media_type in [COLUMNAR_JSON_MEDIA_TYPE, COLUMNAR_BINARY_MEDIA_TYPE]:
+            return media_type
+    return None
+
+
+def convert_to_rows(sql_result: SqlResultDTO) -> SqlResultDTO:
+    """Same result in the ROWS result format."""
+    if sql_result.columnar_rows is None:
+        return sql_result
+    return sql_result.model_copy(
+        update={
+            "rows": decode_columnar_rows(sql_result.columnar_rows),
+            "columnar_rows": None,
+        }
+    )
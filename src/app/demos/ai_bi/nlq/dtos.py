@@ -1,6 +1,26 @@
 from typing import Any, Optional
 from src.utils.typification.base_dto import BaseDTO
-from src.app.demos.ai_bi.nlq.enums import Unit, ChartType
+from src.app.demos.ai_bi.nlq.enums import Unit, ChartType, ColumnType
+
+
+class ColumnarColumnDTO(BaseDTO):
+    name: str
+    type: ColumnType
+    # Base64 of the little-endian packed values: int8 for BOOLEAN, int64 for
+    # INTEGER and TIMESTAMP (ms since epoch, UTC), float64 for FLOAT, int32
+    # for DATE (days since epoch) and STRING (indices in `dictionary`)
+    data: Optional[str] = None
+    dictionary: Optional[list[str]] = None
+    # Values of JSON columns, which mix types or have none of the above
+    values: Optional[list[Any]] = None
+    # Base64 bitmap whose bit i (least significant first) is set when row i
+    # is null. None when there are no nulls.
+    nulls: Optional[str] = None
+
+
+class ColumnarRowsDTO(BaseDTO):
+    n_rows: int
+    columns: list[ColumnarColumnDTO]
 
 
 class SqlResultDTO(BaseDTO):
@@ -8,7 +28,31 @@ class SqlResultDTO(BaseDTO):
     rows: list[list[Any]]
     query: str
     execution_time_ms: float
+    # Time spent waiting for a free pooled connection
+    wait_time_ms: Optional[float] = None
+    # Served from the SQL result cache
+    is_cached: bool = False
+    # Rows beyond the row cap of the query executor were left out
+    is_truncated: bool = False
     columns_units: Optional[list[Unit | None]] = None
+    # Rows of the COLUMNAR result format, which leaves `rows` empty
+    columnar_rows: Optional[ColumnarRowsDTO] = None
+
+
+class SqlRowsBatchDTO(BaseDTO):
+    query: str
+    columns: list[str]
+    rows: list[list[Any]]
+    batch_index: int
+    is_last: bool
+    # Since the query started, excluding the time spent by the consumer
+    execution_time_ms: float
+    is_truncated: bool = False
+    wait_time_ms: Optional[float] = None
+    # Position of the query among those of a natural language query
+    query_index: int = 0
+    columns_units: Optional[list[Unit | None]] = None
+    columnar_rows: Optional[ColumnarRowsDTO] = None
 
 
 class NlqResultDTO(BaseDTO):
@@ -17,4 +61,14 @@ class NlqResultDTO(BaseDTO):
     chart_type: Optional[ChartType] = None
     total_time_ms: float
     generation_time_ms: float
+    # Wall time of running all the queries, concurrently
+    execution_time_ms: Optional[float] = None
+    title: Optional[str] = None
+
+
+class NlqStreamStartDTO(BaseDTO):
+    natural_language_query: str
+    queries: list[str]
+    chart_type: Optional[ChartType] = None
+    generation_time_ms: float
     title: Optional[str] = None
@@ -16,3 +16,26 @@ class ChartType(BaseEnum):
     AREA = "AREA"
     PIE = "PIE"
     KPI = "KPI"
+
+
+class NlqStreamEventType(BaseEnum):
+    START = "nlq_start"
+    ROWS = "nlq_rows"
+    RESULT = "nlq_result"
+    ERROR = "nlq_error"
+
+
+class ResultFormat(BaseEnum):
+    ROWS = "rows"
+    COLUMNAR = "columnar"
+
+
+class ColumnType(BaseEnum):
+    NULL = "NULL"
+    BOOLEAN = "BOOLEAN"
+    INTEGER = "INTEGER"
+    FLOAT = "FLOAT"
+    STRING = "STRING"
+    DATE = "DATE"
+    TIMESTAMP = "TIMESTAMP"
+    JSON = "JSON"
@@ -13,3 +13,5 @@ class NlqLlmResultsDTO(BaseDTO):
     sql_queries: list[str]
     title: Optional[str] = None
     chart_type: Optional[ChartType] = None
+    # Timestamp given to the prompt, under which the results are cached
+    timestamp: Optional[str] = None
@@ -3,25 +3,40 @@ import logging
 import os
 import re
 from datetime import datetime
+from functools import partial
 from pathlib import Path
 from typing import Any, Optional
 
-from langchain_core.exceptions import OutputParserException
-from langchain_core.prompts.few_shot import FewShotPromptTemplate
-from langchain_core.prompts.prompt import PromptTemplate
-from langchain_core.runnables import chain
-from langchain_core.output_parsers import JsonOutputParser
+from langchain_core.utils.json import parse_json_markdown
 from src.app.demos.ai_bi.nlq.llm_nlq.dtos import NlqLlmResultsDTO, NlqRequestDTO
 from src.app.demos.ai_bi.nlq.llm_nlq.errors import (
     InvalidLLMResponseFormatError,
     UnsafeQueryError,
 )
+from src.app.demos.ai_bi.nlq.llm_nlq.nlq_cache import (
+    DEFAULT_SIMILARITY_THRESHOLD,
+    NlqCache,
+)
+from src.app.demos.ai_bi.nlq.query_executor import AibiQueryExecutor
 from src.app.demos.ai_bi.toolbox import typify_chart_type
 from src.config.vars_grabber import VariablesGrabber
-from src.utils.json_toolbox import load_jsons_in_directory, make_serializable
+from src.utils.json_toolbox import load_json, make_serializable
+from src.utils.language_toolbox import DEFAULT_LANGUAGE
 from src.utils.metaclasses import DynamicSingleton
-from src.utils.sql_toolbox import is_valid_sql_query
-from src.wrappers.langchain.llms.bedrock import BedrockLLM
+from src.utils.sql_toolbox import is_select_query, is_valid_sql_query
+from src.wrappers.llm.pipelines.bedrock_text_generator import BedrockTextGenerator
+from src.wrappers.llm.pipelines.llm_pipeline import LlmPipeline
+from src.wrappers.llm.postprocessing.errors import OutputParsingError
+from src.wrappers.llm.postprocessing.tolerant_json_parser import TolerantJsonParser
+from src.wrappers.llm.response_caching.backends.abstract_cache_backend import (
+    AbstractCacheBackend,
+)
+from src.wrappers.llm.response_caching.backends.default_cache_backend import (
+    get_default_cache_backend,
+)
+from src.wrappers.llm.model_cascade import ModelCascade
+from src.wrappers.llm.response_caching.response_cache import ResponseCache
+from src.wrappers.llm.prompting.static_prefix_prompt import StaticPrefixPrompt
 
 logger = logging.getLogger(__name__)
 
@@ -31,6 +46,9 @@ DEFAULT_PROMPT_TEMPLATE_FILEPATH = (
     Path(__file__).parent / "prompting" / "examples-formatter.txt"
 )
 DEFAULT_EXAMPLES_FILEPATH = Path(__file__).parent / "prompting" / "examples"
+DEFAULT_MAX_PROMPT_EXAMPLES = 6
+DEFAULT_PROMPT_EXAMPLES_MAX_TOKENS = 800
+EXAMPLES_LANGUAGES = ["es"]
 DEFAULT_JSON_SCHEMA = json.loads(
     (Path(__file__).parent / "prompting" / "json-schema.json").read_text()
 )
@@ -41,6 +59,27 @@ DEFAULT_MODEL_ID = (
 )
 DEFAULT_REGION = VariablesGrabber().get("AWS_REGION") or "us-east-1"
 
+# Keys models tend to use instead of "sql_queries"
+SQL_QUERIES_KEY_ALIASES = {
+    "query": "sql_queries",
+    "sql": "sql_queries",
+    "queries": "sql_queries",
+}
+
+# About 4x the longest example results
+DEFAULT_MAX_OUTPUT_TOKENS = 600
+# Models tend to carry on with a new few-shot example after their answer
+DEFAULT_STOP_SEQUENCES = ["\nExample "]
+
+RESPONSE_CACHE_NAMESPACE = "aibi-nlq"
+DEFAULT_RESPONSE_CACHE_TTL_S = 60 * 60
+DEFAULT_RESPONSE_CACHE_STALE_TTL_S = 0
+DEFAULT_NLQ_CACHE_TTL_S = 60 * 60
+
+# Hour precision is enough to resolve relative dates, and keeps prompts (hence
+# cached responses) identical within the hour
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:00:00"
+
 SHALL_EXPORT_LOGS = os.environ.get("IS_LOCAL", "False").lower() == "true"
 LOGS_DIRECTORY = Path("logs")
 
@@ -63,19 +102,53 @@ class AibiLlmTextToSQL(metaclass=DynamicSingleton):
     def model_id(self):
         return self.__model.model_id
 
+    @property
+    def prompt_fingerprint(self) -> str:
+        return self.__prompt.fingerprint
+
+    @property
+    def parser_stats(self) -> dict[str, int]:
+        return self.__parser.stats
+
+    @property
+    def cascade_stats(self) -> dict[str, Any]:
+        return self.__cascade.stats
+
+    @property
+    def nlq_cache_stats(self) -> Optional[dict[str, Any]]:
+        return self.__nlq_cache.stats if self.__nlq_cache else None
+
     # Public:
     def __init__(
         self,
-        model_id: str = DEFAULT_MODEL_ID,
+        model_id: str | list[str] = DEFAULT_MODEL_ID,
+        small_model_id: Optional[str | list[str]] = None,
+        query_executor: Optional[AibiQueryExecutor] = None,
         model_params: Optional[dict[str, Any]] = None,
         model_read_timeout: Optional[int] = None,
         prompt_prefix: str | Path = DEFAULT_PROMPT_PREFIX_FILEPATH,
         prompt_suffix: str | Path = DEFAULT_PROMPT_SUFFIX_FILEPATH,
         prompt_examples_formatter: str | Path = DEFAULT_PROMPT_TEMPLATE_FILEPATH,
         prompt_examples: list[dict] | Path = DEFAULT_EXAMPLES_FILEPATH,
+        max_prompt_examples: Optional[int] = DEFAULT_MAX_PROMPT_EXAMPLES,
+        prompt_examples_max_tokens: Optional[int] = DEFAULT_PROMPT_EXAMPLES_MAX_TOKENS,
         json_schema: Optional[dict[str, Any]] = DEFAULT_JSON_SCHEMA,
         region: str = DEFAULT_REGION,
+        max_output_tokens: Optional[int] = DEFAULT_MAX_OUTPUT_TOKENS,
+        stop_sequences: Optional[list[str]] = DEFAULT_STOP_SEQUENCES,
+        response_cache_backend: Optional[AbstractCacheBackend] = None,
+        response_cache_ttl_s: Optional[float] = DEFAULT_RESPONSE_CACHE_TTL_S,
+        response_cache_stale_ttl_s: float = DEFAULT_RESPONSE_CACHE_STALE_TTL_S,
+        nlq_cache_ttl_s: Optional[float] = DEFAULT_NLQ_CACHE_TTL_S,
+        nlq_cache_similarity_threshold: float = DEFAULT_SIMILARITY_THRESHOLD,
     ):
+        """With a `small_model_id`, requests go to it first and are only
+        escalated to `model_id` when its queries are not all SELECT statements
+        that `query_executor`, if any, can EXPLAIN.
+
+        Validated results are cached by normalized natural language query (see
+        `NlqCache`) for `nlq_cache_ttl_s` seconds, so that rewordings of a
+        question skip the LLM call. None disables it."""
         model_params = model_params or {}
         # Configure JSON schema if API supports it
         # model_params["response_format"] = {
@@ -83,69 +156,235 @@ class AibiLlmTextToSQL(metaclass=DynamicSingleton):
         #     "json_schema": json_schema,
         # }
 
-        self.__create_prompt_template(
+        self.__create_prompt(
             prompt_prefix,
             prompt_suffix,
             prompt_examples_formatter,
             prompt_examples,
+            max_prompt_examples,
+            prompt_examples_max_tokens,
         )
 
-        self.__model = BedrockLLM(
-            model_id=model_id,
-            params=model_params,
-            region=region,
-            read_timeout=model_read_timeout,
+        # Answers are cached by model ids, so stages can share the cache
+        if response_cache_ttl_s and response_cache_backend is None:
+            response_cache_backend = get_default_cache_backend()
+        response_cache = (
+            ResponseCache(
+                response_cache_backend,
+                namespace=RESPONSE_CACHE_NAMESPACE,
+                ttl_s=response_cache_ttl_s,
+                stale_ttl_s=response_cache_stale_ttl_s,
+            )
+            if response_cache_ttl_s and response_cache_backend is not None
+            else None
+        )
+        self.__parser = TolerantJsonParser(
+            json_schema=json_schema,
+            key_aliases=SQL_QUERIES_KEY_ALIASES,
+            baseline_parse=parse_json_markdown,
+        )
+        self.__query_executor = query_executor
+        self.__nlq_cache = (
+            NlqCache(
+                ttl_s=nlq_cache_ttl_s,
+                similarity_threshold=nlq_cache_similarity_threshold,
+            )
+            if nlq_cache_ttl_s
+            else None
+        )
+        self.__pipelines: list[LlmPipeline] = []
+        for stage_model_id in (
+            [small_model_id, model_id] if small_model_id else [model_id]
+        ):
+            model = BedrockTextGenerator(
+                model_id=stage_model_id,
+                params=model_params,
+                region=region,
+                read_timeout=model_read_timeout,
+                prompt_prefix=self.__prompt.prefix,
+                max_output_tokens=max_output_tokens,
+                stop=stop_sequences,
+                stop_when_json_complete=True,
+                response_cache=response_cache,
+            )
+            self.__pipelines.append(
+                LlmPipeline(
+                    render=self.__prompt.format_inputs,
+                    generator=model,
+                    parse=self.__parser.parse,
+                    transform=self.__transform_answer,
+                )
+            )
+        self.__model = self.__pipelines[-1].generator
+        self.__cascade = ModelCascade(
+            stage_names=[pipeline.generator.model_id for pipeline in self.__pipelines]
         )
-
-        self.__parser = JsonOutputParser()
 
     def compute(self, request: NlqRequestDTO) -> NlqLlmResultsDTO:
-        response = self.__compute_response(request)
-        response = self.__validate_response(response)
+        timestamp = datetime.now().strftime(TIMESTAMP_FORMAT)
+        response = self.__get_cached_response(request, timestamp)
+        if response is not None:
+            return response
+        response = self.__cascade.run(
+            [
+                partial(
+                    self.__compute_response,
+                    pipeline,
+                    request,
+                    timestamp,
+                    shall_check_queries=i < len(self.__pipelines) - 1,
+                )
+                for i, pipeline in enumerate(self.__pipelines)
+            ]
+        )
+        response.timestamp = timestamp
+        self.__cache_response(request, timestamp, response)
+        return response
+
+    async def acompute(self, request: NlqRequestDTO) -> NlqLlmResultsDTO:
+        """Same as `compute`, without blocking the event loop during the LLM
+        call."""
+        timestamp = datetime.now().strftime(TIMESTAMP_FORMAT)
+        response = self.__get_cached_response(request, timestamp)
+        if response is not None:
+            return response
+        response = await self.__cascade.arun(
+            [
+                partial(
+                    self.__acompute_response,
+                    pipeline,
+                    request,
+                    timestamp,
+                    shall_check_queries=i < len(self.__pipelines) - 1,
+                )
+                for i, pipeline in enumerate(self.__pipelines)
+            ]
+        )
+        response.timestamp = timestamp
+        self.__cache_response(request, timestamp, response)
         return response
 
+    def forget_results(self, request: NlqRequestDTO, timestamp: Optional[str] = None):
+        """Drops the cached results of the request and the cached LLM answers
+        they came from, e.g. because their queries failed, so that a retry
+        calls the model again. `timestamp` is the one of the results, which
+        may have been computed in an earlier hour; defaults to the current
+        one."""
+        timestamp = timestamp or datetime.now().strftime(TIMESTAMP_FORMAT)
+        if self.__nlq_cache:
+            self.__nlq_cache.delete(request.natural_language_query, timestamp)
+        inputs = {
+            "natural_language_query": request.natural_language_query,
+            "timestamp": timestamp,
+        }
+        for pipeline in self.__pipelines:
+            pipeline.forget(inputs)
+
+    async def aforget_results(
+        self, request: NlqRequestDTO, timestamp: Optional[str] = None
+    ):
+        timestamp = timestamp or datetime.now().strftime(TIMESTAMP_FORMAT)
+        if self.__nlq_cache:
+            self.__nlq_cache.delete(request.natural_language_query, timestamp)
+        inputs = {
+            "natural_language_query": request.natural_language_query,
+            "timestamp": timestamp,
+        }
+        for pipeline in self.__pipelines:
+            await pipeline.aforget(inputs)
+
     # Private:
-    def __compute_response(self, request: NlqRequestDTO) -> NlqLlmResultsDTO:
-        llm_response = self.__execute_chain(request.natural_language_query)
+    def __get_cached_response(
+        self, request: NlqRequestDTO, timestamp: str
+    ) -> Optional[NlqLlmResultsDTO]:
+        if not self.__nlq_cache:
+            return None
+        return self.__nlq_cache.get(request.natural_language_query, timestamp)
+
+    def __cache_response(
+        self, request: NlqRequestDTO, timestamp: str, response: NlqLlmResultsDTO
+    ):
+        if self.__nlq_cache:
+            self.__nlq_cache.set(request.natural_language_query, timestamp, response)
+
+    def __compute_response(
+        self,
+        pipeline: LlmPipeline,
+        request: NlqRequestDTO,
+        timestamp: str,
+        shall_check_queries: bool = False,
+    ) -> NlqLlmResultsDTO:
+        llm_response = self.__execute_pipeline(
+            pipeline, request.natural_language_query, timestamp
+        )
         response = self.__extract_response(llm_response)
+        response = self.__validate_response(response)
+        if shall_check_queries:
+            self.__check_queries(response)
         return response
 
-    def __execute_chain(self, natural_language_query: str) -> Any:
-        chain = (
-            self.__prompt_template
-            | self.__model
-            | self.__answer_transform_step
-            | self.__parser
+    async def __acompute_response(
+        self,
+        pipeline: LlmPipeline,
+        request: NlqRequestDTO,
+        timestamp: str,
+        shall_check_queries: bool = False,
+    ) -> NlqLlmResultsDTO:
+        llm_response = await self.__aexecute_pipeline(
+            pipeline, request.natural_language_query, timestamp
         )
+        response = self.__extract_response(llm_response)
+        response = self.__validate_response(response)
+        if shall_check_queries:
+            await self.__acheck_queries(response)
+        return response
 
-        current_timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        if SHALL_EXPORT_LOGS:
-            try:
-                self.__export_prompt_log(natural_language_query, current_timestamp)
-            except Exception as e:
-                logger.warning(f"Failed to export prompt log: {type(e)}-{e}.")
+    def __execute_pipeline(
+        self, pipeline: LlmPipeline, natural_language_query: str, timestamp: str
+    ) -> Any:
+        inputs = self.__create_pipeline_inputs(natural_language_query, timestamp)
+        try:
+            response = pipeline.invoke(inputs)
+        except OutputParsingError as e:
+            logger.error(f"Failed to parse output: {type(e)}-{e}.")
+            raise e
+        self.__log_pipeline_reply(response, inputs)
+        return response
 
+    async def __aexecute_pipeline(
+        self, pipeline: LlmPipeline, natural_language_query: str, timestamp: str
+    ) -> Any:
+        inputs = self.__create_pipeline_inputs(natural_language_query, timestamp)
         try:
-            response = chain.invoke(
-                {
-                    "natural_language_query": natural_language_query,
-                    "timestamp": current_timestamp,
-                }
-            )
-        except OutputParserException as e:
+            response = await pipeline.ainvoke(inputs)
+        except OutputParsingError as e:
             logger.error(f"Failed to parse output: {type(e)}-{e}.")
             raise e
+        self.__log_pipeline_reply(response, inputs)
+        return response
 
+    def __create_pipeline_inputs(
+        self, natural_language_query: str, timestamp: str
+    ) -> dict[str, str]:
+        if SHALL_EXPORT_LOGS:
+            try:
+                self.__export_prompt_log(natural_language_query, timestamp)
+            except Exception as e:
+                logger.warning(f"Failed to export prompt log: {type(e)}-{e}.")
+        return {
+            "natural_language_query": natural_language_query,
+            "timestamp": timestamp,
+        }
+
+    def __log_pipeline_reply(self, response: Any, inputs: dict[str, str]):
         if SHALL_EXPORT_LOGS:
             try:
                 self.__export_reply_log(
-                    response, natural_language_query, current_timestamp
+                    response, inputs["natural_language_query"], inputs["timestamp"]
                 )
             except Exception as e:
                 logger.warning(f"Failed to export reply log: {type(e)}-{e}.")
 
-        return response
-
     def __extract_response(self, response: Any) -> NlqLlmResultsDTO:
         try:
             if isinstance(response, list):
@@ -194,9 +433,28 @@ class AibiLlmTextToSQL(metaclass=DynamicSingleton):
 
         return response
 
-    @chain
+    def __check_queries(self, response: NlqLlmResultsDTO):
+        """Cascade acceptance check: single SELECT statements, which the
+        database can plan without running them."""
+        for sql_query in response.sql_queries:
+            if not is_select_query(sql_query):
+                raise InvalidLLMResponseFormatError(
+                    f"Query is not a single SELECT statement: {sql_query}"
+                )
+            if self.__query_executor is not None:
+                self.__query_executor.explain(sql_query)
+
+    async def __acheck_queries(self, response: NlqLlmResultsDTO):
+        for sql_query in response.sql_queries:
+            if not is_select_query(sql_query):
+                raise InvalidLLMResponseFormatError(
+                    f"Query is not a single SELECT statement: {sql_query}"
+                )
+            if self.__query_executor is not None:
+                await self.__query_executor.aexplain(sql_query)
+
     @staticmethod
-    def __answer_transform_step(answer: str) -> str:
+    def __transform_answer(answer: str) -> str:
         # Remove code blocks if present
         if "```" in answer:
             pattern = r"```(?:sql|json)?(.*?)```"
@@ -216,17 +474,21 @@ class AibiLlmTextToSQL(metaclass=DynamicSingleton):
 
         # If the response directly starts with SELECT, assume it's a raw SQL query
         if answer.strip().upper().startswith("SELECT"):
-            return json.dumps({"sql_queries": answer.strip(), "title": None})
+            return json.dumps({"sql_queries": [answer.strip()], "title": ""})
 
         return answer
 
-    def __create_prompt_template(
+    def __create_prompt(
         self,
         prompt_prefix: str | Path,
         prompt_suffix: str | Path,
         prompt_examples_formatter: str | Path,
         prompt_examples: list[dict] | Path,
+        max_prompt_examples: Optional[int],
+        prompt_examples_max_tokens: Optional[int],
     ):
+        """With `max_prompt_examples` set, only the examples most similar to
+        each query are included in its prompt. Otherwise all of them are."""
         prompt_examples_formatter = (
             prompt_examples_formatter.read_text()
             if isinstance(prompt_examples_formatter, Path)
@@ -247,46 +509,46 @@ class AibiLlmTextToSQL(metaclass=DynamicSingleton):
 
         examples = self.__load_prompt_examples(prompt_examples)
 
-        example_prompt = PromptTemplate(
-            template=prompt_examples_formatter,
-            input_variables=[
-                "example_id",
-                "type",
-                "natural_language_query",
-                "results",
-            ],
-        )
-
-        self.__prompt_template = FewShotPromptTemplate(
+        self.__prompt = StaticPrefixPrompt(
             prefix=prompt_prefix,
-            examples=examples,
-            example_prompt=example_prompt,
-            input_variables=["natural_language_query", "timestamp"],
             suffix=prompt_suffix,
+            examples=examples,
+            example_formatter=prompt_examples_formatter,
+            example_selection_key=(
+                "natural_language_query" if max_prompt_examples else None
+            ),
+            max_examples=max_prompt_examples or len(examples),
+            max_examples_tokens=prompt_examples_max_tokens,
         )
 
     def __load_prompt_examples(self, prompt_examples: list[dict] | Path):
         if isinstance(prompt_examples, Path):
             try:
-                examples: list[dict] = load_jsons_in_directory(
-                    prompt_examples, encoding="utf-8"
+                filepaths = sorted(
+                    f for f in prompt_examples.iterdir() if f.suffix == ".json"
                 )
+                examples: list[dict] = [
+                    load_json(f, encoding="utf-8") for f in filepaths
+                ]
+                # Tag the language examples are written in from their filename
+                # suffix (e.g. "aggregation-2-es.json")
+                for example, filepath in zip(examples, filepaths):
+                    language = filepath.stem.rsplit("-", 1)[-1]
+                    example["language"] = (
+                        language if language in EXAMPLES_LANGUAGES else DEFAULT_LANGUAGE
+                    )
                 # Format the examples to ensure correct handling of nested dictionaries
                 for i, example in enumerate(examples):
                     example["example_id"] = i + 1
                     example["type"] = example.get("type", "Unknown")
 
                 # Convert nested dictionary results to string to prevent direct key access
-                # AND escape any curly braces to prevent string.format from treating them as placeholders
                 processed_examples = []
                 for example in examples:
                     processed_example = {}
                     for k, v in example.items():
                         if k == "results":
-                            # Escape curly braces by doubling them to prevent format string interpretation
-                            json_str = json.dumps(v, ensure_ascii=False)
-                            json_str = json_str.replace("{", "{{").replace("}", "}}")
-                            processed_example[k] = json_str
+                            processed_example[k] = json.dumps(v, ensure_ascii=False)
                         else:
                             processed_example[k] = v
                     processed_examples.append(processed_example)
@@ -303,7 +565,7 @@ class AibiLlmTextToSQL(metaclass=DynamicSingleton):
         current_timestamp: str,
     ):
         try:
-            prompt = self.__prompt_template.format(
+            prompt = self.__prompt.format(
                 natural_language_query=natural_language_query,
                 timestamp=current_timestamp,
             )
@@ -0,0 +1,274 @@
+import logging
+import threading
+import time
+from collections import Counter, OrderedDict
+from typing import Any, Optional
+
+from src.app.demos.ai_bi.nlq.llm_nlq.dtos import NlqLlmResultsDTO
+from src.utils.bm25_toolbox import tokenize
+from src.utils.language_toolbox import STOPWORDS, detect_language
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_ENTRIES = 1024
+DEFAULT_TTL_S = 60 * 60
+# Dice coefficient of character trigrams, between queries of the same tokens
+# in another order
+DEFAULT_SIMILARITY_THRESHOLD = 0.9
+NGRAM_SIZE = 3
+
+NUMBER_WORDS = {
+    # English
+    "zero": "0",
+    "one": "1",
+    "two": "2",
+    "three": "3",
+    "four": "4",
+    "five": "5",
+    "six": "6",
+    "seven": "7",
+    "eight": "8",
+    "nine": "9",
+    "ten": "10",
+    "eleven": "11",
+    "twelve": "12",
+    "fifteen": "15",
+    "twenty": "20",
+    "thirty": "30",
+    "fifty": "50",
+    "hundred": "100",
+    # Spanish, accents removed. "un" and "una" are left as articles.
+    "cero": "0",
+    "uno": "1",
+    "dos": "2",
+    "tres": "3",
+    "cuatro": "4",
+    "cinco": "5",
+    "seis": "6",
+    "siete": "7",
+    "ocho": "8",
+    "nueve": "9",
+    "diez": "10",
+    "once": "11",
+    "doce": "12",
+    "quince": "15",
+    "veinte": "20",
+    "treinta": "30",
+    "cincuenta": "50",
+    "cien": "100",
+}
+# Words that make a question depend on the current date. Their questions are
+# only shared within the same timestamp bucket.
+RELATIVE_DATE_WORDS = frozenset(
+    "today yesterday tomorrow now current currently recent recently ago last past "
+    "previous this next week weeks month months quarter quarters year years ytd "
+    "hoy ayer manana ahora actual actualmente reciente recientes hace ultimo ultima "
+    "ultimos ultimas pasado pasada pasados pasadas anterior este esta proximo "
+    "proxima semana semanas mes meses trimestre trimestres ano anos".split()
+)
+# Negations and comparison or direction words: one word apart, their
+# questions are opposite
+NEGATION_WORDS = frozenset("not no nor never without none sin nunca ni ningun".split())
+COMPARISON_WORDS = frozenset(
+    "before after more less most least highest lowest top bottom best worst "
+    "above below over under asc desc ascending descending first "
+    "antes despues mayor menor mas menos mejor peor primero".split()
+)
+# Stopwords that change the SQL of a question, hence kept
+MEANINGFUL_STOPWORDS = (
+    frozenset(
+        "last month year this than per ano mes este esta ultimo ultimos "
+        "cuanto cuantos who when where which cual cuales quien".split()
+    )
+    | NEGATION_WORDS
+    | COMPARISON_WORDS
+)
+IGNORED_WORDS = (STOPWORDS["en"] | STOPWORDS["es"]) - MEANINGFUL_STOPWORDS
+
+
+def normalize_nlq(natural_language_query: str) -> tuple[list[str], bool]:
+    """Tokens of the query and whether it refers to dates relative to now.
+
+    Tokens are lowercased and accent-free, without punctuation or stopwords
+    of either language, with number words as digits and a plural "s"
+    removed."""
+    tokens = []
+    is_relative = False
+    for token in tokenize(natural_language_query, min_length=1):
+        token = NUMBER_WORDS.get(token, token)
+        if token in IGNORED_WORDS:
+            is_relative = is_relative or token in RELATIVE_DATE_WORDS
+            continue
+        if token in RELATIVE_DATE_WORDS:
+            is_relative = True
+            # Singular of the date words, e.g. "months" and "meses"
+            for suffix in ("es", "s"):
+                if (
+                    token.endswith(suffix)
+                    and token[: -len(suffix)] in RELATIVE_DATE_WORDS
+                ):
+                    token = token[: -len(suffix)]
+                    break
+        elif len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens, is_relative
+
+
+def compute_ngrams(text: str) -> Counter:
+    text = f" {text} "
+    return Counter(text[i : i + NGRAM_SIZE] for i in range(len(text) - NGRAM_SIZE + 1))
+
+
+def compute_dice_similarity(a: Counter, b: Counter) -> float:
+    n_ngrams = a.total() + b.total()
+    return 2 * (a & b).total() / n_ngrams if n_ngrams else 0.0
+
+
+class NlqCache:
+    """Validated LLM results of natural language queries, shared by the
+    queries that normalize alike (see `normalize_nlq`).
+
+    Lookups are exact first, then near-duplicate by character n-gram
+    similarity. Near-duplicates must be in the same language and have the
+    same set of tokens: a single word, e.g. "not" or "lowest", may reverse a
+    question. Questions about relative dates (see `RELATIVE_DATE_WORDS`) are
+    only shared within the same timestamp bucket, so that their time window
+    is never stale."""
+
+    @property
+    def stats(self) -> dict[str, Any]:
+        with self.__lock:
+            n_hits = self.__n_exact_hits + self.__n_similar_hits
+            n_lookups = n_hits + self.__n_misses
+            return {
+                "n_entries": len(self.__entries),
+                "n_exact_hits": self.__n_exact_hits,
+                "n_similar_hits": self.__n_similar_hits,
+                "n_misses": self.__n_misses,
+                "hit_rate": n_hits / n_lookups if n_lookups else 0.0,
+            }
+
+    # Public:
+    def __init__(
+        self,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        ttl_s: Optional[float] = DEFAULT_TTL_S,
+        similarity_threshold: float = DEFAULT_SIMILARITY_THRESHOLD,
+    ):
+        self.__max_entries = max_entries
+        self.__ttl_s = ttl_s
+        self.__similarity_threshold = similarity_threshold
+        # Key to partition, normalized text, n-grams, results and creation time
+        self.__entries: OrderedDict[
+            str, tuple[str, str, Counter, NlqLlmResultsDTO, float]
+        ] = OrderedDict()
+        self.__lock = threading.Lock()
+        self.__n_exact_hits = 0
+        self.__n_similar_hits = 0
+        self.__n_misses = 0
+
+    def get(
+        self, natural_language_query: str, timestamp: str
+    ) -> Optional[NlqLlmResultsDTO]:
+        partition, text = self.__normalize(natural_language_query, timestamp)
+        key = f"{partition}|{text}"
+        with self.__lock:
+            entry = self.__get_entry(key)
+            if entry is not None:
+                self.__n_exact_hits += 1
+                logger.info(f"NLQ cache hit for '{natural_language_query}'.")
+                return entry[3].model_copy(deep=True)
+            key = self.__find_similar_key(partition, text)
+            if key is None:
+                self.__n_misses += 1
+                return None
+            self.__entries.move_to_end(key)
+            self.__n_similar_hits += 1
+            logger.info(
+                f"NLQ cache near-duplicate hit for '{natural_language_query}': '{self.__entries[key][1]}'."
+            )
+            return self.__entries[key][3].model_copy(deep=True)
+
+    def set(
+        self,
+        natural_language_query: str,
+        timestamp: str,
+        results: NlqLlmResultsDTO,
+    ):
+        partition, text = self.__normalize(natural_language_query, timestamp)
+        key = f"{partition}|{text}"
+        entry = (
+            partition,
+            text,
+            compute_ngrams(text),
+            results.model_copy(deep=True),
+            time.monotonic(),
+        )
+        with self.__lock:
+            self.__entries[key] = entry
+            self.__entries.move_to_end(key)
+            while len(self.__entries) > self.__max_entries:
+                self.__entries.popitem(last=False)
+
+    def delete(self, natural_language_query: str, timestamp: str):
+        """Drops the results `get` would return for the query, e.g. because
+        their SQL failed to run."""
+        partition, text = self.__normalize(natural_language_query, timestamp)
+        with self.__lock:
+            key = f"{partition}|{text}"
+            if key not in self.__entries:
+                key = self.__find_similar_key(partition, text)
+            if key is not None:
+                del self.__entries[key]
+
+    # Private:
+    @staticmethod
+    def __normalize(natural_language_query: str, timestamp: str) -> tuple[str, str]:
+        """Partition (language, timestamp bucket, set of tokens) and
+        normalized text of the query."""
+        tokens, is_relative = normalize_nlq(natural_language_query)
+        # Near-duplicates may not differ in any token: "top 5" and "top 10",
+        # "by month" and "by year", or "highest" and "lowest" have different
+        # SQL
+        partition = "|".join(
+            [
+                detect_language(natural_language_query),
+                timestamp if is_relative else "",
+                ",".join(sorted(set(tokens))),
+            ]
+        )
+        return partition, " ".join(tokens)
+
+    def __get_entry(
+        self, key: str
+    ) -> Optional[tuple[str, str, Counter, NlqLlmResultsDTO, float]]:
+        entry = self.__entries.get(key)
+        if entry is None:
+            return None
+        if self.__is_expired(entry[4]):
+            del self.__entries[key]
+            return None
+        self.__entries.move_to_end(key)
+        return entry
+
+    def __find_similar_key(self, partition: str, text: str) -> Optional[str]:
+        ngrams = compute_ngrams(text)
+        best_key, best_similarity = None, self.__similarity_threshold
+        for key, (entry_partition, _, entry_ngrams, _, created_at) in list(
+            self.__entries.items()
+        ):
+            if entry_partition != partition:
+                continue
+            if self.__is_expired(created_at):
+                del self.__entries[key]
+                continue
+            similarity = compute_dice_similarity(ngrams, entry_ngrams)
+            if similarity >= best_similarity:
+                best_key, best_similarity = key, similarity
+        return best_key
+
+    def __is_expired(self, created_at: float) -> bool:
+        return (
+            self.__ttl_s is not None and time.monotonic() - created_at >= self.__ttl_s
+        )
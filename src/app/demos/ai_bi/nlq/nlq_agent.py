@@ -1,9 +1,20 @@
+import asyncio
 import logging
+import threading
+import weakref
+from concurrent.futures import as_completed
 from time import perf_counter
-from typing import Optional
+from typing import AsyncIterator, Optional
 
-from src.app.demos.ai_bi.nlq.dtos import NlqResultDTO, SqlResultDTO
+from src.app.demos.ai_bi.nlq.dtos import (
+    NlqResultDTO,
+    NlqStreamStartDTO,
+    SqlResultDTO,
+    SqlRowsBatchDTO,
+)
+from src.app.demos.ai_bi.nlq.enums import ResultFormat
 from src.app.demos.ai_bi.nlq.llm_nlq.dtos import NlqLlmResultsDTO, NlqRequestDTO
+from src.app.demos.ai_bi.nlq.llm_nlq.errors import InvalidLLMResponseFormatError
 from src.app.demos.ai_bi.nlq.llm_nlq.llm_nlq import AibiLlmTextToSQL
 from src.app.demos.ai_bi.nlq.query_executor import AibiQueryExecutor
 from src.app.demos.ai_bi.nlq.units_assignation.column_units_assigner import (
@@ -14,6 +25,10 @@ from src.utils.metaclasses import DynamicSingleton
 
 logger = logging.getLogger(__name__)
 
+# Per worker process and event loop. Requests beyond it wait for a slot in
+# `acompute`.
+DEFAULT_MAX_CONCURRENT_REQUESTS = 8
+
 
 class AibiNlqAgent(metaclass=DynamicSingleton):
     # Public:
@@ -21,15 +36,29 @@ class AibiNlqAgent(metaclass=DynamicSingleton):
         self,
         llm_text_to_sql: Optional[AibiLlmTextToSQL] = None,
         query_executor: Optional[AibiQueryExecutor] = None,
+        max_concurrent_requests: int = DEFAULT_MAX_CONCURRENT_REQUESTS,
     ):
         self.__llm_text_to_sql = llm_text_to_sql or AibiLlmTextToSQL()
         self.__query_executor = query_executor or AibiQueryExecutor()
+        self.__max_concurrent_requests = max_concurrent_requests
+        # asyncio semaphores are bound to a loop, and the agent outlives them
+        self.__semaphores: weakref.WeakKeyDictionary[
+            asyncio.AbstractEventLoop, asyncio.Semaphore
+        ] = weakref.WeakKeyDictionary()
+        self.__semaphores_lock = threading.Lock()
 
-    def compute(self, natural_language_query: str) -> NlqResultDTO:
+    def compute(
+        self,
+        natural_language_query: str,
+        result_format: ResultFormat = ResultFormat.ROWS,
+    ) -> NlqResultDTO:
         t0 = perf_counter()
-        llm_results, sql_results, generation_time_ms = self.__compute_results(
-            natural_language_query
-        )
+        results = self.__compute_results(natural_language_query, result_format)
+        if results is None:
+            raise InvalidLLMResponseFormatError(
+                f"Failed to compute results for: {natural_language_query}"
+            )
+        llm_results, sql_results, generation_time_ms, execution_time_ms = results
         total_time = (perf_counter() - t0) * 1000
         return NlqResultDTO(
             natural_language_query=natural_language_query,
@@ -38,23 +67,159 @@ class AibiNlqAgent(metaclass=DynamicSingleton):
             chart_type=llm_results.chart_type,
             total_time_ms=total_time,
             generation_time_ms=generation_time_ms,
+            execution_time_ms=execution_time_ms,
+        )
+
+    async def acompute(
+        self,
+        natural_language_query: str,
+        result_format: ResultFormat = ResultFormat.ROWS,
+    ) -> NlqResultDTO:
+        """Same as `compute`, without blocking the event loop: the LLM call is
+        awaited and the queries run in the query executor threads."""
+        semaphore = self.__get_semaphore()
+        if semaphore.locked():
+            logger.info("NLQ concurrency limit reached. Waiting for a slot.")
+        async with semaphore:
+            t0 = perf_counter()
+            results = await self.__acompute_results(
+                natural_language_query, result_format
+            )
+            if results is None:
+                raise InvalidLLMResponseFormatError(
+                    f"Failed to compute results for: {natural_language_query}"
+                )
+            llm_results, sql_results, generation_time_ms, execution_time_ms = results
+            total_time = (perf_counter() - t0) * 1000
+        return NlqResultDTO(
+            natural_language_query=natural_language_query,
+            title=llm_results.title,
+            results=sql_results,
+            chart_type=llm_results.chart_type,
+            total_time_ms=total_time,
+            generation_time_ms=generation_time_ms,
+            execution_time_ms=execution_time_ms,
+        )
+
+    async def astream(
+        self,
+        natural_language_query: str,
+        result_format: ResultFormat = ResultFormat.ROWS,
+    ) -> AsyncIterator[NlqStreamStartDTO | SqlRowsBatchDTO | NlqResultDTO]:
+        """Same as `acompute`, with the rows yielded in batches as they are
+        fetched instead of collected: a `NlqStreamStartDTO` once the queries
+        are generated, the `SqlRowsBatchDTO`s of all the queries as they
+        arrive (see `query_index`), and a `NlqResultDTO` whose results have no
+        rows. Failed queries are not retried, since some of their rows may
+        have been consumed already."""
+        async with self.__get_semaphore():
+            t0 = perf_counter()
+            generated = await self.__agenerate_sql_queries(natural_language_query)
+            if generated is None:
+                raise InvalidLLMResponseFormatError(
+                    f"Failed to generate SQL queries for: {natural_language_query}"
+                )
+            llm_results, generation_time_ms = generated
+            yield NlqStreamStartDTO(
+                natural_language_query=natural_language_query,
+                queries=llm_results.sql_queries,
+                chart_type=llm_results.chart_type,
+                generation_time_ms=generation_time_ms,
+                title=llm_results.title,
+            )
+
+            t1 = perf_counter()
+            last_batches: dict[int, SqlRowsBatchDTO] = {}
+            try:
+                async for batch in self.__astream_sql_queries(
+                    llm_results.sql_queries, result_format
+                ):
+                    if batch.is_last:
+                        last_batches[batch.query_index] = batch
+                    yield batch
+            except Exception as e:
+                await self.__llm_text_to_sql.aforget_results(
+                    NlqRequestDTO(natural_language_query=natural_language_query),
+                    timestamp=llm_results.timestamp,
+                )
+                raise e
+            execution_time_ms = (perf_counter() - t1) * 1000
+            total_time = (perf_counter() - t0) * 1000
+        yield NlqResultDTO(
+            natural_language_query=natural_language_query,
+            title=llm_results.title,
+            results=[
+                SqlResultDTO(
+                    columns=batch.columns,
+                    rows=[],
+                    query=batch.query,
+                    execution_time_ms=batch.execution_time_ms,
+                    wait_time_ms=batch.wait_time_ms,
+                    is_truncated=batch.is_truncated,
+                    columns_units=batch.columns_units,
+                )
+                for _, batch in sorted(last_batches.items())
+            ],
+            chart_type=llm_results.chart_type,
+            total_time_ms=total_time,
+            generation_time_ms=generation_time_ms,
+            execution_time_ms=execution_time_ms,
         )
 
     # Private:
-    @retry(max_retries=5, delay=0)
+    def __get_semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        with self.__semaphores_lock:
+            semaphore = self.__semaphores.get(loop)
+            if semaphore is None:
+                semaphore = asyncio.Semaphore(self.__max_concurrent_requests)
+                self.__semaphores[loop] = semaphore
+            return semaphore
+
+    @retry(n_attempts=5, wait_time=0)
     def __compute_results(
-        self, natural_language_query: str
-    ) -> tuple[NlqLlmResultsDTO, list[SqlResultDTO], float]:
+        self, natural_language_query: str, result_format: ResultFormat
+    ) -> tuple[NlqLlmResultsDTO, list[SqlResultDTO], float, float]:
         llm_results, generation_time_ms = self.__compute_sql_query(
             natural_language_query
         )
-        sql_results = [
-            self.__execute_sql_query(sql_query) for sql_query in llm_results.sql_queries
-        ]
-        sql_results = [
-            self.__assign_column_units(sql_result) for sql_result in sql_results
-        ]
-        return llm_results, sql_results, generation_time_ms
+        try:
+            sql_results, execution_time_ms = self.__execute_sql_queries(
+                llm_results.sql_queries, result_format
+            )
+        except Exception as e:
+            # Otherwise the retry would replay the same cached queries
+            self.__llm_text_to_sql.forget_results(
+                NlqRequestDTO(natural_language_query=natural_language_query),
+                timestamp=llm_results.timestamp,
+            )
+            raise e
+        return llm_results, sql_results, generation_time_ms, execution_time_ms
+
+    @retry(n_attempts=5, wait_time=0)
+    async def __acompute_results(
+        self, natural_language_query: str, result_format: ResultFormat
+    ) -> tuple[NlqLlmResultsDTO, list[SqlResultDTO], float, float]:
+        llm_results, generation_time_ms = await self.__acompute_sql_query(
+            natural_language_query
+        )
+        try:
+            sql_results, execution_time_ms = await self.__aexecute_sql_queries(
+                llm_results.sql_queries, result_format
+            )
+        except Exception as e:
+            await self.__llm_text_to_sql.aforget_results(
+                NlqRequestDTO(natural_language_query=natural_language_query),
+                timestamp=llm_results.timestamp,
+            )
+            raise e
+        return llm_results, sql_results, generation_time_ms, execution_time_ms
+
+    @retry(n_attempts=5, wait_time=0)
+    async def __agenerate_sql_queries(
+        self, natural_language_query: str
+    ) -> tuple[NlqLlmResultsDTO, float]:
+        return await self.__acompute_sql_query(natural_language_query)
 
     def __compute_sql_query(
         self, natural_language_query: str
@@ -62,11 +227,104 @@ class AibiNlqAgent(metaclass=DynamicSingleton):
         t0 = perf_counter()
         nlq_request = NlqRequestDTO(natural_language_query=natural_language_query)
         sql_result = self.__llm_text_to_sql.compute(nlq_request)
-        dt = perf_counter() - t0
+        dt = (perf_counter() - t0) * 1000
+        return sql_result, dt
+
+    async def __acompute_sql_query(
+        self, natural_language_query: str
+    ) -> tuple[NlqLlmResultsDTO, float]:
+        t0 = perf_counter()
+        nlq_request = NlqRequestDTO(natural_language_query=natural_language_query)
+        sql_result = await self.__llm_text_to_sql.acompute(nlq_request)
+        dt = (perf_counter() - t0) * 1000
         return sql_result, dt
 
-    def __execute_sql_query(self, query: str) -> SqlResultDTO:
-        return self.__query_executor.execute(query)
+    def __execute_sql_queries(
+        self, queries: list[str], result_format: ResultFormat
+    ) -> tuple[list[SqlResultDTO], float]:
+        """Results in the order of `queries`, and the wall time to get them.
+        The queries run concurrently on pooled connections, and units are
+        assigned to each result as it arrives."""
+        t0 = perf_counter()
+        if len(queries) == 1:
+            sql_results = [
+                self.__assign_column_units(
+                    self.__execute_sql_query(queries[0], result_format)
+                )
+            ]
+            return sql_results, (perf_counter() - t0) * 1000
+        futures = {
+            self.__query_executor.submit(q, result_format): i
+            for i, q in enumerate(queries)
+        }
+        sql_results: list[Optional[SqlResultDTO]] = [None] * len(queries)
+        try:
+            for future in as_completed(futures):
+                sql_results[futures[future]] = self.__assign_column_units(
+                    future.result()
+                )
+        except Exception as e:
+            for future in futures:
+                future.cancel()
+            raise e
+        return sql_results, (perf_counter() - t0) * 1000
+
+    async def __aexecute_sql_queries(
+        self, queries: list[str], result_format: ResultFormat
+    ) -> tuple[list[SqlResultDTO], float]:
+        t0 = perf_counter()
+        sql_results = await asyncio.gather(
+            *[self.__aexecute_sql_query(query, result_format) for query in queries]
+        )
+        return list(sql_results), (perf_counter() - t0) * 1000
+
+    async def __astream_sql_queries(
+        self, queries: list[str], result_format: ResultFormat
+    ) -> AsyncIterator[SqlRowsBatchDTO]:
+        """Batches of all the queries, run concurrently, in arrival order.
+        The queue is bounded so that fast queries wait for the consumer
+        instead of piling up rows."""
+        queue: asyncio.Queue[SqlRowsBatchDTO | Exception] = asyncio.Queue(
+            maxsize=len(queries)
+        )
+
+        async def produce(query_index: int, query: str):
+            try:
+                columns_units = None
+                async for batch in self.__query_executor.astream(query, result_format):
+                    if columns_units is None:
+                        columns_units = ColumnUnitsAssigner().compute(batch.columns)
+                    batch.query_index = query_index
+                    batch.columns_units = columns_units
+                    await queue.put(batch)
+            except Exception as e:
+                await queue.put(e)
+
+        tasks = [asyncio.create_task(produce(i, q)) for i, q in enumerate(queries)]
+        try:
+            n_pending = len(tasks)
+            while n_pending:
+                batch = await queue.get()
+                if isinstance(batch, Exception):
+                    raise batch
+                if batch.is_last:
+                    n_pending -= 1
+                yield batch
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def __execute_sql_query(
+        self, query: str, result_format: ResultFormat
+    ) -> SqlResultDTO:
+        return self.__query_executor.execute(query, result_format)
+
+    async def __aexecute_sql_query(
+        self, query: str, result_format: ResultFormat
+    ) -> SqlResultDTO:
+        return self.__assign_column_units(
+            await self.__query_executor.aexecute(query, result_format)
+        )
 
     def __assign_column_units(self, sql_result: SqlResultDTO) -> SqlResultDTO:
         columns_units = ColumnUnitsAssigner().compute(sql_result.columns)
@@ -1,16 +1,29 @@
+import asyncio
 import json
 import logging
 import re
-from time import perf_counter
-from typing import Dict, Optional
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
+from time import monotonic, perf_counter
+from typing import Any, AsyncIterator, Dict, Iterator, Optional
+from uuid import uuid4
 
 import psycopg2
 from psycopg2 import pool
 
-from src.app.demos.ai_bi.nlq.dtos import SqlResultDTO
+from src.app.demos.ai_bi.nlq.columnar_rows import ColumnarRowsBuilder
+from src.app.demos.ai_bi.nlq.dtos import SqlResultDTO, SqlRowsBatchDTO
+from src.app.demos.ai_bi.nlq.enums import ResultFormat
 from src.app.demos.ai_bi.nlq.llm_nlq.errors import SqlExecutionError, UnsafeQueryError
+from src.app.demos.ai_bi.nlq.sql_result_cache import (
+    DEFAULT_MAX_SIZE_BYTES,
+    DEFAULT_TTL_S,
+    SqlResultCache,
+)
 from src.config.vars_grabber import VariablesGrabber
 from src.utils.metaclasses import DynamicSingleton
+from src.utils.sql_toolbox import compute_sql_fingerprint
 
 logger = logging.getLogger(__name__)
 
@@ -21,6 +34,15 @@ MIN_CONNECTIONS = 1
 MAX_CONNECTIONS = 10
 POOL_KEEPALIVE_SECONDS = 300  # 5 minutes
 
+# Rows beyond it are left out of results, which are then flagged as truncated
+DEFAULT_MAX_ROWS = 10_000
+DEFAULT_FETCH_BATCH_SIZE = 1_000
+
+# Token that scripts/demo_aibi_database/setup_database.py changes after every
+# reload. Cached results are dropped when it changes.
+DATA_VERSION_QUERY = "SELECT token FROM aibi_data_version"
+DATA_VERSION_CHECK_INTERVAL_S = 30.0
+
 UNSAFE_OPERATIONS = [
     r"\bDROP\b",
     r"\bDELETE\b",
@@ -36,6 +58,27 @@ UNSAFE_OPERATIONS = [
 
 
 class AibiQueryExecutor(metaclass=DynamicSingleton):
+    """Runs the queries of the demo database on pooled connections.
+
+    Results are cached by query fingerprint (see `compute_sql_fingerprint`)
+    in a `SqlResultCache` of `result_cache_max_size_bytes`, unless it is None.
+    The data version token is checked at most every
+    `DATA_VERSION_CHECK_INTERVAL_S` seconds, and the cache is cleared when it
+    changes.
+
+    Rows are read with `fetchmany` from a named (server-side) cursor, so that
+    only one batch of `fetch_batch_size` rows is held in memory at a time, up
+    to `max_rows` per query (None for no cap). `stream` yields those batches
+    instead of collecting them. With the COLUMNAR result format, batches go
+    straight from the cursor into typed column arrays (see
+    `ColumnarRowsBuilder`) instead of rows."""
+
+    @property
+    def result_cache_stats(self) -> Optional[dict[str, Any]]:
+        if self.__result_cache is None:
+            return None
+        return self.__result_cache.stats | {"data_version": self.__data_version}
+
     # Public:
     def __init__(
         self,
@@ -45,6 +88,11 @@ class AibiQueryExecutor(metaclass=DynamicSingleton):
         username: Optional[str] = None,
         password: Optional[str] = None,
         connection_timeout: int = 10,
+        result_cache_max_size_bytes: Optional[int] = DEFAULT_MAX_SIZE_BYTES,
+        result_cache_ttl_s: Optional[float] = DEFAULT_TTL_S,
+        max_rows: Optional[int] = DEFAULT_MAX_ROWS,
+        fetch_batch_size: int = DEFAULT_FETCH_BATCH_SIZE,
+        use_server_side_cursor: bool = True,
     ):
         self.__host = host or VariablesGrabber().get("DEMO_AIBI_DB_HOST")
         self.__port = port or int(VariablesGrabber().get("DEMO_AIBI_DB_PORT") or "5432")
@@ -60,57 +108,290 @@ class AibiQueryExecutor(metaclass=DynamicSingleton):
             self.__password = password
 
         self.__connection_timeout = connection_timeout
+        self.__max_rows = max_rows
+        self.__fetch_batch_size = fetch_batch_size
+        self.__use_server_side_cursor = use_server_side_cursor
         self.__validate_connection_params()
 
         # Initialize connection pool
         self.__connection_pool = self.__create_connection_pool()
+        # Callers wait for a free connection instead of failing on an
+        # exhausted pool
+        self.__connection_slots = threading.BoundedSemaphore(MAX_CONNECTIONS)
+        # Async and submitted calls run psycopg2 in these threads, one per
+        # pooled connection
+        self.__executor = ThreadPoolExecutor(
+            max_workers=MAX_CONNECTIONS, thread_name_prefix="aibi-sql"
+        )
+        self.__result_cache = (
+            SqlResultCache(
+                max_size_bytes=result_cache_max_size_bytes, ttl_s=result_cache_ttl_s
+            )
+            if result_cache_max_size_bytes
+            else None
+        )
+        self.__data_version: Optional[str] = None
+        self.__data_version_checked_at = float("-inf")
+        self.__data_version_lock = threading.Lock()
 
-    def execute(self, query: str) -> SqlResultDTO:
+    def execute(
+        self, query: str, result_format: ResultFormat = ResultFormat.ROWS
+    ) -> SqlResultDTO:
+        self.__validate_query(query)
+        if self.__result_cache is None:
+            return self.__execute(query, result_format)
+        cache_key = ":".join(
+            [
+                self.__get_data_version(),
+                result_format.value,
+                compute_sql_fingerprint(query),
+            ]
+        )
+        result = self.__result_cache.get(cache_key)
+        if result is not None:
+            logger.info(f"SQL result cache hit for {cache_key}.")
+            result.query = query
+            result.is_cached = True
+            return result
+        result = self.__execute(query, result_format)
+        self.__result_cache.set(cache_key, result)
+        return result
+
+    def explain(self, query: str) -> None:
+        """Plans `query` without running it. Raises `SqlExecutionError` when
+        the database rejects it (syntax, unknown tables or columns...)."""
         self.__validate_query(query)
 
         connection = None
         cursor = None
-        start_time = perf_counter()
 
         try:
             connection = self.__get_pooled_connection()
             cursor = connection.cursor()
+            cursor.execute(f"EXPLAIN {query}")
+            cursor.fetchall()
+        except Exception as e:
+            logger.info(f"Query failed to EXPLAIN: {str(e)}")
+            raise SqlExecutionError(f"Error explaining query: {str(e)}")
+        finally:
+            if cursor:
+                cursor.close()
+            if connection:
+                self.__put_pooled_connection(connection)
 
-            cursor.execute(query)
+    def stream(
+        self, query: str, result_format: ResultFormat = ResultFormat.ROWS
+    ) -> Iterator[SqlRowsBatchDTO]:
+        """Rows of `query` in batches of `fetch_batch_size`, fetched as they
+        are consumed, up to `max_rows`. The last batch is flagged `is_last`,
+        and `is_truncated` when rows were left out. The pooled connection is
+        held until the iterator is exhausted or closed. Results are not
+        cached."""
+        self.__validate_query(query)
+        return self.__stream(query, result_format)
 
-            # Get column names
-            columns = (
-                [desc[0] for desc in cursor.description] if cursor.description else []
-            )
+    def submit(
+        self, query: str, result_format: ResultFormat = ResultFormat.ROWS
+    ) -> Future:
+        """Runs `execute` in the query executor threads, so that several
+        queries can run concurrently on pooled connections."""
+        return self.__executor.submit(self.execute, query, result_format)
 
-            # Fetch all results
-            rows = cursor.fetchall()
+    async def aexecute(
+        self, query: str, result_format: ResultFormat = ResultFormat.ROWS
+    ) -> SqlResultDTO:
+        """Same as `execute`, without blocking the event loop."""
+        return await self.__run_in_executor(self.execute, query, result_format)
 
-            # Convert tuples to lists for compatibility with SqlResultDTO
-            row_lists = [list(row) for row in rows]
+    async def aexplain(self, query: str) -> None:
+        """Same as `explain`, without blocking the event loop."""
+        await self.__run_in_executor(self.explain, query)
 
-            # Calculate execution time
-            execution_time_ms = (perf_counter() - start_time) * 1000
+    async def astream(
+        self, query: str, result_format: ResultFormat = ResultFormat.ROWS
+    ) -> AsyncIterator[SqlRowsBatchDTO]:
+        """Same as `stream`, fetching each batch in the query executor
+        threads."""
+        batches = self.stream(query, result_format)
+        try:
+            while True:
+                batch = await self.__run_in_executor(next, batches, None)
+                if batch is None:
+                    return
+                yield batch
+        finally:
+            try:
+                await self.__run_in_executor(batches.close)
+            except ValueError:
+                # Still fetching in its thread, e.g. after a cancellation. It
+                # releases its connection once garbage collected.
+                pass
 
-            return SqlResultDTO(
-                columns=columns,
-                rows=row_lists,
+    # Private:
+    def __execute(self, query: str, result_format: ResultFormat) -> SqlResultDTO:
+        rows = []
+        columnar_rows = None
+        for columns, batch_rows, stats in self.__fetch_batches(query):
+            if result_format is ResultFormat.COLUMNAR:
+                columnar_rows = columnar_rows or ColumnarRowsBuilder(columns)
+                columnar_rows.extend(batch_rows)
+            else:
+                # Lists for compatibility with SqlResultDTO
+                rows.extend(list(row) for row in batch_rows)
+        return SqlResultDTO(
+            columns=columns,
+            rows=rows,
+            query=query,
+            execution_time_ms=stats["execution_time_ms"],
+            wait_time_ms=stats["wait_time_ms"],
+            is_truncated=stats["is_truncated"],
+            columnar_rows=columnar_rows.build() if columnar_rows else None,
+        )
+
+    def __stream(
+        self, query: str, result_format: ResultFormat
+    ) -> Iterator[SqlRowsBatchDTO]:
+        for columns, rows, stats in self.__fetch_batches(query):
+            columnar_rows = None
+            if result_format is ResultFormat.COLUMNAR:
+                columnar_rows = ColumnarRowsBuilder(columns)
+                columnar_rows.extend(rows)
+                rows = []
+            yield SqlRowsBatchDTO(
                 query=query,
-                execution_time_ms=execution_time_ms,
+                columns=columns,
+                rows=[list(row) for row in rows],
+                columnar_rows=columnar_rows.build() if columnar_rows else None,
+                **stats,
             )
 
+    def __fetch_batches(
+        self, query: str
+    ) -> Iterator[tuple[list[str], list[tuple], dict[str, Any]]]:
+        """Columns, rows and stats (batch index, last and truncation flags,
+        timings) of each batch, as fetched from the cursor."""
+        connection = None
+        cursor = None
+        wait_start_time = perf_counter()
+
+        try:
+            connection = self.__get_pooled_connection()
+            start_time = perf_counter()
+            wait_time_ms = (start_time - wait_start_time) * 1000
+            cursor = self.__create_cursor(connection)
+            cursor.execute(query)
+            execution_time_ms = (perf_counter() - start_time) * 1000
         except Exception as e:
+            self.__release(connection, cursor)
             logger.error(f"Error executing query: {str(e)}")
             raise SqlExecutionError(f"Error executing query: {str(e)}")
+
+        try:
+            n_rows = 0
+            batch_index = 0
+            is_last = False
+            while not is_last:
+                start_time = perf_counter()
+                size = self.__fetch_batch_size
+                if (
+                    self.__max_rows is not None
+                    and self.__max_rows - n_rows <= self.__fetch_batch_size
+                ):
+                    # The last batch, with one row beyond the cap that tells
+                    # whether rows are left out
+                    size = self.__max_rows - n_rows + 1
+                try:
+                    rows = cursor.fetchmany(size)
+                    # Named cursors only describe their columns once fetched
+                    columns = (
+                        [desc[0] for desc in cursor.description]
+                        if cursor.description
+                        else []
+                    )
+                except Exception as e:
+                    logger.error(f"Error fetching query results: {str(e)}")
+                    raise SqlExecutionError(f"Error executing query: {str(e)}")
+                execution_time_ms += (perf_counter() - start_time) * 1000
+                is_truncated = (
+                    self.__max_rows is not None and n_rows + len(rows) > self.__max_rows
+                )
+                is_last = is_truncated or len(rows) < size
+                if is_truncated:
+                    rows = rows[: self.__max_rows - n_rows]
+                    logger.warning(
+                        f"Query results truncated to {self.__max_rows} rows: {query}"
+                    )
+                n_rows += len(rows)
+                yield columns, rows, {
+                    "batch_index": batch_index,
+                    "is_last": is_last,
+                    "is_truncated": is_truncated,
+                    "execution_time_ms": execution_time_ms,
+                    "wait_time_ms": wait_time_ms,
+                }
+                batch_index += 1
         finally:
+            self.__release(connection, cursor)
+
+    def __create_cursor(self, connection):
+        if not self.__use_server_side_cursor:
+            return connection.cursor()
+        # Named cursors live in the transaction that `reset` rolls back
+        return connection.cursor(name=f"aibi_{uuid4().hex}")
+
+    def __release(self, connection, cursor):
+        try:
             if cursor:
                 cursor.close()
+        finally:
             if connection:
                 # Return connection to the pool instead of closing
-                connection.reset()
-                self.__connection_pool.putconn(connection)
+                self.__put_pooled_connection(connection)
+
+    def __get_data_version(self) -> str:
+        """Data version token, read again once it is older than
+        `DATA_VERSION_CHECK_INTERVAL_S`."""
+        with self.__data_version_lock:
+            if (
+                monotonic() - self.__data_version_checked_at
+                < DATA_VERSION_CHECK_INTERVAL_S
+            ):
+                return self.__data_version
+            self.__data_version_checked_at = monotonic()
+            data_version = self.__read_data_version()
+            if data_version != self.__data_version:
+                if self.__data_version is not None:
+                    logger.info(
+                        f"Demo database data version changed from {self.__data_version} to {data_version}. Clearing SQL result cache."
+                    )
+                    self.__result_cache.clear()
+                self.__data_version = data_version
+            return data_version
+
+    def __read_data_version(self) -> str:
+        connection = None
+        cursor = None
+        try:
+            connection = self.__get_pooled_connection()
+            cursor = connection.cursor()
+            cursor.execute(DATA_VERSION_QUERY)
+            row = cursor.fetchone()
+            return str(row[0]) if row else ""
+        except Exception as e:
+            # Older databases have no version table: their results are cached
+            # until they expire
+            logger.warning(f"Failed to read demo database data version: {str(e)}")
+            return self.__data_version or ""
+        finally:
+            if cursor:
+                cursor.close()
+            if connection:
+                self.__put_pooled_connection(connection)
+
+    async def __run_in_executor(self, function, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.__executor, partial(function, *args))
 
-    # Private:
     def __create_connection_pool(self):
         """Create a connection pool to the database"""
         try:
@@ -137,16 +418,28 @@ class AibiQueryExecutor(metaclass=DynamicSingleton):
             raise SqlExecutionError(f"Error creating connection pool: {str(e)}")
 
     def __get_pooled_connection(self):
-        """Get a connection from the pool"""
+        """Get a connection from the pool, once one is free"""
+        if not self.__connection_slots.acquire(timeout=self.__connection_timeout):
+            raise SqlExecutionError(
+                f"No free connection in the pool after {self.__connection_timeout} seconds"
+            )
         try:
             connection = self.__connection_pool.getconn()
             return connection
         except Exception as e:
+            self.__connection_slots.release()
             logger.error(f"Error getting connection from pool: {str(e)}")
             # Attempt to recreate the pool if it's unavailable
             self.__connection_pool = self.__create_connection_pool()
             raise SqlExecutionError(f"Error getting connection from pool: {str(e)}")
 
+    def __put_pooled_connection(self, connection):
+        try:
+            connection.reset()
+            self.__connection_pool.putconn(connection)
+        finally:
+            self.__connection_slots.release()
+
     def __get_connection(self):
         """Get a direct connection to the database (fallback method)"""
         try:
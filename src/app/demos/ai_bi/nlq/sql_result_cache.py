@@ -0,0 +1,99 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+from src.app.demos.ai_bi.nlq.dtos import SqlResultDTO
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_SIZE_BYTES = 64 * 1024 * 1024
+DEFAULT_TTL_S = 24 * 60 * 60
+
+
+class SqlResultCache:
+    """In-process LRU of SQL results, bounded by the size of their JSON
+    serialization and expiring after `ttl_s` seconds.
+
+    Results are copied in and out, so that callers can annotate them (e.g.
+    with column units) without altering the cached ones. Results larger than
+    the whole budget are not cached."""
+
+    @property
+    def stats(self) -> dict[str, Any]:
+        with self.__lock:
+            n_lookups = self.__n_hits + self.__n_misses
+            return {
+                "n_entries": len(self.__entries),
+                "size_bytes": self.__size_bytes,
+                "n_hits": self.__n_hits,
+                "n_misses": self.__n_misses,
+                "n_evictions": self.__n_evictions,
+                "n_invalidations": self.__n_invalidations,
+                "hit_rate": self.__n_hits / n_lookups if n_lookups else 0.0,
+            }
+
+    # Public:
+    def __init__(
+        self,
+        max_size_bytes: int = DEFAULT_MAX_SIZE_BYTES,
+        ttl_s: Optional[float] = DEFAULT_TTL_S,
+    ):
+        self.__max_size_bytes = max_size_bytes
+        self.__ttl_s = ttl_s
+        # Key to result, size in bytes and creation time
+        self.__entries: OrderedDict[
+            str, tuple[SqlResultDTO, int, float]
+        ] = OrderedDict()
+        self.__size_bytes = 0
+        self.__lock = threading.Lock()
+        self.__n_hits = 0
+        self.__n_misses = 0
+        self.__n_evictions = 0
+        self.__n_invalidations = 0
+
+    def get(self, key: str) -> Optional[SqlResultDTO]:
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is not None and self.__is_expired(entry[2]):
+                self.__pop(key)
+                entry = None
+            if entry is None:
+                self.__n_misses += 1
+                return None
+            self.__entries.move_to_end(key)
+            self.__n_hits += 1
+        return entry[0].model_copy(deep=True)
+
+    def set(self, key: str, result: SqlResultDTO):
+        result = result.model_copy(deep=True)
+        size_bytes = len(result.model_dump_json().encode("utf-8"))
+        if size_bytes > self.__max_size_bytes:
+            logger.info(f"SQL result of {size_bytes} bytes too large to be cached.")
+            return
+        with self.__lock:
+            if key in self.__entries:
+                self.__pop(key)
+            self.__entries[key] = (result, size_bytes, time.monotonic())
+            self.__size_bytes += size_bytes
+            while self.__size_bytes > self.__max_size_bytes:
+                self.__pop(next(iter(self.__entries)))
+                self.__n_evictions += 1
+
+    def clear(self):
+        """Drops every result, e.g. once the data they were read from changed."""
+        with self.__lock:
+            self.__entries.clear()
+            self.__size_bytes = 0
+            self.__n_invalidations += 1
+
+    # Private:
+    def __is_expired(self, created_at: float) -> bool:
+        return (
+            self.__ttl_s is not None and time.monotonic() - created_at >= self.__ttl_s
+        )
+
+    def __pop(self, key: str):
+        _, size_bytes, _ = self.__entries.pop(key)
+        self.__size_bytes -= size_bytes
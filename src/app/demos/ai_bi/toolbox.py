@@ -1,4 +1,12 @@
-from src.app.demos.ai_bi.nlq.enums import ChartType
+from typing import Any, Optional
+
+from src.app.demos.ai_bi.nlq.dtos import (
+    NlqResultDTO,
+    NlqStreamStartDTO,
+    SqlRowsBatchDTO,
+)
+from src.app.demos.ai_bi.nlq.enums import ChartType, NlqStreamEventType
+from src.utils.json_toolbox import make_serializable
 
 
 def typify_chart_type(s: str) -> ChartType:
@@ -7,3 +15,25 @@ def typify_chart_type(s: str) -> ChartType:
         return ChartType[s]
     else:
         raise ValueError(f"Invalid chart type: {s}")
+
+
+def create_nlq_stream_message(
+    event: NlqStreamStartDTO | SqlRowsBatchDTO | NlqResultDTO | Exception,
+    title: Optional[str] = None,
+) -> dict[str, Any]:
+    """Serializable message of an `AibiNlqAgent.astream` event, or of the
+    error that ended it. `title`, if any, replaces the generated one."""
+    if isinstance(event, Exception):
+        return {"type": NlqStreamEventType.ERROR.value, "data": {"error": str(event)}}
+    if title and isinstance(event, (NlqStreamStartDTO, NlqResultDTO)):
+        event.title = title
+    event_type = (
+        NlqStreamEventType.START
+        if isinstance(event, NlqStreamStartDTO)
+        else (
+            NlqStreamEventType.ROWS
+            if isinstance(event, SqlRowsBatchDTO)
+            else NlqStreamEventType.RESULT
+        )
+    )
+    return {"type": event_type.value, "data": make_serializable(event)}
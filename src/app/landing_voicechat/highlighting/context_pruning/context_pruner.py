@@ -0,0 +1,79 @@
+import logging
+from typing import Optional
+
+from src.app.landing_voicechat.highlighting.section_indexing.section_index import (
+    SectionIndex,
+    compute_terms,
+)
+from src.utils.metaclasses import DynamicSingleton
+from src.wrappers.llm.llm_engines.abstract_llm_engine import CHAR_2_TOKENS_FACTOR
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_PARAGRAPHS = 6
+DEFAULT_MAX_TOKENS = 300
+PARAGRAPHS_SEPARATOR = "\n\n"
+
+
+class ContextPruner(metaclass=DynamicSingleton):
+    """Keeps only the section paragraphs most relevant to a question and answer."""
+
+    # Public:
+    def __init__(
+        self,
+        max_paragraphs: Optional[int] = DEFAULT_MAX_PARAGRAPHS,
+        max_tokens: Optional[int] = DEFAULT_MAX_TOKENS,
+    ):
+        self.__max_paragraphs = max_paragraphs
+        self.__max_tokens = max_tokens
+
+    def compute(self, question: str, answer: str, section_index: SectionIndex) -> str:
+        content = section_index.content
+        paragraph_spans = section_index.paragraph_spans
+        if self.__estimate_tokens(len(content)) <= self.__max_tokens_or_inf:
+            return content
+        scores = section_index.compute_paragraph_scores(
+            compute_terms(question) + compute_terms(answer)
+        )
+        if not any(scores):
+            logger.debug("No paragraph matched the question nor the answer.")
+            return content
+        selected = self.__select_paragraphs(paragraph_spans, scores)
+        return PARAGRAPHS_SEPARATOR.join(
+            content[start:end].strip() for start, end in selected
+        )
+
+    # Private:
+    @property
+    def __max_tokens_or_inf(self) -> float:
+        return self.__max_tokens if self.__max_tokens is not None else float("inf")
+
+    def __select_paragraphs(
+        self, paragraph_spans: list[tuple[int, int]], scores: list[float]
+    ) -> list[tuple[int, int]]:
+        ranking = sorted(
+            (i for i, score in enumerate(scores) if score > 0),
+            key=lambda i: scores[i],
+            reverse=True,
+        )
+        selected: list[int] = []
+        n_tokens = 0
+        for i in ranking:
+            if self.__max_paragraphs is not None and (
+                len(selected) >= self.__max_paragraphs
+            ):
+                break
+            start, end = paragraph_spans[i]
+            paragraph_tokens = self.__estimate_tokens(
+                len(PARAGRAPHS_SEPARATOR) + end - start
+            )
+            if selected and n_tokens + paragraph_tokens > self.__max_tokens_or_inf:
+                continue
+            selected.append(i)
+            n_tokens += paragraph_tokens
+        # Keep the original reading order.
+        return [paragraph_spans[i] for i in sorted(selected)]
+
+    @staticmethod
+    def __estimate_tokens(n_chars: int) -> int:
+        return int(n_chars * CHAR_2_TOKENS_FACTOR)
@@ -4,7 +4,15 @@ from src.app.landing.enums import LanguageCode, SectionName
 from src.utils.typification.base_dto import BaseDTO
 
 
+class HighlightedSpanDTO(BaseDTO):
+    text: str
+    start: int
+    end: int
+    distance: int = 0
+
+
 class HighlightedTextDTO(BaseDTO):
     texts: list[str]
+    spans: Optional[list[HighlightedSpanDTO]] = None
     section: Optional[SectionName] = None
     language: Optional[LanguageCode] = None
@@ -8,3 +8,9 @@ class InvalidLLMResponseFormatError(Exception):
     def __init__(self, msg: str = "Failed to typify LLM response into expected format"):
         self.msg = msg
         super().__init__(msg)
+
+
+class UnalignedHighlightsError(Exception):
+    def __init__(self, msg: str = "Highlights not found in the section"):
+        self.msg = msg
+        super().__init__(msg)
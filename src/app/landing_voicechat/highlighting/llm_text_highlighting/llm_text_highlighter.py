@@ -2,12 +2,28 @@ import json
 import logging
 import os
 from pathlib import Path
-from random import shuffle
 import re
+from functools import partial
+from time import perf_counter
 from typing import Any, Callable, Optional
 
+from langchain_core.utils.json import parse_json_markdown
 from src.app.landing.enums import SectionName
-from src.app.landing_voicechat.highlighting.dtos import HighlightedTextDTO
+from src.app.landing_voicechat.highlighting.context_pruning.context_pruner import (
+    DEFAULT_MAX_PARAGRAPHS,
+    DEFAULT_MAX_TOKENS,
+    ContextPruner,
+)
+from src.app.landing_voicechat.highlighting.dtos import (
+    HighlightedSpanDTO,
+    HighlightedTextDTO,
+)
+from src.app.landing_voicechat.highlighting.section_indexing.section_index import (
+    SectionIndex,
+)
+from src.app.landing_voicechat.highlighting.span_alignment.span_aligner import (
+    SpanAligner,
+)
 from src.config.vars_grabber import VariablesGrabber
 from src.utils.dict_toolbox import (
     remove_other_keys_from_dict_list,
@@ -15,17 +31,26 @@ from src.utils.dict_toolbox import (
 )
 from src.utils.list_toolbox import flatten_list
 from src.utils.metaclasses import DynamicSingleton
-from src.wrappers.langchain.llms.bedrock import BedrockLLM
+from src.wrappers.llm.pipelines.bedrock_text_generator import BedrockTextGenerator
+from src.wrappers.llm.pipelines.llm_pipeline import LlmPipeline
+from src.wrappers.llm.postprocessing.errors import OutputParsingError
+from src.wrappers.llm.postprocessing.tolerant_json_parser import TolerantJsonParser
+from src.wrappers.llm.response_caching.backends.abstract_cache_backend import (
+    AbstractCacheBackend,
+)
+from src.wrappers.llm.response_caching.backends.default_cache_backend import (
+    get_default_cache_backend,
+)
+from src.wrappers.llm.response_caching.response_cache import ResponseCache
+from src.wrappers.llm.llm_engines.abstract_llm_engine import CHAR_2_TOKENS_FACTOR
+from src.wrappers.llm.model_cascade import ModelCascade
+from src.wrappers.llm.prompting.static_prefix_prompt import StaticPrefixPrompt
 
 from .errors import (
     InvalidLLMResponseFormatError,
     InvalidPromptTemplateError,
+    UnalignedHighlightsError,
 )
-from langchain_core.runnables import chain
-from langchain_core.prompts.few_shot import FewShotPromptTemplate
-from langchain_core.prompts.prompt import PromptTemplate
-from langchain_core.output_parsers import JsonOutputParser
-from langchain_core.exceptions import OutputParserException
 from src.utils.json_toolbox import load_jsons_in_directory, make_serializable
 
 
@@ -52,17 +77,38 @@ DEFAULT_JSON_SCHEMA = json.loads(
 
 DEFAULT_REGION = VariablesGrabber().get("AWS_REGION") or "us-east-1"
 
+# About 3x the longest example results
+DEFAULT_MAX_OUTPUT_TOKENS = 400
+# Models tend to carry on with a new few-shot example after their answer
+DEFAULT_STOP_SEQUENCES = ["\nEXAMPLE ", "\nQUESTION:"]
+
+RESPONSE_CACHE_NAMESPACE = "highlighting"
+DEFAULT_RESPONSE_CACHE_TTL_S = 7 * 24 * 60 * 60
+DEFAULT_RESPONSE_CACHE_STALE_TTL_S = 24 * 60 * 60
 
-class LlmTextHighlighter(metaclass=DynamicSingleton):
 
+class LlmTextHighlighter(metaclass=DynamicSingleton):
     @property
     def model_id(self):
         return self.__model.model_id
 
+    @property
+    def prompt_fingerprint(self) -> str:
+        return self.__prompt.fingerprint
+
+    @property
+    def parser_stats(self) -> dict[str, int]:
+        return self.__parser.stats
+
+    @property
+    def cascade_stats(self) -> dict[str, Any]:
+        return self.__cascade.stats
+
     # Public:
     def __init__(
         self,
-        model_id: str = DEFAULT_MODEL_ID,
+        model_id: str | list[str] = DEFAULT_MODEL_ID,
+        small_model_id: Optional[str | list[str]] = None,
         model_params: Optional[dict[str, Any]] = None,
         model_read_timeout: Optional[int] = None,
         prompt_prefix: str | Path = DEFAULT_PROMPT_PREFIX_FILEPATH,
@@ -71,6 +117,13 @@ class LlmTextHighlighter(metaclass=DynamicSingleton):
         prompt_examples: list[dict] | Path = DEFAULT_EXAMPLES_FILEPATH,
         json_schema: Optional[dict[str, Any]] = DEFAULT_JSON_SCHEMA,
         region: str = DEFAULT_REGION,
+        max_output_tokens: Optional[int] = DEFAULT_MAX_OUTPUT_TOKENS,
+        stop_sequences: Optional[list[str]] = DEFAULT_STOP_SEQUENCES,
+        response_cache_backend: Optional[AbstractCacheBackend] = None,
+        response_cache_ttl_s: Optional[float] = DEFAULT_RESPONSE_CACHE_TTL_S,
+        response_cache_stale_ttl_s: float = DEFAULT_RESPONSE_CACHE_STALE_TTL_S,
+        context_max_paragraphs: Optional[int] = DEFAULT_MAX_PARAGRAPHS,
+        context_max_tokens: Optional[int] = DEFAULT_MAX_TOKENS,
     ):
         model_params = model_params or {}
         # !! Json shcema only available for APi versions 2024-08-01-preview and later. !!
@@ -78,19 +131,61 @@ class LlmTextHighlighter(metaclass=DynamicSingleton):
         #     "type": "json_schema",
         #     "json_schema": json_schema,
         # }
-        self.__create_prompt_template(
+        self.__create_prompt(
             prompt_prefix,
             prompt_suffix,
             prompt_examples_formatter,
             prompt_examples,
         )
-        self.__model = BedrockLLM(
-            model_id=model_id,
-            params=model_params,
-            region=region,
-            read_timeout=model_read_timeout,
+        # Answers are cached by model ids, so stages can share the cache
+        if response_cache_ttl_s and response_cache_backend is None:
+            response_cache_backend = get_default_cache_backend()
+        response_cache = (
+            ResponseCache(
+                response_cache_backend,
+                namespace=RESPONSE_CACHE_NAMESPACE,
+                ttl_s=response_cache_ttl_s,
+                stale_ttl_s=response_cache_stale_ttl_s,
+            )
+            if response_cache_ttl_s and response_cache_backend is not None
+            else None
+        )
+        self.__parser = TolerantJsonParser(
+            json_schema=json_schema, baseline_parse=parse_json_markdown
+        )
+        # With a small model, it is tried first and only escalated to the
+        # large one when its highlights are not all found in the section
+        self.__pipelines: list[LlmPipeline] = []
+        for stage_model_id in (
+            [small_model_id, model_id] if small_model_id else [model_id]
+        ):
+            model = BedrockTextGenerator(
+                model_id=stage_model_id,
+                params=model_params,
+                region=region,
+                read_timeout=model_read_timeout,
+                prompt_prefix=self.__prompt.prefix,
+                max_output_tokens=max_output_tokens,
+                stop=stop_sequences,
+                stop_when_json_complete=True,
+                response_cache=response_cache,
+            )
+            self.__pipelines.append(
+                LlmPipeline(
+                    render=self.__prompt.format_inputs,
+                    generator=model,
+                    parse=self.__parser.parse,
+                    transform=self.__transform_answer,
+                )
+            )
+        self.__model = self.__pipelines[-1].generator
+        self.__cascade = ModelCascade(
+            stage_names=[pipeline.generator.model_id for pipeline in self.__pipelines]
+        )
+        self.__context_pruner = ContextPruner(
+            max_paragraphs=context_max_paragraphs,
+            max_tokens=context_max_tokens,
         )
-        self.__parser = JsonOutputParser()
 
     def compute(
         self,
@@ -98,54 +193,158 @@ class LlmTextHighlighter(metaclass=DynamicSingleton):
         answer: str,
         section_content: str,
     ) -> HighlightedTextDTO:
-        results = self.__compute_results(question, answer, section_content)
-        results = self.__correct_results(results)
-        return results
+        section_index = SectionIndex(section_content)
+        context = self.__prune_context(question, answer, section_index)
+        return self.__cascade.run(
+            [
+                partial(
+                    self.__compute_results,
+                    pipeline,
+                    question,
+                    answer,
+                    context,
+                    section_index,
+                    shall_validate=i < len(self.__pipelines) - 1,
+                )
+                for i, pipeline in enumerate(self.__pipelines)
+            ]
+        )
+
+    async def acompute(
+        self,
+        question: str,
+        answer: str,
+        section_content: str,
+    ) -> HighlightedTextDTO:
+        """Same as `compute`, without blocking the event loop during the LLM
+        call."""
+        section_index = SectionIndex(section_content)
+        context = self.__prune_context(question, answer, section_index)
+        return await self.__cascade.arun(
+            [
+                partial(
+                    self.__acompute_results,
+                    pipeline,
+                    question,
+                    answer,
+                    context,
+                    section_index,
+                    shall_validate=i < len(self.__pipelines) - 1,
+                )
+                for i, pipeline in enumerate(self.__pipelines)
+            ]
+        )
 
     # Private:
+    def __prune_context(
+        self, question: str, answer: str, section_index: SectionIndex
+    ) -> str:
+        t0 = perf_counter()
+        context = self.__context_pruner.compute(question, answer, section_index)
+        n_chars = len(section_index.content)
+        logger.info(
+            f"Section context pruned from {n_chars} to {len(context)} characters "
+            f"(~{int(n_chars * CHAR_2_TOKENS_FACTOR)} to ~{int(len(context) * CHAR_2_TOKENS_FACTOR)} tokens) "
+            f"in {(perf_counter() - t0) * 1000:.3f} ms."
+        )
+        return context
+
     def __compute_results(
-        self, question: str, answer: str, section_content: str
+        self,
+        pipeline: LlmPipeline,
+        question: str,
+        answer: str,
+        section_content: str,
+        section_index: SectionIndex,
+        shall_validate: bool = False,
     ) -> HighlightedTextDTO:
-        response = self.__execute_chain(question, answer, section_content)
+        response = self.__execute_pipeline(pipeline, question, answer, section_content)
         results = self.__extract_results(response)
+        n_texts = len(set(results.texts))
+        results = self.__correct_results(results, section_index)
+        if shall_validate:
+            self.__validate_results(results, n_texts)
         return results
 
-    def __execute_chain(self, question: str, answer: str, section_content: str) -> Any:
-        chain = (
-            self.__prompt_template
-            | self.__model
-            | self.__answer_transform_step
-            | self.__parser
+    async def __acompute_results(
+        self,
+        pipeline: LlmPipeline,
+        question: str,
+        answer: str,
+        section_content: str,
+        section_index: SectionIndex,
+        shall_validate: bool = False,
+    ) -> HighlightedTextDTO:
+        response = await self.__aexecute_pipeline(
+            pipeline, question, answer, section_content
         )
+        results = self.__extract_results(response)
+        n_texts = len(set(results.texts))
+        results = self.__correct_results(results, section_index)
+        if shall_validate:
+            self.__validate_results(results, n_texts)
+        return results
+
+    def __execute_pipeline(
+        self,
+        pipeline: LlmPipeline,
+        question: str,
+        answer: str,
+        section_content: str,
+    ) -> Any:
+        inputs = self.__create_pipeline_inputs(question, answer, section_content)
+        t0 = perf_counter()
+        try:
+            response = pipeline.invoke(inputs)
+        except OutputParsingError as e:
+            logger.error(f"Failed to parse output: {type(e)}-{e}.")
+            raise e
+        self.__log_pipeline_reply(response, inputs, perf_counter() - t0)
+        return response
+
+    async def __aexecute_pipeline(
+        self,
+        pipeline: LlmPipeline,
+        question: str,
+        answer: str,
+        section_content: str,
+    ) -> Any:
+        inputs = self.__create_pipeline_inputs(question, answer, section_content)
+        t0 = perf_counter()
+        try:
+            response = await pipeline.ainvoke(inputs)
+        except OutputParsingError as e:
+            logger.error(f"Failed to parse output: {type(e)}-{e}.")
+            raise e
+        self.__log_pipeline_reply(response, inputs, perf_counter() - t0)
+        return response
+
+    def __create_pipeline_inputs(
+        self, question: str, answer: str, section_content: str
+    ) -> dict[str, str]:
         if SHALL_EXPORT_LOGS:
             try:
                 self.__export_prompt_log(question, answer, section_content)
             except Exception as e:
                 logger.warning(f"Failed to export prompt log: {type(e)}-{e}.")
-        try:
-            response = chain.invoke(
-                (
-                    {
-                        "question": question,
-                        "answer": answer,
-                        "section_content": section_content,
-                    }
-                )
-            )
-        except OutputParserException as e:
-            logger.error(f"Failed to parse output: {type(e)}-{e}.")
-            raise e
+        return {
+            "question": question,
+            "answer": answer,
+            "section_content": section_content,
+        }
+
+    def __log_pipeline_reply(
+        self, response: Any, inputs: dict[str, str], duration: float
+    ):
+        logger.info(
+            f"Highlighting pipeline with a section context of {len(inputs['section_content'])} characters "
+            f"took {duration:.2f} seconds."
+        )
         if SHALL_EXPORT_LOGS:
             try:
-                self.__export_reply_log(
-                    response,
-                    question,
-                    answer,
-                    section_content,
-                )
+                self.__export_reply_log(response, **inputs)
             except Exception as e:
                 logger.warning(f"Failed to export reply log: {type(e)}-{e}.")
-        return response
 
     def __extract_results(self, answer: Any) -> HighlightedTextDTO:
         try:
@@ -162,15 +361,40 @@ class LlmTextHighlighter(metaclass=DynamicSingleton):
             )
         return results
 
-    def __correct_results(self, results: HighlightedTextDTO) -> HighlightedTextDTO:
+    def __correct_results(
+        self, results: HighlightedTextDTO, section_index: SectionIndex
+    ) -> HighlightedTextDTO:
+        t0 = perf_counter()
+        spans: list[HighlightedSpanDTO] = []
+        for text in results.texts:
+            span = SpanAligner().compute(text, section_index)
+            if span is None:
+                logger.info(f"Discarding highlight not found in section: '{text}'.")
+                continue
+            if any(s.start == span.start and s.end == span.end for s in spans):
+                continue
+            spans.append(span)
+        logger.debug(
+            f"Aligned {len(spans)}/{len(results.texts)} highlights in {(perf_counter() - t0) * 1000:.3f} ms."
+        )
+        results.texts = [span.text for span in spans]
+        results.spans = spans
         return results
 
-    @chain
     @staticmethod
-    def __answer_transform_step(answer: str) -> str:
+    def __validate_results(results: HighlightedTextDTO, n_texts: int):
+        """Cascade acceptance check: some highlights, all found in the
+        section."""
+        if not results.spans or len(results.spans) < n_texts:
+            raise UnalignedHighlightsError(
+                f"Only {len(results.spans or [])}/{n_texts} highlights found in the section."
+            )
+
+    @staticmethod
+    def __transform_answer(answer: str) -> str:
         return answer
 
-    def __create_prompt_template(
+    def __create_prompt(
         self,
         prompt_prefix: str | Path,
         prompt_suffix: str | Path,
@@ -193,28 +417,12 @@ class LlmTextHighlighter(metaclass=DynamicSingleton):
             else prompt_suffix
         )
         examples = self.__load_prompt_examples(prompt_examples)
-        example_prompt = PromptTemplate(
-            template=prompt_examples_formatter,
-            input_variables=[
-                "example_id",
-                "type",
-                "question",
-                "answer",
-                "section_content",
-                "results",
-            ],
-        )
         try:
-            self.__prompt_template = FewShotPromptTemplate(
+            self.__prompt = StaticPrefixPrompt(
                 prefix=prompt_prefix,
-                examples=examples,
-                example_prompt=example_prompt,
-                input_variables=[
-                    "question",
-                    "answer",
-                    "section_content",
-                ],
                 suffix=prompt_suffix,
+                examples=examples,
+                example_formatter=prompt_examples_formatter,
             )
         except Exception as e:
             raise InvalidPromptTemplateError(
@@ -236,16 +444,10 @@ class LlmTextHighlighter(metaclass=DynamicSingleton):
             raise InvalidPromptTemplateError(
                 "Invalid examples format. Expected a list of dictionaries."
             )
-        shuffle(examples)
         examples = [d | {"example_id": i + 1} for i, d in enumerate(examples)]
         examples = [d | {"type": d.get("type", "CORRECT")} for d in examples]
         examples = [
-            {
-                k: json.dumps(v, ensure_ascii=False)
-                .replace("{", "{{")
-                .replace("}", "}}")
-                for k, v in example.items()
-            }
+            {k: json.dumps(v, ensure_ascii=False) for k, v in example.items()}
             for example in examples
         ]
         return examples
@@ -256,7 +458,7 @@ class LlmTextHighlighter(metaclass=DynamicSingleton):
         answer: str,
         section_content: str,
     ):
-        prompt = self.__prompt_template.format(
+        prompt = self.__prompt.format(
             question=question,
             answer=answer,
             section_content=section_content,
@@ -0,0 +1,130 @@
+import gzip
+import json
+import logging
+from datetime import datetime
+from hashlib import blake2b
+from pathlib import Path
+from types import MappingProxyType
+from typing import Any, Mapping, Optional
+
+from src.app.landing.enums import LanguageCode, SectionName
+from src.app.landing_voicechat.highlighting.dtos import HighlightedSpanDTO
+from src.utils.metaclasses import DynamicSingleton
+from src.utils.string_toolbox import remove_punctuation
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+
+DEFAULT_PRECOMPUTED_HIGHLIGHTS_FILEPATH = Path(
+    "src/app/landing/precomputed-highlights/highlights.json.gz"
+)
+
+
+def compute_section_content_hash(section_content: str) -> str:
+    return blake2b(section_content.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def compute_highlight_key(question: str, response: str) -> str:
+    normalized = "\n".join(
+        " ".join(remove_punctuation(s.lower()).split()) for s in (question, response)
+    )
+    return blake2b(normalized.encode("utf-8"), digest_size=8).hexdigest()
+
+
+class PrecomputedHighlightsStore(metaclass=DynamicSingleton):
+    """Read-only lookup of highlights computed offline for frequent questions.
+
+    Entries are keyed by the hash of the section content they were computed
+    against, so editing a section silently invalidates its entries."""
+
+    @property
+    def n_entries(self) -> int:
+        return sum(len(highlights) for highlights in self.__sections.values())
+
+    # Public:
+    def __init__(self, filepath: Path = DEFAULT_PRECOMPUTED_HIGHLIGHTS_FILEPATH):
+        self.__sections: Mapping[
+            str, Mapping[str, tuple[tuple[int, int], ...]]
+        ] = MappingProxyType({})
+        if not filepath.exists():
+            logger.info(f"No precomputed highlights found at {filepath}.")
+            return
+        try:
+            self.__sections = self.__load(filepath)
+        except Exception as e:
+            logger.warning(
+                f"Failed to load precomputed highlights from {filepath}: {type(e)}-{e}."
+            )
+            return
+        logger.info(
+            f"Loaded {self.n_entries} precomputed highlights for {len(self.__sections)} sections."
+        )
+
+    def get(
+        self, section_content: str, question: str, response: str
+    ) -> Optional[list[HighlightedSpanDTO]]:
+        highlights = self.__sections.get(compute_section_content_hash(section_content))
+        if not highlights:
+            return None
+        spans = highlights.get(compute_highlight_key(question, response))
+        if spans is None:
+            return None
+        return [
+            HighlightedSpanDTO(text=section_content[start:end], start=start, end=end)
+            for start, end in spans
+        ]
+
+    @classmethod
+    def export(
+        cls,
+        filepath: Path,
+        sections: list[dict[str, Any]],
+        model_id: Optional[str] = None,
+    ):
+        """Writes an artifact from a list of sections shaped as
+        `{"section": SectionName, "language": LanguageCode, "content": str,
+        "highlights": {highlight_key: [HighlightedSpanDTO, ...]}}`."""
+        data = {
+            "format_version": FORMAT_VERSION,
+            "created_at": datetime.now().isoformat(),
+            "model_id": model_id,
+            "sections": {
+                compute_section_content_hash(section["content"]): {
+                    "section": SectionName(section["section"]).value,
+                    "language": LanguageCode(section["language"]).value,
+                    "highlights": {
+                        key: [[span.start, span.end] for span in spans]
+                        for key, spans in section["highlights"].items()
+                    },
+                }
+                for section in sections
+            },
+        }
+        filepath.parent.mkdir(parents=True, exist_ok=True)
+        tmp_filepath = filepath.with_suffix(f"{filepath.suffix}.tmp")
+        with gzip.open(tmp_filepath, "wt", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+        tmp_filepath.replace(filepath)
+
+    # Private:
+    def __load(
+        self, filepath: Path
+    ) -> Mapping[str, Mapping[str, tuple[tuple[int, int], ...]]]:
+        with gzip.open(filepath, "rt", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("format_version") != FORMAT_VERSION:
+            raise ValueError(
+                f"Unsupported format version {data.get('format_version')}. Expected {FORMAT_VERSION}."
+            )
+        return MappingProxyType(
+            {
+                content_hash: MappingProxyType(
+                    {
+                        key: tuple((start, end) for start, end in spans)
+                        for key, spans in section["highlights"].items()
+                    }
+                )
+                for content_hash, section in data["sections"].items()
+            }
+        )
@@ -0,0 +1,113 @@
+import re
+import unicodedata
+
+from src.utils.bm25_toolbox import Bm25Index
+from src.utils.metaclasses import DynamicSingleton
+from src.utils.ngram_toolbox import compute_char_ngrams_positions
+
+DEFAULT_NGRAM_SIZE = 3
+PARAGRAPH_SEPARATOR_PATTERN = re.compile(r"\n\s*\n")
+WORD_PATTERN = re.compile(r"\w+")
+
+EQUIVALENT_CHARACTERS = {
+    "‘": "'",
+    "’": "'",
+    "“": '"',
+    "”": '"',
+    "–": "-",
+    "—": "-",
+    " ": " ",
+}
+
+
+def normalize_char(c: str) -> str:
+    c = EQUIVALENT_CHARACTERS.get(c, c)
+    if c.isspace():
+        return " "
+    base = unicodedata.normalize("NFD", c)[0].lower()
+    return base if len(base) == 1 else c
+
+
+def normalize_text(text: str) -> tuple[str, list[int]]:
+    """Lowercases, strips accents and collapses whitespace, keeping a map from
+    every normalized character to its offset in the original text."""
+    chars: list[str] = []
+    offsets: list[int] = []
+    for i, c in enumerate(text):
+        c = normalize_char(c)
+        if c == " " and (not chars or chars[-1] == " "):
+            continue
+        chars.append(c)
+        offsets.append(i)
+    if chars and chars[-1] == " ":
+        chars.pop()
+        offsets.pop()
+    return "".join(chars), offsets
+
+
+def compute_terms(text: str) -> list[str]:
+    normalized_text, _ = normalize_text(text)
+    return [term for term in WORD_PATTERN.findall(normalized_text) if len(term) > 1]
+
+
+class SectionIndex(metaclass=DynamicSingleton):
+    """Precomputed lookup structures over a section's content.
+
+    Instances are cached per content, so the index is built once per section
+    and language and then shared by every highlighting request."""
+
+    @property
+    def content(self) -> str:
+        return self.__content
+
+    @property
+    def normalized_content(self) -> str:
+        return self.__normalized_content
+
+    @property
+    def ngram_size(self) -> int:
+        return self.__ngram_size
+
+    @property
+    def paragraph_spans(self) -> list[tuple[int, int]]:
+        return self.__paragraph_spans
+
+    # Public:
+    def __init__(self, content: str, ngram_size: int = DEFAULT_NGRAM_SIZE):
+        self.__content = content
+        self.__ngram_size = ngram_size
+        self.__normalized_content, self.__offsets = normalize_text(content)
+        self.__ngrams_positions = compute_char_ngrams_positions(
+            self.__normalized_content, ngram_size
+        )
+        self.__index_paragraphs()
+
+    def get_ngram_positions(self, ngram: str) -> list[int]:
+        return self.__ngrams_positions.get(ngram, [])
+
+    def compute_paragraph_scores(self, terms: list[str]) -> list[float]:
+        """BM25 score of every paragraph against the given query terms."""
+        return self.__paragraphs_bm25_index.compute_scores(terms)
+
+    def to_original_span(self, start: int, end: int) -> tuple[int, int]:
+        """Maps a [start, end) span of the normalized content to the original content."""
+        original_start = self.__offsets[start]
+        original_end = self.__offsets[end - 1] + 1
+        return original_start, original_end
+
+    # Private:
+    def __index_paragraphs(self):
+        self.__paragraph_spans = []
+        start = 0
+        for match in PARAGRAPH_SEPARATOR_PATTERN.finditer(self.__content):
+            if self.__content[start : match.start()].strip():
+                self.__paragraph_spans.append((start, match.start()))
+            start = match.end()
+        if self.__content[start:].strip():
+            self.__paragraph_spans.append((start, len(self.__content)))
+        self.__paragraphs_bm25_index = Bm25Index(
+            [
+                compute_terms(self.__content[start:end])
+                for start, end in self.__paragraph_spans
+            ]
+        )
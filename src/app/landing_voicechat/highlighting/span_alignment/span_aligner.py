@@ -0,0 +1,150 @@
+import logging
+from collections import Counter
+from typing import Optional
+
+from src.app.landing_voicechat.highlighting.dtos import HighlightedSpanDTO
+from src.app.landing_voicechat.highlighting.section_indexing.section_index import (
+    SectionIndex,
+    normalize_text,
+)
+from src.utils.metaclasses import DynamicSingleton
+from src.utils.ngram_toolbox import (
+    compute_banded_substring_alignment,
+    compute_char_ngrams,
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_DISTANCE_RATIO = 0.2
+DEFAULT_MIN_VOTES_RATIO = 0.25
+DEFAULT_MAX_CANDIDATES = 3
+INITIAL_BAND = 2
+CANDIDATE_VOTES_RATIO = 0.5
+
+
+class SpanAligner(metaclass=DynamicSingleton):
+    """Snaps (possibly paraphrased) highlight texts to exact spans of a section."""
+
+    # Public:
+    def __init__(
+        self,
+        max_distance_ratio: float = DEFAULT_MAX_DISTANCE_RATIO,
+        min_votes_ratio: float = DEFAULT_MIN_VOTES_RATIO,
+        max_candidates: int = DEFAULT_MAX_CANDIDATES,
+    ):
+        self.__max_distance_ratio = max_distance_ratio
+        self.__min_votes_ratio = min_votes_ratio
+        self.__max_candidates = max_candidates
+
+    def compute(
+        self, text: str, section_index: SectionIndex
+    ) -> Optional[HighlightedSpanDTO]:
+        query, _ = normalize_text(text)
+        if not query:
+            return None
+        span = self.__find_exact_span(query, section_index)
+        if span is None:
+            span = self.__find_approximate_span(query, section_index)
+        if span is None:
+            return None
+        distance, start, end = span
+        start, end = section_index.to_original_span(start, end)
+        return HighlightedSpanDTO(
+            text=section_index.content[start:end],
+            start=start,
+            end=end,
+            distance=distance,
+        )
+
+    # Private:
+    def __find_exact_span(
+        self, query: str, section_index: SectionIndex
+    ) -> Optional[tuple[int, int, int]]:
+        start = section_index.normalized_content.find(query)
+        if start < 0:
+            return None
+        return 0, start, start + len(query)
+
+    def __find_approximate_span(
+        self, query: str, section_index: SectionIndex
+    ) -> Optional[tuple[int, int, int]]:
+        ngram_size = section_index.ngram_size
+        if len(query) < ngram_size:
+            return None
+        max_distance = max(1, int(len(query) * self.__max_distance_ratio))
+        best = None
+        for diagonal in self.__compute_candidate_diagonals(
+            query, section_index, max_distance
+        ):
+            # Weaker candidates only matter if they beat the current best.
+            max_candidate_distance = max_distance if best is None else best[0] - 1
+            if max_candidate_distance < 1:
+                break
+            alignment = self.__align_around_diagonal(
+                query,
+                section_index.normalized_content,
+                diagonal,
+                max_candidate_distance,
+            )
+            if alignment is not None:
+                best = alignment
+        if best is None:
+            return None
+        distance, start, end = best
+        content = section_index.normalized_content
+        while start < end and content[start] == " ":
+            start += 1
+        while end > start and content[end - 1] == " ":
+            end -= 1
+        if start >= end:
+            return None
+        return distance, start, end
+
+    def __align_around_diagonal(
+        self, query: str, content: str, diagonal: int, max_distance: int
+    ) -> Optional[tuple[int, int, int]]:
+        """Runs the banded alignment with a doubling band, so close matches only
+        pay for a narrow band and the full band is reserved for heavy edits."""
+        band = min(INITIAL_BAND, max_distance)
+        while band > 0:
+            alignment = compute_banded_substring_alignment(
+                query, content, diagonal, band
+            )
+            if alignment is not None and alignment[0] <= band:
+                return alignment
+            if band >= max_distance:
+                break
+            band = min(2 * band, max_distance)
+        return None
+
+    def __compute_candidate_diagonals(
+        self, query: str, section_index: SectionIndex, band: int
+    ) -> list[int]:
+        """Votes for the section offset at which the query would start, one vote
+        per shared n-gram, and keeps the best separated diagonals."""
+        ngrams = compute_char_ngrams(query, section_index.ngram_size)
+        votes: Counter[int] = Counter()
+        for i, ngram in enumerate(ngrams):
+            for position in section_index.get_ngram_positions(ngram):
+                votes[position - i] += 1
+        min_votes = max(1, int(len(ngrams) * self.__min_votes_ratio))
+        candidates: list[tuple[int, int]] = []
+        for diagonal, _ in votes.most_common(4 * self.__max_candidates):
+            if len(candidates) >= self.__max_candidates:
+                break
+            if any(abs(diagonal - c) <= band for c, _ in candidates):
+                continue
+            n_votes = sum(
+                votes.get(d, 0) for d in range(diagonal - band, diagonal + band + 1)
+            )
+            if n_votes >= min_votes:
+                candidates.append((diagonal, n_votes))
+        if not candidates:
+            return []
+        candidates.sort(key=lambda candidate: candidate[1], reverse=True)
+        max_votes = candidates[0][1]
+        return [
+            diagonal
+            for diagonal, n_votes in candidates
+            if n_votes >= max_votes * CANDIDATE_VOTES_RATIO
+        ]
@@ -1,14 +1,22 @@
+import logging
 from pathlib import Path
+from typing import Optional
 
 from src.app.landing.enums import LanguageCode, SectionName
 from src.app.landing_voicechat.highlighting.dtos import HighlightedTextDTO
 from src.app.landing_voicechat.highlighting.llm_text_highlighting.llm_text_highlighter import (
     LlmTextHighlighter,
 )
+from src.app.landing_voicechat.highlighting.precomputed_highlights.precomputed_highlights_store import (
+    DEFAULT_PRECOMPUTED_HIGHLIGHTS_FILEPATH,
+    PrecomputedHighlightsStore,
+)
 from src.config.vars_grabber import VariablesGrabber
 from src.utils.metaclasses import DynamicSingleton
 from src.utils.string_toolbox import convert_snake_to_kebab_case
 
+logger = logging.getLogger(__name__)
+
 DEFAULT_BEDROCK_MODEL_ID = (
     VariablesGrabber().get("HIGHLIGHTING_BEDROCK_INFERENCE_PROFILE_ID")
     or "us.meta.llama3-2-1b-instruct-v1:0"
@@ -26,10 +34,21 @@ class TextHighlighter(metaclass=DynamicSingleton):
     def __init__(
         self,
         model_id: str = DEFAULT_BEDROCK_MODEL_ID,
+        small_model_id: Optional[str] = None,
         sections_content_directory: Path = DEFAULT_SECTIONS_CONTENT_DIRECTORY,
+        precomputed_highlights_filepath: Optional[
+            Path
+        ] = DEFAULT_PRECOMPUTED_HIGHLIGHTS_FILEPATH,
     ):
-        self.__llm_text_highlighter = LlmTextHighlighter(model_id=model_id)
+        self.__llm_text_highlighter = LlmTextHighlighter(
+            model_id=model_id, small_model_id=small_model_id
+        )
         self.__load_section_paths(sections_content_directory)
+        self.__precomputed_highlights_store = (
+            PrecomputedHighlightsStore(precomputed_highlights_filepath)
+            if precomputed_highlights_filepath
+            else None
+        )
 
     def compute(
         self,
@@ -38,7 +57,7 @@ class TextHighlighter(metaclass=DynamicSingleton):
         response: str,
         language: LanguageCode,
     ) -> HighlightedTextDTO:
-        section_content = self.__get_section_content(section_name, language)
+        section_content = self.get_section_content(section_name, language)
         highlighted_text = self.__compute_text_to_highlight(
             question, response, section_content
         )
@@ -46,6 +65,28 @@ class TextHighlighter(metaclass=DynamicSingleton):
         highlighted_text.language = language
         return highlighted_text
 
+    async def acompute(
+        self,
+        section_name: SectionName,
+        question: str,
+        response: str,
+        language: LanguageCode,
+    ) -> HighlightedTextDTO:
+        section_content = self.get_section_content(section_name, language)
+        highlighted_text = self.__get_precomputed_highlights(
+            question, response, section_content
+        ) or await self.__llm_text_highlighter.acompute(
+            question, response, section_content
+        )
+        highlighted_text.section = section_name
+        highlighted_text.language = language
+        return highlighted_text
+
+    def get_section_content(
+        self, section_name: SectionName, language: LanguageCode
+    ) -> str:
+        return self.__section_paths[language][section_name].read_text()
+
     # Private:
     def __load_section_paths(self, sections_content_directory: Path):
         def get_section_filename(
@@ -63,16 +104,28 @@ class TextHighlighter(metaclass=DynamicSingleton):
             for language in LanguageCode
         }
 
-    def __get_section_content(
-        self, section_name: SectionName, language: LanguageCode
-    ) -> str:
-        return self.__section_paths[language][section_name].read_text()
-
     def __compute_text_to_highlight(
         self,
         question: str,
         response: str,
         section_content: str,
     ) -> HighlightedTextDTO:
+        return self.__get_precomputed_highlights(
+            question, response, section_content
+        ) or self.__llm_text_highlighter.compute(question, response, section_content)
 
-        return self.__llm_text_highlighter.compute(question, response, section_content)
+    def __get_precomputed_highlights(
+        self,
+        question: str,
+        response: str,
+        section_content: str,
+    ) -> Optional[HighlightedTextDTO]:
+        if not self.__precomputed_highlights_store:
+            return None
+        spans = self.__precomputed_highlights_store.get(
+            section_content, question, response
+        )
+        if spans is None:
+            return None
+        logger.info("Precomputed highlights hit. Skipping LLM call.")
+        return HighlightedTextDTO(texts=[span.text for span in spans], spans=spans)
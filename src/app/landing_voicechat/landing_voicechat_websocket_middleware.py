@@ -129,7 +129,7 @@ class LandingVoicechatWebsocketMiddleware(ElevenLabsWebsocketMiddleware):
                 )
                 return
 
-            highlighted_text_results = self.__compute_text_to_highlight(
+            highlighted_text_results = await self.__compute_text_to_highlight(
                 section_name, question, response, language
             )
             tool_call_uuid = tool_call.get("client_tool_call", {}).get(
@@ -202,14 +202,16 @@ class LandingVoicechatWebsocketMiddleware(ElevenLabsWebsocketMiddleware):
     def __ensure_email_format(self, email: str) -> str:
         return EmailFormatter().compute(email)
 
-    def __compute_text_to_highlight(
+    async def __compute_text_to_highlight(
         self,
         section_name: SectionName,
         question: str,
         response: str,
         language: LanguageCode,
     ) -> HighlightedTextDTO:
-        return TextHighlighter().compute(section_name, question, response, language)
+        return await TextHighlighter().acompute(
+            section_name, question, response, language
+        )
 
     def __detect_animation_trigger(
         self, agent_response: str
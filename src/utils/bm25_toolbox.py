@@ -0,0 +1,71 @@
+import math
+import re
+import unicodedata
+from collections import Counter
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+WORD_PATTERN = re.compile(r"\w+")
+
+
+def tokenize(text: str, min_length: int = 2) -> list[str]:
+    """Lowercased, accent-free word tokens."""
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return [t for t in WORD_PATTERN.findall(text) if len(t) >= min_length]
+
+
+class Bm25Index:
+    """Okapi BM25 scoring over a fixed collection of tokenized documents."""
+
+    @property
+    def n_documents(self) -> int:
+        return len(self.__documents_terms)
+
+    # Public:
+    def __init__(
+        self,
+        documents_terms: list[list[str]],
+        k1: float = BM25_K1,
+        b: float = BM25_B,
+    ):
+        self.__k1 = k1
+        self.__b = b
+        self.__documents_terms = [Counter(terms) for terms in documents_terms]
+        self.__documents_lengths = [len(terms) for terms in documents_terms]
+        self.__mean_document_length = (
+            sum(self.__documents_lengths) / len(self.__documents_lengths)
+            if self.__documents_lengths
+            else 0
+        )
+        document_frequencies = Counter(
+            term for terms in self.__documents_terms for term in terms
+        )
+        n = len(self.__documents_terms)
+        self.__idfs = {
+            term: math.log(1 + (n - frequency + 0.5) / (frequency + 0.5))
+            for term, frequency in document_frequencies.items()
+        }
+
+    def compute_scores(self, terms: list[str]) -> list[float]:
+        query_terms = [t for t in set(terms) if t in self.__idfs]
+        scores = []
+        for document_terms, length in zip(
+            self.__documents_terms, self.__documents_lengths
+        ):
+            norm = self.__k1 * (
+                1 - self.__b + self.__b * length / (self.__mean_document_length or 1)
+            )
+            score = 0.0
+            for term in query_terms:
+                frequency = document_terms.get(term)
+                if frequency:
+                    score += (
+                        self.__idfs[term]
+                        * frequency
+                        * (self.__k1 + 1)
+                        / (frequency + norm)
+                    )
+            scores.append(score)
+        return scores
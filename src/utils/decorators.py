@@ -1,3 +1,4 @@
+import asyncio
 import logging
 from functools import wraps
 from time import perf_counter, sleep
@@ -31,30 +32,43 @@ def retry(
         raise_exceptions = []
 
     def wrapper(f: Callable) -> Callable:
+        def shall_retry(e: Exception, i: int) -> bool:
+            if retry_exceptions is not None:
+                for exception in retry_exceptions:
+                    if isinstance(e, exception):
+                        logger.warning(
+                            f"Failed execution of {f.__qualname__}. Attempt: {i+1}/{n_attempts}. DETAILS: <{str(e)}>"
+                        )
+                        if i + 1 < n_attempts:
+                            return True
+                        else:
+                            raise e
+            for exception in raise_exceptions:
+                if isinstance(e, exception):
+                    raise e
+            logger.warning(
+                f"Failed execution of {f.__qualname__}. Attempt: {i+1}/{n_attempts}. DETAILS: <{str(e)}>"
+            )
+            return False
+
         def retry_function(*args, **kwargs):
             for i in range(0, n_attempts):
                 try:
                     return f(*args, **kwargs)
                 except Exception as e:
-                    if retry_exceptions is not None:
-                        for exception in retry_exceptions:
-                            if isinstance(e, exception):
-                                logger.warning(
-                                    f"Failed execution of {f.__qualname__}. Attempt: {i+1}/{n_attempts}. DETAILS: <{str(e)}>"
-                                )
-                                if i + 1 < n_attempts:
-                                    sleep(wait_time)
-                                    continue
-                                else:
-                                    raise e
-                    for exception in raise_exceptions:
-                        if isinstance(e, exception):
-                            raise e
-                    logger.warning(
-                        f"Failed execution of {f.__qualname__}. Attempt: {i+1}/{n_attempts}. DETAILS: <{str(e)}>"
-                    )
+                    if shall_retry(e, i):
+                        sleep(wait_time)
+
+        async def aretry_function(*args, **kwargs):
+            # Same as `retry_function`, waiting without blocking the event loop
+            for i in range(0, n_attempts):
+                try:
+                    return await f(*args, **kwargs)
+                except Exception as e:
+                    if shall_retry(e, i):
+                        await asyncio.sleep(wait_time)
 
-        return retry_function
+        return aretry_function if asyncio.iscoroutinefunction(f) else retry_function
 
     return wrapper
 
@@ -1,9 +1,10 @@
 from decimal import Decimal
 import json
+import re
 from datetime import date, datetime
 from enum import Enum
 from pathlib import Path
-from typing import Any
+from typing import Any, Literal, Optional
 
 from pydantic import BaseModel
 
@@ -33,7 +34,7 @@ def load_jsons_in_directory(
 ) -> list[dict | list]:
     return [
         load_json(file, encoding=encoding)
-        for file in directory.iterdir()
+        for file in sorted(directory.iterdir())
         if file.suffix == ".json"
     ]
 
@@ -85,3 +86,205 @@ def is_jsonable(value: Any) -> bool:
         return True
     except Exception:
         return False
+
+
+JSON_ROOT_OPENERS = {"object": "{", "array": "[", None: "{["}
+JSON_NUMBER_PATTERN = re.compile(r"-?(0|[1-9]\d*)(\.\d+)?([eE][+-]?\d+)?")
+BARE_TOKEN_PATTERN = re.compile(r"[\w+\-.$]+")
+BARE_LITERALS = {
+    "true": "true",
+    "false": "false",
+    "null": "null",
+    "True": "true",
+    "False": "false",
+    "None": "null",
+}
+STRING_CONTROL_ESCAPES = {"\n": "\\n", "\r": "\\r", "\t": "\\t"}
+
+
+def parse_json_tolerantly(
+    text: str, root: Optional[Literal["object", "array"]] = None
+) -> tuple[Any, bool]:
+    """Parsed JSON value of `text`, and whether it had to be repaired (see
+    `repair_json`). Raises `ValueError` when it cannot be repaired."""
+    try:
+        value = json.loads(text)
+        if root is None or isinstance(value, dict if root == "object" else list):
+            return value, False
+    except json.JSONDecodeError:
+        pass
+    return json.loads(repair_json(text, root=root)), True
+
+
+def repair_json(text: str, root: Optional[Literal["object", "array"]] = None) -> str:
+    """First object or array of `text` (e.g. an LLM reply), as valid JSON text.
+
+    Single pass over the characters which skips the text around the value
+    (prose, code fences) and fixes common defects: single-quoted strings,
+    unescaped control characters and quotes, invalid escapes, unquoted keys
+    and strings, Python literals, comments, missing or trailing commas, and
+    unclosed strings, brackets and keys (e.g. a truncated generation)."""
+    starts = [i for i in map(text.find, JSON_ROOT_OPENERS[root]) if i >= 0]
+    if not starts:
+        raise ValueError("No JSON object or array found.")
+    out: list[str] = []
+    # Closing characters of the open containers, and whether each object
+    # expects a key next
+    closers: list[str] = []
+    is_expecting_key: list[bool] = []
+    is_key_pending = False
+    quote: Optional[str] = None
+    i = min(starts)
+    n = len(text)
+
+    def get_last() -> str:
+        for chunk in reversed(out):
+            if not chunk.isspace():
+                return chunk[-1]
+        return ""
+
+    def open_value():
+        nonlocal is_key_pending
+        if get_last() in ('"', "}", "]") or get_last().isalnum():
+            out.append(",")
+            if closers and closers[-1] == "}":
+                is_expecting_key[-1] = True
+        if closers and closers[-1] == "}" and is_expecting_key[-1]:
+            is_key_pending = True
+            is_expecting_key[-1] = False
+
+    def close_container():
+        nonlocal is_key_pending
+        while out and out[-1].isspace():
+            out.pop()
+        if is_key_pending:
+            out.append(": null")
+            is_key_pending = False
+        elif out and out[-1] == ":":
+            out.append(" null")
+        elif out and out[-1] == ",":
+            out.pop()
+        out.append(closers.pop())
+        is_expecting_key.pop()
+
+    while i < n:
+        c = text[i]
+        if quote is not None:
+            if c == "\\":
+                escaped = text[i + 1 : i + 2]
+                if escaped == "'":
+                    out.append("'")
+                elif escaped and escaped in '"\\/bfnrtu':
+                    out.append(c + escaped)
+                else:
+                    out.append("\\\\")
+                    i -= 1
+                i += 2
+                continue
+            if c == quote:
+                out.append('"')
+                quote = None
+            elif c == '"':
+                out.append('\\"')
+            elif c < " ":
+                out.append(STRING_CONTROL_ESCAPES.get(c) or f"\\u{ord(c):04x}")
+            else:
+                out.append(c)
+            i += 1
+            continue
+        if c in "\"'":
+            open_value()
+            quote = c
+            out.append('"')
+        elif c in "{[":
+            open_value()
+            is_key_pending = False
+            closers.append("}" if c == "{" else "]")
+            is_expecting_key.append(c == "{")
+            out.append(c)
+        elif c in "}]":
+            if c in closers:
+                while closers[-1] != c:
+                    close_container()
+                close_container()
+                if not closers:
+                    break
+        elif c == ",":
+            if get_last() not in ",{[:":
+                out.append(c)
+                if closers[-1] == "}":
+                    is_expecting_key[-1] = True
+        elif c == ":":
+            out.append(c)
+            is_key_pending = False
+        elif c.isspace():
+            out.append(c)
+        elif text.startswith("//", i):
+            i = text.find("\n", i)
+            i = n if i < 0 else i
+            continue
+        elif text.startswith("/*", i):
+            i = text.find("*/", i)
+            i = n if i < 0 else i + 2
+            continue
+        elif match := BARE_TOKEN_PATTERN.match(text, i):
+            open_value()
+            token = match.group()
+            if token in BARE_LITERALS:
+                out.append(BARE_LITERALS[token])
+            elif JSON_NUMBER_PATTERN.fullmatch(token):
+                out.append(token)
+            else:
+                out.append(json.dumps(token))
+            i = match.end()
+            continue
+        # Any other character is dropped
+        i += 1
+    if quote is not None:
+        out.append('"')
+    while closers:
+        close_container()
+    return "".join(out)
+
+
+class JsonObjectTracker:
+    """Follows a JSON text fed in chunks (e.g. streamed by an LLM) and finds
+    where its first top-level object or array ends. Text before it, such as a
+    code fence, is skipped."""
+
+    @property
+    def is_complete(self) -> bool:
+        return self.__is_complete
+
+    # Public:
+    def __init__(self):
+        self.__depth = 0
+        self.__is_in_string = False
+        self.__is_escaped = False
+        self.__is_complete = False
+
+    def feed(self, text: str) -> int | None:
+        """Index of `text` right after the end of the JSON value, if it ends in
+        this chunk."""
+        if self.__is_complete:
+            return 0
+        for i, c in enumerate(text):
+            if self.__is_in_string:
+                if self.__is_escaped:
+                    self.__is_escaped = False
+                elif c == "\\":
+                    self.__is_escaped = True
+                elif c == '"':
+                    self.__is_in_string = False
+            elif c in "{[":
+                self.__depth += 1
+            elif self.__depth == 0:
+                continue
+            elif c == '"':
+                self.__is_in_string = True
+            elif c in "}]":
+                self.__depth -= 1
+                if self.__depth == 0:
+                    self.__is_complete = True
+                    return i + 1
+        return None
@@ -0,0 +1,37 @@
+from src.utils.bm25_toolbox import tokenize
+
+STOPWORDS = {
+    "en": frozenset(
+        "a about all an and are as at be by can did do does for from give how i in "
+        "is it last list me month most my of on or per show tell than that the this "
+        "to was we what when where which who with year".split()
+    ),
+    "es": frozenset(
+        "a al ano como con cual cuales cuanto cuantos de del dame el en es esta este "
+        "la las lo los mas me mes mi muestra muestrame para por que quien se su sus "
+        "ultimo ultimos un una y".split()
+    ),
+}
+
+DEFAULT_LANGUAGE = "en"
+
+
+def detect_language(text: str, default: str = DEFAULT_LANGUAGE) -> str:
+    """Cheap English/Spanish detection by stopword counts."""
+    tokens = tokenize(text, min_length=1)
+    counts = {
+        language: sum(token in stopwords for token in tokens)
+        for language, stopwords in STOPWORDS.items()
+    }
+    best_language = max(counts, key=lambda language: counts[language])
+    if list(counts.values()).count(counts[best_language]) > 1:
+        return default
+    return best_language
+
+
+def remove_stopwords(tokens: list[str]) -> list[str]:
+    return [
+        token
+        for token in tokens
+        if not any(token in stopwords for stopwords in STOPWORDS.values())
+    ]
@@ -0,0 +1,34 @@
+import math
+import threading
+from collections import deque
+from typing import Optional
+
+DEFAULT_WINDOW_SIZE = 200
+
+
+class LatencyTracker:
+    """Rolling window of the latest latencies, with percentiles computed on
+    demand."""
+
+    @property
+    def n_samples(self) -> int:
+        return len(self.__latencies)
+
+    # Public:
+    def __init__(self, window_size: int = DEFAULT_WINDOW_SIZE):
+        self.__latencies: deque[float] = deque(maxlen=window_size)
+        self.__lock = threading.Lock()
+
+    def record(self, latency: float):
+        with self.__lock:
+            self.__latencies.append(latency)
+
+    def compute_percentile(self, percentile: float) -> Optional[float]:
+        """Nearest-rank percentile, `percentile` in [0, 100]. None without
+        samples."""
+        with self.__lock:
+            latencies = sorted(self.__latencies)
+        if not latencies:
+            return None
+        rank = max(1, math.ceil(percentile / 100 * len(latencies)))
+        return latencies[rank - 1]
@@ -0,0 +1,77 @@
+from collections import defaultdict
+
+
+def compute_char_ngrams(s: str, n: int = 3) -> list[str]:
+    if len(s) < n:
+        return [s] if s else []
+    return [s[i : i + n] for i in range(len(s) - n + 1)]
+
+
+def compute_char_ngrams_positions(s: str, n: int = 3) -> dict[str, list[int]]:
+    positions: dict[str, list[int]] = defaultdict(list)
+    for i in range(len(s) - n + 1):
+        positions[s[i : i + n]].append(i)
+    return dict(positions)
+
+
+def compute_char_ngrams_similarity(a: str, b: str, n: int = 3) -> float:
+    """Jaccard similarity between the character n-gram sets of two strings."""
+    a_ngrams = set(compute_char_ngrams(a, n))
+    b_ngrams = set(compute_char_ngrams(b, n))
+    if not a_ngrams and not b_ngrams:
+        return 1.0
+    return len(a_ngrams & b_ngrams) / len(a_ngrams | b_ngrams)
+
+
+def compute_banded_substring_alignment(
+    query: str, text: str, diagonal: int, band: int
+) -> tuple[int, int, int] | None:
+    """Aligns the whole `query` against the best substring of `text` around `diagonal`.
+
+    Semi-global edit distance (free start and end in `text`) restricted to the cells
+    whose text index lies within `band` characters of `diagonal + query_index`.
+
+    :return: (distance, start, end) of the best alignment, or None if the band
+        does not overlap `text`.
+    """
+    m, n = len(query), len(text)
+    width = 2 * band + 1
+    inf = m + width + 1
+    # Row 0: free start anywhere inside the band.
+    costs = [inf] * width
+    starts = [0] * width
+    for t in range(width):
+        j = diagonal - band + t
+        if 0 <= j <= n:
+            costs[t] = 0
+            starts[t] = j
+    for i in range(1, m + 1):
+        q = query[i - 1]
+        row_costs = [inf] * width
+        row_starts = [0] * width
+        offset = diagonal + i - band
+        for t in range(width):
+            j = offset + t
+            if j < 0 or j > n:
+                continue
+            best = inf
+            best_start = 0
+            # Substitution / match (text index j-1 lies on the same band offset).
+            if j > 0 and costs[t] < inf:
+                best = costs[t] + (q != text[j - 1])
+                best_start = starts[t]
+            # Query character not present in text.
+            if t + 1 < width and costs[t + 1] + 1 < best:
+                best = costs[t + 1] + 1
+                best_start = starts[t + 1]
+            # Extra text character.
+            if t > 0 and row_costs[t - 1] + 1 < best:
+                best = row_costs[t - 1] + 1
+                best_start = row_starts[t - 1]
+            row_costs[t] = best
+            row_starts[t] = best_start
+        costs, starts = row_costs, row_starts
+    best_t = min(range(width), key=lambda t: costs[t])
+    if costs[best_t] >= inf:
+        return None
+    return costs[best_t], starts[best_t], diagonal + m - band + best_t
@@ -0,0 +1,103 @@
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Hashable, TypeVar
+
+from src.utils.metaclasses import DynamicSingleton
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class SingleFlight(metaclass=DynamicSingleton):
+    """Coalesces concurrent calls sharing a key into a single execution.
+
+    The first caller of a key (the leader) runs the call. Callers arriving
+    while it is in flight wait for it and receive the same result or
+    exception. Sync (`run`) and async (`arun`) callers share the in-flight
+    calls, so an async caller can wait on a call led from a worker thread and
+    vice versa. Nothing is kept once the call completes: this is not a
+    cache."""
+
+    @property
+    def n_calls(self) -> int:
+        return self.__n_calls
+
+    @property
+    def n_collapsed_calls(self) -> int:
+        return self.__n_collapsed_calls
+
+    @property
+    def n_in_flight(self) -> int:
+        return len(self.__futures)
+
+    # Public:
+    def __init__(self, name: str):
+        self.__name = name
+        self.__lock = threading.Lock()
+        self.__futures: dict[Hashable, Future] = {}
+        self.__n_calls = 0
+        self.__n_collapsed_calls = 0
+
+    def run(self, key: Hashable, function: Callable[..., T], *args, **kwargs) -> T:
+        future, is_leader = self.__join(key)
+        if not is_leader:
+            return future.result()
+        try:
+            result = function(*args, **kwargs)
+        except BaseException as e:
+            self.__complete(key, future, exception=e)
+            raise
+        self.__complete(key, future, result=result)
+        return result
+
+    async def arun(
+        self, key: Hashable, function: Callable[..., Awaitable[T]], *args, **kwargs
+    ) -> T:
+        future, is_leader = self.__join(key)
+        if not is_leader:
+            # A cancelled follower must not cancel the call of the others
+            return await asyncio.shield(asyncio.wrap_future(future))
+        try:
+            result = await function(*args, **kwargs)
+        except BaseException as e:
+            self.__complete(key, future, exception=e)
+            raise
+        self.__complete(key, future, result=result)
+        return result
+
+    # Private:
+    def __join(self, key: Hashable) -> tuple[Future, bool]:
+        with self.__lock:
+            self.__n_calls += 1
+            future = self.__futures.get(key)
+            if future is not None:
+                self.__n_collapsed_calls += 1
+                logger.info(
+                    f"[{self.__name}] Joined in-flight call ({self.__n_collapsed_calls}/{self.__n_calls} calls collapsed)."
+                )
+                return future, False
+            future = Future()
+            self.__futures[key] = future
+            return future, True
+
+    def __complete(
+        self,
+        key: Hashable,
+        future: Future,
+        result: Any = None,
+        exception: BaseException | None = None,
+    ):
+        with self.__lock:
+            self.__futures.pop(key, None)
+        if future.done():
+            return
+        if isinstance(exception, asyncio.CancelledError):
+            # Followers of a cancelled leader are cancelled too
+            future.cancel()
+        elif exception is not None:
+            future.set_exception(exception)
+        else:
+            future.set_result(result)
@@ -1,4 +1,7 @@
+from hashlib import sha256
+
 import sqlparse
+from sqlparse import tokens as T
 
 
 def is_valid_sql_query(s: str) -> bool:
@@ -6,3 +9,39 @@ def is_valid_sql_query(s: str) -> bool:
         return bool(sqlparse.parse(s))
     except Exception:
         return False
+
+
+def is_select_query(s: str) -> bool:
+    """Whether `s` is a single SELECT statement (CTEs included)."""
+    try:
+        statements = [st for st in sqlparse.parse(s) if st.get_type() != "UNKNOWN"]
+        return len(statements) == 1 and statements[0].get_type() == "SELECT"
+    except Exception:
+        return False
+
+
+def normalize_sql_query(s: str) -> str:
+    """`s` with comments and trailing semicolons removed, keywords in upper
+    case, unquoted names in lower case, and one space between tokens. Literals
+    are kept verbatim, so that queries differing in their values do not
+    normalize the same."""
+    values = []
+    for statement in sqlparse.parse(s):
+        for token in statement.flatten():
+            if token.is_whitespace or token.ttype in T.Comment:
+                continue
+            if token.is_keyword:
+                values.append(token.normalized.upper())
+            elif token.ttype in T.Name:
+                values.append(token.value.lower())
+            else:
+                values.append(token.value)
+    while values and values[-1] == ";":
+        values.pop()
+    return " ".join(values)
+
+
+def compute_sql_fingerprint(s: str) -> str:
+    """Hash of the normalized query (see `normalize_sql_query`): queries that
+    only differ in whitespace, comments or keyword and name case share it."""
+    return sha256(normalize_sql_query(s).encode("utf-8")).hexdigest()
@@ -1,13 +1,14 @@
 import json
 import logging
-import time
 from typing import Optional, Any
 
+from botocore.config import Config
 from botocore.exceptions import ClientError
 from botocore.eventstream import EventStream
 from ...utils.metaclasses import DynamicSingleton
+from .bedrock_executor import BedrockExecutor
+from .bedrock_rate_limiter import DEFAULT_REQUEST_DEADLINE_S, BedrockRateLimiter
 from .exception import AWSException
-from .errors import RateLimitExceededError
 from .session import Boto3Session
 
 logger = logging.getLogger(__name__)
@@ -18,12 +19,15 @@ class BedrockAgentWrapper(metaclass=DynamicSingleton):
     # Public:
     @AWSException.error_handling
     def __init__(self, credentials: dict | None = None, region: Optional[str] = None):
-        config_data = {}
-        if region:
-            config_data["region_name"] = region
-
+        # Throttling and transient errors are retried by the rate limiter,
+        # not by botocore
+        config = Config(
+            region_name=region,
+            max_pool_connections=BedrockExecutor().max_workers,
+            retries={"total_max_attempts": 1},
+        )
         self.__client = Boto3Session(credentials=credentials).client(
-            "bedrock-agent-runtime", config=config_data if config_data else None
+            "bedrock-agent-runtime", config=config
         )
 
     @AWSException.error_handling
@@ -38,9 +42,8 @@ class BedrockAgentWrapper(metaclass=DynamicSingleton):
         end_session: bool = False,
         max_attempts: int = 3,
         retry_delay: float = 2.0,
+        deadline_s: Optional[float] = DEFAULT_REQUEST_DEADLINE_S,
     ) -> dict:
-        self.__client.meta.config.retries = {"max_attempts": max_attempts}
-
         request_body = {
             "inputText": input_text,
             "enableTrace": enable_trace,
@@ -55,64 +58,57 @@ class BedrockAgentWrapper(metaclass=DynamicSingleton):
         if end_session:
             request_body["endSession"] = end_session
 
-        attempts = 0
-        last_exception = None
-
-        while attempts < max_attempts:
-            try:
-                attempts += 1
-                response = self.__client.invoke_agent(
-                    agentId=agent_id, agentAliasId=agent_alias_id, **request_body
-                )
-
-                # Process the streaming response if needed
-                reply = self.__process_response(response)
-                return reply
-
-            except ClientError as e:
-                last_exception = e
-                code = e.response["Error"]["Code"]
-                message = e.response["Error"]["Message"]
-
-                if (
-                    code == "throttlingException"
-                    and "rate is too high" in message.lower()
-                ):
-                    last_exception = RateLimitExceededError(message)
-                    if attempts <= max_attempts:
-                        wait_time = retry_delay * (
-                            2 ** (attempts - 1)
-                        )  # Exponential backoff
-                        logger.info(
-                            f"Rate limit exceeded, retrying in {wait_time:.2f} seconds (attempt {attempts}/{max_attempts})"
-                        )
-                        time.sleep(wait_time)
-                        continue
-                # Check if this is the "not in ready state" error
-                if (
-                    code == "validationException"
-                    and "not in ready state" in message.lower()
-                ):
-
-                    if attempts <= max_attempts:
-                        wait_time = retry_delay * (
-                            2 ** (attempts - 1)
-                        )  # Exponential backoff
-                        logger.info(
-                            f"Agent not ready, retrying in {wait_time:.2f} seconds (attempt {attempts}/{max_attempts})"
-                        )
-                        time.sleep(wait_time)
-                        continue
-
-                # For other errors or if we've exhausted retries
-                logger.error(f"Bedrock Agent invocation failed: {code} - {message}")
-                raise e
-
-        # If we've exhausted all retries
-        if last_exception:
-            logger.error(f"Bedrock Agent still not ready after {max_attempts} attempts")
-            raise last_exception
-        raise Exception("Unknown error")
+        def invoke_agent() -> dict:
+            response = self.__client.invoke_agent(
+                agentId=agent_id, agentAliasId=agent_alias_id, **request_body
+            )
+            # The completion is streamed: throttling can also surface while
+            # reading it, so it is processed within the retried call.
+            return self.__process_response(response)
+
+        try:
+            return BedrockRateLimiter(f"agent/{agent_id}").call(
+                invoke_agent,
+                deadline_s=deadline_s,
+                max_attempts=max_attempts,
+                base_delay_s=retry_delay,
+                should_retry=self.__is_agent_not_ready_error,
+            )
+        except ClientError as e:
+            error = e.response.get("Error", {})
+            logger.error(
+                f"Bedrock Agent invocation failed: {error.get('Code')} - {error.get('Message')}"
+            )
+            raise e
+
+    async def ainvoke(
+        self,
+        agent_id: str,
+        agent_alias_id: str,
+        input_text: str,
+        session_id: Optional[str] = None,
+        enable_trace: bool = False,
+        memory_attributes: Optional[dict[str, Any]] = None,
+        end_session: bool = False,
+        max_attempts: int = 3,
+        retry_delay: float = 2.0,
+        deadline_s: Optional[float] = DEFAULT_REQUEST_DEADLINE_S,
+    ) -> dict:
+        """Same as `invoke`, run in the Bedrock executor. Retry waits happen in
+        the worker thread, not in the event loop."""
+        return await BedrockExecutor().run(
+            self.invoke,
+            agent_id,
+            agent_alias_id,
+            input_text,
+            session_id=session_id,
+            enable_trace=enable_trace,
+            memory_attributes=memory_attributes,
+            end_session=end_session,
+            max_attempts=max_attempts,
+            retry_delay=retry_delay,
+            deadline_s=deadline_s,
+        )
 
     @AWSException.error_handling
     def list_agents(self) -> list:
@@ -125,6 +121,14 @@ class BedrockAgentWrapper(metaclass=DynamicSingleton):
         return response
 
     # Private:
+    @staticmethod
+    def __is_agent_not_ready_error(e: ClientError) -> bool:
+        error = e.response.get("Error", {})
+        return (
+            error.get("Code") == "validationException"
+            and "not in ready state" in error.get("Message", "").lower()
+        )
+
     def __process_response(self, response) -> dict:
         """Process the EventStream response from Bedrock Agent and return just the completion text."""
         completion_event = response.get("completion", None)
@@ -0,0 +1,42 @@
+import asyncio
+import logging
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, TypeVar
+
+from ...utils.metaclasses import Singleton
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_WORKERS = 32
+
+T = TypeVar("T")
+
+
+class BedrockExecutor(metaclass=Singleton):
+    """Process-wide bounded thread pool for blocking boto3 Bedrock calls.
+
+    Awaiting `run` keeps the event loop free while the call is in flight.
+    Calls beyond `max_workers` wait in the pool queue instead of piling up
+    threads, so the same bound also caps concurrent requests to Bedrock."""
+
+    @property
+    def max_workers(self) -> int:
+        return self.__max_workers
+
+    # Public:
+    def __init__(self, max_workers: int = DEFAULT_MAX_WORKERS):
+        self.__max_workers = max_workers
+        self.__executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="bedrock"
+        )
+        logger.info(f"Initialized Bedrock executor with {max_workers} workers.")
+
+    async def run(self, function: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.__executor, partial(function, *args, **kwargs)
+        )
+
+    def submit(self, function: Callable[..., T], *args: Any, **kwargs: Any) -> Future:
+        return self.__executor.submit(function, *args, **kwargs)
@@ -1,19 +1,86 @@
 import json
 import logging
-from typing import Optional, Any
+import traceback
+from typing import Any, Iterator, Optional
 
 from src.utils.metaclasses import DynamicSingleton
+from src.wrappers.aws.bedrock_executor import BedrockExecutor
+from src.wrappers.aws.bedrock_rate_limiter import (
+    DEFAULT_REQUEST_DEADLINE_S,
+    BedrockRateLimiter,
+)
 from src.wrappers.aws.exception import AWSException
 from src.wrappers.aws.session import Boto3Session
 from botocore.config import Config
+from botocore.exceptions import ClientError
 
 logger = logging.getLogger(__name__)
 
 DEFAULT_AWS_REGION = "us-east-1"
 
+# Model families accepting cache checkpoints in Converse requests. Matched as
+# substrings so that inference profiles ("us.anthropic...") match too.
+PROMPT_CACHING_MODEL_FAMILIES = [
+    "anthropic.claude-3-5-haiku",
+    "anthropic.claude-3-7-sonnet",
+    "anthropic.claude-sonnet-4",
+    "anthropic.claude-opus-4",
+    "amazon.nova",
+]
+# Shorter prefixes are below the minimum cacheable size (~1024 tokens)
+MIN_CACHE_CHECKPOINT_CHARS = 4096
+# Model-specific parameter names mapped to the Converse inference config. The
+# other parameters are sent as additional model request fields.
+CONVERSE_INFERENCE_PARAMS = {
+    "max_gen_len": "maxTokens",
+    "max_tokens": "maxTokens",
+    "temperature": "temperature",
+    "top_p": "topP",
+    "stop_sequences": "stopSequences",
+    "stop": "stopSequences",
+}
+# Only meaningful in InvokeModel bodies
+IGNORED_CONVERSE_PARAMS = ["anthropic_version"]
+
+
+# Generation length and stop sequences parameter names per model family. Meta
+# Llama models take no stop sequences: they are applied client-side.
+MAX_TOKENS_PARAMS = {
+    "meta": "max_gen_len",
+    "anthropic": "max_tokens",
+    "mistral": "max_tokens",
+}
+STOP_SEQUENCES_PARAMS = {"anthropic": "stop_sequences", "mistral": "stop"}
+
+
+def supports_prompt_caching(model_id: str) -> bool:
+    return any(family in model_id for family in PROMPT_CACHING_MODEL_FAMILIES)
 
-class BedrockWrapper(metaclass=DynamicSingleton):
 
+def get_model_family(model_id: str) -> Optional[str]:
+    return next(
+        (family for family in MAX_TOKENS_PARAMS if f"{family}." in model_id.lower()),
+        None,
+    )
+
+
+def create_generation_params(
+    model_id: str,
+    max_tokens: Optional[int] = None,
+    stop_sequences: Optional[list[str]] = None,
+) -> dict[str, Any]:
+    """Generation length and stop sequences, named after the parameters of
+    the model family. Unsupported ones are left out."""
+    family = get_model_family(model_id)
+    params: dict[str, Any] = {}
+    if max_tokens is not None and family in MAX_TOKENS_PARAMS:
+        params[MAX_TOKENS_PARAMS[family]] = max_tokens
+    if stop_sequences and family in STOP_SEQUENCES_PARAMS:
+        params[STOP_SEQUENCES_PARAMS[family]] = stop_sequences
+    return params
+
+
+class BedrockWrapper(metaclass=DynamicSingleton):
     @AWSException.error_handling
     def __init__(
         self,
@@ -21,13 +88,15 @@ class BedrockWrapper(metaclass=DynamicSingleton):
         region: Optional[str] = DEFAULT_AWS_REGION,
         read_timeout: Optional[int] = None,
     ):
-        config = (
-            Config(
-                read_timeout=read_timeout,
-            )
-            if read_timeout
-            else Config()
+        # Enough pooled connections for every executor worker to have one.
+        # Throttling and transient errors are retried by the rate limiter,
+        # not by botocore.
+        config = Config(
+            max_pool_connections=BedrockExecutor().max_workers,
+            retries={"total_max_attempts": 1},
         )
+        if read_timeout:
+            config = config.merge(Config(read_timeout=read_timeout))
         self.__client = Boto3Session(credentials=credentials).client(
             "bedrock-runtime", region_name=region, config=config
         )
@@ -38,7 +107,118 @@ class BedrockWrapper(metaclass=DynamicSingleton):
         model_id: str,
         prompt: str,
         params: Optional[dict[str, Any]] = None,
+        deadline_s: Optional[float] = DEFAULT_REQUEST_DEADLINE_S,
+    ) -> dict:
+        response = BedrockRateLimiter(model_id).call(
+            self.__client.invoke_model,
+            deadline_s=deadline_s,
+            modelId=model_id,
+            body=self.__create_body(model_id, prompt, params),
+            accept="application/json",
+            contentType="application/json",
+        )
+        logger.debug(f"Boto3 response: '{response}'")
+
+        if response.get("ResponseMetadata", {}).get("HTTPStatusCode", 0) != 200:
+            raise Exception(f"Error invoking model: {response}")
+
+        response_body = response.get("body").read().decode("utf-8")
+        if not response_body:
+            raise Exception("Empty response body")
+        return json.loads(response_body)
+
+    async def ainvoke_model(
+        self,
+        model_id: str,
+        prompt: str,
+        params: Optional[dict[str, Any]] = None,
+        deadline_s: Optional[float] = DEFAULT_REQUEST_DEADLINE_S,
+    ) -> dict:
+        return await BedrockExecutor().run(
+            self.invoke_model, model_id, prompt, params=params, deadline_s=deadline_s
+        )
+
+    @AWSException.error_handling
+    def converse(
+        self,
+        model_id: str,
+        prompt: str,
+        params: Optional[dict[str, Any]] = None,
+        prompt_prefix: Optional[str] = None,
+        deadline_s: Optional[float] = DEFAULT_REQUEST_DEADLINE_S,
+    ) -> dict:
+        """Same request as `invoke_model` through the Converse API, which takes
+        the same body for every model family. When `prompt` starts with
+        `prompt_prefix` and the model supports it, a cache checkpoint is placed
+        after the prefix so that later requests sharing it read it from the
+        provider-side prompt cache."""
+        response = BedrockRateLimiter(model_id).call(
+            self.__client.converse,
+            deadline_s=deadline_s,
+            modelId=model_id,
+            **self.__create_converse_request(model_id, prompt, params, prompt_prefix),
+        )
+        logger.debug(f"Boto3 response: '{response}'")
+
+        if response.get("ResponseMetadata", {}).get("HTTPStatusCode", 0) != 200:
+            raise Exception(f"Error conversing with model: {response}")
+
+        usage = response.get("usage", {})
+        logger.info(
+            f"Bedrock model ({model_id}) usage: {usage.get('inputTokens')} input tokens "
+            f"({usage.get('cacheReadInputTokens', 0)} read from cache, "
+            f"{usage.get('cacheWriteInputTokens', 0)} written to cache), "
+            f"{usage.get('outputTokens')} output tokens."
+        )
+        return response
+
+    async def aconverse(
+        self,
+        model_id: str,
+        prompt: str,
+        params: Optional[dict[str, Any]] = None,
+        prompt_prefix: Optional[str] = None,
+        deadline_s: Optional[float] = DEFAULT_REQUEST_DEADLINE_S,
     ) -> dict:
+        return await BedrockExecutor().run(
+            self.converse,
+            model_id,
+            prompt,
+            params=params,
+            prompt_prefix=prompt_prefix,
+            deadline_s=deadline_s,
+        )
+
+    @AWSException.error_handling
+    def invoke_model_with_response_stream(
+        self,
+        model_id: str,
+        prompt: str,
+        params: Optional[dict[str, Any]] = None,
+        deadline_s: Optional[float] = DEFAULT_REQUEST_DEADLINE_S,
+    ) -> Iterator[str]:
+        """Same request as `invoke_model`, but yields the generated text deltas
+        as the model produces them. Only opening the stream is retried."""
+        response = BedrockRateLimiter(model_id).call(
+            self.__client.invoke_model_with_response_stream,
+            deadline_s=deadline_s,
+            modelId=model_id,
+            body=self.__create_body(model_id, prompt, params),
+            accept="application/json",
+            contentType="application/json",
+        )
+        logger.debug(f"Boto3 stream response: '{response}'")
+
+        if response.get("ResponseMetadata", {}).get("HTTPStatusCode", 0) != 200:
+            raise Exception(f"Error invoking model with response stream: {response}")
+
+        return self.__iterate_stream(response["body"])
+
+    # Private:
+    @staticmethod
+    def __create_body(
+        model_id: str, prompt: str, params: Optional[dict[str, Any]]
+    ) -> str:
         body_data: dict[str, str | int | float | dict | list | None] = {}
         if "anthropic" in model_id.lower():
             body_data["messages"] = [
@@ -51,22 +231,76 @@ class BedrockWrapper(metaclass=DynamicSingleton):
             body_data["prompt"] = prompt
         if params:
             body_data |= params
+        return json.dumps(body_data)
 
-        body = json.dumps(body_data)
-        response = self.__client.invoke_model(
-            modelId=model_id,
-            body=body,
-            accept="application/json",
-            contentType="application/json",
-        )
-        logger.debug(f"Boto3 response: '{response}'")
-
-        if response.get("ResponseMetadata", {}).get("HTTPStatusCode", 0) != 200:
-            raise Exception(f"Error invoking model: {response}")
+    @staticmethod
+    def __create_converse_request(
+        model_id: str,
+        prompt: str,
+        params: Optional[dict[str, Any]],
+        prompt_prefix: Optional[str],
+    ) -> dict[str, Any]:
+        content: list[dict[str, Any]] = [{"text": prompt}]
+        if (
+            prompt_prefix
+            and len(prompt_prefix) >= MIN_CACHE_CHECKPOINT_CHARS
+            and prompt.startswith(prompt_prefix)
+            and supports_prompt_caching(model_id)
+        ):
+            suffix = prompt[len(prompt_prefix) :]
+            content = [
+                {"text": prompt_prefix},
+                {"cachePoint": {"type": "default"}},
+                *([{"text": suffix}] if suffix else []),
+            ]
+        inference_config: dict[str, Any] = {}
+        additional_fields: dict[str, Any] = {}
+        for name, value in (params or {}).items():
+            if name in CONVERSE_INFERENCE_PARAMS:
+                inference_config[CONVERSE_INFERENCE_PARAMS[name]] = value
+            elif name not in IGNORED_CONVERSE_PARAMS:
+                additional_fields[name] = value
+        request: dict[str, Any] = {"messages": [{"role": "user", "content": content}]}
+        if inference_config:
+            request["inferenceConfig"] = inference_config
+        if additional_fields:
+            request["additionalModelRequestFields"] = additional_fields
+        return request
 
-        response_body = response.get("body").read().decode("utf-8")
-        if not response_body:
-            raise Exception("Empty response body")
-        return json.loads(response_body)
+    def __iterate_stream(self, stream: Any) -> Iterator[str]:
+        # Errors raised while reading the event stream happen outside of
+        # `invoke_model_with_response_stream`, so they are wrapped here.
+        try:
+            for event in stream:
+                if "chunk" not in event:
+                    raise Exception(f"Unexpected stream event: {event}")
+                text = self.__extract_stream_text(
+                    json.loads(event["chunk"]["bytes"].decode("utf-8"))
+                )
+                if text:
+                    yield text
+        except ClientError as e:
+            msg = f"'invoke_model_with_response_stream' - Boto3 error: '{e}'"
+            logger.error(f"{msg} - Stack trace: '{traceback.format_exc()}'")
+            raise AWSException(msg, original_exception=e)
+        finally:
+            # Reached too when the consumer stops early: the connection is
+            # released instead of reading the remaining tokens
+            if hasattr(stream, "close"):
+                stream.close()
 
-    # Private helper methods can be added here if needed
+    @staticmethod
+    def __extract_stream_text(payload: dict[str, Any]) -> Optional[str]:
+        # Meta Llama
+        if "generation" in payload:
+            return payload["generation"]
+        # Mistral
+        if "outputs" in payload:
+            return payload["outputs"][0].get("text")
+        # Anthropic messages API: only content deltas carry text, the other
+        # events (message_start, content_block_stop, ...) carry metadata.
+        if payload.get("type") == "content_block_delta":
+            return payload["delta"].get("text")
+        if "type" in payload:
+            return None
+        raise NotImplementedError(f"Unexpected stream chunk: {payload}")
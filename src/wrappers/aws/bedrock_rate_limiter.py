@@ -0,0 +1,241 @@
+import logging
+import random
+import threading
+import time
+from typing import Any, Callable, Optional, TypeVar
+
+from botocore.exceptions import ClientError, ConnectionError, HTTPClientError
+
+from ...utils.metaclasses import DynamicSingleton
+from .errors import RateLimitExceededError
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INITIAL_RATE = 10.0
+DEFAULT_MIN_RATE = 0.5
+DEFAULT_MAX_RATE = 50.0
+DEFAULT_BURST = 10
+# AIMD: the rate grows by a fixed step per success and is multiplied by a
+# factor on throttling, at most once per cooldown.
+DEFAULT_RATE_INCREASE = 0.5
+DEFAULT_RATE_DECREASE_FACTOR = 0.5
+RATE_DECREASE_COOLDOWN_S = 1.0
+
+DEFAULT_REQUEST_DEADLINE_S = 60.0
+DEFAULT_MAX_ATTEMPTS = 5
+DEFAULT_BASE_DELAY_S = 0.5
+DEFAULT_MAX_DELAY_S = 8.0
+
+THROTTLING_ERROR_CODES = [
+    "ThrottlingException",
+    "throttlingException",
+    "TooManyRequestsException",
+]
+# Errors botocore's standard retry mode retries, now that it does not retry:
+# the limiter retries them without lowering the rate
+TRANSIENT_ERROR_CODES = [
+    "ServiceUnavailableException",
+    "ServiceUnavailable",
+    "InternalServerException",
+    "InternalFailure",
+    "ModelNotReadyException",
+    "RequestTimeout",
+    "RequestTimeoutException",
+]
+# Connection errors, connect and read timeouts, and reset connections
+TRANSIENT_CONNECTION_ERRORS = (ConnectionError, HTTPClientError)
+
+T = TypeVar("T")
+
+
+def is_throttling_error(e: ClientError) -> bool:
+    return e.response.get("Error", {}).get("Code") in THROTTLING_ERROR_CODES
+
+
+def is_transient_error(e: Exception) -> bool:
+    if isinstance(e, TRANSIENT_CONNECTION_ERRORS):
+        return True
+    return isinstance(e, ClientError) and (
+        e.response.get("Error", {}).get("Code") in TRANSIENT_ERROR_CODES
+        or e.response.get("ResponseMetadata", {}).get("HTTPStatusCode", 0) >= 500
+    )
+
+
+class BedrockRateLimiter(metaclass=DynamicSingleton):
+    """Process-wide token bucket for one Bedrock model, inference profile or
+    agent, whose rate adapts to throttling (AIMD).
+
+    Every Bedrock wrapper sends its calls through `call`, which waits for a
+    token, retries throttled calls and transient errors (5xx, connection
+    errors and timeouts) with full-jitter exponential backoff and gives up
+    once the request deadline would be exceeded."""
+
+    __limiters: dict[str, "BedrockRateLimiter"] = {}
+
+    @property
+    def resource_id(self) -> str:
+        return self.__resource_id
+
+    @property
+    def rate(self) -> float:
+        return self.__rate
+
+    @property
+    def queue_depth(self) -> int:
+        return self.__queue_depth
+
+    @property
+    def n_requests(self) -> int:
+        return self.__n_requests
+
+    @property
+    def n_throttles(self) -> int:
+        return self.__n_throttles
+
+    @property
+    def stats(self) -> dict[str, Any]:
+        return {
+            "rate": round(self.__rate, 3),
+            "queue_depth": self.__queue_depth,
+            "n_requests": self.__n_requests,
+            "n_throttles": self.__n_throttles,
+            "n_rejections": self.__n_rejections,
+        }
+
+    # Public:
+    def __init__(
+        self,
+        resource_id: str,
+        initial_rate: float = DEFAULT_INITIAL_RATE,
+        min_rate: float = DEFAULT_MIN_RATE,
+        max_rate: float = DEFAULT_MAX_RATE,
+        burst: int = DEFAULT_BURST,
+    ):
+        self.__resource_id = resource_id
+        self.__rate = initial_rate
+        self.__min_rate = min_rate
+        self.__max_rate = max_rate
+        self.__burst = burst
+        self.__tokens = float(burst)
+        self.__last_refill = time.monotonic()
+        self.__last_decrease = 0.0
+        self.__lock = threading.Lock()
+        self.__queue_depth = 0
+        self.__n_requests = 0
+        self.__n_throttles = 0
+        self.__n_rejections = 0
+        BedrockRateLimiter.__limiters[resource_id] = self
+
+    @classmethod
+    def get_all_stats(cls) -> dict[str, dict[str, Any]]:
+        return {
+            resource_id: limiter.stats
+            for resource_id, limiter in cls.__limiters.items()
+        }
+
+    def call(
+        self,
+        function: Callable[..., T],
+        *args,
+        deadline_s: Optional[float] = DEFAULT_REQUEST_DEADLINE_S,
+        max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+        base_delay_s: float = DEFAULT_BASE_DELAY_S,
+        max_delay_s: float = DEFAULT_MAX_DELAY_S,
+        should_retry: Optional[Callable[[ClientError], bool]] = None,
+        **kwargs,
+    ) -> T:
+        """Calls `function` once a token is available. Throttling errors,
+        transient errors and the errors accepted by `should_retry` are retried
+        up to `max_attempts` times within `deadline_s` seconds."""
+        deadline = time.monotonic() + deadline_s if deadline_s else None
+        attempt = 0
+        while True:
+            attempt += 1
+            self.acquire(deadline)
+            try:
+                result = function(*args, **kwargs)
+            except (ClientError, *TRANSIENT_CONNECTION_ERRORS) as e:
+                is_throttle = isinstance(e, ClientError) and is_throttling_error(e)
+                if is_throttle:
+                    self.__on_throttle()
+                elif not (
+                    is_transient_error(e)
+                    or (should_retry and isinstance(e, ClientError) and should_retry(e))
+                ):
+                    raise
+                if attempt >= max_attempts:
+                    if is_throttle:
+                        raise RateLimitExceededError(
+                            f"{self.__resource_id} still throttled after {attempt} attempts: {e}"
+                        )
+                    raise
+                delay_s = random.uniform(
+                    0, min(max_delay_s, base_delay_s * 2 ** (attempt - 1))
+                )
+                if deadline is not None and time.monotonic() + delay_s > deadline:
+                    if is_throttle:
+                        raise RateLimitExceededError(
+                            f"{self.__resource_id} request deadline exceeded after {attempt} attempts: {e}"
+                        )
+                    raise
+                logger.info(
+                    f"Retrying {self.__resource_id} in {delay_s:.2f} seconds "
+                    f"(attempt {attempt}/{max_attempts}, rate {self.__rate:.2f}/s): {e}"
+                )
+                time.sleep(delay_s)
+                continue
+            self.__on_success()
+            return result
+
+    def acquire(self, deadline: Optional[float] = None):
+        """Blocks until a token is available. Raises `RateLimitExceededError`
+        right away if it would only be available after the deadline."""
+        with self.__lock:
+            now = time.monotonic()
+            self.__refill(now)
+            # Tokens are reserved ahead: a negative balance is the queue of
+            # callers waiting for their turn.
+            self.__tokens -= 1
+            wait_s = max(0.0, -self.__tokens / self.__rate)
+            if deadline is not None and now + wait_s > deadline:
+                self.__tokens += 1
+                self.__n_rejections += 1
+                raise RateLimitExceededError(
+                    f"{self.__resource_id} rate limit wait of {wait_s:.2f} seconds exceeds the request deadline."
+                )
+            self.__n_requests += 1
+            if wait_s <= 0:
+                return
+            self.__queue_depth += 1
+        try:
+            time.sleep(wait_s)
+        finally:
+            with self.__lock:
+                self.__queue_depth -= 1
+
+    # Private:
+    def __refill(self, now: float):
+        self.__tokens = min(
+            self.__burst, self.__tokens + (now - self.__last_refill) * self.__rate
+        )
+        self.__last_refill = now
+
+    def __on_success(self):
+        with self.__lock:
+            self.__refill(time.monotonic())
+            self.__rate = min(self.__max_rate, self.__rate + DEFAULT_RATE_INCREASE)
+
+    def __on_throttle(self):
+        with self.__lock:
+            self.__n_throttles += 1
+            now = time.monotonic()
+            if now - self.__last_decrease < RATE_DECREASE_COOLDOWN_S:
+                return
+            self.__refill(now)
+            self.__rate = max(
+                self.__min_rate, self.__rate * DEFAULT_RATE_DECREASE_FACTOR
+            )
+            self.__last_decrease = now
+        logger.warning(
+            f"{self.__resource_id} throttled. Rate lowered to {self.__rate:.2f} requests/s."
+        )
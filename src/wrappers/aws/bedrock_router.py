@@ -0,0 +1,234 @@
+import asyncio
+import logging
+import threading
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from time import perf_counter
+from typing import Any, Optional
+
+from ...utils.latency_tracker import LatencyTracker
+from ...utils.metaclasses import DynamicSingleton
+from .bedrock_executor import BedrockExecutor
+from .bedrock_model import DEFAULT_AWS_REGION, BedrockWrapper
+
+logger = logging.getLogger(__name__)
+
+HEDGE_PERCENTILE = 95
+# Until the primary has enough samples for a meaningful p95, hedge after a
+# fixed delay
+MIN_SAMPLES = 20
+DEFAULT_INITIAL_HEDGE_DELAY_S = 3.0
+DEFAULT_MAX_HEDGE_RATIO = 0.1
+HEDGE_RATIO_WINDOW_SIZE = 100
+
+
+class BedrockRouter(metaclass=DynamicSingleton):
+    """Sends each request to the first of an ordered list of Bedrock model ids
+    or inference profiles, and hedges it to the next one when the primary is
+    slower than its rolling p95.
+
+    Whichever target answers first wins. The loser is left to finish in the
+    background, where its latency is still recorded. Hedges are capped to a
+    ratio of the recent requests so that a slow primary cannot double the
+    traffic. All targets receive the same parameters, so they should belong
+    to the same model family. With `use_converse`, requests go through the
+    Converse API."""
+
+    @property
+    def model_ids(self) -> tuple[str, ...]:
+        return self.__model_ids
+
+    @property
+    def stats(self) -> dict[str, Any]:
+        with self.__lock:
+            n_requests = self.__n_requests
+            n_hedges = self.__n_hedges
+            wins = dict(self.__wins)
+        return {
+            "n_requests": n_requests,
+            "n_hedges": n_hedges,
+            "hedge_ratio": n_hedges / n_requests if n_requests else 0.0,
+            "targets": {
+                model_id: {
+                    "p50_s": self.__latency_trackers[model_id].compute_percentile(50),
+                    "p95_s": self.__latency_trackers[model_id].compute_percentile(95),
+                    "n_samples": self.__latency_trackers[model_id].n_samples,
+                    "n_wins": wins[model_id],
+                    "win_rate": wins[model_id] / n_requests if n_requests else 0.0,
+                }
+                for model_id in self.__model_ids
+            },
+        }
+
+    # Public:
+    def __init__(
+        self,
+        model_ids: tuple[str, ...],
+        region: Optional[str] = DEFAULT_AWS_REGION,
+        read_timeout: Optional[int] = None,
+        initial_hedge_delay_s: float = DEFAULT_INITIAL_HEDGE_DELAY_S,
+        max_hedge_ratio: float = DEFAULT_MAX_HEDGE_RATIO,
+        use_converse: bool = False,
+    ):
+        if not model_ids:
+            raise ValueError("At least one model id is required.")
+        self.__model_ids = tuple(model_ids)
+        self.__region = region
+        self.__read_timeout = read_timeout
+        self.__initial_hedge_delay_s = initial_hedge_delay_s
+        self.__max_hedge_ratio = max_hedge_ratio
+        self.__use_converse = use_converse
+        self.__latency_trackers = {
+            model_id: LatencyTracker() for model_id in self.__model_ids
+        }
+        self.__lock = threading.Lock()
+        self.__recent_hedges: deque[bool] = deque(maxlen=HEDGE_RATIO_WINDOW_SIZE)
+        self.__n_requests = 0
+        self.__n_hedges = 0
+        self.__wins = {model_id: 0 for model_id in self.__model_ids}
+
+    def invoke_model(
+        self,
+        prompt: str,
+        params: Optional[dict[str, Any]] = None,
+        prompt_prefix: Optional[str] = None,
+    ) -> tuple[dict, str]:
+        """Response of the winning target, and its model id."""
+        primary, secondary = self.__get_targets()
+        futures = {self.__submit(primary, prompt, params, prompt_prefix): primary}
+        done, _ = wait(futures, timeout=self.__compute_hedge_delay(primary))
+        if self.__shall_hedge(primary, secondary, is_slow=not done):
+            futures[self.__submit(secondary, prompt, params, prompt_prefix)] = secondary
+
+        pending = set(futures)
+        while True:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            winner = self.__select_winner(done, pending, futures)
+            if winner is not None:
+                return winner
+
+    async def ainvoke_model(
+        self,
+        prompt: str,
+        params: Optional[dict[str, Any]] = None,
+        prompt_prefix: Optional[str] = None,
+    ) -> tuple[dict, str]:
+        """Response of the winning target, and its model id."""
+        primary, secondary = self.__get_targets()
+        tasks = {
+            asyncio.ensure_future(
+                asyncio.wrap_future(
+                    self.__submit(primary, prompt, params, prompt_prefix)
+                )
+            ): primary
+        }
+        done, _ = await asyncio.wait(tasks, timeout=self.__compute_hedge_delay(primary))
+        if self.__shall_hedge(primary, secondary, is_slow=not done):
+            tasks[
+                asyncio.ensure_future(
+                    asyncio.wrap_future(
+                        self.__submit(secondary, prompt, params, prompt_prefix)
+                    )
+                )
+            ] = secondary
+
+        pending = set(tasks)
+        try:
+            while True:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                winner = self.__select_winner(done, pending, tasks)
+                if winner is not None:
+                    return winner
+        finally:
+            # Only stops waiting: the request keeps running in its thread
+            for task in pending:
+                task.cancel()
+
+    # Private:
+    def __get_targets(self) -> tuple[str, Optional[str]]:
+        with self.__lock:
+            self.__n_requests += 1
+        primary = self.__model_ids[0]
+        secondary = self.__model_ids[1] if len(self.__model_ids) > 1 else None
+        return primary, secondary
+
+    def __compute_hedge_delay(self, model_id: str) -> Optional[float]:
+        tracker = self.__latency_trackers[model_id]
+        if tracker.n_samples < MIN_SAMPLES:
+            return self.__initial_hedge_delay_s
+        return tracker.compute_percentile(HEDGE_PERCENTILE)
+
+    def __shall_hedge(
+        self, primary: str, secondary: Optional[str], is_slow: bool
+    ) -> bool:
+        with self.__lock:
+            shall_hedge = (
+                is_slow
+                and secondary is not None
+                and sum(self.__recent_hedges) + 1
+                <= self.__max_hedge_ratio * HEDGE_RATIO_WINDOW_SIZE
+            )
+            self.__recent_hedges.append(shall_hedge)
+            if shall_hedge:
+                self.__n_hedges += 1
+        if shall_hedge:
+            logger.info(f"Bedrock target {primary} is slow. Hedging to {secondary}.")
+        elif is_slow and secondary is not None:
+            logger.info(f"Bedrock target {primary} is slow. Hedge rate cap reached.")
+        return shall_hedge
+
+    def __submit(
+        self,
+        model_id: str,
+        prompt: str,
+        params: Optional[dict[str, Any]],
+        prompt_prefix: Optional[str],
+    ) -> Future:
+        t0 = perf_counter()
+        wrapper = BedrockWrapper(region=self.__region, read_timeout=self.__read_timeout)
+        future = (
+            BedrockExecutor().submit(
+                wrapper.converse,
+                model_id,
+                prompt,
+                params=params,
+                prompt_prefix=prompt_prefix,
+            )
+            if self.__use_converse
+            else BedrockExecutor().submit(
+                wrapper.invoke_model, model_id, prompt, params=params
+            )
+        )
+
+        def record_latency(future: Future):
+            # Hedge losers may be cancelled before they run
+            if future.cancelled():
+                return
+            if future.exception() is None:
+                self.__latency_trackers[model_id].record(perf_counter() - t0)
+
+        future.add_done_callback(record_latency)
+        return future
+
+    def __select_winner(
+        self,
+        done: set[Future | asyncio.Future],
+        pending: set[Future | asyncio.Future],
+        targets: dict[Future | asyncio.Future, str],
+    ) -> Optional[tuple[dict, str]]:
+        """First successful response among `done`. If all of them failed,
+        None while another target is pending, their exception otherwise."""
+        for future in done:
+            if future.exception() is None:
+                with self.__lock:
+                    self.__wins[targets[future]] += 1
+                return future.result(), targets[future]
+        for future in done:
+            logger.warning(
+                f"Bedrock target {targets[future]} failed: {future.exception()}"
+            )
+        if pending:
+            return None
+        raise next(iter(done)).exception()
@@ -1,14 +1,17 @@
 import logging
-from math import ceil
-from time import perf_counter
-from typing import Any, Dict, Iterator, List, Mapping, Optional
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
 
-from langchain_core.callbacks.manager import CallbackManagerForLLMRun
+from langchain_core.callbacks.manager import (
+    AsyncCallbackManagerForLLMRun,
+    CallbackManagerForLLMRun,
+)
 from langchain_core.language_models.llms import LLM
 from langchain_core.outputs import GenerationChunk
 from pydantic import Extra
 
-from src.wrappers.aws.bedrock_model import BedrockWrapper
+from src.wrappers.aws.bedrock_executor import BedrockExecutor
+from src.wrappers.llm.pipelines.bedrock_text_generator import BedrockTextGenerator
+from src.wrappers.llm.response_caching.response_cache import ResponseCache
 
 logger = logging.getLogger(__name__)
 
@@ -39,18 +42,34 @@ class BedrockLLM(LLM):
 
     def __init__(
         self,
-        model_id: str,
+        model_id: str | list[str],
         region: str,
         *args,
         params: Optional[dict[str, Any]] = None,
         read_timeout: Optional[int] = None,
+        response_cache: Optional[ResponseCache] = None,
+        prompt_prefix: Optional[str] = None,
+        use_converse: Optional[bool] = None,
+        max_output_tokens: Optional[int] = None,
+        stop: Optional[list[str]] = None,
+        stop_when_json_complete: bool = False,
         **kwargs,
     ):
+        """LangChain adapter of `BedrockTextGenerator`, see its parameters."""
         super().__init__(*args, **kwargs)
-        self.__model_id = model_id
-        self.__region = region
         self.__params = params
-        self.__read_timeout = read_timeout
+        self.__generator = BedrockTextGenerator(
+            model_id=model_id,
+            region=region,
+            params=params,
+            read_timeout=read_timeout,
+            response_cache=response_cache,
+            prompt_prefix=prompt_prefix,
+            use_converse=use_converse,
+            max_output_tokens=max_output_tokens,
+            stop=stop,
+            stop_when_json_complete=stop_when_json_complete,
+        )
 
     def _call(
         self,
@@ -59,44 +78,87 @@ class BedrockLLM(LLM):
         run_manager: Optional[CallbackManagerForLLMRun] = None,
         **kwargs: Any,
     ) -> str:
-        logger.info(
-            f"Calling Bedrock model ({self.__model_id}) with a prompt of {len(prompt)} characters (~{ceil(len(prompt)/4)} tokens)."
-        )
-        t0 = perf_counter()
-        if stop is not None:
-            raise ValueError("stop kwargs are not permitted.")
-        response = BedrockWrapper(
-            region=self.__region, read_timeout=self.__read_timeout
-        ).invoke_model(
-            self.__model_id,
-            prompt,
-            params=self.__params,
-        )
-        logger.info(
-            f"Bedrock model ({self.__model_id}) call took {perf_counter() - t0:.2f} seconds."
-        )
-        answer = None
-        if "generation" in response:
-            answer = response["generation"]
-        elif "outputs" in response:
-            answer = response["outputs"][0]["text"]
-        elif "content" in response:
-            answer = response["content"][0]["text"]
-        else:
-            raise NotImplementedError(f"Unexpected response: {response}")
-        if answer is None:
-            raise ValueError(f"Failed to extract answer from response: {response}")
-        return answer
+        return self.__generator.generate(prompt, stop=stop)
+
+    async def _acall(
+        self,
+        prompt: str,
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> str:
+        return await self.__generator.agenerate(prompt, stop=stop)
+
+    def _stream(
+        self,
+        prompt: str,
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[GenerationChunk]:
+        for text in self.__generator.stream(prompt, stop):
+            chunk = GenerationChunk(text=text)
+            if run_manager:
+                run_manager.on_llm_new_token(text, chunk=chunk)
+            yield chunk
+
+    async def _astream(
+        self,
+        prompt: str,
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[GenerationChunk]:
+        # boto3 is blocking: each chunk is read in the Bedrock executor so the
+        # event loop stays free while waiting for tokens.
+        executor = BedrockExecutor()
+        texts = await executor.run(self.__generator.stream, prompt, stop)
+        done = object()
+        while (text := await executor.run(next, texts, done)) is not done:
+            chunk = GenerationChunk(text=text)
+            if run_manager:
+                await run_manager.on_llm_new_token(text, chunk=chunk)
+            yield chunk
+
+    def forget_answer(self, prompt: str, stop: Optional[List[str]] = None):
+        self.__generator.forget_answer(prompt, stop)
+
+    async def aforget_answer(self, prompt: str, stop: Optional[List[str]] = None):
+        await self.__generator.aforget_answer(prompt, stop)
+
+    @property
+    def generator(self) -> BedrockTextGenerator:
+        return self.__generator
 
     @property
     def model_id(self) -> str:
-        return self.__model_id
+        return self.__generator.model_id
+
+    @property
+    def model_ids(self) -> list[str]:
+        return self.__generator.model_ids
+
+    @property
+    def use_converse(self) -> bool:
+        return self.__generator.use_converse
+
+    @property
+    def response_cache_stats(self) -> Optional[dict[str, Any]]:
+        return self.__generator.response_cache_stats
+
+    @property
+    def usage_stats(self) -> dict[str, Any]:
+        return self.__generator.usage_stats
+
+    @property
+    def routing_stats(self) -> Optional[dict[str, Any]]:
+        return self.__generator.routing_stats
 
     @property
     def _identifying_params(self) -> Dict[str, Any]:
         """Return a dictionary of identifying parameters."""
         return {
-            "model_name": self.__model_id,
+            "model_name": self.__generator.model_id,
             "model_parameters": self.__params,
         }
 
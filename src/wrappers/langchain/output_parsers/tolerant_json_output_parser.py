@@ -0,0 +1,46 @@
+from typing import Any, Optional
+
+from langchain_core.exceptions import OutputParserException
+from langchain_core.output_parsers import BaseOutputParser
+from langchain_core.utils.json import parse_json_markdown
+from pydantic import Extra
+
+from src.wrappers.llm.postprocessing.errors import OutputParsingError
+from src.wrappers.llm.postprocessing.tolerant_json_parser import TolerantJsonParser
+
+
+class TolerantJsonOutputParser(BaseOutputParser[Any]):
+    """LangChain adapter of `TolerantJsonParser`, see its parameters. Its LLM
+    retries avoided are the repaired replies LangChain's JSON parser rejects:
+    it already handles Markdown fences and truncated values."""
+
+    class Config:
+        extra = Extra.allow
+
+    def __init__(
+        self,
+        json_schema: Optional[dict[str, Any]] = None,
+        key_aliases: Optional[dict[str, str]] = None,
+        **kwargs,
+    ):
+        super().__init__(**kwargs)
+        self.__parser = TolerantJsonParser(
+            json_schema, key_aliases, baseline_parse=parse_json_markdown
+        )
+
+    @property
+    def stats(self) -> dict[str, int]:
+        return self.__parser.stats
+
+    def parse(self, text: str) -> Any:
+        try:
+            return self.__parser.parse(text)
+        except OutputParsingError as e:
+            raise OutputParserException(e.msg, llm_output=e.llm_output)
+
+    def get_format_instructions(self) -> str:
+        return "Return a JSON object."
+
+    @property
+    def _type(self) -> str:
+        return "tolerant_json_output_parser"
@@ -1,4 +1,6 @@
 import logging
+from collections import OrderedDict
+from hashlib import sha256
 from pathlib import Path
 from time import perf_counter
 from typing import Optional
@@ -12,6 +14,7 @@ logger = logging.getLogger(__name__)
 
 CHAR_2_TOKENS_FACTOR = 0.25
 TOKENS_RATIO_LAZY_ESTIMATION_THRESHOLD = 0.5
+PREFIX_TOKENS_CACHE_SIZE = 128
 
 
 class AbstractLlmEngine:
@@ -23,6 +26,15 @@ class AbstractLlmEngine:
     def __str__(self) -> str:
         return str(self.type)
 
+    @property
+    def token_count_stats(self) -> dict[str, int]:
+        return {
+            "n_estimated": self.__n_estimated_counts,
+            "n_exact": self.__n_exact_counts,
+            "n_prefix_hits": self.__n_prefix_hits,
+            "n_prefix_misses": self.__n_prefix_misses,
+        }
+
     def __init__(
         self,
         max_input_tokens: Optional[int] = None,
@@ -47,20 +59,30 @@ class AbstractLlmEngine:
             if isinstance(cache_directory, Path)
             else None
         )
+        # Exact token counts of static prompt prefixes, by fingerprint
+        self.__prefix_tokens: OrderedDict[str, int] = OrderedDict()
+        self.__n_estimated_counts = 0
+        self.__n_exact_counts = 0
+        self.__n_prefix_hits = 0
+        self.__n_prefix_misses = 0
 
     def compute(
         self,
         prompt: str,
         max_input_tokens: Optional[int] = None,
+        prompt_prefix: Optional[str] = None,
         **kwargs,
     ) -> str:
+        """`prompt_prefix` is the static start of `prompt` shared across calls
+        (e.g. instructions and few-shot examples), whose token count is then
+        cached."""
         self._execute_text_completion_kwargs = kwargs
         max_input_tokens = max_input_tokens or self.__max_input_tokens
-        n_tokens = self._count_tokens(prompt)
+        n_tokens = self.__compute_input_tokens(prompt, max_input_tokens, prompt_prefix)
         if n_tokens > max_input_tokens:
             raise ExceededMaxLength(
                 n_tokens=n_tokens,
-                max_input_tokens=max_input_tokens,
+                max_tokens=max_input_tokens,
             )
         if n_tokens < self.__min_input_tokens:
             raise ValueError(
@@ -104,6 +126,41 @@ class AbstractLlmEngine:
         return int(len(prompt) * CHAR_2_TOKENS_FACTOR)
 
     # Private:
+    def __compute_input_tokens(
+        self, prompt: str, max_input_tokens: int, prompt_prefix: Optional[str]
+    ) -> int:
+        """Estimated tokens when far enough from both input limits, exact
+        tokens otherwise."""
+        estimate = self._estimate_tokens(prompt)
+        if all(
+            abs(estimate - limit) > TOKENS_RATIO_LAZY_ESTIMATION_THRESHOLD * limit
+            for limit in [max_input_tokens, self.__min_input_tokens]
+        ):
+            self.__n_estimated_counts += 1
+            return estimate
+        self.__n_exact_counts += 1
+        if not prompt_prefix or not prompt.startswith(prompt_prefix):
+            return self._count_tokens(prompt)
+        # Tokens rarely merge across the prefix boundary, which usually ends in
+        # a separator, so the sum is exact or off by one token
+        return self.__count_prefix_tokens(prompt_prefix) + self._count_tokens(
+            prompt[len(prompt_prefix) :]
+        )
+
+    def __count_prefix_tokens(self, prompt_prefix: str) -> int:
+        fingerprint = sha256(prompt_prefix.encode("utf-8")).hexdigest()
+        n_tokens = self.__prefix_tokens.get(fingerprint)
+        if n_tokens is not None:
+            self.__n_prefix_hits += 1
+            self.__prefix_tokens.move_to_end(fingerprint)
+            return n_tokens
+        self.__n_prefix_misses += 1
+        n_tokens = self._count_tokens(prompt_prefix)
+        self.__prefix_tokens[fingerprint] = n_tokens
+        if len(self.__prefix_tokens) > PREFIX_TOKENS_CACHE_SIZE:
+            self.__prefix_tokens.popitem(last=False)
+        return n_tokens
+
     def __execute_model(self, prompt: str) -> str:
         logger.log(
             self.__prompt_log_level, f"{self} - PROMPT: {prompt}"
@@ -1,19 +1,124 @@
+import hashlib
 import logging
+import sqlite3
+import threading
+import time
 from pathlib import Path
-from typing import Callable, Optional
-from uuid import NAMESPACE_URL, uuid5
+from typing import Any, Callable, Optional
+from uuid import NAMESPACE_URL, UUID
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_MAX_ENTRIES = 100_000
+DEFAULT_MAX_SIZE_BYTES = 512 * 1024 * 1024
+# Once a cap is exceeded, least recently used entries are evicted down to this
+# fraction of it, so that eviction does not run on every write
+EVICTION_LOW_WATER_RATIO = 0.9
+# Recency is refreshed at most once per interval, so that hits stay reads
+ACCESS_REFRESH_INTERVAL_S = 60.0
+MIGRATED_DIRECTORY_SUFFIX = ".migrated"
+# ASCII bytes removed from prompts before hashing: all but alphanumerics and
+# spaces. UTF-8 multi-byte sequences never contain ASCII bytes.
+ASCII_NON_ALPHANUMERIC_BYTES = bytes(
+    b for b in range(128) if not (chr(b).isalnum() or chr(b) == " ")
+)
+
+CREATE_TABLES_SQL = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_accessed_at ON entries (accessed_at);
+CREATE INDEX IF NOT EXISTS entries_created_at ON entries (created_at);
+CREATE TABLE IF NOT EXISTS totals (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    n_entries INTEGER NOT NULL,
+    size_bytes INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO totals VALUES (0, 0, 0);
+CREATE TRIGGER IF NOT EXISTS entries_insert AFTER INSERT ON entries BEGIN
+    UPDATE totals SET n_entries = n_entries + 1, size_bytes = size_bytes + new.size;
+END;
+CREATE TRIGGER IF NOT EXISTS entries_delete AFTER DELETE ON entries BEGIN
+    UPDATE totals SET n_entries = n_entries - 1, size_bytes = size_bytes - old.size;
+END;
+CREATE TRIGGER IF NOT EXISTS entries_update AFTER UPDATE OF size ON entries BEGIN
+    UPDATE totals SET size_bytes = size_bytes - old.size + new.size;
+END;
+"""
+UPSERT_SQL = (
+    "INSERT INTO entries (key, value, size, created_at, accessed_at) "
+    "VALUES (?, ?, ?, ?, ?) ON CONFLICT (key) DO UPDATE SET value = excluded.value, "
+    "size = excluded.size, created_at = excluded.created_at, "
+    "accessed_at = excluded.accessed_at"
+)
+EVICT_SQL = """
+DELETE FROM entries WHERE key IN (
+    SELECT key FROM (
+        SELECT
+            key,
+            ROW_NUMBER() OVER (ORDER BY accessed_at DESC) AS n_newer,
+            SUM(size) OVER (ORDER BY accessed_at DESC) AS size_newer
+        FROM entries
+    ) WHERE n_newer > ? OR size_newer > ?
+)
+"""
+
 
 class CacheManager:
+    """Prompt to completion cache, stored in one SQLite file per version.
+
+    WAL mode lets any number of readers, threads or processes, proceed while
+    one of them writes, and every write is an atomic transaction. Entries
+    expire after `ttl_s` seconds, and the least recently used ones are evicted
+    beyond `max_entries` or `max_size_bytes`. A cache directory of the legacy
+    file-per-prompt layout is imported on first use."""
+
+    @property
+    def filepath(self) -> Path:
+        return self.__filepath
+
+    @property
+    def stats(self) -> dict[str, Any]:
+        n_entries, size_bytes = (
+            self.__get_connection()
+            .execute("SELECT n_entries, size_bytes FROM totals")
+            .fetchone()
+        )
+        return {
+            "n_entries": n_entries,
+            "size_bytes": size_bytes,
+            "n_hits": self.__n_hits,
+            "n_misses": self.__n_misses,
+            "n_evictions": self.__n_evictions,
+        }
+
     # Public:
     def __init__(
-        self, base_cache_directory: Path, version_name: str = "undefined"
+        self,
+        base_cache_directory: Path,
+        version_name: str = "undefined",
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        max_size_bytes: int = DEFAULT_MAX_SIZE_BYTES,
+        ttl_s: Optional[float] = None,
     ) -> None:
         self.__base_cache_directory = base_cache_directory
-        self.__cache_directory = self.__base_cache_directory / version_name
-        self.__cache_directory.mkdir(parents=True, exist_ok=True)
+        self.__base_cache_directory.mkdir(parents=True, exist_ok=True)
+        self.__filepath = self.__base_cache_directory / f"{version_name}.sqlite3"
+        self.__max_entries = max_entries
+        self.__max_size_bytes = max_size_bytes
+        self.__ttl_s = ttl_s
+        self.__local = threading.local()
+        self.__n_hits = 0
+        self.__n_misses = 0
+        self.__n_evictions = 0
+        connection = self.__get_connection()
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.executescript(CREATE_TABLES_SQL)
+        self.__migrate_directory(self.__base_cache_directory / version_name)
 
     def get_or_set(self, prompt: str, func: Callable[[], str]) -> str:
         key = self.__prompt2key(prompt)
@@ -35,23 +140,106 @@ class CacheManager:
         return self.get_by_key(self.__prompt2key(prompt))
 
     def get_by_key(self, key: str) -> Optional[str]:
-        cache_file = self.__cache_directory / key
-        if cache_file.exists():
-            return cache_file.read_text()
-        return None
+        now = time.time()
+        connection = self.__get_connection()
+        row = connection.execute(
+            "SELECT value, accessed_at FROM entries WHERE key = ? AND created_at > ?",
+            (key, now - self.__ttl_s if self.__ttl_s else 0.0),
+        ).fetchone()
+        if row is None:
+            self.__n_misses += 1
+            return None
+        self.__n_hits += 1
+        if now - row[1] > ACCESS_REFRESH_INTERVAL_S:
+            with connection:
+                connection.execute(
+                    "UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key)
+                )
+        return row[0]
 
     def set_by_prompt(self, prompt: str, value: str) -> None:
         self.set_by_key(self.__prompt2key(prompt), value)
 
     def set_by_key(self, key: str, value: str) -> None:
-        cache_file = self.__cache_directory / key
-        cache_file.write_text(value)
+        now = time.time()
+        connection = self.__get_connection()
+        with connection:
+            connection.execute(UPSERT_SQL, (key, value, len(value.encode()), now, now))
+            self.__evict(connection, now)
         logger.info(f"Cache set for {key}.")
 
     # Private:
+    def __get_connection(self) -> sqlite3.Connection:
+        # SQLite connections cannot be shared across threads
+        connection = getattr(self.__local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.__filepath, timeout=5.0)
+            # WAL stays consistent on power loss with NORMAL, and commits no
+            # longer wait for a sync
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self.__local.connection = connection
+        return connection
+
+    def __evict(self, connection: sqlite3.Connection, now: float):
+        if self.__ttl_s:
+            expired = connection.execute(
+                "DELETE FROM entries WHERE created_at <= ?", (now - self.__ttl_s,)
+            ).rowcount
+            self.__n_evictions += expired
+        n_entries, size_bytes = connection.execute(
+            "SELECT n_entries, size_bytes FROM totals"
+        ).fetchone()
+        if n_entries <= self.__max_entries and size_bytes <= self.__max_size_bytes:
+            return
+        evicted = connection.execute(
+            EVICT_SQL,
+            (
+                int(self.__max_entries * EVICTION_LOW_WATER_RATIO),
+                int(self.__max_size_bytes * EVICTION_LOW_WATER_RATIO),
+            ),
+        ).rowcount
+        self.__n_evictions += evicted
+        logger.info(f"Evicted {evicted} least recently used entries from cache.")
+
+    def __migrate_directory(self, directory: Path):
+        """Imports the files of the legacy layout, named by key, and renames
+        the directory so that it is only imported once."""
+        if not directory.is_dir():
+            return
+        rows = []
+        for cache_file in directory.iterdir():
+            if not cache_file.is_file():
+                continue
+            value = cache_file.read_text()
+            mtime = cache_file.stat().st_mtime
+            rows.append((cache_file.name, value, len(value.encode()), mtime, mtime))
+        connection = self.__get_connection()
+        with connection:
+            connection.executemany(
+                "INSERT OR IGNORE INTO entries "
+                "(key, value, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+            self.__evict(connection, time.time())
+        try:
+            directory.rename(
+                directory.with_name(directory.name + MIGRATED_DIRECTORY_SUFFIX)
+            )
+        except OSError as e:
+            # Another process may have migrated it concurrently
+            logger.warning(f"Failed to rename migrated cache {directory}: {e}.")
+        logger.info(f"Migrated {len(rows)} cache entries from {directory}.")
+
     def __prompt2key(self, prompt: str) -> str:
-        # remove any non-alphanumeric characters
-        prompt = "".join([c for c in prompt if c.isalnum() or c == " "])
-        # replace any whitespace with a single space
-        prompt = " ".join(prompt.split())
-        return str(uuid5(NAMESPACE_URL, prompt))
+        """Same keys as the legacy per-character normalization (alphanumerics
+        and single spaces, hashed into a UUID5), computed with C-level passes
+        over the prompt."""
+        if not prompt.isascii():
+            for c in set(prompt):
+                if not (c.isascii() or c.isalnum()):
+                    prompt = prompt.replace(c, "")
+        normalized = b" ".join(
+            prompt.encode().translate(None, ASCII_NON_ALPHANUMERIC_BYTES).split()
+        )
+        digest = hashlib.sha1(NAMESPACE_URL.bytes + normalized).digest()
+        return str(UUID(bytes=digest[:16], version=5))
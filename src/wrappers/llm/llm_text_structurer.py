@@ -1,3 +1,5 @@
+from typing import Optional
+
 from text_utils.regex_toolbox import get_first_json
 
 from src.wrappers.llm.llm_engines.errors import FailedExtractingData
@@ -10,8 +12,8 @@ class LlmTextStructurer:
     def __init__(self, model_type: ModelType = ModelType.GPT, **kwargs):
         self.__llm_engine = LlmEnginesFactory.create(model_type, **kwargs)
 
-    def compute(self, prompt: str) -> list | dict:
-        reply = self.__llm_engine.compute(prompt)
+    def compute(self, prompt: str, prompt_prefix: Optional[str] = None) -> list | dict:
+        reply = self.__llm_engine.compute(prompt, prompt_prefix=prompt_prefix)
         data = self.__extract_json_from_reply(reply)
         return data
 
@@ -0,0 +1,136 @@
+import logging
+import threading
+from time import perf_counter
+from typing import Any, Awaitable, Callable, TypeVar
+
+from src.utils.latency_tracker import LatencyTracker
+
+logger = logging.getLogger(__name__)
+
+LATENCY_PERCENTILES = [50, 95, 99]
+
+T = TypeVar("T")
+
+
+class ModelCascade:
+    """Tries a request on a sequence of stages, typically a small model then
+    a large one, and escalates to the next stage only when a stage fails.
+
+    Each stage computes and validates its result, and raises when it is not
+    acceptable. The exception of the last stage is propagated. Stats report
+    the acceptance rate of every stage, the reasons of their rejections, and
+    the end-to-end latency distribution, overall and by accepting stage."""
+
+    @property
+    def stage_names(self) -> list[str]:
+        return self.__stage_names
+
+    @property
+    def stats(self) -> dict[str, Any]:
+        with self.__lock:
+            counts = {name: dict(c) for name, c in self.__counts.items()}
+            rejection_reasons = {
+                name: dict(r) for name, r in self.__rejection_reasons.items()
+            }
+            n_requests = self.__n_requests
+        return {
+            "n_requests": n_requests,
+            "latency": self.__summarize_latencies(self.__latency_tracker),
+            "stages": {
+                name: counts[name]
+                | {
+                    "acceptance_rate": (
+                        counts[name]["n_accepted"] / counts[name]["n_attempts"]
+                        if counts[name]["n_attempts"]
+                        else 0.0
+                    ),
+                    "rejection_reasons": rejection_reasons[name],
+                    "latency": self.__summarize_latencies(
+                        self.__stage_latency_trackers[name]
+                    ),
+                }
+                for name in self.__stage_names
+            },
+        }
+
+    # Public:
+    def __init__(self, stage_names: list[str]):
+        if not stage_names:
+            raise ValueError("At least one stage is required.")
+        self.__stage_names = list(stage_names)
+        self.__lock = threading.Lock()
+        self.__n_requests = 0
+        self.__counts = {
+            name: {"n_attempts": 0, "n_accepted": 0, "n_rejected": 0}
+            for name in self.__stage_names
+        }
+        self.__rejection_reasons: dict[str, dict[str, int]] = {
+            name: {} for name in self.__stage_names
+        }
+        # End-to-end latencies, overall and by the stage that accepted them
+        self.__latency_tracker = LatencyTracker()
+        self.__stage_latency_trackers = {
+            name: LatencyTracker() for name in self.__stage_names
+        }
+
+    def run(self, stages: list[Callable[[], T]]) -> T:
+        """Result of the first of `stages`, one per stage name, that does not
+        raise."""
+        self.__check_stages(stages)
+        t0 = perf_counter()
+        for i, (name, stage) in enumerate(zip(self.__stage_names, stages)):
+            try:
+                result = stage()
+            except Exception as e:
+                self.__reject(name, e, t0, is_last=i == len(stages) - 1)
+                continue
+            self.__accept(name, t0)
+            return result
+
+    async def arun(self, stages: list[Callable[[], Awaitable[T]]]) -> T:
+        self.__check_stages(stages)
+        t0 = perf_counter()
+        for i, (name, stage) in enumerate(zip(self.__stage_names, stages)):
+            try:
+                result = await stage()
+            except Exception as e:
+                self.__reject(name, e, t0, is_last=i == len(stages) - 1)
+                continue
+            self.__accept(name, t0)
+            return result
+
+    # Private:
+    def __check_stages(self, stages: list):
+        if len(stages) != len(self.__stage_names):
+            raise ValueError(
+                f"Expected {len(self.__stage_names)} stages, got {len(stages)}."
+            )
+
+    def __accept(self, name: str, t0: float):
+        latency = perf_counter() - t0
+        with self.__lock:
+            self.__n_requests += 1
+            self.__counts[name]["n_attempts"] += 1
+            self.__counts[name]["n_accepted"] += 1
+        self.__latency_tracker.record(latency)
+        self.__stage_latency_trackers[name].record(latency)
+
+    def __reject(self, name: str, e: Exception, t0: float, is_last: bool):
+        reason = type(e).__name__
+        with self.__lock:
+            self.__counts[name]["n_attempts"] += 1
+            self.__counts[name]["n_rejected"] += 1
+            reasons = self.__rejection_reasons[name]
+            reasons[reason] = reasons.get(reason, 0) + 1
+            if is_last:
+                self.__n_requests += 1
+        if is_last:
+            raise e
+        logger.info(f"Cascade stage {name} rejected ({reason}: {e}). Escalating.")
+
+    @staticmethod
+    def __summarize_latencies(tracker: LatencyTracker) -> dict[str, Any]:
+        return {"n_samples": tracker.n_samples} | {
+            f"p{percentile}_s": tracker.compute_percentile(percentile)
+            for percentile in LATENCY_PERCENTILES
+        }
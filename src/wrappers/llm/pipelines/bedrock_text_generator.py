@@ -0,0 +1,426 @@
+import json
+import logging
+import threading
+from hashlib import blake2b
+from math import ceil
+from time import perf_counter
+from typing import Any, Iterator, Optional
+
+from src.utils.json_toolbox import JsonObjectTracker
+from src.utils.single_flight import SingleFlight
+from src.wrappers.aws.bedrock_executor import BedrockExecutor
+from src.wrappers.aws.bedrock_model import (
+    STOP_SEQUENCES_PARAMS,
+    BedrockWrapper,
+    create_generation_params,
+    get_model_family,
+    supports_prompt_caching,
+)
+from src.wrappers.aws.bedrock_router import BedrockRouter
+from src.wrappers.llm.response_caching.response_cache import ResponseCache
+
+logger = logging.getLogger(__name__)
+
+SINGLE_FLIGHT_NAME = "bedrock-llm"
+
+
+class BedrockTextGenerator:
+    """Text generation with Bedrock models: prompt in, answer out.
+
+    Requests are coalesced while in flight (see `SingleFlight`), optionally
+    cached, and routed across several targets. This is the plain Python core
+    of `BedrockLLM`, without LangChain."""
+
+    @property
+    def model_id(self) -> str:
+        return self.__model_id
+
+    @property
+    def model_ids(self) -> list[str]:
+        return self.__model_ids
+
+    @property
+    def use_converse(self) -> bool:
+        return self.__use_converse
+
+    @property
+    def response_cache_stats(self) -> Optional[dict[str, Any]]:
+        return self.__response_cache.stats if self.__response_cache else None
+
+    @property
+    def usage_stats(self) -> dict[str, Any]:
+        """Token usage reported by Bedrock, and the share of input tokens read
+        from the provider-side prompt cache (Converse calls only)."""
+        with self.__usage_lock:
+            usage = dict(self.__usage)
+        n_input_tokens = (
+            usage["input_tokens"]
+            + usage["cache_read_input_tokens"]
+            + usage["cache_write_input_tokens"]
+        )
+        usage["cache_read_ratio"] = (
+            usage["cache_read_input_tokens"] / n_input_tokens if n_input_tokens else 0.0
+        )
+        return usage
+
+    @property
+    def routing_stats(self) -> Optional[dict[str, Any]]:
+        """Hedging and per-target latency and win rate stats, when routing
+        across several targets."""
+        return self.__router.stats if self.__router else None
+
+    # Public:
+    def __init__(
+        self,
+        model_id: str | list[str],
+        region: str,
+        params: Optional[dict[str, Any]] = None,
+        read_timeout: Optional[int] = None,
+        response_cache: Optional[ResponseCache] = None,
+        prompt_prefix: Optional[str] = None,
+        use_converse: Optional[bool] = None,
+        max_output_tokens: Optional[int] = None,
+        stop: Optional[list[str]] = None,
+        stop_when_json_complete: bool = False,
+    ):
+        """`model_id` may be an ordered list of model ids or inference profiles:
+        requests go to the first one and are hedged to the second one when it
+        is slow (see `BedrockRouter`). Streaming only uses the first one.
+
+        With a `response_cache`, answers are cached by model ids, params and
+        prompt. Streaming calls bypass it.
+
+        With `use_converse`, requests go through the Converse API, and the
+        static `prompt_prefix` that prompts start with is cached provider-side
+        (see `BedrockWrapper.converse`). By default, the Converse API is used
+        when every model supports prompt caching.
+
+        `max_output_tokens` and the default `stop` sequences are mapped onto
+        the parameters of the model family. Stop sequences are also applied
+        client-side, for families without them. With `stop_when_json_complete`,
+        answers end as soon as the first JSON object or array is complete.
+
+        To stop early, `generate` reads the answer from a stream, cut at the
+        first stop sequence or complete JSON value, when the request has no
+        routing and no Converse prompt caching: those keep their full
+        request, truncated client-side. Streamed answers report no usage."""
+        self.__model_ids = [model_id] if isinstance(model_id, str) else model_id
+        self.__model_id = self.__model_ids[0]
+        self.__use_converse = (
+            use_converse
+            if use_converse is not None
+            else all(supports_prompt_caching(m) for m in self.__model_ids)
+        )
+        self.__router = (
+            BedrockRouter(
+                model_ids=tuple(self.__model_ids),
+                region=region,
+                read_timeout=read_timeout,
+                use_converse=self.__use_converse,
+            )
+            if len(self.__model_ids) > 1
+            else None
+        )
+        self.__region = region
+        self.__params = params
+        self.__read_timeout = read_timeout
+        self.__response_cache = response_cache
+        self.__prompt_prefix = prompt_prefix
+        self.__max_output_tokens = max_output_tokens
+        self.__stop = stop
+        self.__stop_when_json_complete = stop_when_json_complete
+        self.__usage_lock = threading.Lock()
+        self.__usage = {
+            "n_calls": 0,
+            "input_tokens": 0,
+            "cache_read_input_tokens": 0,
+            "cache_write_input_tokens": 0,
+            "output_tokens": 0,
+        }
+
+    def generate(self, prompt: str, stop: Optional[list[str]] = None) -> str:
+        """Answer to `prompt`. `stop` overrides the default stop sequences."""
+        logger.info(
+            f"Calling Bedrock model ({self.__model_id}) with a prompt of {len(prompt)} characters (~{ceil(len(prompt)/4)} tokens)."
+        )
+        t0 = perf_counter()
+        stop = stop if stop is not None else self.__stop
+        params = self.__create_params(stop)
+        key = self.__compute_request_key(prompt, params)
+        answer = (
+            self.__response_cache.get_or_compute(
+                key, lambda: self.__compute_answer(key, prompt, params, stop)
+            )
+            if self.__response_cache
+            else self.__compute_answer(key, prompt, params, stop)
+        )
+        logger.info(
+            f"Bedrock model ({self.__model_id}) call took {perf_counter() - t0:.2f} seconds."
+        )
+        return answer
+
+    async def agenerate(self, prompt: str, stop: Optional[list[str]] = None) -> str:
+        logger.info(
+            f"Calling Bedrock model ({self.__model_id}) asynchronously with a prompt of {len(prompt)} characters (~{ceil(len(prompt)/4)} tokens)."
+        )
+        t0 = perf_counter()
+        stop = stop if stop is not None else self.__stop
+        params = self.__create_params(stop)
+        key = self.__compute_request_key(prompt, params)
+        answer = (
+            await self.__response_cache.aget_or_compute(
+                key, lambda: self.__acompute_answer(key, prompt, params, stop)
+            )
+            if self.__response_cache
+            else await self.__acompute_answer(key, prompt, params, stop)
+        )
+        logger.info(
+            f"Bedrock model ({self.__model_id}) call took {perf_counter() - t0:.2f} seconds."
+        )
+        return answer
+
+    def stream(self, prompt: str, stop: Optional[list[str]] = None) -> Iterator[str]:
+        """Answer texts as they are generated, from the first model id only.
+        Bypasses the response cache."""
+        logger.info(
+            f"Streaming Bedrock model ({self.__model_id}) with a prompt of {len(prompt)} characters (~{ceil(len(prompt)/4)} tokens)."
+        )
+        t0 = perf_counter()
+        stop = stop if stop is not None else self.__stop
+        texts = self.__get_wrapper().invoke_model_with_response_stream(
+            self.__model_id,
+            prompt,
+            params=self.__create_params(stop),
+        )
+        return self.__log_stream(self.__cut_stream(texts, stop), t0)
+
+    def forget_answer(self, prompt: str, stop: Optional[list[str]] = None):
+        """Drops the cached answer to `prompt`, e.g. after it failed to parse,
+        so that a retry calls the model again instead of replaying it."""
+        if self.__response_cache:
+            self.__response_cache.delete(
+                self.__compute_prompt_request_key(prompt, stop)
+            )
+
+    async def aforget_answer(self, prompt: str, stop: Optional[list[str]] = None):
+        if self.__response_cache:
+            await self.__response_cache.adelete(
+                self.__compute_prompt_request_key(prompt, stop)
+            )
+
+    # Private:
+    def __create_params(self, stop: Optional[list[str]]) -> dict[str, Any]:
+        # Explicit params take precedence over the generation budget
+        return create_generation_params(
+            self.__model_id, max_tokens=self.__max_output_tokens, stop_sequences=stop
+        ) | (self.__params or {})
+
+    def __compute_prompt_request_key(
+        self, prompt: str, stop: Optional[list[str]]
+    ) -> str:
+        stop = stop if stop is not None else self.__stop
+        return self.__compute_request_key(prompt, self.__create_params(stop))
+
+    def __compute_answer(
+        self, key: str, prompt: str, params: dict[str, Any], stop: Optional[list[str]]
+    ) -> str:
+        # Identical prompts already in flight share their Bedrock call
+        if self.__shall_stop_early(stop):
+            return SingleFlight(SINGLE_FLIGHT_NAME).run(
+                key, self.__stream_answer, prompt, params, stop
+            )
+        response = SingleFlight(SINGLE_FLIGHT_NAME).run(
+            key, self.__invoke_model, prompt, params
+        )
+        return self.__truncate_at_stop(self.__extract_answer(response), stop)
+
+    async def __acompute_answer(
+        self, key: str, prompt: str, params: dict[str, Any], stop: Optional[list[str]]
+    ) -> str:
+        if self.__shall_stop_early(stop):
+            # The stream is read in a worker thread, not in the event loop
+            return await SingleFlight(SINGLE_FLIGHT_NAME).arun(
+                key, BedrockExecutor().run, self.__stream_answer, prompt, params, stop
+            )
+        response = await SingleFlight(SINGLE_FLIGHT_NAME).arun(
+            key, self.__ainvoke_model, prompt, params
+        )
+        return self.__truncate_at_stop(self.__extract_answer(response), stop)
+
+    def __shall_stop_early(self, stop: Optional[list[str]]) -> bool:
+        """Whether reading the answer from a stream can end it before the model
+        does: on a complete JSON value, or on stop sequences the model family
+        does not take."""
+        if self.__router is not None or self.__use_converse:
+            return False
+        return self.__stop_when_json_complete or bool(
+            stop and get_model_family(self.__model_id) not in STOP_SEQUENCES_PARAMS
+        )
+
+    def __stream_answer(
+        self, prompt: str, params: dict[str, Any], stop: Optional[list[str]]
+    ) -> str:
+        texts = self.__get_wrapper().invoke_model_with_response_stream(
+            self.__model_id, prompt, params=params
+        )
+        return "".join(self.__cut_stream(texts, stop))
+
+    def __invoke_model(self, prompt: str, params: dict[str, Any]) -> dict:
+        if self.__router is not None:
+            response, model_id = self.__router.invoke_model(
+                prompt, params=params, prompt_prefix=self.__prompt_prefix
+            )
+            logger.info(f"Bedrock request answered by {model_id}.")
+        elif self.__use_converse:
+            response = self.__get_wrapper().converse(
+                self.__model_id,
+                prompt,
+                params=params,
+                prompt_prefix=self.__prompt_prefix,
+            )
+        else:
+            response = self.__get_wrapper().invoke_model(
+                self.__model_id, prompt, params=params
+            )
+        self.__record_usage(response)
+        return response
+
+    async def __ainvoke_model(self, prompt: str, params: dict[str, Any]) -> dict:
+        if self.__router is not None:
+            response, model_id = await self.__router.ainvoke_model(
+                prompt, params=params, prompt_prefix=self.__prompt_prefix
+            )
+            logger.info(f"Bedrock request answered by {model_id}.")
+        elif self.__use_converse:
+            response = await self.__get_wrapper().aconverse(
+                self.__model_id,
+                prompt,
+                params=params,
+                prompt_prefix=self.__prompt_prefix,
+            )
+        else:
+            response = await self.__get_wrapper().ainvoke_model(
+                self.__model_id, prompt, params=params
+            )
+        self.__record_usage(response)
+        return response
+
+    def __get_wrapper(self) -> BedrockWrapper:
+        return BedrockWrapper(region=self.__region, read_timeout=self.__read_timeout)
+
+    def __record_usage(self, response: dict[str, Any]):
+        usage = response.get("usage")
+        if isinstance(usage, dict) and "inputTokens" in usage:
+            # Converse API
+            n_tokens = {
+                "input_tokens": usage["inputTokens"],
+                "cache_read_input_tokens": usage.get("cacheReadInputTokens", 0),
+                "cache_write_input_tokens": usage.get("cacheWriteInputTokens", 0),
+                "output_tokens": usage.get("outputTokens", 0),
+            }
+        elif isinstance(usage, dict):
+            # Anthropic messages API
+            n_tokens = {
+                "input_tokens": usage.get("input_tokens", 0),
+                "output_tokens": usage.get("output_tokens", 0),
+            }
+        elif "generation_token_count" in response:
+            # Meta Llama
+            n_tokens = {
+                "input_tokens": response.get("prompt_token_count", 0),
+                "output_tokens": response["generation_token_count"],
+            }
+        else:
+            return
+        with self.__usage_lock:
+            self.__usage["n_calls"] += 1
+            for name, value in n_tokens.items():
+                self.__usage[name] += value or 0
+
+    def __compute_request_key(self, prompt: str, params: dict[str, Any]) -> str:
+        parts = [self.__model_ids, params, prompt]
+        if self.__stop_when_json_complete:
+            # Those answers end earlier than the ones to the same request
+            parts.append("stop_when_json_complete")
+        request = json.dumps(parts, sort_keys=True, default=str)
+        return blake2b(request.encode("utf-8"), digest_size=16).hexdigest()
+
+    @staticmethod
+    def __find_stop(text: str, stop: Optional[list[str]]) -> Optional[int]:
+        indices = [i for s in stop or [] if (i := text.find(s)) >= 0]
+        return min(indices) if indices else None
+
+    @staticmethod
+    def __truncate_at_stop(answer: str, stop: Optional[list[str]]) -> str:
+        stop_index = BedrockTextGenerator.__find_stop(answer, stop)
+        return answer if stop_index is None else answer[:stop_index]
+
+    @staticmethod
+    def __extract_answer(response: dict[str, Any]) -> str:
+        answer = None
+        if "generation" in response:
+            answer = response["generation"]
+        elif "outputs" in response:
+            answer = response["outputs"][0]["text"]
+        elif "content" in response:
+            answer = response["content"][0]["text"]
+        elif "output" in response:
+            # Converse API
+            answer = next(
+                (
+                    block["text"]
+                    for block in response["output"]["message"]["content"]
+                    if "text" in block
+                ),
+                None,
+            )
+        else:
+            raise NotImplementedError(f"Unexpected response: {response}")
+        if answer is None:
+            raise ValueError(f"Failed to extract answer from response: {response}")
+        return answer
+
+    def __cut_stream(
+        self, texts: Iterator[str], stop: Optional[list[str]]
+    ) -> Iterator[str]:
+        """Ends the stream at the first stop sequence or, with
+        `stop_when_json_complete`, right after the first JSON value. Closing
+        the underlying stream stops reading the remaining tokens."""
+        tracker = JsonObjectTracker() if self.__stop_when_json_complete else None
+        # Text that may be the start of a stop sequence is held back
+        n_held_back = max((len(s) for s in stop or []), default=1) - 1
+        pending = ""
+        is_stopped = False
+        try:
+            for text in texts:
+                pending += text
+                if (stop_index := self.__find_stop(pending, stop)) is not None:
+                    pending, is_stopped = pending[:stop_index], True
+                n_ready = len(pending) if is_stopped else len(pending) - n_held_back
+                ready, pending = pending[: max(n_ready, 0)], pending[max(n_ready, 0) :]
+                if tracker and ready and (end := tracker.feed(ready)) is not None:
+                    ready, is_stopped = ready[:end], True
+                if ready:
+                    yield ready
+                if is_stopped:
+                    break
+            else:
+                if tracker and pending and (end := tracker.feed(pending)) is not None:
+                    pending = pending[:end]
+                if pending:
+                    yield pending
+        finally:
+            if is_stopped:
+                logger.info(f"Bedrock model ({self.__model_id}) stream stopped early.")
+            getattr(texts, "close", lambda: None)()
+
+    def __log_stream(self, texts: Iterator[str], t0: float) -> Iterator[str]:
+        time_to_first_token = None
+        for text in texts:
+            if time_to_first_token is None:
+                time_to_first_token = perf_counter() - t0
+            yield text
+        logger.info(
+            f"Bedrock model ({self.__model_id}) stream took {perf_counter() - t0:.2f} seconds "
+            f"(first token after {time_to_first_token or 0:.2f} seconds)."
+        )
@@ -0,0 +1,68 @@
+import logging
+from typing import Any, Callable, Generic, Optional, TypeVar
+
+from src.wrappers.llm.pipelines.bedrock_text_generator import BedrockTextGenerator
+from src.wrappers.llm.postprocessing.errors import OutputParsingError
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class LlmPipeline(Generic[T]):
+    """Renders a prompt from inputs, generates its answer, transforms it and
+    parses it, as plain function calls.
+
+    Same steps as a `prompt | llm | transform | parser` LangChain chain,
+    without the runnable machinery (configs, callbacks, tracing) on each call.
+    When parsing fails, the cached answer is forgotten so that a retry calls
+    the model again, and the `OutputParsingError` is raised."""
+
+    @property
+    def generator(self) -> BedrockTextGenerator:
+        return self.__generator
+
+    # Public:
+    def __init__(
+        self,
+        render: Callable[[dict[str, Any]], str],
+        generator: BedrockTextGenerator,
+        parse: Callable[[str], T],
+        transform: Optional[Callable[[str], str]] = None,
+    ):
+        self.__render = render
+        self.__generator = generator
+        self.__parse = parse
+        self.__transform = transform
+
+    def invoke(self, inputs: dict[str, Any]) -> T:
+        prompt = self.__render(inputs)
+        answer = self.__generator.generate(prompt)
+        try:
+            return self.__parse_answer(answer)
+        except OutputParsingError as e:
+            self.__generator.forget_answer(prompt)
+            raise e
+
+    async def ainvoke(self, inputs: dict[str, Any]) -> T:
+        prompt = self.__render(inputs)
+        answer = await self.__generator.agenerate(prompt)
+        try:
+            return self.__parse_answer(answer)
+        except OutputParsingError as e:
+            await self.__generator.aforget_answer(prompt)
+            raise e
+
+    def forget(self, inputs: dict[str, Any]):
+        """Drops the cached answer to the prompt of `inputs`, e.g. after it was
+        parsed but turned out to be wrong."""
+        self.__generator.forget_answer(self.__render(inputs))
+
+    async def aforget(self, inputs: dict[str, Any]):
+        await self.__generator.aforget_answer(self.__render(inputs))
+
+    # Private:
+    def __parse_answer(self, answer: str) -> T:
+        if self.__transform is not None:
+            answer = self.__transform(answer)
+        return self.__parse(answer)
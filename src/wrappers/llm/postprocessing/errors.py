@@ -0,0 +1,5 @@
+class OutputParsingError(Exception):
+    def __init__(self, msg: str = "Failed to parse LLM output", llm_output: str = ""):
+        self.msg = msg
+        self.llm_output = llm_output
+        super().__init__(msg)
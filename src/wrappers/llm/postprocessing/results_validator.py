@@ -1,51 +1,132 @@
 import json
 from datetime import datetime
+from functools import lru_cache
 from pathlib import Path
+from typing import Any, Callable, Optional
 
-from data_structures_utils.dict_toolbox import CaseType, convert_keys_case
-from jsonschema import SchemaError, ValidationError, validate
+from jsonschema import SchemaError, ValidationError
+from jsonschema.exceptions import best_match
+from jsonschema.validators import validator_for
+
+from src.utils.string_toolbox import CaseType, convert_string_case
+
+# Keywords the compiled validator checks. Any other one makes the schema fall
+# back to the jsonschema validator.
+ANNOTATION_KEYWORDS = {
+    "$schema",
+    "$id",
+    "$comment",
+    "title",
+    "description",
+    "default",
+    "examples",
+}
+COMPILED_KEYWORDS = ANNOTATION_KEYWORDS | {
+    "type",
+    "properties",
+    "required",
+    "items",
+    "additionalProperties",
+}
+TYPE_CHECKS: dict[str, Callable[[Any], bool]] = {
+    "object": lambda v: isinstance(v, dict),
+    "array": lambda v: isinstance(v, list),
+    "string": lambda v: isinstance(v, str),
+    "boolean": lambda v: isinstance(v, bool),
+    "null": lambda v: v is None,
+    "number": lambda v: isinstance(v, (int, float)) and not isinstance(v, bool),
+    "integer": lambda v: (isinstance(v, int) and not isinstance(v, bool))
+    or (isinstance(v, float) and v.is_integer()),
+}
+# Exact Python types of each JSON type, checked first as a fast path
+JSON_TYPES_PYTHON_TYPES: dict[str, tuple[type, ...]] = {
+    "object": (dict,),
+    "array": (list,),
+    "string": (str,),
+    "boolean": (bool,),
+    "null": (type(None),),
+    "number": (int, float),
+    "integer": (int,),
+}
+
+# Validates a value and returns it, with the keys of its (nested) objects
+# converted when the flag is set. Raises `InvalidInstance`.
+CompiledSchema = Callable[[Any, bool], Any]
+
+
+class InvalidInstance(Exception):
+    """Raised by compiled schemas. The `ValidationError` is only built then,
+    by the jsonschema validator."""
 
 
 class ResultsValidator:
+    """Validates results against a JSON schema and converts their keys to
+    kebab case.
+
+    The schema is checked and compiled once per schema, and shared across
+    instances. Schemas made of the common keywords (type, properties,
+    required, items, additionalProperties) are compiled into nested checks
+    that validate and convert keys in a single traversal. Others are
+    validated with the jsonschema validator class of their draft."""
+
+    __compiled_schemas: dict[str, tuple[Any, Optional[CompiledSchema]]] = {}
 
     # Public:
     def __init__(
-        self, schema: dict | Path | None, __date_format: str = "%Y-%m-%d"
+        self, schema: dict | Path | None, date_format: str = "%Y-%m-%d"
     ) -> None:
         self.__schema = (
             json.loads(schema.read_text()) if isinstance(schema, Path) else schema
         )
-        self.__date_format = __date_format
+        self.__date_format = date_format
+        self.__schema_error: Optional[SchemaError] = None
+        self.__validator = None
+        self.__compiled_schema: Optional[CompiledSchema] = None
+        if self.__schema is not None:
+            try:
+                self.__validator, self.__compiled_schema = self.__compile_schema(
+                    self.__schema
+                )
+            except SchemaError as e:
+                self.__schema_error = e
 
     def validate(self, results: dict | Exception | None) -> dict | Exception | None:
-        self._results = results
-        if isinstance(self._results, dict):
-            # if len(self._results) == 0:
-            #     return None
-            if self.__schema is not None:
-                self.__ensure_schema()
-            self.__format_data()
-        return self._results
+        if not isinstance(results, dict):
+            return results
+        if self.__schema_error is not None:
+            return self.__schema_error
+        if self.__validator is None:
+            results = convert_keys_to_kebab_case(results)
+        elif self.__compiled_schema is not None:
+            try:
+                results = self.__compiled_schema(results, True)
+            except InvalidInstance:
+                return self.__get_validation_error(results)
+        else:
+            error = self.__get_validation_error(results)
+            if error is not None:
+                return error
+            results = convert_keys_to_kebab_case(results)
+        # !! MAKE GENERAL !!
+        if "date" in results:
+            results["date"] = self.__format_date(results.get("date"))
+        return results
 
     # Private:
-    def __ensure_schema(self) -> None:
-        schema = self.__schema
-        if schema is None:
-            raise ValueError(f"Invalid schema type: {schema}.")
-        if isinstance(self._results, dict):
-            try:
-                validate(instance=self._results, schema=schema)
-            except (SchemaError, ValidationError) as e:
-                self._results = e
-
-    def __format_data(self) -> None:
-        results = self._results
-        if isinstance(results, dict):
-            results = convert_keys_case(results, CaseType.KEBAB, recursive=True)
-            # !! MAKE GENERAL !!
-            if "date" in results:
-                results["date"] = self.__format_date(results.get("date"))
-            self._results = results
+    @classmethod
+    def __compile_schema(cls, schema: dict) -> tuple[Any, Optional[CompiledSchema]]:
+        key = json.dumps(schema, sort_keys=True)
+        if key not in cls.__compiled_schemas:
+            validator_class = validator_for(schema)
+            validator_class.check_schema(schema)
+            cls.__compiled_schemas[key] = (
+                validator_class(schema),
+                compile_schema(schema),
+            )
+        return cls.__compiled_schemas[key]
+
+    def __get_validation_error(self, results: dict) -> Optional[ValidationError]:
+        return best_match(self.__validator.iter_errors(results))
 
     def __format_date(self, date) -> datetime | Exception | None:
         if date is None:
@@ -55,3 +136,86 @@ class ResultsValidator:
         else:
             date = TypeError(f'Invalid date type "{type(date)}". Must be a string.')
         return date
+
+
+@lru_cache(maxsize=4096)
+def convert_key_to_kebab_case(key: str) -> str:
+    return convert_string_case(key, CaseType.KEBAB)
+
+
+def convert_keys_to_kebab_case(d: dict) -> dict:
+    """Same as `convert_keys_case(d, CaseType.KEBAB, recursive=True)`, with
+    converted keys memoized."""
+    return {
+        convert_key_to_kebab_case(k): (
+            convert_keys_to_kebab_case(v) if isinstance(v, dict) else v
+        )
+        for k, v in d.items()
+    }
+
+
+def compile_schema(schema: dict | bool) -> Optional[CompiledSchema]:
+    """Nested checks of `schema`, or None if it uses keywords they do not
+    cover. Keys are converted like `convert_keys_to_kebab_case`: in objects
+    nested in objects only, not in objects within arrays."""
+    if schema is True or schema == {}:
+        return lambda value, is_converting: (
+            convert_keys_to_kebab_case(value)
+            if is_converting and isinstance(value, dict)
+            else value
+        )
+    if not isinstance(schema, dict) or not set(schema) <= COMPILED_KEYWORDS:
+        return None
+
+    types = schema.get("type", [])
+    types = [types] if isinstance(types, str) else types
+    if not all(t in TYPE_CHECKS for t in types):
+        return None
+    type_checks = [TYPE_CHECKS[t] for t in types]
+    python_types = {pt for t in types for pt in JSON_TYPES_PYTHON_TYPES[t]}
+
+    properties: dict[str, CompiledSchema] = {}
+    for name, subschema in schema.get("properties", {}).items():
+        properties[name] = compile_schema(subschema)
+        if properties[name] is None:
+            return None
+    required = schema.get("required", [])
+
+    items = None
+    if schema.get("items", True) is not True:
+        items = compile_schema(schema["items"])
+        if items is None:
+            return None
+
+    additional = schema.get("additionalProperties", True)
+    if additional is not False:
+        additional = compile_schema(additional)
+        if additional is None:
+            return None
+
+    def check(value: Any, is_converting: bool) -> Any:
+        if (
+            type_checks
+            and type(value) not in python_types
+            and not any(c(value) for c in type_checks)
+        ):
+            raise InvalidInstance()
+        if isinstance(value, dict):
+            for name in required:
+                if name not in value:
+                    raise InvalidInstance()
+            converted = {} if is_converting else None
+            for k, v in value.items():
+                subcheck = properties.get(k, additional)
+                if subcheck is False:
+                    raise InvalidInstance()
+                v = subcheck(v, is_converting)
+                if is_converting:
+                    converted[convert_key_to_kebab_case(k)] = v
+            return converted if is_converting else value
+        if isinstance(value, list) and items is not None:
+            for item in value:
+                items(item, False)
+        return value
+
+    return check
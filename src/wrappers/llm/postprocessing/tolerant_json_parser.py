@@ -0,0 +1,97 @@
+import logging
+import threading
+from typing import Any, Callable, Optional
+
+from jsonschema import Draft7Validator
+
+from src.utils.json_toolbox import parse_json_tolerantly
+
+from .errors import OutputParsingError
+
+logger = logging.getLogger(__name__)
+
+JSON_SCHEMA_ROOT_TYPES = ["object", "array"]
+
+
+class TolerantJsonParser:
+    """JSON parser that repairs malformed LLM replies (see `repair_json`)
+    instead of failing, so that they need no new LLM call.
+
+    With a `json_schema`, parsed values are validated against it, and only its
+    root type is extracted from the reply. `key_aliases` renames the top-level
+    keys models tend to use instead of the schema ones before validation.
+    `baseline_parse` is the stricter parser the replies went through before:
+    only the repaired replies it rejects count as LLM retries avoided."""
+
+    @property
+    def stats(self) -> dict[str, int]:
+        """Parsing outcomes. Without a `baseline_parse`, no repaired reply is
+        known to be an LLM retry avoided."""
+        with self.__lock:
+            return dict(self.__stats)
+
+    # Public:
+    def __init__(
+        self,
+        json_schema: Optional[dict[str, Any]] = None,
+        key_aliases: Optional[dict[str, str]] = None,
+        baseline_parse: Optional[Callable[[str], Any]] = None,
+    ):
+        self.__validator = Draft7Validator(json_schema) if json_schema else None
+        root_type = (json_schema or {}).get("type")
+        self.__root_type = root_type if root_type in JSON_SCHEMA_ROOT_TYPES else None
+        self.__key_aliases = key_aliases or {}
+        self.__baseline_parse = baseline_parse
+        self.__lock = threading.Lock()
+        self.__stats = {
+            "n_parsed": 0,
+            "n_repaired": 0,
+            "n_unrepairable": 0,
+            "n_invalid": 0,
+            "n_retries_avoided": 0,
+        }
+
+    def parse(self, text: str) -> Any:
+        try:
+            value, is_repaired = parse_json_tolerantly(text, root=self.__root_type)
+        except ValueError as e:
+            self.__count("n_unrepairable")
+            raise OutputParsingError(
+                f"Failed to parse or repair JSON output: {e}", llm_output=text
+            )
+        if isinstance(value, dict) and self.__key_aliases:
+            value = self.__rename_keys(value)
+        if self.__validator is not None:
+            error = next(self.__validator.iter_errors(value), None)
+            if error is not None:
+                self.__count("n_invalid")
+                raise OutputParsingError(
+                    f"JSON output does not match the schema: {error.message}",
+                    llm_output=text,
+                )
+        self.__count("n_repaired" if is_repaired else "n_parsed")
+        if is_repaired and self.__is_rejected_by_baseline(text):
+            self.__count("n_retries_avoided")
+        if is_repaired:
+            logger.info(f"Repaired malformed JSON output of {len(text)} characters.")
+        return value
+
+    # Private:
+    def __rename_keys(self, value: dict[str, Any]) -> dict[str, Any]:
+        for alias, key in self.__key_aliases.items():
+            if alias in value and key not in value:
+                value[key] = value.pop(alias)
+        return value
+
+    def __is_rejected_by_baseline(self, text: str) -> bool:
+        if self.__baseline_parse is None:
+            return False
+        try:
+            self.__baseline_parse(text)
+        except Exception:
+            return True
+        return False
+
+    def __count(self, name: str):
+        with self.__lock:
+            self.__stats[name] += 1
@@ -0,0 +1,4 @@
+class InvalidStaticPrefixPromptError(Exception):
+    def __init__(self, msg: str = "Failed to render static prompt prefix"):
+        self.msg = msg
+        super().__init__(msg)
@@ -0,0 +1,84 @@
+import logging
+from typing import Optional
+
+from src.utils.bm25_toolbox import Bm25Index, tokenize
+from src.utils.language_toolbox import detect_language, remove_stopwords
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_EXAMPLES = 6
+DEFAULT_MIN_EXAMPLES = 3
+LANGUAGE_MATCH_BOOST = 1.5
+
+
+class ExampleSelector:
+    """Selects the few-shot examples most similar to a query with BM25.
+
+    Examples tagged with the query's language get their score boosted, and the
+    best of them is always kept so the model sees at least one example written
+    in the language it has to answer in. Selected examples are returned in
+    their original order."""
+
+    @property
+    def n_examples(self) -> int:
+        return len(self.__examples_sizes)
+
+    # Public:
+    def __init__(
+        self,
+        examples_texts: list[str],
+        examples_sizes: list[int],
+        examples_languages: Optional[list[Optional[str]]] = None,
+        max_examples: int = DEFAULT_MAX_EXAMPLES,
+        max_size: Optional[int] = None,
+        min_examples: int = DEFAULT_MIN_EXAMPLES,
+    ):
+        """`examples_sizes` and `max_size` share the same unit (e.g. estimated
+        tokens of the rendered examples)."""
+        self.__examples_sizes = examples_sizes
+        self.__examples_languages = examples_languages or [None] * len(examples_sizes)
+        self.__max_examples = max_examples
+        self.__max_size = max_size
+        self.__min_examples = min(min_examples, max_examples)
+        self.__index = Bm25Index(
+            [remove_stopwords(tokenize(text)) for text in examples_texts]
+        )
+
+    def compute(self, query: str) -> list[int]:
+        """Indices of the selected examples."""
+        language = detect_language(query)
+        scores = self.__index.compute_scores(remove_stopwords(tokenize(query)))
+        scores = [
+            score * LANGUAGE_MATCH_BOOST if example_language == language else score
+            for score, example_language in zip(scores, self.__examples_languages)
+        ]
+        ranking = sorted(
+            range(self.n_examples),
+            key=lambda i: (-scores[i], self.__examples_languages[i] != language, i),
+        )
+
+        same_language = [i for i in ranking if self.__examples_languages[i] == language]
+        if same_language:
+            ranking.remove(same_language[0])
+            ranking.insert(0, same_language[0])
+
+        selected = []
+        size = 0
+        for i in ranking:
+            if len(selected) >= self.__max_examples:
+                break
+            if scores[i] <= 0 and len(selected) >= self.__min_examples:
+                break
+            if (
+                self.__max_size is not None
+                and selected
+                and size + self.__examples_sizes[i] > self.__max_size
+            ):
+                continue
+            selected.append(i)
+            size += self.__examples_sizes[i]
+
+        logger.debug(
+            f"Selected {len(selected)}/{self.n_examples} examples ({language}): {selected}."
+        )
+        return sorted(selected)
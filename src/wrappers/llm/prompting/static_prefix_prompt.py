@@ -0,0 +1,126 @@
+import logging
+from hashlib import sha256
+from string import Formatter
+from typing import Any, Optional
+
+from src.wrappers.llm.llm_engines.abstract_llm_engine import CHAR_2_TOKENS_FACTOR
+
+from .errors import InvalidStaticPrefixPromptError
+from .example_selector import DEFAULT_MAX_EXAMPLES, ExampleSelector
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_EXAMPLE_SEPARATOR = "\n\n"
+
+
+class StaticPrefixPrompt:
+    """Few-shot prompt whose prefix (instructions plus formatted examples) is
+    rendered once at construction.
+
+    Produces the same text as LangChain's `FewShotPromptTemplate` with the
+    default example separator, but only the suffix is formatted per call.
+    Prefix and suffix use `str.format` escaping (`{{` / `}}`). Example values
+    are inserted verbatim, so they must NOT be escaped.
+
+    When `example_selection_key` is given, only the instructions are static:
+    examples are rendered once and those whose field of the same name is the
+    most similar to that input variable are picked per call (see
+    `ExampleSelector`). The rest of an example, e.g. its SQL or results, plays
+    no part in it. An optional `language` key in an example tags the language
+    it is written in."""
+
+    @property
+    def prefix(self) -> str:
+        return self.__prefix
+
+    @property
+    def fingerprint(self) -> str:
+        """Content hash of the static prefix. Equal prefixes share a fingerprint
+        across processes, which makes it usable as a cache key."""
+        return self.__fingerprint
+
+    @property
+    def input_variables(self) -> list[str]:
+        return self.__input_variables
+
+    # Public:
+    def __init__(
+        self,
+        prefix: str,
+        suffix: str,
+        examples: list[dict[str, Any]],
+        example_formatter: str,
+        example_separator: str = DEFAULT_EXAMPLE_SEPARATOR,
+        example_selection_key: Optional[str] = None,
+        max_examples: int = DEFAULT_MAX_EXAMPLES,
+        max_examples_tokens: Optional[int] = None,
+    ):
+        try:
+            rendered_examples = [example_formatter.format(**e) for e in examples]
+            rendered_prefix = prefix.format()
+        except (KeyError, IndexError, ValueError) as e:
+            raise InvalidStaticPrefixPromptError(
+                f"Failed to render static prompt prefix: {type(e)}-{e}"
+            )
+        self.__suffix = suffix
+        self.__separator = example_separator
+        self.__input_variables = [
+            name for _, name, _, _ in Formatter().parse(suffix) if name
+        ]
+        self.__example_selection_key = example_selection_key
+        self.__rendered_examples = rendered_examples
+        self.__example_selector: Optional[ExampleSelector] = None
+        if example_selection_key is None:
+            self.__prefix = example_separator.join(
+                [p for p in [rendered_prefix, *rendered_examples] if p]
+            )
+        else:
+            if example_selection_key not in self.__input_variables:
+                raise InvalidStaticPrefixPromptError(
+                    f"Example selection key '{example_selection_key}' is not a suffix input variable."
+                )
+            self.__prefix = rendered_prefix
+            self.__example_selector = ExampleSelector(
+                examples_texts=[
+                    str(e.get(example_selection_key, "")) for e in examples
+                ],
+                examples_sizes=[
+                    int(len(e) * CHAR_2_TOKENS_FACTOR) for e in rendered_examples
+                ],
+                examples_languages=[e.get("language") for e in examples],
+                max_examples=max_examples,
+                max_size=max_examples_tokens,
+            )
+        self.__fingerprint = sha256(self.__prefix.encode("utf-8")).hexdigest()
+        logger.debug(
+            f"Rendered static prompt prefix of {len(self.__prefix)} characters ({self.__fingerprint[:12]})."
+        )
+
+    def format(self, **kwargs: Any) -> str:
+        if self.__example_selector is None:
+            return f"{self.__prefix}{self.__separator}{self.format_suffix(**kwargs)}"
+        return self.__separator.join(
+            [
+                p
+                for p in [
+                    self.__prefix,
+                    *self.format_examples(kwargs[self.__example_selection_key]),
+                    self.format_suffix(**kwargs),
+                ]
+                if p
+            ]
+        )
+
+    def format_examples(self, query: str) -> list[str]:
+        """Rendered examples included in the prompt for `query`."""
+        if self.__example_selector is None:
+            return self.__rendered_examples
+        return [
+            self.__rendered_examples[i] for i in self.__example_selector.compute(query)
+        ]
+
+    def format_suffix(self, **kwargs: Any) -> str:
+        return self.__suffix.format(**kwargs)
+
+    def format_inputs(self, inputs: dict[str, Any]) -> str:
+        return self.format(**inputs)
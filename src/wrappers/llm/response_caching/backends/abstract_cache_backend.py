@@ -0,0 +1,25 @@
+from typing import Optional
+
+from src.wrappers.llm.response_caching.dtos import CacheEntryDTO
+
+
+class AbstractCacheBackend:
+    """Key-value storage of cache entries. Entries past their `expires_at` may
+    be dropped by the backend at any time, but freshness is decided by
+    `ResponseCache`, not by the backend."""
+
+    # Public:
+    @property
+    def is_blocking(self) -> bool:
+        """Whether operations do I/O, so async callers must run them off the
+        event loop."""
+        return True
+
+    def get(self, key: str) -> Optional[CacheEntryDTO]:
+        raise NotImplementedError("Abstract method.")
+
+    def set(self, key: str, entry: CacheEntryDTO) -> None:
+        raise NotImplementedError("Abstract method.")
+
+    def delete(self, key: str) -> None:
+        raise NotImplementedError("Abstract method.")
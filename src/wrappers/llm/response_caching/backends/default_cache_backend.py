@@ -0,0 +1,51 @@
+import logging
+from functools import cache
+from pathlib import Path
+from typing import Optional
+
+from src.config.vars_grabber import VariablesGrabber
+from src.wrappers.llm.response_caching.enums import CacheBackendType
+
+from .abstract_cache_backend import AbstractCacheBackend
+from .memory_cache_backend import MemoryCacheBackend
+
+logger = logging.getLogger(__name__)
+
+
+@cache
+def get_default_cache_backend() -> Optional[AbstractCacheBackend]:
+    """Response cache backend of the process, shared by its LLM pipelines.
+
+    Chosen by the LLM_RESPONSE_CACHE_BACKEND variable: "memory" (default),
+    "sqlite" with LLM_RESPONSE_CACHE_SQLITE_FILEPATH, whose directory must
+    exist, "dynamodb" with LLM_RESPONSE_CACHE_DYNAMODB_TABLE, or "none".
+    Misconfigured backends fall back to memory."""
+    name = VariablesGrabber().get("LLM_RESPONSE_CACHE_BACKEND") or "memory"
+    try:
+        backend_type = CacheBackendType(name.lower())
+    except ValueError:
+        logger.warning(f"Unknown LLM response cache backend '{name}'. Using memory.")
+        backend_type = CacheBackendType.MEMORY
+
+    if backend_type is CacheBackendType.NONE:
+        return None
+    if backend_type is CacheBackendType.SQLITE:
+        filepath = VariablesGrabber().get("LLM_RESPONSE_CACHE_SQLITE_FILEPATH")
+        if filepath:
+            # Imported here: only SQLite deployments open a database file
+            from .sqlite_cache_backend import SqliteCacheBackend
+
+            return SqliteCacheBackend(Path(filepath))
+        logger.warning(
+            "LLM_RESPONSE_CACHE_SQLITE_FILEPATH not configured. Using memory."
+        )
+    if backend_type is CacheBackendType.DYNAMODB:
+        table_name = VariablesGrabber().get("LLM_RESPONSE_CACHE_DYNAMODB_TABLE")
+        if table_name:
+            from .dynamodb_cache_backend import DynamoDBCacheBackend
+
+            return DynamoDBCacheBackend(table_name)
+        logger.warning(
+            "LLM_RESPONSE_CACHE_DYNAMODB_TABLE not configured. Using memory."
+        )
+    return MemoryCacheBackend()
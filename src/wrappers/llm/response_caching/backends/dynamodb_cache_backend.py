@@ -0,0 +1,42 @@
+from typing import Optional
+
+from src.wrappers.aws.dynamodb import DynamoDBWrapper
+from src.wrappers.llm.response_caching.dtos import CacheEntryDTO
+
+from .abstract_cache_backend import AbstractCacheBackend
+
+
+class DynamoDBCacheBackend(AbstractCacheBackend):
+    """DynamoDB table shared by every host. The table must have a string
+    partition key named `key`. Enabling DynamoDB TTL on the `expires_at`
+    attribute lets DynamoDB purge expired entries."""
+
+    # Public:
+    def __init__(self, table_name: str, region: Optional[str] = None):
+        self.__table_name = table_name
+        self.__region = region
+
+    def get(self, key: str) -> Optional[CacheEntryDTO]:
+        item = DynamoDBWrapper(region=self.__region).get_item(
+            self.__table_name, {"key": key}
+        )
+        if not item:
+            return None
+        expires_at = item.get("expires_at")
+        return CacheEntryDTO(
+            value=item["value"],
+            created_at=float(item["created_at"]),
+            expires_at=float(expires_at) if expires_at is not None else None,
+        )
+
+    def set(self, key: str, entry: CacheEntryDTO) -> None:
+        item = {"key": key, "value": entry.value, "created_at": entry.created_at}
+        if entry.expires_at is not None:
+            # DynamoDB TTL requires an epoch in seconds as a number
+            item["expires_at"] = int(entry.expires_at)
+        DynamoDBWrapper(region=self.__region).create_item(self.__table_name, item)
+
+    def delete(self, key: str) -> None:
+        DynamoDBWrapper(region=self.__region).delete_item(
+            self.__table_name, {"key": key}
+        )
@@ -0,0 +1,50 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from src.wrappers.llm.response_caching.dtos import CacheEntryDTO
+
+from .abstract_cache_backend import AbstractCacheBackend
+
+DEFAULT_MAX_ENTRIES = 1024
+
+
+class MemoryCacheBackend(AbstractCacheBackend):
+    """In-process LRU, bounded in number of entries."""
+
+    @property
+    def is_blocking(self) -> bool:
+        return False
+
+    @property
+    def n_entries(self) -> int:
+        return len(self.__entries)
+
+    # Public:
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.__max_entries = max_entries
+        self.__entries: OrderedDict[str, CacheEntryDTO] = OrderedDict()
+        self.__lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[CacheEntryDTO]:
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is None:
+                return None
+            if entry.expires_at is not None and entry.expires_at <= time.time():
+                del self.__entries[key]
+                return None
+            self.__entries.move_to_end(key)
+            return entry
+
+    def set(self, key: str, entry: CacheEntryDTO) -> None:
+        with self.__lock:
+            self.__entries[key] = entry
+            self.__entries.move_to_end(key)
+            while len(self.__entries) > self.__max_entries:
+                self.__entries.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self.__lock:
+            self.__entries.pop(key, None)
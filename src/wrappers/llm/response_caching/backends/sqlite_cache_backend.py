@@ -0,0 +1,73 @@
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+from src.utils.metaclasses import DynamicSingleton
+from src.wrappers.llm.response_caching.dtos import CacheEntryDTO
+
+from .abstract_cache_backend import AbstractCacheBackend
+
+# Expired rows are purged every this many writes
+PURGE_INTERVAL = 1000
+
+
+class SqliteCacheBackend(AbstractCacheBackend, metaclass=DynamicSingleton):
+    """Local SQLite file, shared by the workers of one host. WAL mode lets
+    readers proceed while another process writes. The directory of the file
+    must exist."""
+
+    # Public:
+    def __init__(self, filepath: Path):
+        self.__filepath = filepath
+        self.__local = threading.local()
+        self.__n_writes = 0
+        connection = self.__get_connection()
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+            "created_at REAL NOT NULL, expires_at REAL)"
+        )
+
+    def get(self, key: str) -> Optional[CacheEntryDTO]:
+        row = (
+            self.__get_connection()
+            .execute(
+                "SELECT value, created_at, expires_at FROM responses "
+                "WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+                (key, time.time()),
+            )
+            .fetchone()
+        )
+        if row is None:
+            return None
+        return CacheEntryDTO(value=row[0], created_at=row[1], expires_at=row[2])
+
+    def set(self, key: str, entry: CacheEntryDTO) -> None:
+        connection = self.__get_connection()
+        connection.execute(
+            "INSERT OR REPLACE INTO responses (key, value, created_at, expires_at) "
+            "VALUES (?, ?, ?, ?)",
+            (key, entry.value, entry.created_at, entry.expires_at),
+        )
+        self.__n_writes += 1
+        if self.__n_writes % PURGE_INTERVAL == 0:
+            connection.execute(
+                "DELETE FROM responses WHERE expires_at <= ?", (time.time(),)
+            )
+
+    def delete(self, key: str) -> None:
+        self.__get_connection().execute("DELETE FROM responses WHERE key = ?", (key,))
+
+    # Private:
+    def __get_connection(self) -> sqlite3.Connection:
+        # SQLite connections cannot be shared across threads
+        connection = getattr(self.__local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(
+                self.__filepath, timeout=5.0, isolation_level=None
+            )
+            self.__local.connection = connection
+        return connection
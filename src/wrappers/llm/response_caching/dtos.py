@@ -0,0 +1,9 @@
+from typing import Optional
+
+from src.utils.typification.base_dto import BaseDTO
+
+
+class CacheEntryDTO(BaseDTO):
+    value: str
+    created_at: float
+    expires_at: Optional[float] = None
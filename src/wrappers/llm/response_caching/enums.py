@@ -0,0 +1,8 @@
+from src.utils.typification.base_enum import BaseEnum
+
+
+class CacheBackendType(BaseEnum):
+    MEMORY = "memory"
+    SQLITE = "sqlite"
+    DYNAMODB = "dynamodb"
+    NONE = "none"
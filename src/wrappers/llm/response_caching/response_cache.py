@@ -0,0 +1,181 @@
+import asyncio
+import logging
+import threading
+import time
+from typing import Any, Awaitable, Callable, Optional
+
+from src.wrappers.llm.response_caching.backends.abstract_cache_backend import (
+    AbstractCacheBackend,
+)
+from src.wrappers.llm.response_caching.dtos import CacheEntryDTO
+
+logger = logging.getLogger(__name__)
+
+
+class ResponseCache:
+    """LLM response cache of one use case over a pluggable backend.
+
+    Entries are fresh for `ttl_s` seconds. With `stale_ttl_s`, an expired entry
+    is still served for that many extra seconds while a single background
+    call refreshes it (stale-while-revalidate). Backend failures are logged
+    and counted, and never fail the request."""
+
+    @property
+    def namespace(self) -> str:
+        return self.__namespace
+
+    @property
+    def stats(self) -> dict[str, Any]:
+        n_lookups = self.__n_hits + self.__n_stale_hits + self.__n_misses
+        return {
+            "n_hits": self.__n_hits,
+            "n_stale_hits": self.__n_stale_hits,
+            "n_misses": self.__n_misses,
+            "n_revalidations": self.__n_revalidations,
+            "n_errors": self.__n_errors,
+            "hit_rate": (
+                (self.__n_hits + self.__n_stale_hits) / n_lookups if n_lookups else 0.0
+            ),
+        }
+
+    # Public:
+    def __init__(
+        self,
+        backend: AbstractCacheBackend,
+        namespace: str,
+        ttl_s: float,
+        stale_ttl_s: float = 0.0,
+    ):
+        self.__backend = backend
+        self.__namespace = namespace
+        self.__ttl_s = ttl_s
+        self.__stale_ttl_s = stale_ttl_s
+        self.__lock = threading.Lock()
+        self.__revalidating_keys: set[str] = set()
+        self.__revalidation_tasks: set[asyncio.Task] = set()
+        self.__n_hits = 0
+        self.__n_stale_hits = 0
+        self.__n_misses = 0
+        self.__n_revalidations = 0
+        self.__n_errors = 0
+
+    def get_or_compute(self, key: str, compute: Callable[[], str]) -> str:
+        key = f"{self.__namespace}:{key}"
+        entry = self.__get(key)
+        if entry is not None:
+            if not self.__is_fresh(entry) and self.__start_revalidation(key):
+                threading.Thread(
+                    target=self.__revalidate, args=(key, compute), daemon=True
+                ).start()
+            return entry.value
+        value = compute()
+        self.__set(key, value)
+        return value
+
+    async def aget_or_compute(
+        self, key: str, compute: Callable[[], Awaitable[str]]
+    ) -> str:
+        key = f"{self.__namespace}:{key}"
+        entry = await self.__run_backend(self.__get, key)
+        if entry is not None:
+            if not self.__is_fresh(entry) and self.__start_revalidation(key):
+                task = asyncio.create_task(self.__arevalidate(key, compute))
+                # Keeps a reference so that the task is not garbage collected
+                self.__revalidation_tasks.add(task)
+                task.add_done_callback(self.__revalidation_tasks.discard)
+            return entry.value
+        value = await compute()
+        await self.__run_backend(self.__set, key, value)
+        return value
+
+    def delete(self, key: str):
+        """Drops a cached response, e.g. one that turned out to be unusable, so
+        that the next call computes it again."""
+        self.__delete(f"{self.__namespace}:{key}")
+
+    async def adelete(self, key: str):
+        await self.__run_backend(self.__delete, f"{self.__namespace}:{key}")
+
+    # Private:
+    def __get(self, key: str) -> Optional[CacheEntryDTO]:
+        try:
+            entry = self.__backend.get(key)
+        except Exception as e:
+            logger.warning(f"Failed to get cached response {key}: {type(e)}-{e}.")
+            self.__count_error()
+            entry = None
+        is_fresh = entry is not None and self.__is_fresh(entry)
+        with self.__lock:
+            if (
+                entry is None
+                or time.time() >= entry.created_at + self.__ttl_s + self.__stale_ttl_s
+            ):
+                self.__n_misses += 1
+                return None
+            if is_fresh:
+                self.__n_hits += 1
+            else:
+                self.__n_stale_hits += 1
+        logger.info(f"Response cache {'hit' if is_fresh else 'stale hit'} for {key}.")
+        return entry
+
+    def __set(self, key: str, value: str):
+        now = time.time()
+        entry = CacheEntryDTO(
+            value=value,
+            created_at=now,
+            expires_at=now + self.__ttl_s + self.__stale_ttl_s,
+        )
+        try:
+            self.__backend.set(key, entry)
+        except Exception as e:
+            logger.warning(f"Failed to cache response {key}: {type(e)}-{e}.")
+            self.__count_error()
+
+    def __delete(self, key: str):
+        try:
+            self.__backend.delete(key)
+        except Exception as e:
+            logger.warning(f"Failed to delete cached response {key}: {type(e)}-{e}.")
+            self.__count_error()
+            return
+        logger.info(f"Response cache entry {key} deleted.")
+
+    def __count_error(self):
+        with self.__lock:
+            self.__n_errors += 1
+
+    def __is_fresh(self, entry: CacheEntryDTO) -> bool:
+        return time.time() < entry.created_at + self.__ttl_s
+
+    def __start_revalidation(self, key: str) -> bool:
+        with self.__lock:
+            if key in self.__revalidating_keys:
+                return False
+            self.__revalidating_keys.add(key)
+            self.__n_revalidations += 1
+            return True
+
+    def __revalidate(self, key: str, compute: Callable[[], str]):
+        try:
+            self.__set(key, compute())
+        except Exception as e:
+            logger.warning(f"Failed to revalidate response {key}: {type(e)}-{e}.")
+        finally:
+            with self.__lock:
+                self.__revalidating_keys.discard(key)
+
+    async def __arevalidate(self, key: str, compute: Callable[[], Awaitable[str]]):
+        try:
+            value = await compute()
+            await self.__run_backend(self.__set, key, value)
+        except Exception as e:
+            logger.warning(f"Failed to revalidate response {key}: {type(e)}-{e}.")
+        finally:
+            with self.__lock:
+                self.__revalidating_keys.discard(key)
+
+    async def __run_backend(self, function: Callable, *args) -> Any:
+        if not self.__backend.is_blocking:
+            return function(*args)
+        return await asyncio.to_thread(function, *args)
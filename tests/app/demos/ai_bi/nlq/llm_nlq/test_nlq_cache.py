@@ -0,0 +1,128 @@
+import pytest
+
+from src.app.demos.ai_bi.nlq.llm_nlq.dtos import NlqLlmResultsDTO
+from src.app.demos.ai_bi.nlq.llm_nlq.nlq_cache import NlqCache, normalize_nlq
+
+TIMESTAMP = "2026-10-19 10:00:00"
+NEXT_TIMESTAMP = "2026-10-19 11:00:00"
+
+
+def create_results(query: str = "SELECT 1") -> NlqLlmResultsDTO:
+    return NlqLlmResultsDTO(sql_queries=[query], title="Results")
+
+
+def test_normalize_nlq():
+    assert normalize_nlq("What are the top five Products by revenue?") == (
+        ["top", "5", "product", "revenue"],
+        False,
+    )
+    assert normalize_nlq("Los cinco productos con más ingresos") == (
+        ["5", "producto", "mas", "ingreso"],
+        False,
+    )
+    assert normalize_nlq("Sales of last month")[1]
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        "top 5 products by revenue",
+        "Top five products by revenue?",
+        "What are the top 5 products by revenue",
+        "top 5 product by revenue",
+    ],
+)
+def test_rewordings_hit(query):
+    cache = NlqCache()
+    cache.set("Top 5 products by revenue", TIMESTAMP, create_results())
+    assert cache.get(query, TIMESTAMP) == create_results()
+
+
+def test_near_duplicates_hit():
+    cache = NlqCache()
+    cache.set("sales by category and product", TIMESTAMP, create_results())
+    assert cache.get("sales by product and category", TIMESTAMP) == create_results()
+    assert cache.stats["n_similar_hits"] == 1
+    assert cache.get("total sales by category and product", TIMESTAMP) is None
+
+
+@pytest.mark.parametrize(
+    "cached_query, query",
+    [
+        (
+            "Which customers did not place any orders in March 2023",
+            "Which customers did place any orders in March 2023",
+        ),
+        (
+            "Revenue in March 2023 for the highest selling stores",
+            "Revenue in March 2023 for the lowest selling stores",
+        ),
+        ("Orders before 2023", "Orders after 2023"),
+        ("Top 5 stores by revenue", "Bottom 5 stores by revenue"),
+        ("Clientes sin pedidos en 2023", "Clientes con pedidos en 2023"),
+        ("Tiendas con mayor venta", "Tiendas con menor venta"),
+    ],
+)
+def test_opposite_questions_miss(cached_query, query):
+    cache = NlqCache(similarity_threshold=0.5)
+    cache.set(cached_query, TIMESTAMP, create_results())
+    assert cache.get(query, TIMESTAMP) is None
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        "Top 10 products by revenue",
+        "Top 5 products by revenue this year",
+        "Top 5 customers by revenue",
+        "Los 5 productos con más ingresos",
+    ],
+)
+def test_different_questions_miss(query):
+    cache = NlqCache()
+    cache.set("Top 5 products by revenue", TIMESTAMP, create_results())
+    assert cache.get(query, TIMESTAMP) is None
+
+
+def test_date_words_must_match():
+    cache = NlqCache(similarity_threshold=0.5)
+    cache.set("Sales by month", TIMESTAMP, create_results())
+    assert cache.get("Sales by year", TIMESTAMP) is None
+    assert cache.get("sales by months", TIMESTAMP) == create_results()
+
+
+def test_relative_dates_are_keyed_on_timestamp():
+    cache = NlqCache()
+    cache.set("Sales of last month", TIMESTAMP, create_results())
+    cache.set("Sales by region", TIMESTAMP, create_results())
+    assert cache.get("Sales of last month", TIMESTAMP) == create_results()
+    assert cache.get("Sales of last month", NEXT_TIMESTAMP) is None
+    assert cache.get("Sales by region", NEXT_TIMESTAMP) == create_results()
+
+
+def test_results_are_copied():
+    cache = NlqCache()
+    results = create_results()
+    cache.set("Sales by region", TIMESTAMP, results)
+    results.sql_queries.append("SELECT 2")
+    cache.get("Sales by region", TIMESTAMP).sql_queries.append("SELECT 3")
+    assert cache.get("Sales by region", TIMESTAMP) == create_results()
+
+
+def test_delete_drops_near_duplicates():
+    cache = NlqCache()
+    cache.set("Top 5 products by revenue", TIMESTAMP, create_results())
+    cache.delete("top five product by revenue?", TIMESTAMP)
+    assert cache.get("Top 5 products by revenue", TIMESTAMP) is None
+
+
+def test_expired_and_evicted_entries_miss():
+    cache = NlqCache(ttl_s=0)
+    cache.set("Sales by region", TIMESTAMP, create_results())
+    assert cache.get("Sales by region", TIMESTAMP) is None
+
+    cache = NlqCache(max_entries=1)
+    cache.set("Sales by region", TIMESTAMP, create_results())
+    cache.set("Sales by product", TIMESTAMP, create_results())
+    assert cache.get("Sales by region", TIMESTAMP) is None
+    assert cache.stats["n_entries"] == 1
@@ -0,0 +1,164 @@
+from datetime import date, datetime, timezone
+from decimal import Decimal
+
+import pytest
+from src.app.demos.ai_bi.nlq.columnar_rows import (
+    COLUMNAR_BINARY_MEDIA_TYPE,
+    COLUMNAR_JSON_MEDIA_TYPE,
+    ColumnarRowsBuilder,
+    convert_to_rows,
+    decode_columnar_binary,
+    decode_columnar_rows,
+    encode_columnar_binary,
+    negotiate_columnar_media_type,
+)
+from src.app.demos.ai_bi.nlq.dtos import ColumnarRowsDTO, SqlResultDTO
+from src.app.demos.ai_bi.nlq.enums import ColumnType
+
+COLUMNS = ["day", "region", "orders", "amount", "is_open", "updated_at", "note"]
+ROWS = [
+    (
+        date(2025, 1, 1),
+        "north",
+        3,
+        Decimal("10.50"),
+        True,
+        datetime(2025, 1, 1, 12, 30),
+        None,
+    ),
+    (date(2025, 1, 2), "south", None, Decimal("20.00"), False, None, None),
+    (
+        date(1969, 12, 31),
+        "north",
+        -7,
+        None,
+        None,
+        datetime(2025, 1, 2, 8, 0, tzinfo=timezone.utc),
+        None,
+    ),
+]
+
+
+def build(rows: list[tuple], columns: list[str] = COLUMNS, batch_size: int = 2):
+    builder = ColumnarRowsBuilder(columns)
+    for i in range(0, len(rows), batch_size):
+        builder.extend(rows[i : i + batch_size])
+    return builder.build()
+
+
+def test_rows_roundtrip_with_types_and_nulls():
+    columnar_rows = build(ROWS)
+    assert columnar_rows.n_rows == 3
+    assert [c.type for c in columnar_rows.columns] == [
+        ColumnType.DATE,
+        ColumnType.STRING,
+        ColumnType.INTEGER,
+        ColumnType.STRING,
+        ColumnType.BOOLEAN,
+        ColumnType.TIMESTAMP,
+        ColumnType.NULL,
+    ]
+    assert columnar_rows.columns[0].nulls is None
+    assert decode_columnar_rows(columnar_rows) == [
+        [
+            date(2025, 1, 1),
+            "north",
+            3,
+            "10.50",
+            True,
+            datetime(2025, 1, 1, 12, 30),
+            None,
+        ],
+        [date(2025, 1, 2), "south", None, "20.00", False, None, None],
+        [date(1969, 12, 31), "north", -7, None, None, datetime(2025, 1, 2, 8), None],
+    ]
+
+
+def test_strings_are_dictionary_encoded():
+    columnar_rows = build([("north",), ("south",), ("north",), ("north",)], ["r"])
+    assert columnar_rows.columns[0].dictionary == ["north", "south"]
+
+
+def test_integers_are_promoted_to_floats():
+    columnar_rows = build([(1,), (None,), (2.5,), (3,)], ["n"])
+    assert columnar_rows.columns[0].type is ColumnType.FLOAT
+    assert decode_columnar_rows(columnar_rows) == [[1.0], [None], [2.5], [3.0]]
+
+
+@pytest.mark.parametrize(
+    "values",
+    [
+        [1, "a", None, 2],
+        [2**70, 1],
+        [1, 2**70],
+        [{"a": 1}, None],
+        [date(2025, 1, 1), "2025-01-02"],
+    ],
+)
+def test_mixed_types_fall_back_to_json(values):
+    columnar_rows = build([(v,) for v in values], ["v"], batch_size=1)
+    assert columnar_rows.columns[0].type is ColumnType.JSON
+    decoded = [row[0] for row in decode_columnar_rows(columnar_rows)]
+    assert len(decoded) == len(values)
+    assert decoded[0] == (
+        values[0].isoformat() if isinstance(values[0], date) else values[0]
+    )
+
+
+def test_empty_result():
+    columnar_rows = build([], ["a", "b"])
+    assert columnar_rows.n_rows == 0
+    assert decode_columnar_rows(columnar_rows) == []
+
+
+def test_binary_encoding_roundtrip():
+    result = SqlResultDTO(
+        columns=COLUMNS,
+        rows=[],
+        query="SELECT 1",
+        execution_time_ms=1.0,
+        columnar_rows=build(ROWS),
+    )
+    payload = {"message": "ok", "data": {"results": [result.model_dump(mode="json")]}}
+    binary = encode_columnar_binary(payload)
+    # Raw buffers instead of base64 strings in the header
+    assert b'"data":[0,' in binary
+    decoded = decode_columnar_binary(binary)
+    assert decoded == payload
+    columnar_rows = ColumnarRowsDTO.model_validate(
+        decoded["data"]["results"][0]["columnar_rows"]
+    )
+    assert decode_columnar_rows(columnar_rows) == decode_columnar_rows(
+        result.columnar_rows
+    )
+    with pytest.raises(ValueError):
+        decode_columnar_binary(b"{}")
+
+
+def test_convert_to_rows():
+    result = SqlResultDTO(
+        columns=["r"],
+        rows=[],
+        query="SELECT r",
+        execution_time_ms=1.0,
+        columnar_rows=build([("north",), (None,)], ["r"]),
+    )
+    converted = convert_to_rows(result)
+    assert converted.rows == [["north"], [None]]
+    assert converted.columnar_rows is None and result.rows == []
+
+
+@pytest.mark.parametrize(
+    "accept, media_type",
+    [
+        (None, None),
+        ("application/json", None),
+        (f"{COLUMNAR_JSON_MEDIA_TYPE}, application/json", COLUMNAR_JSON_MEDIA_TYPE),
+        (
+            f"application/json, {COLUMNAR_BINARY_MEDIA_TYPE};q=0.9",
+            COLUMNAR_BINARY_MEDIA_TYPE,
+        ),
+    ],
+)
+def test_negotiate_columnar_media_type(accept, media_type):
+    assert negotiate_columnar_media_type(accept) == media_type
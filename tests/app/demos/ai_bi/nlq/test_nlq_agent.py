@@ -0,0 +1,276 @@
+import asyncio
+from concurrent.futures import Future, ThreadPoolExecutor
+from time import perf_counter, sleep
+from typing import Optional
+
+import pytest
+
+from src.app.demos.ai_bi.nlq.dtos import (
+    NlqResultDTO,
+    NlqStreamStartDTO,
+    SqlResultDTO,
+    SqlRowsBatchDTO,
+)
+from src.app.demos.ai_bi.nlq.enums import ResultFormat
+from src.app.demos.ai_bi.nlq.llm_nlq.errors import InvalidLLMResponseFormatError
+from src.app.demos.ai_bi.nlq.llm_nlq.dtos import NlqLlmResultsDTO, NlqRequestDTO
+from src.app.demos.ai_bi.nlq.nlq_agent import AibiNlqAgent
+
+LLM_LATENCY_S = 0.05
+QUERY_LATENCY_S = 0.02
+QUERY = "SELECT region, SUM(amount) AS total_amount FROM sales GROUP BY region"
+# Slowest first, so that results arrive in reverse order
+QUERIES_LATENCIES_S = {
+    "SELECT region, SUM(amount) AS total_amount FROM sales GROUP BY region": 0.06,
+    "SELECT product, SUM(amount) AS total_amount FROM sales GROUP BY product": 0.04,
+    "SELECT month, SUM(amount) AS total_amount FROM sales GROUP BY month": 0.02,
+}
+FAILING_QUERY = "SELECT region, SUM(amount) AS total_amount FROM sale GROUP BY region"
+# Hour in which the results were computed, possibly before the current one
+COMPUTE_TIMESTAMP = "2024-01-01 09:00:00"
+
+
+class StubTextToSQL:
+    def __init__(
+        self,
+        n_failures: int = 0,
+        queries: list[str] = [QUERY],
+        cached_queries: Optional[list[str]] = None,
+    ):
+        self.n_failures = n_failures
+        self.queries = queries
+        # Replayed until forgotten
+        self.cached_queries = cached_queries
+        self.n_calls = 0
+        self.n_in_flight = 0
+        self.max_in_flight = 0
+        self.n_forgotten = 0
+        self.forgotten_timestamps = []
+
+    async def acompute(self, request: NlqRequestDTO) -> NlqLlmResultsDTO:
+        self.n_calls += 1
+        self.n_in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.n_in_flight)
+        try:
+            await asyncio.sleep(LLM_LATENCY_S)
+        finally:
+            self.n_in_flight -= 1
+        if self.n_calls <= self.n_failures:
+            raise ValueError("Unparsable answer")
+        return self.compute(request)
+
+    def compute(self, request: NlqRequestDTO) -> NlqLlmResultsDTO:
+        queries = (
+            self.cached_queries
+            if self.cached_queries and not self.n_forgotten
+            else self.queries
+        )
+        return NlqLlmResultsDTO(
+            sql_queries=queries,
+            title=request.natural_language_query,
+            timestamp=COMPUTE_TIMESTAMP,
+        )
+
+    def forget_results(self, request: NlqRequestDTO, timestamp: Optional[str] = None):
+        self.n_forgotten += 1
+        self.forgotten_timestamps.append(timestamp)
+
+    async def aforget_results(
+        self, request: NlqRequestDTO, timestamp: Optional[str] = None
+    ):
+        self.forget_results(request, timestamp)
+
+
+class StubQueryExecutor:
+    def __init__(self):
+        self.executor = ThreadPoolExecutor(max_workers=4)
+
+    def execute(
+        self, query: str, result_format: ResultFormat = ResultFormat.ROWS
+    ) -> SqlResultDTO:
+        if query == FAILING_QUERY:
+            raise ValueError("Relation sale does not exist")
+        latency_s = QUERIES_LATENCIES_S.get(query, QUERY_LATENCY_S)
+        sleep(latency_s)
+        return self.__create_result(query, latency_s)
+
+    def submit(
+        self, query: str, result_format: ResultFormat = ResultFormat.ROWS
+    ) -> Future:
+        return self.executor.submit(self.execute, query, result_format)
+
+    async def aexecute(
+        self, query: str, result_format: ResultFormat = ResultFormat.ROWS
+    ) -> SqlResultDTO:
+        if query == FAILING_QUERY:
+            raise ValueError("Relation sale does not exist")
+        latency_s = QUERIES_LATENCIES_S.get(query, QUERY_LATENCY_S)
+        await asyncio.sleep(latency_s)
+        return self.__create_result(query, latency_s)
+
+    async def astream(
+        self, query: str, result_format: ResultFormat = ResultFormat.ROWS
+    ):
+        result = await self.aexecute(query)
+        for batch_index in range(2):
+            yield SqlRowsBatchDTO(
+                query=query,
+                columns=result.columns,
+                rows=result.rows,
+                batch_index=batch_index,
+                is_last=batch_index == 1,
+                execution_time_ms=result.execution_time_ms,
+            )
+
+    @staticmethod
+    def __create_result(query: str, latency_s: float) -> SqlResultDTO:
+        return SqlResultDTO(
+            columns=[query.split()[1].rstrip(","), "total_amount"],
+            rows=[["north", 10.0]],
+            query=query,
+            execution_time_ms=latency_s * 1000,
+        )
+
+
+def create_agent(
+    n_failures: int = 0,
+    max_concurrent_requests: int = 8,
+    queries: list[str] = [QUERY],
+    cached_queries: Optional[list[str]] = None,
+):
+    text_to_sql = StubTextToSQL(n_failures, queries, cached_queries)
+    agent = AibiNlqAgent(
+        llm_text_to_sql=text_to_sql,
+        query_executor=StubQueryExecutor(),
+        max_concurrent_requests=max_concurrent_requests,
+    )
+    return agent, text_to_sql
+
+
+def test_acompute_executes_generated_queries():
+    agent, _ = create_agent()
+    result = asyncio.run(agent.acompute("Sales by region"))
+    assert result.title == "Sales by region"
+    assert [r.query for r in result.results] == [QUERY]
+    assert result.results[0].columns_units is not None
+
+
+def test_acompute_retries_failed_generations():
+    agent, text_to_sql = create_agent(n_failures=2)
+    result = asyncio.run(agent.acompute("Sales by region"))
+    assert text_to_sql.n_calls == 3
+    assert len(result.results) == 1
+
+
+def test_acompute_limits_concurrent_requests():
+    agent, text_to_sql = create_agent(max_concurrent_requests=3)
+
+    async def run():
+        return await asyncio.gather(*[agent.acompute(f"q{i}") for i in range(9)])
+
+    t0 = perf_counter()
+    results = asyncio.run(run())
+    assert len(results) == 9
+    assert text_to_sql.max_in_flight == 3
+    # Three waves of requests
+    assert perf_counter() - t0 >= 3 * (LLM_LATENCY_S + QUERY_LATENCY_S)
+
+
+def test_acompute_runs_from_successive_event_loops():
+    agent, text_to_sql = create_agent(max_concurrent_requests=1)
+
+    async def run():
+        return await asyncio.gather(*[agent.acompute(f"q{i}") for i in range(2)])
+
+    # The semaphore is bound to the loop of its first wait
+    assert len(asyncio.run(run())) == 2
+    assert len(asyncio.run(run())) == 2
+    assert text_to_sql.max_in_flight == 1
+
+
+def test_acompute_does_not_block_event_loop():
+    agent, _ = create_agent()
+
+    async def run() -> float:
+        max_lag_s = 0.0
+        task = asyncio.gather(*[agent.acompute(f"q{i}") for i in range(8)])
+        while not task.done():
+            t0 = perf_counter()
+            await asyncio.sleep(0.005)
+            max_lag_s = max(max_lag_s, perf_counter() - t0 - 0.005)
+        await task
+        return max_lag_s
+
+    assert asyncio.run(run()) < LLM_LATENCY_S / 2
+
+
+@pytest.mark.parametrize("is_async", [False, True])
+def test_queries_run_concurrently_and_in_order(is_async):
+    agent, _ = create_agent(queries=list(QUERIES_LATENCIES_S))
+    result = (
+        asyncio.run(agent.acompute("Sales breakdowns"))
+        if is_async
+        else agent.compute("Sales breakdowns")
+    )
+    assert [r.query for r in result.results] == list(QUERIES_LATENCIES_S)
+    assert all(r.columns_units is not None for r in result.results)
+    # Slowest query, not the sum of them
+    slowest_ms = max(QUERIES_LATENCIES_S.values()) * 1000
+    assert slowest_ms <= result.execution_time_ms < 1.5 * slowest_ms
+    assert result.generation_time_ms < result.total_time_ms
+
+
+@pytest.mark.parametrize("is_async", [False, True])
+def test_failed_queries_are_forgotten_before_retrying(is_async):
+    agent, text_to_sql = create_agent(cached_queries=[FAILING_QUERY])
+    result = (
+        asyncio.run(agent.acompute("Sales by region"))
+        if is_async
+        else agent.compute("Sales by region")
+    )
+    assert text_to_sql.n_forgotten == 1
+    # The results are forgotten under the timestamp they were computed for
+    assert text_to_sql.forgotten_timestamps == [COMPUTE_TIMESTAMP]
+    assert [r.query for r in result.results] == [QUERY]
+
+
+def test_astream_yields_batches_of_all_queries():
+    agent, _ = create_agent(queries=list(QUERIES_LATENCIES_S))
+
+    async def collect() -> list:
+        return [event async for event in agent.astream("Sales breakdowns")]
+
+    events = asyncio.run(collect())
+    assert isinstance(events[0], NlqStreamStartDTO)
+    assert events[0].queries == list(QUERIES_LATENCIES_S)
+    batches = events[1:-1]
+    assert len(batches) == 6
+    assert all(isinstance(b, SqlRowsBatchDTO) for b in batches)
+    assert all(b.columns_units is not None for b in batches)
+    # Fastest query first
+    assert batches[0].query_index == 2
+    assert isinstance(events[-1], NlqResultDTO)
+    assert [r.query for r in events[-1].results] == list(QUERIES_LATENCIES_S)
+    assert all(r.rows == [] for r in events[-1].results)
+
+
+@pytest.mark.parametrize("is_async", [False, True])
+def test_exhausted_retries_raise(is_async):
+    agent, _ = create_agent(queries=[FAILING_QUERY])
+    with pytest.raises(InvalidLLMResponseFormatError):
+        if is_async:
+            asyncio.run(agent.acompute("Sales by region"))
+        else:
+            agent.compute("Sales by region")
+
+
+def test_astream_forgets_failed_queries():
+    agent, text_to_sql = create_agent(queries=[QUERY, FAILING_QUERY])
+
+    async def collect() -> list:
+        return [event async for event in agent.astream("Sales by region")]
+
+    with pytest.raises(ValueError):
+        asyncio.run(collect())
+    assert text_to_sql.n_forgotten == 1
+    assert text_to_sql.forgotten_timestamps == [COMPUTE_TIMESTAMP]
@@ -0,0 +1,248 @@
+import asyncio
+from decimal import Decimal
+from typing import Optional
+
+import pytest
+from src.app.demos.ai_bi.nlq import query_executor as query_executor_module
+from src.app.demos.ai_bi.nlq.columnar_rows import decode_columnar_rows
+from src.app.demos.ai_bi.nlq.enums import ResultFormat
+from src.app.demos.ai_bi.nlq.query_executor import (
+    DATA_VERSION_QUERY,
+    AibiQueryExecutor,
+)
+from src.app.demos.ai_bi.nlq.sql_result_cache import SqlResultCache
+from src.app.demos.ai_bi.nlq.dtos import SqlResultDTO
+from src.utils.json_toolbox import make_serializable
+
+QUERY = "SELECT region, SUM(amount) AS total_amount FROM sales GROUP BY region"
+EQUIVALENT_QUERY = (
+    "select Region,  sum(amount) as total_amount -- per region\n"
+    "from SALES group by region;"
+)
+OTHER_QUERY = "SELECT region FROM sales WHERE region = 'North'"
+LARGE_QUERY = "SELECT id, amount FROM sales"
+
+
+class FakeCursor:
+    def __init__(self, database: "FakeDatabase", name: Optional[str] = None):
+        self.database = database
+        self.name = name
+        self.description = None
+        self.rows = []
+
+    def execute(self, query: str):
+        if query == DATA_VERSION_QUERY:
+            self.rows = [(self.database.data_version,)]
+            return
+        self.database.executed_queries.append(query)
+        if query == LARGE_QUERY:
+            self.description = [("id",), ("amount",)]
+            self.rows = [(i, float(i)) for i in range(self.database.n_large_rows)]
+        else:
+            self.description = [("region",), ("total_amount",)]
+            self.rows = [("north", Decimal("10.50")), ("south", Decimal("20.00"))]
+
+    def fetchmany(self, size: int) -> list[tuple]:
+        self.database.fetch_sizes.append(size)
+        rows, self.rows = self.rows[:size], self.rows[size:]
+        return rows
+
+    def fetchone(self) -> tuple:
+        return self.rows[0]
+
+    def close(self):
+        self.database.n_open_cursors -= 1
+
+
+class FakeConnection:
+    def __init__(self, database: "FakeDatabase"):
+        self.database = database
+
+    def cursor(self, name: Optional[str] = None) -> FakeCursor:
+        self.database.n_open_cursors += 1
+        self.database.cursor_names.append(name)
+        return FakeCursor(self.database, name)
+
+    def reset(self):
+        pass
+
+
+class FakeDatabase:
+    """Stands for the psycopg2 connection pool of the demo database."""
+
+    def __init__(self, **kwargs):
+        self.data_version = "v1"
+        self.executed_queries = []
+        self.n_large_rows = 25
+        self.fetch_sizes = []
+        self.cursor_names = []
+        self.n_open_cursors = 0
+        self.n_connections_out = 0
+
+    def getconn(self) -> FakeConnection:
+        self.n_connections_out += 1
+        return FakeConnection(self)
+
+    def putconn(self, connection: FakeConnection):
+        self.n_connections_out -= 1
+
+
+@pytest.fixture
+def database(monkeypatch) -> FakeDatabase:
+    database = FakeDatabase()
+    monkeypatch.setattr(
+        query_executor_module.pool, "ThreadedConnectionPool", lambda **_: database
+    )
+    return database
+
+
+def create_executor(**kwargs) -> AibiQueryExecutor:
+    return AibiQueryExecutor(
+        host="localhost",
+        port=5432,
+        dbname=f"demo-{id(kwargs)}",
+        username="user",
+        password="password",
+        **kwargs,
+    )
+
+
+def test_equivalent_queries_share_cached_results(database):
+    executor = create_executor()
+    result = executor.execute(QUERY)
+    cached = executor.execute(EQUIVALENT_QUERY)
+    assert database.executed_queries == [QUERY]
+    assert not result.is_cached and cached.is_cached
+    assert cached.query == EQUIVALENT_QUERY
+    assert cached.rows == result.rows
+    executor.execute(OTHER_QUERY)
+    assert database.executed_queries == [QUERY, OTHER_QUERY]
+    stats = executor.result_cache_stats
+    assert stats["n_hits"] == 1 and stats["n_misses"] == 2
+    assert stats["size_bytes"] > 0 and stats["data_version"] == "v1"
+
+
+def test_cached_results_are_not_altered_by_callers(database):
+    executor = create_executor()
+    executor.execute(QUERY).columns_units = ["unknown"]
+    assert executor.execute(QUERY).columns_units is None
+
+
+def test_data_version_change_clears_cache(database, monkeypatch):
+    monkeypatch.setattr(query_executor_module, "DATA_VERSION_CHECK_INTERVAL_S", 0.0)
+    executor = create_executor()
+    executor.execute(QUERY)
+    executor.execute(QUERY)
+    database.data_version = "v2"
+    assert not executor.execute(QUERY).is_cached
+    assert len(database.executed_queries) == 2
+    stats = executor.result_cache_stats
+    assert stats["n_invalidations"] == 1 and stats["data_version"] == "v2"
+
+
+def test_cache_can_be_disabled(database):
+    executor = create_executor(result_cache_max_size_bytes=None)
+    executor.execute(QUERY)
+    executor.execute(QUERY)
+    assert len(database.executed_queries) == 2
+    assert executor.result_cache_stats is None
+
+
+def test_result_cache_evicts_least_recently_used_within_budget():
+    def create_result(i: int) -> SqlResultDTO:
+        return SqlResultDTO(
+            columns=["n"], rows=[[i]], query=f"SELECT {i}", execution_time_ms=1.0
+        )
+
+    size_bytes = len(create_result(0).model_dump_json())
+    cache = SqlResultCache(max_size_bytes=3 * size_bytes, ttl_s=None)
+    for i in range(3):
+        cache.set(str(i), create_result(i))
+    assert cache.get("0") is not None
+    cache.set("3", create_result(3))
+    assert cache.get("1") is None
+    assert [cache.get(k) is not None for k in ["0", "2", "3"]] == [True] * 3
+    assert cache.stats["n_evictions"] == 1
+    assert cache.stats["size_bytes"] <= 3 * size_bytes
+
+
+def test_result_cache_expires_entries():
+    cache = SqlResultCache(ttl_s=0.0)
+    cache.set("0", SqlResultDTO(columns=[], rows=[], query="", execution_time_ms=0))
+    assert cache.get("0") is None
+
+
+def test_rows_are_fetched_in_batches_from_a_named_cursor(database):
+    executor = create_executor(fetch_batch_size=10, max_rows=None)
+    result = executor.execute(LARGE_QUERY)
+    assert len(result.rows) == 25 and not result.is_truncated
+    assert result.rows[-1] == [24, 24.0]
+    assert database.fetch_sizes == [10, 10, 10]
+    assert database.cursor_names[-1].startswith("aibi_")
+    assert database.n_open_cursors == 0 and database.n_connections_out == 0
+
+
+@pytest.mark.parametrize(
+    "n_rows, is_truncated", [(19, False), (20, False), (21, True), (100, True)]
+)
+def test_results_are_capped_to_max_rows(database, n_rows, is_truncated):
+    database.n_large_rows = n_rows
+    executor = create_executor(fetch_batch_size=8, max_rows=20)
+    result = executor.execute(LARGE_QUERY)
+    assert len(result.rows) == min(n_rows, 20)
+    assert result.is_truncated == is_truncated
+    # Never more than one row beyond the cap
+    assert sum(database.fetch_sizes) <= 21
+
+
+def test_stream_yields_batches_and_releases_connection(database):
+    executor = create_executor(fetch_batch_size=10, max_rows=20)
+    batches = list(executor.stream(LARGE_QUERY))
+    assert [len(b.rows) for b in batches] == [10, 10]
+    assert [b.batch_index for b in batches] == [0, 1]
+    assert [b.is_last for b in batches] == [False, True]
+    assert batches[-1].is_truncated and batches[0].columns == ["id", "amount"]
+    assert database.n_connections_out == 0
+
+    batches = executor.stream(LARGE_QUERY)
+    next(batches)
+    assert database.n_connections_out == 1
+    batches.close()
+    assert database.n_open_cursors == 0 and database.n_connections_out == 0
+
+
+def test_astream_yields_the_same_batches(database):
+    executor = create_executor(fetch_batch_size=10, max_rows=None)
+
+    async def collect() -> list:
+        return [batch async for batch in executor.astream(LARGE_QUERY)]
+
+    batches = asyncio.run(collect())
+    assert [len(b.rows) for b in batches] == [10, 10, 5]
+    assert database.n_connections_out == 0
+
+
+def test_columnar_results_are_cached_apart_from_rows(database):
+    executor = create_executor()
+    rows_result = executor.execute(QUERY)
+    columnar_result = executor.execute(QUERY, result_format=ResultFormat.COLUMNAR)
+    assert not columnar_result.is_cached and len(database.executed_queries) == 2
+    assert columnar_result.rows == [] and rows_result.columnar_rows is None
+    # Decimals are sent as strings in both result formats
+    assert decode_columnar_rows(columnar_result.columnar_rows) == [
+        ["north", "10.50"],
+        ["south", "20.00"],
+    ]
+    assert make_serializable(rows_result.rows) == [
+        ["north", "10.50"],
+        ["south", "20.00"],
+    ]
+    assert executor.execute(QUERY, result_format=ResultFormat.COLUMNAR).is_cached
+
+
+def test_stream_yields_columnar_batches(database):
+    executor = create_executor(fetch_batch_size=10, max_rows=None)
+    batches = list(executor.stream(LARGE_QUERY, result_format=ResultFormat.COLUMNAR))
+    assert [b.columnar_rows.n_rows for b in batches] == [10, 10, 5]
+    assert all(b.rows == [] for b in batches)
+    assert decode_columnar_rows(batches[-1].columnar_rows)[-1] == [24, 24.0]
@@ -0,0 +1,63 @@
+from pathlib import Path
+
+import pytest
+from src.app.landing_voicechat.highlighting.context_pruning.context_pruner import (
+    ContextPruner,
+)
+from src.app.landing_voicechat.highlighting.section_indexing.section_index import (
+    SectionIndex,
+)
+from src.utils.json_toolbox import load_jsons_in_directory
+from src.wrappers.llm.llm_engines.abstract_llm_engine import CHAR_2_TOKENS_FACTOR
+
+EXAMPLES_DIRECTORY = Path(
+    "src/app/landing_voicechat/highlighting/llm_text_highlighting/prompting/examples"
+)
+SECTION_CONTENT = Path(
+    "src/app/landing/highlightable-content/en/en-selected-projects.txt"
+).read_text()
+
+
+class TestContextPruner:
+    @pytest.fixture
+    def pruner(self):
+        return ContextPruner()
+
+    def test_examples_highlights_recall(self, pruner):
+        """Evaluation over the few-shot examples: the expected highlights must
+        survive the pruning of their section."""
+        examples = load_jsons_in_directory(EXAMPLES_DIRECTORY, encoding="utf-8")
+        n_texts = n_kept_texts = 0
+        for example in examples:
+            section_content = example["section_content"]
+            context = pruner.compute(
+                example["question"], example["answer"], SectionIndex(section_content)
+            )
+            texts = [t for t in example["results"]["texts"] if t in section_content]
+            n_texts += len(texts)
+            n_kept_texts += sum(t in context for t in texts)
+        assert n_kept_texts / n_texts >= 0.95
+
+    def test_compute_respects_budget(self):
+        pruner = ContextPruner(max_paragraphs=2, max_tokens=100)
+        context = pruner.compute(
+            "Which voice assistants did Oriol build?",
+            "He built voice assistants and chatbots.",
+            SectionIndex(SECTION_CONTENT),
+        )
+        assert 0 < len(context) < len(SECTION_CONTENT)
+        paragraphs = context.split("\n\n")
+        assert len(paragraphs) <= 2
+        # A single paragraph may exceed the budget, several may not.
+        assert len(paragraphs) == 1 or len(context) * CHAR_2_TOKENS_FACTOR <= 100
+        positions = [SECTION_CONTENT.index(p) for p in paragraphs]
+        assert positions == sorted(positions)
+
+    def test_compute_without_matches_keeps_content(self):
+        pruner = ContextPruner(max_paragraphs=2, max_tokens=100)
+        context = pruner.compute("zzz", "qqq", SectionIndex(SECTION_CONTENT))
+        assert context == SECTION_CONTENT
+
+    def test_compute_short_section_is_untouched(self, pruner):
+        content = "Short section.\n\nWith two paragraphs."
+        assert pruner.compute("short", "section", SectionIndex(content)) == content
@@ -0,0 +1,45 @@
+import json
+from pathlib import Path
+
+import pytest
+from src.app.landing_voicechat.highlighting.llm_text_highlighting.llm_text_highlighter import (
+    LlmTextHighlighter,
+)
+
+REGION = "us-east-1"
+SMALL_MODEL_ID = "us.meta.llama3-2-1b-instruct-v1:0"
+LARGE_MODEL_ID = "us.meta.llama3-3-70b-instruct-v1:0"
+SECTION_CONTENT = Path(
+    "src/app/landing/highlightable-content/en/en-bio.txt"
+).read_text()
+ALIGNED_TEXT = "Tech Lead & AI Expert"
+UNALIGNED_TEXT = "Astronaut with a passion for deep sea diving"
+
+
+@pytest.mark.parametrize(
+    "small_text,expected_model_ids",
+    [
+        (ALIGNED_TEXT, [SMALL_MODEL_ID]),
+        (UNALIGNED_TEXT, [SMALL_MODEL_ID, LARGE_MODEL_ID]),
+    ],
+)
+def test_cascade_escalates_unaligned_highlights(
+    stub_client, small_text, expected_model_ids
+):
+    client = stub_client(
+        {
+            SMALL_MODEL_ID: json.dumps({"texts": [small_text]}),
+            LARGE_MODEL_ID: json.dumps({"texts": [ALIGNED_TEXT]}),
+        }
+    )
+    highlighter = LlmTextHighlighter(
+        model_id=LARGE_MODEL_ID,
+        small_model_id=SMALL_MODEL_ID,
+        region=REGION,
+        response_cache_ttl_s=None,
+    )
+    results = highlighter.compute("Who are you?", "A tech lead.", SECTION_CONTENT)
+    assert results.texts == [ALIGNED_TEXT]
+    assert client.invoked_model_ids == expected_model_ids
+    stats = highlighter.cascade_stats["stages"]
+    assert stats[SMALL_MODEL_ID]["n_attempts"] >= 1
@@ -0,0 +1,58 @@
+from src.app.landing.enums import LanguageCode, SectionName
+from src.app.landing_voicechat.highlighting.dtos import HighlightedSpanDTO
+from src.app.landing_voicechat.highlighting.precomputed_highlights.precomputed_highlights_store import (
+    PrecomputedHighlightsStore,
+    compute_highlight_key,
+)
+
+SECTION_CONTENT = "Who I Am\n\nI'm a Tech Lead & AI Expert with 7+ years in AI."
+QUESTION = "Who is Oriol?"
+RESPONSE = "Oriol is a Tech Lead and AI expert."
+
+
+def export_artifact(filepath):
+    start = SECTION_CONTENT.index("Tech Lead & AI Expert")
+    end = start + len("Tech Lead & AI Expert")
+    PrecomputedHighlightsStore.export(
+        filepath,
+        [
+            {
+                "section": SectionName.BIO,
+                "language": LanguageCode.EN,
+                "content": SECTION_CONTENT,
+                "highlights": {
+                    compute_highlight_key(QUESTION, RESPONSE): [
+                        HighlightedSpanDTO(
+                            text=SECTION_CONTENT[start:end], start=start, end=end
+                        )
+                    ]
+                },
+            }
+        ],
+        model_id="test-model",
+    )
+
+
+def test_get(tmp_path):
+    filepath = tmp_path / "highlights.json.gz"
+    export_artifact(filepath)
+    store = PrecomputedHighlightsStore(filepath)
+    assert store.n_entries == 1
+    spans = store.get(SECTION_CONTENT, "who is  oriol", RESPONSE.upper())
+    assert spans is not None
+    assert [span.text for span in spans] == ["Tech Lead & AI Expert"]
+
+
+def test_get_miss(tmp_path):
+    filepath = tmp_path / "highlights.json.gz"
+    export_artifact(filepath)
+    store = PrecomputedHighlightsStore(filepath)
+    assert store.get(SECTION_CONTENT, "What does Oriol do?", RESPONSE) is None
+    # Changing the section content invalidates its entries
+    assert store.get(f"{SECTION_CONTENT}\n", QUESTION, RESPONSE) is None
+
+
+def test_missing_artifact(tmp_path):
+    store = PrecomputedHighlightsStore(tmp_path / "missing.json.gz")
+    assert store.n_entries == 0
+    assert store.get(SECTION_CONTENT, QUESTION, RESPONSE) is None
@@ -0,0 +1,73 @@
+from pathlib import Path
+
+import pytest
+from src.app.landing_voicechat.highlighting.section_indexing.section_index import (
+    SectionIndex,
+)
+from src.app.landing_voicechat.highlighting.span_alignment.span_aligner import (
+    SpanAligner,
+)
+
+SECTION_CONTENT = Path(
+    "src/app/landing/highlightable-content/en/en-bio.txt"
+).read_text()
+
+
+class TestSpanAligner:
+    @pytest.fixture
+    def section_index(self):
+        return SectionIndex(SECTION_CONTENT)
+
+    @pytest.fixture
+    def aligner(self):
+        return SpanAligner()
+
+    @pytest.mark.parametrize(
+        "highlight,expected_text",
+        [
+            # Exact fragments
+            ("7+ years in the AI industry", "7+ years in the AI industry"),
+            # Case, whitespace and typographic quotes
+            ("i’m  a COMITTED tech lead", "I'm a comitted Tech Lead"),
+            # Small paraphrases and typos
+            (
+                "building end to end tailor made software solutions powered by AI",
+                "building end-to-end tailor-made software solutions powered by AI",
+            ),
+            ("high technical qualty", "high technical quality"),
+            ("business oriented vision", "business-oriented vision"),
+        ],
+    )
+    def test_compute(self, aligner, section_index, highlight, expected_text):
+        span = aligner.compute(highlight, section_index)
+        assert span is not None
+        assert span.text == expected_text
+        assert SECTION_CONTENT[span.start : span.end] == span.text
+
+    @pytest.mark.parametrize(
+        "highlight",
+        [
+            "",
+            "Kubernetes cluster autoscaling",
+            "The quick brown fox jumps over the lazy dog",
+        ],
+    )
+    def test_compute_not_found(self, aligner, section_index, highlight):
+        assert aligner.compute(highlight, section_index) is None
+
+    def test_section_index_is_cached(self):
+        assert SectionIndex(SECTION_CONTENT) is SectionIndex(SECTION_CONTENT)
+
+    def test_repeated_compute_is_stable(self, aligner, section_index):
+        # Timings are measured by scripts/benchmarks/span_aligner_benchmark.py
+        highlights = [
+            "building end to end tailor made software solutions powered by AI",
+            "high technical qualty",
+            "i’m  a COMITTED tech lead",
+            "Kubernetes cluster autoscaling",
+        ]
+        first_spans = [aligner.compute(h, section_index) for h in highlights]
+        for _ in range(3):
+            assert [aligner.compute(h, section_index) for h in highlights] == (
+                first_spans
+            )
@@ -1,10 +1,16 @@
+import io
 import json
 import os
+from time import sleep
+from typing import Optional
 
 import pytest
+from src.wrappers.aws.bedrock_model import BedrockWrapper
 
 __ENV_FILE = ".env"
 
+BEDROCK_REGION = "us-east-1"
+
 
 def pytest_sessionstart(session):
     """
@@ -33,3 +39,81 @@ def json_file():
         yield {"file": json_file, "content": content}
     finally:
         os.remove(json_file)
+
+
+class StubBedrockClient:
+    """Bedrock runtime client answering with canned generations: the next one
+    of a list (the last one once exhausted), or the one of the invoked model
+    id. Streams yield the generation as a single Llama chunk, or the `chunks`
+    events, whose Llama texts are also the generation by default."""
+
+    @property
+    def prompts(self) -> list[Optional[str]]:
+        return [body.get("prompt") for body in self.bodies]
+
+    def __init__(
+        self,
+        generations: Optional[list[str] | dict[str, str]] = None,
+        chunks: Optional[list[dict]] = None,
+        first_token_delay_s: float = 0.0,
+        token_delay_s: float = 0.0,
+    ):
+        self.generations = (
+            generations
+            if generations is not None
+            else ["".join(c.get("generation", "") for c in chunks or [])]
+        )
+        self.chunks = chunks
+        self.first_token_delay_s = first_token_delay_s
+        self.token_delay_s = token_delay_s
+        self.n_invocations = 0
+        self.n_streamed_chunks = 0
+        self.invoked_model_ids = []
+        self.bodies = []
+
+    def invoke_model(self, **kwargs):
+        generation = self.__invoke(kwargs)
+        sleep(self.token_delay_s)
+        return {
+            "ResponseMetadata": {"HTTPStatusCode": 200},
+            "body": io.BytesIO(json.dumps({"generation": generation}).encode()),
+        }
+
+    def invoke_model_with_response_stream(self, **kwargs):
+        generation = self.__invoke(kwargs)
+        return {
+            "ResponseMetadata": {"HTTPStatusCode": 200},
+            "body": self.__iterate_events(self.chunks or [{"generation": generation}]),
+        }
+
+    def __invoke(self, kwargs: dict) -> str:
+        self.n_invocations += 1
+        self.invoked_model_ids.append(kwargs["modelId"])
+        self.bodies.append(json.loads(kwargs["body"]))
+        if isinstance(self.generations, dict):
+            return self.generations[kwargs["modelId"]]
+        return self.generations[min(self.n_invocations, len(self.generations)) - 1]
+
+    def __iterate_events(self, chunks: list[dict]):
+        n_texts = 0
+        for chunk in chunks:
+            # Only chunks carrying text are delayed, metadata events are not
+            if "generation" in chunk or "delta" in chunk:
+                sleep(self.first_token_delay_s if n_texts == 0 else self.token_delay_s)
+                n_texts += 1
+            self.n_streamed_chunks += 1
+            yield {"chunk": {"bytes": json.dumps(chunk).encode("utf-8")}}
+
+
+@pytest.fixture
+def stub_client(monkeypatch):
+    """Installs a `StubBedrockClient`, created with the given arguments, in
+    the Bedrock wrapper of the tests' region."""
+
+    def install(*args, **kwargs) -> StubBedrockClient:
+        wrapper = BedrockWrapper(region=BEDROCK_REGION, read_timeout=None)
+        client = StubBedrockClient(*args, **kwargs)
+        monkeypatch.setattr(wrapper, "_BedrockWrapper__client", client)
+        return client
+
+    return install
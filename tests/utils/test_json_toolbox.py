@@ -0,0 +1,110 @@
+import json
+import random
+
+import pytest
+from src.utils.json_toolbox import (
+    JsonObjectTracker,
+    parse_json_tolerantly,
+    repair_json,
+)
+
+VALID_REPLIES = [
+    {
+        "sql_queries": ["SELECT name, SUM(amount) FROM sales GROUP BY name"],
+        "title": "Sales",
+    },
+    {"texts": ['It\'s "quoted", with a\nnewline', "C:\\path"], "n": -1.5e3},
+    {"a": [True, False, None, {"b": []}], "c": {}},
+]
+
+# Malformed replies, and the value they should be repaired into
+MALFORMED_REPLIES = [
+    ('Sure! Here is the JSON:\n{"texts": ["a"]}\nHope it helps!', {"texts": ["a"]}),
+    ('```json\n{"texts": ["a"]}\n```', {"texts": ["a"]}),
+    ("{'texts': ['it\\'s', 'say \"hi\"']}", {"texts": ["it's", 'say "hi"']}),
+    ('{"texts": ["a", "b",],}', {"texts": ["a", "b"]}),
+    ('{"texts": ["a" "b"] "n": 1}', {"texts": ["a", "b"], "n": 1}),
+    (
+        "{texts: ['a'], flag: True, other: None}",
+        {"texts": ["a"], "flag": True, "other": None},
+    ),
+    ('{"texts": ["line\nbreak\ttab"]}', {"texts": ["line\nbreak\ttab"]}),
+    ('{"texts": ["a\\d"]}', {"texts": ["a\\d"]}),
+    ('{"texts": ["a"], // comment\n "n": /* inline */ 2}', {"texts": ["a"], "n": 2}),
+    ('{"texts": ["a", "b', {"texts": ["a", "b"]}),
+    ('{"texts": ["a"], "title": ', {"texts": ["a"], "title": None}),
+    ('{"texts": ["a"], "tit', {"texts": ["a"], "tit": None}),
+    ('{"texts": ["a"]}]} {"other": 1}', {"texts": ["a"]}),
+]
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        '{"a": 1}',
+        '```json\n{"a": "}", "b": [1, {"c": "\\"{"}]}',
+        '[{"a": 1}, {"b": "]"}]',
+    ],
+)
+def test_tracker_finds_end_across_chunks(text):
+    tracker = JsonObjectTracker()
+    trailing_text = "\n```\nExample 2: more text {"
+    chunks = [text[i : i + 3] for i in range(0, len(text), 3)] + [trailing_text]
+    consumed = ""
+    for chunk in chunks:
+        end = tracker.feed(chunk)
+        if end is not None:
+            consumed += chunk[:end]
+            break
+        consumed += chunk
+    assert tracker.is_complete
+    assert consumed == text
+
+
+def test_tracker_waits_for_incomplete_json():
+    tracker = JsonObjectTracker()
+    assert tracker.feed('Sure: {"a": [1, 2') is None
+    assert not tracker.is_complete
+
+
+@pytest.mark.parametrize("value", VALID_REPLIES)
+def test_valid_json_is_not_repaired(value):
+    assert parse_json_tolerantly(json.dumps(value)) == (value, False)
+
+
+@pytest.mark.parametrize("text,expected", MALFORMED_REPLIES)
+def test_malformed_json_is_repaired(text, expected):
+    assert parse_json_tolerantly(text, root="object") == (expected, True)
+
+
+def test_root_type_selects_first_value_of_that_type():
+    text = 'Rows [1, 2] then [{"texts": ["a"]}]'
+    assert parse_json_tolerantly(text, root="object")[0] == {"texts": ["a"]}
+    assert parse_json_tolerantly(text, root="array")[0] == [1, 2]
+
+
+def test_text_without_json_is_not_repairable():
+    with pytest.raises(ValueError):
+        parse_json_tolerantly("SELECT 1", root="object")
+
+
+@pytest.mark.parametrize("value", VALID_REPLIES)
+def test_fuzzed_replies_are_repaired_into_json(value):
+    """Truncations, prose around the value and Python style quoting always
+    repair into valid JSON, and into the original value when nothing was
+    lost."""
+    rng = random.Random(0)
+    text = json.dumps(value, indent=rng.choice([None, 2]))
+    for _ in range(200):
+        fuzzed = text[: rng.randint(1, len(text))]
+        is_complete = len(fuzzed) == len(text)
+        if rng.random() < 0.5:
+            fuzzed = f"Here you go:\n```json\n{fuzzed}"
+        if rng.random() < 0.5 and is_complete:
+            fuzzed = f"{fuzzed}\n```\nLet me know if you need anything else."
+        repaired = json.loads(repair_json(fuzzed))
+        assert isinstance(repaired, dict)
+        if is_complete:
+            assert repaired == value
+    python_repr = str(value)
+    assert parse_json_tolerantly(python_repr, root="object")[0] == value
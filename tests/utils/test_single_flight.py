@@ -0,0 +1,99 @@
+import asyncio
+import threading
+from time import sleep
+
+import pytest
+from src.utils.single_flight import SingleFlight
+
+N_CALLERS = 5
+CALL_DURATION_S = 0.05
+
+
+def test_run_collapses_concurrent_calls():
+    single_flight = SingleFlight("test-run")
+    n_executions = 0
+    results = []
+
+    def function(x: int) -> int:
+        nonlocal n_executions
+        n_executions += 1
+        sleep(CALL_DURATION_S)
+        return x * 2
+
+    threads = [
+        threading.Thread(
+            target=lambda: results.append(single_flight.run("key", function, 21))
+        )
+        for _ in range(N_CALLERS)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == [42] * N_CALLERS
+    assert n_executions == 1
+    assert single_flight.n_collapsed_calls == N_CALLERS - 1
+    assert single_flight.n_in_flight == 0
+    # Completed calls are not kept
+    assert single_flight.run("key", function, 1) == 2
+    assert n_executions == 2
+
+
+def test_arun_collapses_concurrent_calls_and_shares_exceptions():
+    single_flight = SingleFlight("test-arun")
+    n_executions = 0
+
+    async def function(key: str) -> str:
+        nonlocal n_executions
+        n_executions += 1
+        await asyncio.sleep(CALL_DURATION_S)
+        if key == "failing":
+            raise ValueError(key)
+        return key
+
+    async def run():
+        return await asyncio.gather(
+            *[single_flight.arun(k, function, k) for k in ["a"] * N_CALLERS],
+            *[single_flight.arun("failing", function, "failing") for _ in range(2)],
+            return_exceptions=True,
+        )
+
+    results = asyncio.run(run())
+    assert results[:N_CALLERS] == ["a"] * N_CALLERS
+    assert all(isinstance(r, ValueError) for r in results[N_CALLERS:])
+    assert n_executions == 2
+    assert single_flight.n_collapsed_calls == N_CALLERS
+
+
+def test_run_propagates_exceptions():
+    single_flight = SingleFlight("test-exception")
+
+    def function():
+        raise RuntimeError("failed")
+
+    with pytest.raises(RuntimeError):
+        single_flight.run("key", function)
+    assert single_flight.n_in_flight == 0
+
+
+def test_cancelled_follower_does_not_cancel_the_call():
+    single_flight = SingleFlight("test-cancelled-follower")
+
+    async def function() -> str:
+        await asyncio.sleep(CALL_DURATION_S)
+        return "result"
+
+    async def run():
+        leader = asyncio.create_task(single_flight.arun("key", function))
+        await asyncio.sleep(0)
+        followers = [
+            asyncio.create_task(single_flight.arun("key", function)) for _ in range(2)
+        ]
+        await asyncio.sleep(0)
+        followers[0].cancel()
+        return await asyncio.gather(leader, *followers, return_exceptions=True)
+
+    leader_result, cancelled_result, follower_result = asyncio.run(run())
+    assert leader_result == follower_result == "result"
+    assert isinstance(cancelled_result, asyncio.CancelledError)
+    assert single_flight.n_in_flight == 0
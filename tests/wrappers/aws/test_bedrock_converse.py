@@ -0,0 +1,109 @@
+import asyncio
+
+import pytest
+from src.wrappers.aws.bedrock_model import BedrockWrapper
+from src.wrappers.langchain.llms.bedrock import BedrockLLM
+
+REGION = "us-east-1"
+CLAUDE = "us.anthropic.claude-3-7-sonnet-20250219-v1:0"
+LLAMA = "us.meta.llama3-3-70b-instruct-v1:0"
+PREFIX = "Instructions and examples.\n" * 200
+SUFFIX = "Question: which product sold the most?"
+
+
+class ConverseBedrockClient:
+    """Reports the prefix as written to the cache on the first call, and as
+    read from it afterwards."""
+
+    def __init__(self):
+        self.requests = []
+
+    def converse(self, **kwargs):
+        self.requests.append(kwargs)
+        content = kwargs["messages"][0]["content"]
+        is_cached = any("cachePoint" in block for block in content)
+        n_prefix_tokens = len(content[0]["text"]) // 4 if is_cached else 0
+        is_first = len(self.requests) == 1
+        return {
+            "ResponseMetadata": {"HTTPStatusCode": 200},
+            "output": {"message": {"role": "assistant", "content": [{"text": "{}"}]}},
+            "stopReason": "end_turn",
+            "usage": {
+                "inputTokens": 10,
+                "outputTokens": 1,
+                "cacheReadInputTokens": 0 if is_first else n_prefix_tokens,
+                "cacheWriteInputTokens": n_prefix_tokens if is_first else 0,
+            },
+        }
+
+
+@pytest.fixture
+def client(monkeypatch) -> ConverseBedrockClient:
+    client = ConverseBedrockClient()
+    wrapper = BedrockWrapper(region=REGION, read_timeout=None)
+    monkeypatch.setattr(wrapper, "_BedrockWrapper__client", client)
+    return client
+
+
+def test_cache_point_follows_prefix(client):
+    BedrockWrapper(region=REGION, read_timeout=None).converse(
+        CLAUDE, PREFIX + SUFFIX, prompt_prefix=PREFIX
+    )
+    assert client.requests[0]["messages"][0]["content"] == [
+        {"text": PREFIX},
+        {"cachePoint": {"type": "default"}},
+        {"text": SUFFIX},
+    ]
+
+
+@pytest.mark.parametrize(
+    "model_id,prompt_prefix",
+    [(LLAMA, PREFIX), (CLAUDE, None), (CLAUDE, "Short prefix. ")],
+    ids=["unsupported model", "no prefix", "short prefix"],
+)
+def test_no_cache_point(client, model_id, prompt_prefix):
+    BedrockWrapper(region=REGION, read_timeout=None).converse(
+        model_id, PREFIX + SUFFIX, prompt_prefix=prompt_prefix
+    )
+    assert client.requests[0]["messages"][0]["content"] == [{"text": PREFIX + SUFFIX}]
+
+
+@pytest.mark.parametrize(
+    "params",
+    [
+        {"max_gen_len": 512, "temperature": 0.1, "top_p": 0.9},
+        {
+            "anthropic_version": "bedrock-2023-05-31",
+            "max_tokens": 512,
+            "temperature": 0.1,
+            "top_p": 0.9,
+        },
+    ],
+)
+def test_params_are_normalized(client, params):
+    BedrockWrapper(region=REGION, read_timeout=None).converse(
+        CLAUDE, SUFFIX, params=params | {"top_k": 5}
+    )
+    request = client.requests[0]
+    assert request["inferenceConfig"] == {
+        "maxTokens": 512,
+        "temperature": 0.1,
+        "topP": 0.9,
+    }
+    assert request["additionalModelRequestFields"] == {"top_k": 5}
+
+
+def test_llm_reports_prompt_cache_usage(client):
+    llm = BedrockLLM(model_id=CLAUDE, region=REGION, prompt_prefix=PREFIX)
+    assert llm.invoke(PREFIX + SUFFIX) == "{}"
+    assert asyncio.run(llm.ainvoke(PREFIX + "Another question?")) == "{}"
+    stats = llm.usage_stats
+    assert stats["n_calls"] == 2
+    assert stats["cache_write_input_tokens"] == len(PREFIX) // 4
+    assert stats["cache_read_input_tokens"] == len(PREFIX) // 4
+    assert stats["cache_read_ratio"] > 0.45
+
+
+def test_llm_uses_converse_only_for_caching_models():
+    assert BedrockLLM(model_id=CLAUDE, region=REGION).use_converse
+    assert not BedrockLLM(model_id=LLAMA, region=REGION).use_converse
@@ -0,0 +1,83 @@
+import time
+
+import pytest
+from botocore.exceptions import ClientError, ReadTimeoutError
+from src.wrappers.aws.bedrock_rate_limiter import BedrockRateLimiter
+from src.wrappers.aws.errors import RateLimitExceededError
+
+
+def create_client_error(code: str, status_code: int = 400) -> ClientError:
+    return ClientError(
+        {
+            "Error": {"Code": code, "Message": code},
+            "ResponseMetadata": {"HTTPStatusCode": status_code},
+        },
+        "InvokeModel",
+    )
+
+
+class FlakyFunction:
+    def __init__(self, errors: list[Exception]):
+        self.errors = errors
+        self.n_calls = 0
+
+    def __call__(self) -> str:
+        self.n_calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return "ok"
+
+
+def test_call_retries_throttling_and_lowers_rate():
+    limiter = BedrockRateLimiter("test-retry", initial_rate=8.0)
+    function = FlakyFunction([create_client_error("ThrottlingException")] * 2)
+    assert limiter.call(function, base_delay_s=0.01) == "ok"
+    assert function.n_calls == 3
+    assert limiter.n_throttles == 2
+    # Decreased once (cooldown), then increased additively by the success
+    assert limiter.rate == pytest.approx(4.5)
+
+
+def test_call_gives_up_after_max_attempts():
+    limiter = BedrockRateLimiter("test-max-attempts")
+    function = FlakyFunction([create_client_error("ThrottlingException")] * 3)
+    with pytest.raises(RateLimitExceededError):
+        limiter.call(function, max_attempts=2, base_delay_s=0.01)
+    assert function.n_calls == 2
+
+
+def test_call_does_not_retry_other_errors():
+    limiter = BedrockRateLimiter("test-other-errors")
+    function = FlakyFunction([create_client_error("ValidationException")])
+    with pytest.raises(ClientError):
+        limiter.call(function)
+    assert function.n_calls == 1
+    assert limiter.n_throttles == 0
+
+
+def test_call_retries_transient_errors_without_lowering_rate():
+    limiter = BedrockRateLimiter("test-transient", initial_rate=8.0)
+    function = FlakyFunction(
+        [
+            create_client_error("ServiceUnavailableException", 503),
+            create_client_error("InternalError", 500),
+            ReadTimeoutError(endpoint_url="https://bedrock"),
+        ]
+    )
+    assert limiter.call(function, base_delay_s=0.01) == "ok"
+    assert function.n_calls == 4
+    assert limiter.n_throttles == 0 and limiter.rate == pytest.approx(8.5)
+
+
+def test_acquire_paces_requests_and_respects_deadline():
+    limiter = BedrockRateLimiter("test-pacing", initial_rate=20.0, burst=1)
+    t0 = time.monotonic()
+    for _ in range(5):
+        limiter.acquire()
+    # The first token comes from the burst, the next 4 at 20 requests/s
+    assert time.monotonic() - t0 >= 4 / 20 * 0.9
+    with pytest.raises(RateLimitExceededError):
+        limiter.acquire(deadline=time.monotonic() + 0.001)
+    limiter.acquire()
+    assert limiter.queue_depth == 0
+    assert BedrockRateLimiter.get_all_stats()["test-pacing"]["n_rejections"] == 1
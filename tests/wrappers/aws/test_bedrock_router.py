@@ -0,0 +1,137 @@
+import asyncio
+import io
+import json
+import logging
+from concurrent.futures import Future
+from time import perf_counter, sleep
+
+import pytest
+from src.wrappers.aws import bedrock_router as bedrock_router_module
+from src.wrappers.aws.bedrock_model import BedrockWrapper
+from src.wrappers.aws.bedrock_router import BedrockRouter
+from src.wrappers.langchain.llms.bedrock import BedrockLLM
+
+REGION = "us-east-1"
+PRIMARY = "us.meta.llama3-3-70b-instruct-v1:0"
+SECONDARY = "meta.llama3-3-70b-instruct-v1:0"
+HEDGE_DELAY_S = 0.05
+
+
+class DelayedBedrockClient:
+    """Answers with the model id after a delay configured per model id."""
+
+    def __init__(self, delays_s: dict[str, float]):
+        self.delays_s = delays_s
+        self.n_invocations = {model_id: 0 for model_id in delays_s}
+        self.n_running = 0
+
+    def invoke_model(self, modelId: str, **kwargs):
+        self.n_invocations[modelId] += 1
+        self.n_running += 1
+        sleep(self.delays_s[modelId])
+        self.n_running -= 1
+        return {
+            "ResponseMetadata": {"HTTPStatusCode": 200},
+            "body": io.BytesIO(json.dumps({"generation": modelId}).encode("utf-8")),
+        }
+
+
+@pytest.fixture
+def stub_client(monkeypatch):
+    clients = []
+
+    def install(delays_s: dict[str, float]) -> DelayedBedrockClient:
+        wrapper = BedrockWrapper(region=REGION, read_timeout=None)
+        client = DelayedBedrockClient(delays_s)
+        monkeypatch.setattr(wrapper, "_BedrockWrapper__client", client)
+        clients.append(client)
+        return client
+
+    yield install
+    # Hedge losers keep running in the background
+    while any(client.n_running for client in clients):
+        sleep(0.01)
+
+
+def test_slow_primary_is_hedged(stub_client):
+    client = stub_client({PRIMARY: 0.5, SECONDARY: 0.01})
+    router = BedrockRouter(
+        model_ids=(PRIMARY, SECONDARY),
+        region=REGION,
+        initial_hedge_delay_s=HEDGE_DELAY_S,
+    )
+    t0 = perf_counter()
+    response, model_id = router.invoke_model("prompt 1")
+    assert perf_counter() - t0 < 0.3
+    assert (response["generation"], model_id) == (SECONDARY, SECONDARY)
+    assert client.n_invocations == {PRIMARY: 1, SECONDARY: 1}
+    stats = router.stats
+    assert stats["n_hedges"] >= 1
+    assert stats["targets"][SECONDARY]["n_wins"] >= 1
+
+
+def test_fast_primary_is_not_hedged(stub_client):
+    client = stub_client({PRIMARY: 0.01, SECONDARY: 0.01})
+    router = BedrockRouter(
+        model_ids=(PRIMARY, SECONDARY),
+        region=REGION,
+        initial_hedge_delay_s=HEDGE_DELAY_S * 2,
+    )
+    _, model_id = router.invoke_model("prompt 2")
+    assert model_id == PRIMARY
+    assert client.n_invocations[SECONDARY] == 0
+
+
+def test_hedge_rate_is_capped(stub_client):
+    client = stub_client({PRIMARY: 0.1, SECONDARY: 0.01})
+    router = BedrockRouter(
+        model_ids=(PRIMARY, SECONDARY),
+        region=REGION,
+        initial_hedge_delay_s=0.01,
+        max_hedge_ratio=0.0,
+    )
+    _, model_id = router.invoke_model("prompt 3")
+    assert model_id == PRIMARY
+    assert client.n_invocations[SECONDARY] == 0
+
+
+def test_bedrock_llm_hedges_async_calls(stub_client):
+    stub_client({PRIMARY: 0.5, SECONDARY: 0.01})
+    llm = BedrockLLM(model_id=[PRIMARY, SECONDARY], region=REGION)
+    llm.generator._BedrockTextGenerator__router = BedrockRouter(
+        model_ids=(PRIMARY, SECONDARY),
+        region=REGION,
+        initial_hedge_delay_s=HEDGE_DELAY_S,
+    )
+    n_wins = llm.routing_stats["targets"][SECONDARY]["n_wins"]
+    t0 = perf_counter()
+    answer = asyncio.run(llm.ainvoke("prompt 4"))
+    assert perf_counter() - t0 < 0.3
+    assert answer == SECONDARY
+    assert llm.routing_stats["targets"][SECONDARY]["n_wins"] == n_wins + 1
+
+
+def test_cancelled_hedge_is_not_recorded(stub_client, monkeypatch):
+    class QueuedExecutor:
+        def submit(self, *args, **kwargs) -> Future:
+            return Future()
+
+    class RecordsHandler(logging.Handler):
+        def __init__(self):
+            super().__init__()
+            self.records = []
+
+        def emit(self, record: logging.LogRecord):
+            self.records.append(record)
+
+    stub_client({})
+    monkeypatch.setattr(bedrock_router_module, "BedrockExecutor", QueuedExecutor)
+    handler = RecordsHandler()
+    logging.getLogger("concurrent.futures").addHandler(handler)
+    try:
+        router = BedrockRouter(model_ids=(PRIMARY, SECONDARY), region=REGION)
+        router._BedrockRouter__submit(SECONDARY, "prompt 5", None, None).cancel()
+    finally:
+        logging.getLogger("concurrent.futures").removeHandler(handler)
+    assert handler.records == []
+    assert router.stats["targets"][SECONDARY]["n_samples"] == 0
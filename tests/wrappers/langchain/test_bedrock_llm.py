@@ -0,0 +1,166 @@
+import asyncio
+from time import perf_counter
+
+import pytest
+from src.wrappers.langchain.llms.bedrock import BedrockLLM
+
+REGION = "us-east-1"
+LLAMA = "us.meta.llama3-3-70b-instruct-v1:0"
+ANTHROPIC = "us.anthropic.claude-3-5-haiku-20241022-v1:0"
+FIRST_TOKEN_DELAY_S = 0.01
+TOKEN_DELAY_S = 0.05
+
+LLAMA_CHUNKS = [{"generation": text} for text in ['{"texts": ', '["a", ', '"b"]}']]
+ANTHROPIC_CHUNKS = [
+    {"type": "message_start", "message": {"usage": {"input_tokens": 10}}},
+    {"type": "content_block_start", "index": 0},
+    *[
+        {"type": "content_block_delta", "delta": {"type": "text_delta", "text": t}}
+        for t in ['{"texts": ', '["a", ', '"b"]}']
+    ],
+    {"type": "content_block_stop", "index": 0},
+    {"type": "message_stop"},
+]
+# The model keeps generating after the JSON object
+RAMBLING_LLAMA_CHUNKS = LLAMA_CHUNKS + [
+    {"generation": text} for text in ["\n\nExample", " 2: ", '{"texts": ', "[]}"]
+]
+
+
+@pytest.fixture
+def stub_chunks_client(stub_client):
+    """Installs a client streaming the given chunks with token delays."""
+    return lambda chunks: stub_client(
+        chunks=chunks,
+        first_token_delay_s=FIRST_TOKEN_DELAY_S,
+        token_delay_s=TOKEN_DELAY_S,
+    )
+
+
+@pytest.mark.parametrize(
+    "model_id,chunks",
+    [
+        ("us.meta.llama3-3-70b-instruct-v1:0", LLAMA_CHUNKS),
+        ("us.anthropic.claude-3-5-haiku-20241022-v1:0", ANTHROPIC_CHUNKS),
+    ],
+)
+def test_stream_time_to_first_token(stub_chunks_client, model_id, chunks):
+    stub_chunks_client(chunks)
+    llm = BedrockLLM(model_id=model_id, region=REGION)
+    t0 = perf_counter()
+    texts = []
+    for text in llm.stream("prompt"):
+        if not texts:
+            time_to_first_token = perf_counter() - t0
+        texts.append(text)
+    total_s = perf_counter() - t0
+    assert "".join(texts) == '{"texts": ["a", "b"]}'
+    assert len(texts) == 3
+    # The first token arrives long before the whole generation
+    assert time_to_first_token < FIRST_TOKEN_DELAY_S + TOKEN_DELAY_S
+    assert total_s >= FIRST_TOKEN_DELAY_S + 2 * TOKEN_DELAY_S
+
+
+def test_astream_time_to_first_token(stub_chunks_client):
+    stub_chunks_client(LLAMA_CHUNKS)
+    llm = BedrockLLM(model_id="us.meta.llama3-3-70b-instruct-v1:0", region=REGION)
+
+    async def consume():
+        t0 = perf_counter()
+        times = []
+        async for _ in llm.astream("prompt"):
+            times.append(perf_counter() - t0)
+        return times
+
+    times = asyncio.run(consume())
+    assert len(times) == 3
+    assert times[0] < FIRST_TOKEN_DELAY_S + TOKEN_DELAY_S
+
+
+def test_ainvoke_does_not_block_loop(stub_chunks_client):
+    stub_chunks_client(LLAMA_CHUNKS)
+    llm = BedrockLLM(model_id="us.meta.llama3-3-70b-instruct-v1:0", region=REGION)
+    n_calls = 10
+
+    async def consume():
+        t0 = perf_counter()
+        answers = await asyncio.gather(
+            *[llm.ainvoke(f"prompt {i}") for i in range(n_calls)]
+        )
+        return answers, perf_counter() - t0
+
+    answers, duration_s = asyncio.run(consume())
+    assert answers == ['{"texts": ["a", "b"]}'] * n_calls
+    # Calls overlap instead of running one after the other
+    assert duration_s < n_calls * TOKEN_DELAY_S / 2
+
+
+def test_identical_prompts_share_one_call(stub_chunks_client):
+    client = stub_chunks_client(LLAMA_CHUNKS)
+    llm = BedrockLLM(model_id="us.meta.llama3-3-70b-instruct-v1:0", region=REGION)
+    n_calls = 5
+
+    async def consume():
+        return await asyncio.gather(
+            *[llm.ainvoke("same prompt") for _ in range(n_calls)],
+            asyncio.to_thread(llm.invoke, "same prompt"),
+        )
+
+    answers = asyncio.run(consume())
+    assert answers == ['{"texts": ["a", "b"]}'] * (n_calls + 1)
+    assert client.n_invocations == 1
+
+
+@pytest.mark.parametrize(
+    "model_id,expected_params",
+    [
+        (LLAMA, {"max_gen_len": 100}),
+        (ANTHROPIC, {"max_tokens": 100, "stop_sequences": ["\nExample"]}),
+    ],
+)
+def test_generation_budget_is_mapped_to_model_family(
+    stub_chunks_client, model_id, expected_params
+):
+    client = stub_chunks_client(LLAMA_CHUNKS)
+    llm = BedrockLLM(
+        model_id=model_id,
+        region=REGION,
+        use_converse=False,
+        max_output_tokens=100,
+        stop=["\nExample"],
+    )
+    llm.invoke("budget prompt")
+    params = {
+        name: value
+        for name, value in client.bodies[0].items()
+        if name not in ["prompt", "messages"]
+    }
+    assert params == expected_params
+
+
+def test_stop_sequences_are_applied_client_side(stub_chunks_client):
+    stub_chunks_client(RAMBLING_LLAMA_CHUNKS)
+    llm = BedrockLLM(model_id=LLAMA, region=REGION, stop=["\n\nExample"])
+    assert llm.invoke("stop prompt") == '{"texts": ["a", "b"]}'
+    assert llm.invoke("stop prompt", stop=["Example"]) == '{"texts": ["a", "b"]}\n\n'
+    assert "".join(llm.stream("stop prompt")) == '{"texts": ["a", "b"]}'
+
+
+def test_stream_ends_when_json_is_complete(stub_chunks_client):
+    client = stub_chunks_client(RAMBLING_LLAMA_CHUNKS)
+    llm = BedrockLLM(model_id=LLAMA, region=REGION, stop_when_json_complete=True)
+    assert "".join(llm.stream("json prompt")) == '{"texts": ["a", "b"]}'
+    # The remaining chunks are not read
+    assert client.n_streamed_chunks == len(LLAMA_CHUNKS)
+
+
+@pytest.mark.parametrize("is_async", [False, True])
+def test_invoke_ends_when_json_is_complete(stub_chunks_client, is_async):
+    client = stub_chunks_client(RAMBLING_LLAMA_CHUNKS)
+    llm = BedrockLLM(model_id=LLAMA, region=REGION, stop_when_json_complete=True)
+    prompt = f"json prompt {is_async}"
+    answer = asyncio.run(llm.ainvoke(prompt)) if is_async else llm.invoke(prompt)
+    assert answer == '{"texts": ["a", "b"]}'
+    # The answer is streamed, and the remaining chunks are not read
+    assert client.n_invocations == 1
+    assert client.n_streamed_chunks == len(LLAMA_CHUNKS)
@@ -0,0 +1,61 @@
+import pytest
+from langchain_core.exceptions import OutputParserException
+from src.wrappers.langchain.llms.bedrock import BedrockLLM
+from src.wrappers.langchain.output_parsers.tolerant_json_output_parser import (
+    TolerantJsonOutputParser,
+)
+from src.wrappers.llm.response_caching.backends.memory_cache_backend import (
+    MemoryCacheBackend,
+)
+from src.wrappers.llm.response_caching.response_cache import ResponseCache
+
+REGION = "us-east-1"
+LLAMA = "us.meta.llama3-3-70b-instruct-v1:0"
+JSON_SCHEMA = {
+    "type": "object",
+    "properties": {"texts": {"type": "array", "items": {"type": "string"}}},
+    "required": ["texts"],
+}
+
+
+def create_llm() -> BedrockLLM:
+    return BedrockLLM(
+        model_id=LLAMA,
+        region=REGION,
+        response_cache=ResponseCache(MemoryCacheBackend(), "test", ttl_s=60),
+    )
+
+
+def test_malformed_reply_is_repaired_without_new_call(stub_client):
+    client = stub_client(["Here it is: {'texts': ['a', 'b',]"])
+    parser = TolerantJsonOutputParser(json_schema=JSON_SCHEMA)
+    assert (create_llm() | parser).invoke("prompt") == {"texts": ["a", "b"]}
+    assert client.n_invocations == 1
+    assert parser.stats["n_retries_avoided"] == 1
+
+
+def test_replies_langchain_parses_are_not_retries_avoided():
+    parser = TolerantJsonOutputParser(json_schema=JSON_SCHEMA)
+    assert parser.parse('```json\n{"texts": ["a", "b"') == {"texts": ["a", "b"]}
+    assert parser.stats["n_repaired"] == 1
+    assert parser.stats["n_retries_avoided"] == 0
+
+
+def test_key_aliases_are_renamed_before_validation():
+    parser = TolerantJsonOutputParser(
+        json_schema=JSON_SCHEMA, key_aliases={"text": "texts"}
+    )
+    assert parser.parse('{"text": ["a"]}') == {"texts": ["a"]}
+    assert parser.stats["n_parsed"] == 1
+
+
+def test_unparsable_reply_is_not_replayed_from_cache(stub_client):
+    client = stub_client(['{"texts": "a"}', '{"texts": ["a"]}'])
+    llm = create_llm()
+    parser = TolerantJsonOutputParser(json_schema=JSON_SCHEMA)
+    with pytest.raises(OutputParserException):
+        parser.parse(llm.invoke("prompt"))
+    assert parser.stats["n_invalid"] == 1
+    llm.forget_answer("prompt")
+    assert parser.parse(llm.invoke("prompt")) == {"texts": ["a"]}
+    assert client.n_invocations == 2
@@ -0,0 +1,55 @@
+import pytest
+from src.wrappers.llm.llm_engines.abstract_llm_engine import AbstractLlmEngine
+from src.wrappers.llm.llm_engines.errors import ExceededMaxLength
+from src.wrappers.llm.llm_engines.model_types import ModelType
+
+
+class WordsEngine(AbstractLlmEngine):
+    """One token per word, i.e. per 5 characters with the words below."""
+
+    @property
+    def type(self) -> ModelType:
+        return ModelType.MOCK
+
+    @property
+    def _max_model_tokens(self) -> int:
+        return 1000
+
+    def _execute_text_completion(self, prompt: str, **kwargs) -> str:
+        return "{}"
+
+    def _count_tokens(self, prompt: str) -> int:
+        self.counted_texts.append(prompt)
+        return len(prompt.split())
+
+
+@pytest.fixture
+def engine() -> WordsEngine:
+    engine = WordsEngine(min_input_tokens=10)
+    engine.counted_texts = []
+    return engine
+
+
+def test_far_from_limits_is_estimated(engine):
+    engine.compute("word " * 300)
+    assert engine.counted_texts == []
+    assert engine.token_count_stats["n_estimated"] == 1
+
+
+def test_close_to_limits_is_counted(engine):
+    with pytest.raises(ExceededMaxLength):
+        engine.compute("word " * 1001)
+    with pytest.raises(ValueError):
+        engine.compute("word " * 9)
+    assert len(engine.counted_texts) == 2
+    assert engine.token_count_stats["n_exact"] == 2
+
+
+def test_prefix_tokens_are_cached(engine):
+    prefix = "word " * 800
+    for tail in ["first question", "second question"]:
+        engine.compute(prefix + tail, prompt_prefix=prefix)
+    assert engine.counted_texts == [prefix, "first question", "second question"]
+    assert engine.token_count_stats["n_prefix_hits"] == 1
+    with pytest.raises(ExceededMaxLength):
+        engine.compute(prefix + "word " * 201, prompt_prefix=prefix)
@@ -0,0 +1,55 @@
+import time
+from uuid import NAMESPACE_URL, uuid5
+
+from src.wrappers.llm.llm_engines.caching.cache_manager import CacheManager
+
+
+def test_get_or_set(tmp_path):
+    cache_manager = CacheManager(tmp_path, version_name="v1")
+    assert cache_manager.get_or_set("Hello, world!", lambda: "reply") == "reply"
+    assert cache_manager.get_or_set("hello world", lambda: "other") == "other"
+    assert cache_manager.get_or_set("Hello  world?", lambda: "other") == "reply"
+    assert cache_manager.stats["n_entries"] == 2
+    assert cache_manager.stats["n_hits"] == 1
+
+
+def test_entries_are_shared_across_instances(tmp_path):
+    CacheManager(tmp_path, version_name="v1").set_by_prompt("prompt", "reply")
+    assert CacheManager(tmp_path, version_name="v1").get_by_prompt("prompt") == "reply"
+    assert CacheManager(tmp_path, version_name="v2").get_by_prompt("prompt") is None
+
+
+def test_entries_expire(tmp_path):
+    cache_manager = CacheManager(tmp_path, ttl_s=0.05)
+    cache_manager.set_by_prompt("prompt", "reply")
+    time.sleep(0.1)
+    assert cache_manager.get_by_prompt("prompt") is None
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache_manager = CacheManager(tmp_path, max_entries=10)
+    for i in range(11):
+        cache_manager.set_by_prompt(f"prompt {i}", "reply")
+    # Evicted down to 90% of the cap
+    assert cache_manager.stats["n_entries"] == 9
+    assert cache_manager.get_by_prompt("prompt 0") is None
+    assert cache_manager.get_by_prompt("prompt 10") == "reply"
+
+
+def test_size_is_bounded(tmp_path):
+    cache_manager = CacheManager(tmp_path, max_size_bytes=100)
+    for i in range(5):
+        cache_manager.set_by_prompt(f"prompt {i}", "x" * 30)
+    assert cache_manager.stats["size_bytes"] <= 100
+    cache_manager.set_by_prompt("prompt 4", "x")
+    assert cache_manager.stats["size_bytes"] == 61
+
+
+def test_legacy_directory_is_migrated(tmp_path):
+    legacy_directory = tmp_path / "v1"
+    legacy_directory.mkdir()
+    (legacy_directory / str(uuid5(NAMESPACE_URL, "Hello world"))).write_text("reply")
+    cache_manager = CacheManager(tmp_path, version_name="v1")
+    assert cache_manager.get_by_prompt("Hello, world!") == "reply"
+    assert not legacy_directory.exists()
+    assert (tmp_path / "v1.migrated").is_dir()
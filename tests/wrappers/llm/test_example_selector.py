@@ -0,0 +1,71 @@
+from src.wrappers.llm.prompting.example_selector import ExampleSelector
+from src.wrappers.llm.prompting.static_prefix_prompt import StaticPrefixPrompt
+
+EXAMPLES = [
+    {"query": "What's the total sales by month in 2023?", "language": "en"},
+    {"query": "¿Cuál es el valor promedio por método de pago?", "language": "es"},
+    {"query": "What's the average value by payment method?", "language": "en"},
+    {"query": "Compare sales for top 5 products by region", "language": "en"},
+    {"query": "Which customers have purchased blue products?", "language": "en"},
+]
+FORMATTER = "Q: {query}"
+
+
+def create_selector(**kwargs) -> ExampleSelector:
+    return ExampleSelector(
+        examples_texts=[e["query"] for e in EXAMPLES],
+        examples_sizes=[10] * len(EXAMPLES),
+        examples_languages=[e["language"] for e in EXAMPLES],
+        **kwargs,
+    )
+
+
+def test_compute_selects_similar_examples():
+    selector = create_selector(max_examples=2)
+    assert selector.compute("Top 5 products by region") == [3, 4]
+    assert 2 in selector.compute("Average value by payment method")
+
+
+def test_compute_keeps_query_language_example():
+    selector = create_selector(max_examples=2)
+    assert 1 in selector.compute("¿Cuáles son los productos más vendidos?")
+    assert 1 not in selector.compute("Which products sold the most?")
+
+
+def test_compute_respects_budget():
+    selector = create_selector(max_examples=5, max_size=20)
+    assert len(selector.compute("sales of products by month by region")) == 2
+
+
+def test_prompt_with_selection():
+    prompt = StaticPrefixPrompt(
+        "Instructions.",
+        "Q: {query}\nA:",
+        EXAMPLES,
+        FORMATTER,
+        example_selection_key="query",
+        max_examples=1,
+    )
+    assert prompt.prefix == "Instructions."
+    assert prompt.format(query="Which customers bought blue products?") == (
+        "Instructions.\n\nQ: Which customers have purchased blue products?"
+        "\n\nQ: Which customers bought blue products?\nA:"
+    )
+
+
+def test_prompt_selects_by_query_field_only():
+    examples = [
+        {"query": "Sales by region", "results": "SELECT customers FROM orders"},
+        {"query": "Orders of each customer", "results": "SELECT 1"},
+    ]
+    prompt = StaticPrefixPrompt(
+        "Instructions.",
+        "Q: {query}\nA:",
+        examples,
+        "Q: {query}\nA: {results}",
+        example_selection_key="query",
+        max_examples=1,
+    )
+    assert prompt.format_examples("Which customers placed orders?") == [
+        "Q: Orders of each customer\nA: SELECT 1"
+    ]
@@ -0,0 +1,68 @@
+import asyncio
+
+import pytest
+from src.wrappers.llm.pipelines.bedrock_text_generator import BedrockTextGenerator
+from src.wrappers.llm.pipelines.llm_pipeline import LlmPipeline
+from src.wrappers.llm.postprocessing.errors import OutputParsingError
+from src.wrappers.llm.postprocessing.tolerant_json_parser import TolerantJsonParser
+from src.wrappers.llm.response_caching.backends.memory_cache_backend import (
+    MemoryCacheBackend,
+)
+from src.wrappers.llm.response_caching.response_cache import ResponseCache
+
+REGION = "us-east-1"
+LLAMA = "us.meta.llama3-3-70b-instruct-v1:0"
+SCHEMA = {
+    "type": "object",
+    "properties": {"texts": {"type": "array", "items": {"type": "string"}}},
+    "required": ["texts"],
+}
+
+
+def create_pipeline(response_cache=None, transform=None) -> LlmPipeline:
+    return LlmPipeline(
+        render=lambda inputs: f"Highlight: {inputs['question']}",
+        generator=BedrockTextGenerator(
+            model_id=LLAMA,
+            region=REGION,
+            response_cache=response_cache,
+            use_converse=False,
+        ),
+        parse=TolerantJsonParser(json_schema=SCHEMA).parse,
+        transform=transform,
+    )
+
+
+def test_invoke_runs_all_steps(stub_client):
+    client = stub_client(['```json\n{"texts": ["a"]}\n```'])
+    pipeline = create_pipeline(transform=lambda answer: answer.replace("a", "b"))
+    assert pipeline.invoke({"question": "q"}) == {"texts": ["b"]}
+    assert client.prompts == ["Highlight: q"]
+
+
+def test_ainvoke_matches_invoke(stub_client):
+    stub_client(['{"texts": ["a", "b"]}'])
+    pipeline = create_pipeline()
+    assert asyncio.run(pipeline.ainvoke({"question": "q"})) == pipeline.invoke(
+        {"question": "q"}
+    )
+
+
+@pytest.mark.parametrize("is_async", [False, True])
+def test_parsing_error_forgets_cached_answer(stub_client, is_async):
+    client = stub_client(['{"words": []}', '{"texts": []}'])
+    cache = ResponseCache(MemoryCacheBackend(), namespace="pipeline", ttl_s=60)
+    pipeline = create_pipeline(response_cache=cache)
+
+    def invoke():
+        if is_async:
+            return asyncio.run(pipeline.ainvoke({"question": "q"}))
+        return pipeline.invoke({"question": "q"})
+
+    with pytest.raises(OutputParsingError):
+        invoke()
+    # The unparsable answer is not replayed from the cache
+    assert invoke() == {"texts": []}
+    assert len(client.prompts) == 2
+    assert invoke() == {"texts": []}
+    assert len(client.prompts) == 2
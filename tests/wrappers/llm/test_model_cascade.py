@@ -0,0 +1,52 @@
+import asyncio
+
+import pytest
+from src.wrappers.llm.model_cascade import ModelCascade
+
+
+def reject():
+    raise ValueError("Invalid output")
+
+
+def test_accepted_small_stage_is_not_escalated():
+    cascade = ModelCascade(stage_names=["small", "large"])
+    calls = []
+    result = cascade.run(
+        [lambda: calls.append("small") or "a", lambda: calls.append("large") or "b"]
+    )
+    assert result == "a"
+    assert calls == ["small"]
+    stats = cascade.stats
+    assert stats["n_requests"] == 1
+    assert stats["stages"]["small"]["acceptance_rate"] == 1.0
+    assert stats["stages"]["large"]["n_attempts"] == 0
+    assert stats["latency"]["n_samples"] == 1
+
+
+def test_rejected_stage_escalates():
+    cascade = ModelCascade(stage_names=["small", "large"])
+    assert cascade.run([reject, lambda: "b"]) == "b"
+    assert asyncio.run(cascade.arun([reject, lambda: asyncio.sleep(0, "c")])) == "c"
+    stats = cascade.stats
+    assert stats["n_requests"] == 2
+    assert stats["stages"]["small"]["acceptance_rate"] == 0.0
+    assert stats["stages"]["small"]["rejection_reasons"] == {"ValueError": 2}
+    assert stats["stages"]["large"]["n_accepted"] == 2
+    assert stats["stages"]["large"]["latency"]["n_samples"] == 2
+
+
+def test_last_stage_failure_is_raised():
+    cascade = ModelCascade(stage_names=["small", "large"])
+    with pytest.raises(ValueError):
+        cascade.run([reject, reject])
+    assert cascade.stats["n_requests"] == 1
+    assert cascade.stats["stages"]["large"]["n_rejected"] == 1
+
+
+def test_stages_must_match_stage_names():
+    cascade = ModelCascade(stage_names=["small", "large"])
+    with pytest.raises(ValueError):
+        cascade.run([lambda: "a"])
+    with pytest.raises(ValueError):
+        asyncio.run(cascade.arun([reject, reject, lambda: asyncio.sleep(0, "c")]))
+    assert cascade.stats["n_requests"] == 0
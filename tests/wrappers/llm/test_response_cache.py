@@ -0,0 +1,123 @@
+import asyncio
+import time
+
+import pytest
+from src.wrappers.llm.response_caching.backends import default_cache_backend
+from src.wrappers.llm.response_caching.backends.memory_cache_backend import (
+    MemoryCacheBackend,
+)
+from src.wrappers.llm.response_caching.backends.sqlite_cache_backend import (
+    SqliteCacheBackend,
+)
+from src.wrappers.llm.response_caching.response_cache import ResponseCache
+
+
+class Counter:
+    def __init__(self):
+        self.n_calls = 0
+
+    def __call__(self) -> str:
+        self.n_calls += 1
+        return f"answer {self.n_calls}"
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def backend(request, tmp_path):
+    if request.param == "memory":
+        return MemoryCacheBackend(max_entries=2)
+    return SqliteCacheBackend(tmp_path / "cache.sqlite3")
+
+
+def test_get_or_compute_hits(backend):
+    cache = ResponseCache(backend, namespace="test", ttl_s=60)
+    compute = Counter()
+    assert cache.get_or_compute("key", compute) == "answer 1"
+    assert cache.get_or_compute("key", compute) == "answer 1"
+    assert compute.n_calls == 1
+    assert cache.stats["n_hits"] == 1
+    assert cache.stats["n_misses"] == 1
+
+
+def test_get_or_compute_expires(backend):
+    cache = ResponseCache(backend, namespace="test", ttl_s=0.05)
+    compute = Counter()
+    cache.get_or_compute("key", compute)
+    time.sleep(0.1)
+    assert cache.get_or_compute("key", compute) == "answer 2"
+
+
+def test_stale_while_revalidate(backend):
+    cache = ResponseCache(backend, namespace="test", ttl_s=0.2, stale_ttl_s=60)
+    compute = Counter()
+    cache.get_or_compute("key", compute)
+    time.sleep(0.25)
+    # The stale answer is served while it is refreshed in the background
+    assert cache.get_or_compute("key", compute) == "answer 1"
+    for _ in range(100):
+        if compute.n_calls == 2:
+            break
+        time.sleep(0.01)
+    time.sleep(0.02)
+    assert cache.get_or_compute("key", compute) == "answer 2"
+    assert cache.stats["n_stale_hits"] == 1
+    assert cache.stats["n_revalidations"] == 1
+
+
+def test_aget_or_compute_hits(backend):
+    cache = ResponseCache(backend, namespace="test", ttl_s=60)
+    compute = Counter()
+
+    async def acompute() -> str:
+        return compute()
+
+    async def run():
+        return [await cache.aget_or_compute("key", acompute) for _ in range(2)]
+
+    assert asyncio.run(run()) == ["answer 1", "answer 1"]
+    assert compute.n_calls == 1
+
+
+def test_memory_backend_is_bounded():
+    cache = ResponseCache(MemoryCacheBackend(max_entries=2), namespace="t", ttl_s=60)
+    compute = Counter()
+    for key in ["a", "b", "a", "c", "a", "b"]:
+        cache.get_or_compute(key, compute)
+    # "b" was the least recently used entry when "c" was added
+    assert compute.n_calls == 4
+
+
+@pytest.mark.parametrize(
+    "variables, backend_class",
+    [
+        ({}, MemoryCacheBackend),
+        ({"LLM_RESPONSE_CACHE_BACKEND": "none"}, None),
+        ({"LLM_RESPONSE_CACHE_BACKEND": "unknown"}, MemoryCacheBackend),
+        ({"LLM_RESPONSE_CACHE_BACKEND": "sqlite"}, MemoryCacheBackend),
+        (
+            {"LLM_RESPONSE_CACHE_BACKEND": "sqlite", "filepath": True},
+            SqliteCacheBackend,
+        ),
+    ],
+)
+def test_default_cache_backend_is_configured(
+    monkeypatch, tmp_path, variables, backend_class
+):
+    if variables.pop("filepath", False):
+        variables["LLM_RESPONSE_CACHE_SQLITE_FILEPATH"] = str(tmp_path / "c.sqlite3")
+
+    class FakeVariablesGrabber:
+        def get(self, name: str):
+            return variables.get(name)
+
+    monkeypatch.setattr(default_cache_backend, "VariablesGrabber", FakeVariablesGrabber)
+    default_cache_backend.get_default_cache_backend.cache_clear()
+    try:
+        backend = default_cache_backend.get_default_cache_backend()
+    finally:
+        default_cache_backend.get_default_cache_backend.cache_clear()
+    if backend_class is None:
+        assert backend is None
+    else:
+        assert isinstance(backend, backend_class)
+    # Nothing is created but the configured file
+    assert [p.name for p in tmp_path.iterdir() if p.is_dir()] == []
@@ -0,0 +1,96 @@
+import random
+from copy import deepcopy
+from datetime import datetime
+
+import pytest
+from jsonschema import SchemaError, ValidationError, validate
+from src.utils.dict_toolbox import convert_keys_case
+from src.utils.string_toolbox import CaseType
+from src.wrappers.llm.postprocessing.results_validator import ResultsValidator
+
+SCHEMA = {
+    "type": "object",
+    "properties": {
+        "Sql Queries": {"type": "array", "items": {"type": "string"}},
+        "Title": {"type": ["string", "null"]},
+        "Chart Options": {
+            "type": "object",
+            "properties": {"Stacked": {"type": "boolean"}},
+            "additionalProperties": {"type": "integer"},
+        },
+        "Rows": {"type": "array", "items": {"type": "array"}},
+    },
+    "required": ["Sql Queries", "Title"],
+}
+# "enum" is not compiled: validated by jsonschema
+FALLBACK_SCHEMA = SCHEMA | {
+    "properties": SCHEMA["properties"] | {"Unit": {"enum": ["EUR", "USD"]}}
+}
+RESULTS = {
+    "Sql Queries": ["SELECT 1"],
+    "Title": "Sales",
+    "Chart Options": {"Stacked": True, "Max Items": 10},
+    "Metadata": {"Nested Dict": {"Inner Key": 1}},
+    "Rows": [[1, "a", None], [2.5, "b", {"Not Converted": 1}]],
+}
+
+
+def validate_legacy(results: dict, schema: dict) -> dict | Exception:
+    try:
+        validate(instance=results, schema=schema)
+    except ValidationError as e:
+        return e
+    return convert_keys_case(results, CaseType.KEBAB, recursive=True)
+
+
+def mutate(results: dict, rng: random.Random) -> dict:
+    results = deepcopy(results)
+    match rng.randrange(6):
+        case 0:
+            results.pop(rng.choice(["Sql Queries", "Title"]))
+        case 1:
+            results["Sql Queries"].append(rng.choice([1, None, True, "SELECT 2"]))
+        case 2:
+            results["Title"] = rng.choice([None, 1, ["a"], "Other"])
+        case 3:
+            results["Chart Options"][rng.choice(["Stacked", "Other"])] = rng.choice(
+                [1, 1.0, 1.5, False, "a"]
+            )
+        case 4:
+            results["Rows"].append(rng.choice([[], (1,), {"a": 1}, 1]))
+        case 5:
+            results[rng.choice(["Extra Key", "Other"])] = {"Inner Key": [1]}
+    return results
+
+
+@pytest.mark.parametrize("schema", [SCHEMA, FALLBACK_SCHEMA])
+def test_same_results_as_jsonschema_validation(schema):
+    validator = ResultsValidator(schema)
+    rng = random.Random(0)
+    for _ in range(300):
+        results = mutate(RESULTS, rng)
+        expected = validate_legacy(deepcopy(results), schema)
+        actual = validator.validate(results)
+        if isinstance(expected, ValidationError):
+            assert isinstance(actual, ValidationError)
+            assert actual.message == expected.message
+        else:
+            assert actual == expected
+
+
+def test_keys_are_converted_without_schema():
+    results = ResultsValidator(None).validate(deepcopy(RESULTS))
+    assert results == convert_keys_case(RESULTS, CaseType.KEBAB, recursive=True)
+    assert "max-items" in results["chart-options"]
+
+
+def test_invalid_schema_is_returned():
+    validator = ResultsValidator({"type": "unknown"})
+    assert isinstance(validator.validate({"a": 1}), SchemaError)
+
+
+def test_date_is_formatted():
+    results = ResultsValidator(None, date_format="%d/%m/%Y").validate(
+        {"Date": "31/12/2025"}
+    )
+    assert results == {"date": datetime(2025, 12, 31)}
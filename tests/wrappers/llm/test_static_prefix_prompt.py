@@ -0,0 +1,47 @@
+import pytest
+from langchain_core.prompts.few_shot import FewShotPromptTemplate
+from langchain_core.prompts.prompt import PromptTemplate
+from src.wrappers.llm.prompting.errors import InvalidStaticPrefixPromptError
+from src.wrappers.llm.prompting.static_prefix_prompt import StaticPrefixPrompt
+
+PREFIX = 'Return a JSON like {{"texts": []}}.'
+SUFFIX = "Question: {question}\nResults:"
+FORMATTER = "Example {example_id}:\n{results}"
+EXAMPLES = [
+    {"example_id": 1, "results": '{"texts": ["a"]}'},
+    {"example_id": 2, "results": '{"texts": ["b"]}'},
+]
+
+
+def test_format_matches_few_shot_prompt_template():
+    few_shot_prompt_template = FewShotPromptTemplate(
+        prefix=PREFIX,
+        examples=[
+            {k: str(v).replace("{", "{{").replace("}", "}}") for k, v in e.items()}
+            for e in EXAMPLES
+        ],
+        example_prompt=PromptTemplate.from_template(FORMATTER),
+        input_variables=["question"],
+        suffix=SUFFIX,
+    )
+    prompt = StaticPrefixPrompt(PREFIX, SUFFIX, EXAMPLES, FORMATTER)
+    question = "What is {this}?"
+    assert prompt.format(question=question) == few_shot_prompt_template.format(
+        question=question
+    )
+    assert prompt.input_variables == ["question"]
+
+
+def test_fingerprint():
+    prompt = StaticPrefixPrompt(PREFIX, SUFFIX, EXAMPLES, FORMATTER)
+    other_suffix = StaticPrefixPrompt(
+        PREFIX, "Other suffix {question}", EXAMPLES, FORMATTER
+    )
+    other_examples = StaticPrefixPrompt(PREFIX, SUFFIX, EXAMPLES[::-1], FORMATTER)
+    assert prompt.fingerprint == other_suffix.fingerprint
+    assert prompt.fingerprint != other_examples.fingerprint
+
+
+def test_invalid_prefix():
+    with pytest.raises(InvalidStaticPrefixPromptError):
+        StaticPrefixPrompt("Unescaped {variable}", SUFFIX, EXAMPLES, FORMATTER)